@@ -8,8 +8,9 @@ equations, reactions, and relationships?
 # agents/analysis/content_analyzer.py
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from core.state import UserProfile, TutoringState, GroundedContext, PlannerOutput
+from core.context_builder import build_context, prompt_diagnostics
 from preprocessing.text_cleaner import clean_llm_string
 
 logger = logging.getLogger(__name__)
@@ -18,7 +19,7 @@ logger = logging.getLogger(__name__)
 def build_content_analyzer_prompt(
     task: Dict[str, Any],
     planning_context: Dict[str, str],
-    grounded_context: GroundedContext,
+    source_content: str,
 ) -> str:
     return f"""
 You are a content analysis agent.
@@ -38,7 +39,7 @@ Chapter: {planning_context.get("chapter", "")}
 Sub-topic: {planning_context.get("sub_topic", "")}
 
 SOURCE CONTENT (CLEANED IMAGE ANALYSIS):
-{grounded_context.image_analysis}
+{source_content}
 
 RULES:
 - Extract concepts, facts, definitions, equations, reactions, and relationships
@@ -49,6 +50,19 @@ RULES:
 """
 
 
+def _build_prompt(task: Dict[str, Any], state: TutoringState) -> Tuple[str, Dict[str, Any]]:
+    rendered, report = build_context(
+        "content_analyzer",
+        {"image_analysis": state.grounded_context.image_analysis},
+    )
+    prompt = build_content_analyzer_prompt(
+        task,
+        state.plan.planning_context,
+        rendered["image_analysis"],
+    )
+    return prompt, prompt_diagnostics(prompt, report)
+
+
 def content_analyzer_agent(
     llm,
     task: Dict[str, Any],
@@ -58,17 +72,37 @@ def content_analyzer_agent(
     Extracts core academic content from the grounded context.
     """
 
-    planning_context = state.plan.planning_context
-    grounded_context = state.grounded_context
+    prompt, diagnostics = _build_prompt(task, state)
 
     logger.info("Running content analyzer")
-    response = llm.invoke(
-        build_content_analyzer_prompt(task, planning_context, grounded_context)
-    )
+    response = llm.invoke(prompt)
 
     # Clean text output
     cleaned = clean_llm_string(response.content)
 
     return {
-        "knowledge_base": {task["task_id"]: cleaned}
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": diagnostics,
+    }
+
+
+async def acontent_analyzer_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Async variant of content_analyzer_agent.
+    """
+
+    prompt, diagnostics = _build_prompt(task, state)
+
+    logger.info("Running content analyzer (async)")
+    response = await llm.ainvoke(prompt)
+
+    cleaned = clean_llm_string(response.content)
+
+    return {
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": diagnostics,
     }
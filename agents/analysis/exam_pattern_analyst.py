@@ -7,9 +7,10 @@ Given the extracted content, how is this usually tested in the target exam?
 
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
 from core.state import TutoringState
+from core.context_builder import build_context, knowledge_sections, prompt_diagnostics
 from preprocessing.text_cleaner import clean_llm_string
 
 logger = logging.getLogger(__name__)
@@ -51,6 +52,19 @@ RULES:
 """
 
 
+def _build_prompt(task: Dict[str, Any], state: TutoringState) -> Tuple[str, Dict[str, Any]]:
+    rendered, report = build_context(
+        "exam_pattern_analyst",
+        knowledge_sections("exam_pattern_analyst", state.knowledge_base),
+    )
+    prompt = build_exam_pattern_prompt(
+        task,
+        state.plan.planning_context,
+        rendered.get("content_analyzer", ""),
+    )
+    return prompt, prompt_diagnostics(prompt, report)
+
+
 def exam_pattern_analyst_agent(
     llm,
     task: Dict[str, Any],
@@ -60,17 +74,36 @@ def exam_pattern_analyst_agent(
     Analyzes exam relevance and testing patterns for extracted content.
     """
 
-    planning_context = state.plan.planning_context
-
-    extracted_content = state.knowledge_base.get("content_analyzer", "")
+    prompt, diagnostics = _build_prompt(task, state)
 
     logger.info("Running exam pattern analyst")
-    response = llm.invoke(
-        build_exam_pattern_prompt(task, planning_context, extracted_content)
-    )
+    response = llm.invoke(prompt)
+
+    cleaned = clean_llm_string(response.content)
+
+    return {
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": diagnostics,
+    }
+
+
+async def aexam_pattern_analyst_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Async variant of exam_pattern_analyst_agent.
+    """
+
+    prompt, diagnostics = _build_prompt(task, state)
+
+    logger.info("Running exam pattern analyst (async)")
+    response = await llm.ainvoke(prompt)
 
     cleaned = clean_llm_string(response.content)
 
     return {
-        "knowledge_base": {task["task_id"]: cleaned}
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": diagnostics,
     }
@@ -8,9 +8,10 @@ at what difficulty, and with what distractor logic?
 
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
 from core.state import TutoringState
+from core.context_builder import build_context, knowledge_sections, prompt_diagnostics
 from preprocessing.text_cleaner import clean_llm_string
 
 logger = logging.getLogger(__name__)
@@ -56,6 +57,20 @@ RULES:
 """
 
 
+def _build_prompt(task: Dict[str, Any], state: TutoringState) -> Tuple[str, Dict[str, Any]]:
+    rendered, report = build_context(
+        "question_designer",
+        knowledge_sections("question_designer", state.knowledge_base),
+    )
+    prompt = build_question_design_prompt(
+        task,
+        state.plan.planning_context,
+        rendered.get("content_analyzer", ""),
+        rendered.get("exam_pattern_analyst", ""),
+    )
+    return prompt, prompt_diagnostics(prompt, report)
+
+
 def question_designer_agent(
     llm,
     task: Dict[str, Any],
@@ -65,23 +80,36 @@ def question_designer_agent(
     Designs question intent, difficulty, and distractors.
     """
 
-    planning_context = state.plan.planning_context
-
-    extracted_content = state.knowledge_base.get("content_analyzer", "")
-    exam_analysis = state.knowledge_base.get("exam_pattern_analyst", "")
+    prompt, diagnostics = _build_prompt(task, state)
 
     logger.info("Running question designer")
-    response = llm.invoke(
-        build_question_design_prompt(
-            task,
-            planning_context,
-            extracted_content,
-            exam_analysis,
-        )
-    )
+    response = llm.invoke(prompt)
+
+    cleaned = clean_llm_string(response.content)
+
+    return {
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": diagnostics,
+    }
+
+
+async def aquestion_designer_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Async variant of question_designer_agent.
+    """
+
+    prompt, diagnostics = _build_prompt(task, state)
+
+    logger.info("Running question designer (async)")
+    response = await llm.ainvoke(prompt)
 
     cleaned = clean_llm_string(response.content)
 
     return {
-        "knowledge_base": {task["task_id"]: cleaned}
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": diagnostics,
     }
@@ -6,18 +6,41 @@ Are these answers correct, complete, well-structured, and aligned with the board
 # agents/evaluation/evaluator_agent.py
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from core.state import TutoringState, UserProfile, PlannerOutput, GroundedContext
-from preprocessing.json_utils import extract_json_from_llm, JSONExtractionError
+from preprocessing.json_utils import extract_json_with_report, JSONExtractionError
 from preprocessing.text_cleaner import clean_llm_json
+from core.schemas import Evaluation
+from core.structured_output import supports_structured_output, invoke_structured, ainvoke_structured
+from core.context_builder import ContextBudgetError, build_context, fits_context, prompt_diagnostics
+from core.llm_cache import forget_responses
+from core.sharding import (
+    QUESTION_SECTIONS,
+    count_questions,
+    sample_question_bank,
+    shard_question_bank,
+    split_to_fit,
+    shard_bank,
+    shard_reports,
+    merge_shard_outputs,
+    run_shards,
+    arun_shards,
+)
+from config.concurrency import (
+    EVALUATOR_BATCH_SIZE,
+    EVALUATOR_MAX_PARALLEL_BATCHES,
+    EVALUATOR_BATCH_RETRIES,
+    EVALUATOR_SAMPLE_FRACTION,
+    EVALUATOR_SAMPLE_COUNT,
+)
 
 logger = logging.getLogger(__name__)
 
 
 def build_evaluator_prompt(
     planning_context: Dict[str, str],
-    question_bank: Dict[str, Any],
-    solver_output: Dict[str, Any],
+    question_bank: str,
+    solver_output: str,
 ) -> str:
     return f"""
 You are an expert examiner and teacher.
@@ -53,33 +76,13 @@ OUTPUT FORMAT:
 """
 
 
-def evaluator_agent(
-    llm,
-    task: Dict[str, Any],
-    state: TutoringState,
-) -> Dict[str, Any]:
-    """
-    Evaluates solutions using exam-specific criteria.
-    """
-
-    planning_context = state.plan.planning_context
-    question_bank = state.question_bank
-    solver_output = state.solver_output
-
-    logger.info("Running evaluator")
-    response = llm.invoke(
-        build_evaluator_prompt(
-            planning_context,
-            question_bank,
-            solver_output,
-        )
-    )
-
+def _parse_evaluation(content: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     try:
-        parsed = extract_json_from_llm(response.content)
+        parsed, report = extract_json_with_report(content)
         cleaned = clean_llm_json(parsed)
     except JSONExtractionError as exc:
         logger.warning("Evaluator JSON parse failed: %s", exc)
+        report = {"strategy": "failed", "error": str(exc)}
         cleaned = {
             "overall_feedback": "Evaluator output could not be parsed.",
             "mcq": [],
@@ -102,7 +105,359 @@ def evaluator_agent(
             "long_answer": [],
         }
 
+    return cleaned, report
+
+
+def _invoke_evaluation(llm, prompt: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if supports_structured_output(llm, "evaluator"):
+        cleaned = clean_llm_json(invoke_structured(llm, prompt, Evaluation))
+        return cleaned, {"strategy": "structured"}
+    response = llm.invoke(prompt)
+    content = response.content if hasattr(response, "content") else response
+    return _parse_evaluation(content)
+
+
+async def _ainvoke_evaluation(llm, prompt: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if supports_structured_output(llm, "evaluator"):
+        cleaned = clean_llm_json(await ainvoke_structured(llm, prompt, Evaluation))
+        return cleaned, {"strategy": "structured"}
+    response = await llm.ainvoke(prompt)
+    content = response.content if hasattr(response, "content") else response
+    return _parse_evaluation(content)
+
+
+def _build_prompt(
+    state: TutoringState,
+    question_bank: Dict[str, Any],
+    solver_output: Dict[str, Any],
+) -> Tuple[str, Dict[str, Any]]:
+    rendered, report = build_context(
+        "evaluator",
+        {"question_bank": question_bank, "solver_output": solver_output},
+    )
+    prompt = build_evaluator_prompt(
+        state.plan.planning_context,
+        rendered["question_bank"],
+        rendered["solver_output"],
+    )
+    return prompt, prompt_diagnostics(prompt, report)
+
+
+# -------------------------------------------------
+# Batched / sampled evaluation
+# -------------------------------------------------
+
+def _plan_batches(state: TutoringState) -> Optional[Dict[str, Any]]:
+    """
+    Batches to evaluate separately, or None when one call covers the bank.
+    A bank (or batch) too large for one prompt is split further rather than
+    cut down to fit.
+    """
+    question_bank = state.question_bank if isinstance(state.question_bank, dict) else {}
+    sampled, positions = sample_question_bank(
+        question_bank,
+        EVALUATOR_SAMPLE_FRACTION,
+        EVALUATOR_SAMPLE_COUNT,
+    )
+    total = count_questions(question_bank)
+    evaluated = count_questions(sampled)
+    batches = shard_question_bank(sampled, EVALUATOR_BATCH_SIZE)
+    plan = {"batches": batches, "positions": positions, "evaluated": evaluated, "total": total}
+    if evaluated == total and len(batches) <= 1:
+        if fits_context("evaluator", {"question_bank": question_bank, "solver_output": state.solver_output}):
+            return None
+        logger.warning("Question bank does not fit one evaluator prompt; splitting it")
+    plan["batches"] = split_to_fit(
+        batches,
+        lambda batch: fits_context("evaluator", _batch_sections(state, plan, batch)),
+    )
+    return plan
+
+
+def _batch_solutions(state: TutoringState, plan: Dict[str, Any], batch: Dict[str, Any]) -> List[Any]:
+    # Solutions line up with the question bank by section and index.
+    section = batch["section"]
+    solutions = state.solver_output.get(section) if isinstance(state.solver_output, dict) else None
+    solutions = solutions if isinstance(solutions, list) else []
+    indices = plan["positions"][section][batch["offset"]:batch["offset"] + len(batch["items"])]
+    return [solutions[index] if index < len(solutions) else {} for index in indices]
+
+
+def _batch_sections(state: TutoringState, plan: Dict[str, Any], batch: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "question_bank": shard_bank(batch),
+        "solver_output": {batch["section"]: _batch_solutions(state, plan, batch)},
+    }
+
+
+def _batch_prompt(
+    state: TutoringState,
+    plan: Dict[str, Any],
+    batch: Dict[str, Any],
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    # A question too large for a prompt on its own is left unevaluated.
+    sections = _batch_sections(state, plan, batch)
+    try:
+        return _build_prompt(state, sections["question_bank"], sections["solver_output"])
+    except ContextBudgetError as exc:
+        return None, {"prompt_tokens": 0, "context_error": str(exc)}
+
+
+def _no_prompt(batch: Dict[str, Any]) -> ContextBudgetError:
+    return ContextBudgetError(
+        f"Evaluator {batch['section']} batch at {batch['offset']} does not fit the context budget"
+    )
+
+
+def _check_batch(batch: Dict[str, Any], cleaned: Dict[str, Any], report: Dict[str, Any]) -> None:
+    if report.get("strategy") == "failed" or not merge_shard_outputs([batch], [cleaned])[batch["section"]]:
+        raise ValueError(
+            f"Evaluator returned no results for {batch['section']} batch at {batch['offset']}"
+        )
+
+
+def _unevaluated(item: Any) -> Dict[str, Any]:
+    return {
+        "question": item.get("question", "") if isinstance(item, dict) else str(item),
+        "is_correct": None,
+        "score": None,
+        "feedback": "",
+        "improvements": [],
+    }
+
+
+def _unevaluated_batch(batch: Dict[str, Any], exc: Exception) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    results = [_unevaluated(item) for item in batch["items"]]
+    return {batch["section"]: results}, {"strategy": "failed", "error": str(exc)}
+
+
+def _by_position(
+    state: TutoringState,
+    plan: Dict[str, Any],
+    outputs: List[Dict[str, Any]],
+) -> Dict[str, List[Any]]:
+    """
+    Per-item results laid out by question bank position, one per question.
+    A question left out of the sample gets an unevaluated entry marked
+    "sampled": False; one missing from its batch's output stays unevaluated.
+    """
+    question_bank = state.question_bank if isinstance(state.question_bank, dict) else {}
+    laid_out: Dict[str, List[Any]] = {}
+    for section in QUESTION_SECTIONS:
+        questions = question_bank.get(section)
+        laid_out[section] = [None] * len(questions) if isinstance(questions, list) else []
+    for batch, output in zip(plan["batches"], outputs):
+        section = batch["section"]
+        items = merge_shard_outputs([batch], [output])[section]
+        indices = plan["positions"][section][batch["offset"]:batch["offset"] + len(batch["items"])]
+        for index, item in zip(indices, items):
+            laid_out[section][index] = item
+
+    for section, results in laid_out.items():
+        sampled = set(plan["positions"][section])
+        for index, result in enumerate(results):
+            if result is not None:
+                continue
+            results[index] = _unevaluated(question_bank[section][index])
+            if index not in sampled:
+                results[index]["sampled"] = False
+    return laid_out
+
+
+def _coverage(evaluation: Dict[str, Any], evaluated: int, total: int) -> Dict[str, Any]:
+    items = [
+        item
+        for section in QUESTION_SECTIONS
+        for item in evaluation.get(section, [])
+        if isinstance(item, dict)
+    ]
+    judged = [item["is_correct"] for item in items if isinstance(item.get("is_correct"), bool)]
+    scores = [
+        float(item["score"])
+        for item in items
+        if isinstance(item.get("score"), (int, float)) and not isinstance(item.get("score"), bool)
+    ]
+    coverage = {
+        "evaluated": evaluated,
+        "total": total,
+        "sampled": evaluated < total,
+        "judged": len(judged),
+        "correct": sum(judged),
+    }
+    if judged:
+        coverage["estimated_accuracy"] = round(sum(judged) / len(judged), 3)
+    if scores:
+        coverage["mean_score"] = round(sum(scores) / len(scores), 3)
+    return coverage
+
+
+def _overall_feedback(outputs: List[Dict[str, Any]], coverage: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for output in outputs:
+        feedback = str(output.get("overall_feedback") or "").strip()
+        if feedback and feedback not in lines:
+            lines.append(feedback)
+    if coverage["sampled"]:
+        summary = f"Evaluated a sample of {coverage['evaluated']} of {coverage['total']} questions."
+        if "estimated_accuracy" in coverage:
+            summary += (
+                f" {coverage['correct']} of {coverage['judged']} sampled answers were judged correct,"
+                f" so about {coverage['estimated_accuracy']:.0%} of the full set is expected to be correct."
+            )
+        lines.insert(0, summary)
+    return "\n".join(lines)
+
+
+def _merge_batches(
+    task: Dict[str, Any],
+    state: TutoringState,
+    plan: Dict[str, Any],
+    prompts: List[Tuple[str, Dict[str, Any]]],
+    results: List[Tuple[Any, Dict[str, Any]]],
+) -> Dict[str, Any]:
+    batches = plan["batches"]
+    if batches and all(meta["fallback_used"] for _result, meta in results):
+        raise RuntimeError("Evaluator failed on every batch")
+
+    outputs = [cleaned for (cleaned, _report), _meta in results]
+    merged = _by_position(state, plan, outputs)
+    coverage = _coverage(merged, plan["evaluated"], plan["total"])
+    evaluation = {
+        "overall_feedback": _overall_feedback(outputs, coverage),
+        **merged,
+        "coverage": coverage,
+    }
+    reports = shard_reports(
+        batches,
+        [diagnostics["prompt_tokens"] for _prompt, diagnostics in prompts],
+        results,
+    )
+    return {
+        "evaluation": evaluation,
+        "knowledge_base": {task["task_id"]: evaluation},
+        "diagnostics": {
+            "prompt_tokens": sum(report["prompt_tokens"] for report in reports),
+            "json_extraction": {"strategy": "batched"},
+            "batches": reports,
+        },
+    }
+
+
+def _batch_prompts(state: TutoringState, plan: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    return [_batch_prompt(state, plan, batch) for batch in plan["batches"]]
+
+
+def _evaluate_batched(llm, task: Dict[str, Any], state: TutoringState, plan: Dict[str, Any]) -> Dict[str, Any]:
+    prompts = _batch_prompts(state, plan)
+    prompt_of = {id(batch): prompt for batch, (prompt, _diagnostics) in zip(plan["batches"], prompts)}
+
+    def _evaluate(batch: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if prompt_of[id(batch)] is None:
+            raise _no_prompt(batch)
+        cleaned, report = _invoke_evaluation(llm, prompt_of[id(batch)])
+        try:
+            _check_batch(batch, cleaned, report)
+        except ValueError:
+            forget_responses(llm, prompt_of[id(batch)])
+            raise
+        return cleaned, report
+
+    logger.info(
+        "Running evaluator on %d batches (%d of %d questions)",
+        len(plan["batches"]),
+        plan["evaluated"],
+        plan["total"],
+    )
+    results = run_shards(
+        "evaluator",
+        plan["batches"],
+        _evaluate,
+        max_parallel=EVALUATOR_MAX_PARALLEL_BATCHES,
+        retries=EVALUATOR_BATCH_RETRIES,
+        fallback=_unevaluated_batch,
+        deadline=state.deadline_at,
+    )
+    return _merge_batches(task, state, plan, prompts, results)
+
+
+async def _aevaluate_batched(llm, task: Dict[str, Any], state: TutoringState, plan: Dict[str, Any]) -> Dict[str, Any]:
+    prompts = _batch_prompts(state, plan)
+    prompt_of = {id(batch): prompt for batch, (prompt, _diagnostics) in zip(plan["batches"], prompts)}
+
+    async def _evaluate(batch: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if prompt_of[id(batch)] is None:
+            raise _no_prompt(batch)
+        cleaned, report = await _ainvoke_evaluation(llm, prompt_of[id(batch)])
+        try:
+            _check_batch(batch, cleaned, report)
+        except ValueError:
+            forget_responses(llm, prompt_of[id(batch)])
+            raise
+        return cleaned, report
+
+    logger.info(
+        "Running evaluator on %d batches (%d of %d questions, async)",
+        len(plan["batches"]),
+        plan["evaluated"],
+        plan["total"],
+    )
+    results = await arun_shards(
+        "evaluator",
+        plan["batches"],
+        _evaluate,
+        max_parallel=EVALUATOR_MAX_PARALLEL_BATCHES,
+        retries=EVALUATOR_BATCH_RETRIES,
+        fallback=_unevaluated_batch,
+        deadline=state.deadline_at,
+    )
+    return _merge_batches(task, state, plan, prompts, results)
+
+
+def evaluator_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Evaluates solutions using exam-specific criteria.
+    """
+
+    plan = _plan_batches(state)
+    if plan is not None:
+        return _evaluate_batched(llm, task, state, plan)
+
+    prompt, diagnostics = _build_prompt(state, state.question_bank, state.solver_output)
+
+    logger.info("Running evaluator")
+    cleaned, report = _invoke_evaluation(llm, prompt)
+
+    return {
+        "evaluation": cleaned,
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": {**diagnostics, "json_extraction": report},
+    }
+
+
+async def aevaluator_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Async variant of evaluator_agent.
+    """
+
+    plan = _plan_batches(state)
+    if plan is not None:
+        return await _aevaluate_batched(llm, task, state, plan)
+
+    prompt, diagnostics = _build_prompt(state, state.question_bank, state.solver_output)
+
+    logger.info("Running evaluator (async)")
+    cleaned, report = await _ainvoke_evaluation(llm, prompt)
+
     return {
         "evaluation": cleaned,
         "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": {**diagnostics, "json_extraction": report},
     }
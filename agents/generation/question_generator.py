@@ -6,18 +6,37 @@ Based on everything decided so far, generate the actual questions and answers.
 # agents/generation/question_generator.py
 
 import logging
-from typing import Dict, Any
+import time
+from typing import Callable, Dict, Any, Tuple
 from core.state import TutoringState, UserProfile, PlannerOutput, GroundedContext
-from preprocessing.json_utils import extract_json_from_llm, JSONExtractionError
+from preprocessing.json_utils import extract_json_with_report, JSONExtractionError, IncrementalJSONItems
 from preprocessing.text_cleaner import clean_llm_json
+from core.schemas import QuestionBank
+from core.context_builder import build_context, knowledge_sections, render_sections, prompt_diagnostics
+from core.structured_output import supports_structured_output, invoke_structured, ainvoke_structured
+from core.llm_cache import agent_llm
+from core.handoff import hand_over
+from core.resilience import on_abandon
+from agents.solving.solver_agent import PipelinedSolver, AsyncPipelinedSolver
+from config.concurrency import PIPELINED_SOLVING_ENABLED
 
 logger = logging.getLogger(__name__)
 
 
+def _recent_questions_block(stems: Any) -> str:
+    if not stems:
+        return ""
+    listed = "\n".join(f"- {stem}" for stem in stems)
+    return f"""
+RECENTLY GENERATED QUESTIONS (do NOT repeat or paraphrase these):
+{listed}
+"""
+
+
 def build_question_generator_prompt(
     task: Dict[str, Any],
     planning_context: Dict[str, str],
-    knowledge_base: Dict[str, Any],
+    knowledge_base: str,
 ) -> str:
     return f"""
 You are a question generation agent.
@@ -38,7 +57,7 @@ Sub-topic: {planning_context.get("sub_topic", "")}
 
 KNOWLEDGE BASE:
 {knowledge_base}
-
+{_recent_questions_block(task.get("avoid_questions"))}
 RULES:
 - Generate questions strictly based on the knowledge base
 - Follow the question design guidance
@@ -56,32 +75,13 @@ OUTPUT FORMAT:
 """
 
 
-def question_generator_agent(
-    llm,
-    task: Dict[str, Any],
-    state: TutoringState,
-) -> Dict[str, Any]:
-    """
-    Generates final exam-aligned questions.
-    """
-
-    planning_context = state.plan.planning_context
-    knowledge_base = state.knowledge_base
-
-    logger.info("Running question generator")
-    response = llm.invoke(
-        build_question_generator_prompt(
-            task,
-            planning_context,
-            knowledge_base,
-        )
-    )
-
+def _parse_question_bank(content: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     try:
-        parsed = extract_json_from_llm(response.content)
+        parsed, report = extract_json_with_report(content)
         cleaned = clean_llm_json(parsed)
     except JSONExtractionError as exc:
         logger.warning("Question generator JSON parse failed: %s", exc)
+        report = {"strategy": "failed", "error": str(exc)}
         cleaned = {"mcq": [], "short_answer": [], "long_answer": []}
 
     if isinstance(cleaned, list):
@@ -93,7 +93,191 @@ def question_generator_agent(
     elif not isinstance(cleaned, dict):
         cleaned = {"mcq": [], "short_answer": [], "long_answer": []}
 
+    return cleaned, report
+
+
+def _invoke_question_bank(llm, prompt: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if supports_structured_output(llm, "question_generator"):
+        cleaned = clean_llm_json(invoke_structured(llm, prompt, QuestionBank))
+        return cleaned, {"strategy": "structured"}
+    response = llm.invoke(prompt)
+    content = response.content if hasattr(response, "content") else response
+    return _parse_question_bank(content)
+
+
+async def _ainvoke_question_bank(llm, prompt: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if supports_structured_output(llm, "question_generator"):
+        cleaned = clean_llm_json(await ainvoke_structured(llm, prompt, QuestionBank))
+        return cleaned, {"strategy": "structured"}
+    response = await llm.ainvoke(prompt)
+    content = response.content if hasattr(response, "content") else response
+    return _parse_question_bank(content)
+
+
+def _build_prompt(task: Dict[str, Any], state: TutoringState) -> Tuple[str, Dict[str, Any]]:
+    rendered, report = build_context(
+        "question_generator",
+        knowledge_sections("question_generator", state.knowledge_base),
+    )
+    prompt = build_question_generator_prompt(
+        task,
+        state.plan.planning_context,
+        render_sections(rendered),
+    )
+    return prompt, prompt_diagnostics(prompt, report)
+
+
+# -------------------------------------------------
+# Pipelined generation (streamed questions solved as they arrive)
+# -------------------------------------------------
+
+def _pipelined(llm, state: TutoringState, method: str) -> bool:
+    return (
+        PIPELINED_SOLVING_ENABLED
+        and callable(getattr(llm, method, None))
+        and any(task.get("executed_by") == "solver" for task in state.plan.subtasks)
+    )
+
+
+class _StreamReader:
+    """
+    Collects streamed chunks and passes every completed question on.
+    """
+
+    def __init__(self, on_item: Callable[[str, int, Any], None]) -> None:
+        self._on_item = on_item
+        self._parser = IncrementalJSONItems()
+        self._parts = []
+        self._start = time.time()
+        self._first_item_ms = None
+
+    def feed(self, chunk: Any) -> None:
+        text = getattr(chunk, "content", chunk)
+        if not isinstance(text, str):
+            return
+        self._parts.append(text)
+        for section, index, item in self._parser.feed(text):
+            if self._first_item_ms is None:
+                self._first_item_ms = int((time.time() - self._start) * 1000)
+            self._on_item(section, index, clean_llm_json(item))
+
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "chunks": len(self._parts),
+            "items": self._parser.items,
+            "first_item_ms": self._first_item_ms,
+            "duration_ms": int((time.time() - self._start) * 1000),
+        }
+
+
+def _pipelined_update(
+    task: Dict[str, Any],
+    cleaned: Dict[str, Any],
+    diagnostics: Dict[str, Any],
+) -> Dict[str, Any]:
+    return {
+        "question_bank": cleaned,
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": diagnostics,
+    }
+
+
+def _generate_pipelined(llm, task: Dict[str, Any], state: TutoringState) -> Dict[str, Any]:
+    prompt, diagnostics = _build_prompt(task, state)
+    solver = PipelinedSolver(agent_llm(llm, "solver"), state)
+    # Stop the solves if this attempt is given up on.
+    on_abandon(solver.close)
+    reader = _StreamReader(solver.submit)
+
+    logger.info("Running question generator (streaming, pipelined solver)")
+    try:
+        for chunk in llm.stream(prompt):
+            reader.feed(chunk)
+        cleaned, report = _parse_question_bank(reader.content())
+    except BaseException:
+        solver.close()
+        raise
+
+    # The solves keep running; the solver task waits for them. An abandoned
+    # attempt's closed solver is not handed over.
+    if not solver.closed:
+        hand_over(state.run_id, PipelinedSolver.HANDOFF_KEY, solver)
+    return _pipelined_update(task, cleaned, {
+        **diagnostics,
+        "json_extraction": report,
+        "streaming": reader.report(),
+    })
+
+
+async def _agenerate_pipelined(llm, task: Dict[str, Any], state: TutoringState) -> Dict[str, Any]:
+    prompt, diagnostics = _build_prompt(task, state)
+    solver = AsyncPipelinedSolver(agent_llm(llm, "solver"), state)
+    reader = _StreamReader(solver.submit)
+
+    logger.info("Running question generator (streaming, pipelined solver, async)")
+    try:
+        async for chunk in llm.astream(prompt):
+            reader.feed(chunk)
+        cleaned, report = _parse_question_bank(reader.content())
+    except BaseException:
+        # Includes the cancellation of a timed-out attempt.
+        solver.close()
+        raise
+
+    hand_over(state.run_id, AsyncPipelinedSolver.HANDOFF_KEY, solver)
+    return _pipelined_update(task, cleaned, {
+        **diagnostics,
+        "json_extraction": report,
+        "streaming": reader.report(),
+    })
+
+
+def question_generator_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Generates final exam-aligned questions.
+    """
+
+    if _pipelined(llm, state, "stream"):
+        return _generate_pipelined(llm, task, state)
+
+    prompt, diagnostics = _build_prompt(task, state)
+
+    logger.info("Running question generator")
+    cleaned, report = _invoke_question_bank(llm, prompt)
+
+    return {
+        "question_bank": cleaned,
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": {**diagnostics, "json_extraction": report},
+    }
+
+
+async def aquestion_generator_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Async variant of question_generator_agent.
+    """
+
+    if _pipelined(llm, state, "astream"):
+        return await _agenerate_pipelined(llm, task, state)
+
+    prompt, diagnostics = _build_prompt(task, state)
+
+    logger.info("Running question generator (async)")
+    cleaned, report = await _ainvoke_question_bank(llm, prompt)
+
     return {
         "question_bank": cleaned,
         "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": {**diagnostics, "json_extraction": report},
     }
@@ -65,43 +65,71 @@ Target Exam: {user_profile.target_exam}
 """
 
 
+def _build_contents(
+    image_bytes: bytes,
+    user_profile: UserProfile,
+    mime_type: str,
+) -> list:
+    prompt = build_multimodal_prompt(user_profile)
+    return [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_bytes(
+                    data=image_bytes,
+                    mime_type=mime_type,
+                ),
+                types.Part.from_text(text=prompt)
+            ],
+        )
+    ]
+
+
+def _parse_grounding(raw_text: str) -> GroundedContext:
+    # Extract and clean JSON safely
+    try:
+        parsed = extract_json_from_llm(raw_text)
+        cleaned = clean_llm_json(parsed)
+        return GroundedContext(**cleaned)
+    except JSONExtractionError as exc:
+        logger.warning("Multimodal JSON parse failed, returning empty context: %s", exc)
+        return GroundedContext(metadata={}, image_analysis=str(raw_text))
+
+
 def multimodal_vision_agent(
-    image_base64: str,
+    image_bytes: bytes,
     user_profile: UserProfile,
+    mime_type: str = "image/png",
 ) -> GroundedContext:
     """
     Uses Gemini 3 Flash Preview to ground educational content from an image.
     """
 
     logger.info("Invoking multimodal model")
-    prompt = build_multimodal_prompt(user_profile)
     client = genai.Client(api_key=_get_env_value("GEMINI_API_KEY"))
     response = client.models.generate_content(
         model=_get_env_value("MULTIMODAL_MODEL_NAME"),
-        contents=[
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_bytes(
-                        data=bytes.fromhex(image_base64)
-                        if image_base64.startswith("0x")
-                        else __import__("base64").b64decode(image_base64),
-                        mime_type="image/png",
-                    ),
-                    types.Part.from_text(text=prompt)
-                ],
-            )
-        ],
+        contents=_build_contents(image_bytes, user_profile, mime_type),
     )
 
     # Gemini SDK returns plain text
-    raw_text = response.text
+    return _parse_grounding(response.text)
 
-    # Extract and clean JSON safely
-    try:
-        parsed = extract_json_from_llm(raw_text)
-        cleaned = clean_llm_json(parsed)
-        return GroundedContext(**cleaned)
-    except JSONExtractionError as exc:
-        logger.warning("Multimodal JSON parse failed, returning empty context: %s", exc)
-        return GroundedContext(metadata={}, image_analysis=str(raw_text))
+
+async def amultimodal_vision_agent(
+    image_bytes: bytes,
+    user_profile: UserProfile,
+    mime_type: str = "image/png",
+) -> GroundedContext:
+    """
+    Async variant of multimodal_vision_agent (uses the SDK's aio client).
+    """
+
+    logger.info("Invoking multimodal model (async)")
+    client = genai.Client(api_key=_get_env_value("GEMINI_API_KEY"))
+    response = await client.aio.models.generate_content(
+        model=_get_env_value("MULTIMODAL_MODEL_NAME"),
+        contents=_build_contents(image_bytes, user_profile, mime_type),
+    )
+
+    return _parse_grounding(response.text)
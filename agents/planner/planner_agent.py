@@ -11,7 +11,7 @@ It must:
 """
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from core.state import UserProfile, GroundedContext, PlannerOutput
 from config.planner_constraints import PLANNER_SYSTEM_PROMPT
@@ -44,29 +44,51 @@ Image Analysis:
 """
 
 
-def planner_agent(
-    llm,
+def _build_planner_messages(
     user_profile: UserProfile,
     grounded_context: GroundedContext,
-) -> PlannerOutput:
-    """
-    Calls the planner LLM to produce a task execution plan.
-    """
+) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
+        {"role": "user", "content": build_planner_input(user_profile, grounded_context)},
+    ]
 
-    logger.info("Invoking planner LLM")
-    response = llm.invoke(
-        [
-            {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
-            {"role": "user", "content": build_planner_input(user_profile, grounded_context)},
-        ]
-    )
 
+def _parse_plan(content: str) -> PlannerOutput:
     # Extract and clean JSON
     try:
-        parsed = extract_json_from_llm(response.content)
+        parsed = extract_json_from_llm(content)
         cleaned = clean_llm_json(parsed)
         logger.info("Planner LLM response parsed")
         return PlannerOutput(**cleaned)
     except JSONExtractionError as exc:
         logger.warning("Planner JSON parse failed: %s", exc)
         raise
+
+
+def planner_agent(
+    llm,
+    user_profile: UserProfile,
+    grounded_context: GroundedContext,
+) -> PlannerOutput:
+    """
+    Calls the planner LLM to produce a task execution plan.
+    """
+
+    logger.info("Invoking planner LLM")
+    response = llm.invoke(_build_planner_messages(user_profile, grounded_context))
+    return _parse_plan(response.content)
+
+
+async def aplanner_agent(
+    llm,
+    user_profile: UserProfile,
+    grounded_context: GroundedContext,
+) -> PlannerOutput:
+    """
+    Async variant of planner_agent.
+    """
+
+    logger.info("Invoking planner LLM (async)")
+    response = await llm.ainvoke(_build_planner_messages(user_profile, grounded_context))
+    return _parse_plan(response.content)
@@ -4,17 +4,48 @@ Given the generated questions, what are the correct, well-explained solutions?
 """
 
 
+import asyncio
 import logging
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from core.state import TutoringState, UserProfile, PlannerOutput, GroundedContext
-from preprocessing.json_utils import extract_json_from_llm, JSONExtractionError
+from preprocessing.json_utils import extract_json_with_report, JSONExtractionError
 from preprocessing.text_cleaner import clean_llm_json
+from core.schemas import SolverOutput
+from core.structured_output import supports_structured_output, invoke_structured, ainvoke_structured
+from core.context_builder import ContextBudgetError, build_context, fits_context, prompt_diagnostics
+from core.llm_cache import forget_responses
+from core.handoff import take_over
+from core.resilience import DeadlineExceeded, run_with_retry, arun_with_retry, on_abandon, remaining_time
+from core.sharding import (
+    QUESTION_SECTIONS,
+    count_questions,
+    shard_question_bank,
+    split_to_fit,
+    shard_bank,
+    shard_label,
+    shard_reports,
+    merge_shard_outputs,
+    run_shards,
+    arun_shards,
+)
+from config.concurrency import (
+    SOLVER_SHARDING_ENABLED,
+    SOLVER_SHARD_SIZE,
+    SOLVER_MAX_PARALLEL_SHARDS,
+    SOLVER_SHARD_RETRIES,
+)
+from config.resilience import AGENT_TIMEOUT_SEC, PIPELINE_RETRY_DELAY_SEC
+from config.verification import ANSWER_CHECK_ENABLED
+from tools.math_solver import verify_solver_output
 
 logger = logging.getLogger(__name__)
 
 def build_solver_instruction(
     planning_context: Dict[str, str],
-    question_bank: Dict[str, Any],
+    question_bank: str,
 ) -> str:
     return f"""
 You are a solution-writing agent.
@@ -45,35 +76,13 @@ OUTPUT FORMAT:
 """
 
 
-def solver_agent(
-    llm,
-    task: Dict[str, Any],
-    state: TutoringState,
-) -> Dict[str, Any]:
-    """
-    ReAct-based solver agent with math tool support.
-    """
-
-    planning_context = state.plan.planning_context
-    question_bank = state.question_bank
-
-    solver_prompt = build_solver_instruction(
-        planning_context,
-        question_bank
-    )
-
-    logger.info("Running solver")
-    if llm is None or not hasattr(llm, "invoke"):
-        raise RuntimeError("LLM is not configured for solver agent")
-
-    response = llm.invoke(solver_prompt)
-    content = response.content if hasattr(response, "content") else response
-
+def _parse_solver_output(content: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     try:
-        parsed = extract_json_from_llm(content)
+        parsed, report = extract_json_with_report(content)
         cleaned = clean_llm_json(parsed)
     except JSONExtractionError as exc:
         logger.warning("Solver JSON parse failed: %s", exc)
+        report = {"strategy": "failed", "error": str(exc)}
         cleaned = {"mcq": [], "short_answer": [], "long_answer": []}
 
     if isinstance(cleaned, list):
@@ -85,7 +94,536 @@ def solver_agent(
     elif not isinstance(cleaned, dict):
         cleaned = {"mcq": [], "short_answer": [], "long_answer": []}
 
+    return cleaned, report
+
+
+def _invoke_solver_output(llm, prompt: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if supports_structured_output(llm, "solver"):
+        cleaned = clean_llm_json(invoke_structured(llm, prompt, SolverOutput))
+        return cleaned, {"strategy": "structured"}
+    response = llm.invoke(prompt)
+    content = response.content if hasattr(response, "content") else response
+    return _parse_solver_output(content)
+
+
+async def _ainvoke_solver_output(llm, prompt: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if supports_structured_output(llm, "solver"):
+        cleaned = clean_llm_json(await ainvoke_structured(llm, prompt, SolverOutput))
+        return cleaned, {"strategy": "structured"}
+    response = await llm.ainvoke(prompt)
+    content = response.content if hasattr(response, "content") else response
+    return _parse_solver_output(content)
+
+
+def _build_prompt(state: TutoringState, question_bank: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    rendered, report = build_context("solver", {"question_bank": question_bank})
+    prompt = build_solver_instruction(
+        state.plan.planning_context,
+        rendered["question_bank"],
+    )
+    return prompt, prompt_diagnostics(prompt, report)
+
+
+# -------------------------------------------------
+# Sharded solving
+# -------------------------------------------------
+
+def _fits(shard: Dict[str, Any]) -> bool:
+    return fits_context("solver", {"question_bank": shard_bank(shard)})
+
+
+def _shards(state: TutoringState) -> List[Dict[str, Any]]:
+    """
+    Shards to solve separately, or [] when one prompt covers the bank. Banks
+    (or shards) too large for one prompt are split further, even with
+    sharding off, rather than cut down to fit.
+    """
+    question_bank = state.question_bank
+    if not isinstance(question_bank, dict):
+        return []
+    if SOLVER_SHARDING_ENABLED:
+        shards = shard_question_bank(question_bank, SOLVER_SHARD_SIZE)
+        if len(shards) > 1:
+            return split_to_fit(shards, _fits)
+    if fits_context("solver", {"question_bank": question_bank}):
+        return []
+    logger.warning("Question bank does not fit one solver prompt; splitting it")
+    return split_to_fit(shard_question_bank(question_bank, count_questions(question_bank)), _fits)
+
+
+def _shard_prompt(state: TutoringState, shard: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+    # A question too large for a prompt on its own is left unsolved.
+    try:
+        return _build_prompt(state, shard_bank(shard))
+    except ContextBudgetError as exc:
+        return None, {"prompt_tokens": 0, "context_error": str(exc)}
+
+
+def _check_shard(shard: Dict[str, Any], cleaned: Dict[str, Any], report: Dict[str, Any]) -> None:
+    # Raising lets the shard be retried instead of merging an empty result.
+    if report.get("strategy") == "failed" or not merge_shard_outputs([shard], [cleaned])[shard["section"]]:
+        raise ValueError(
+            f"Solver returned no solutions for {shard['section']} questions "
+            f"{shard['offset']}-{shard['offset'] + len(shard['items']) - 1}"
+        )
+
+
+def _unsolved_shard(shard: Dict[str, Any], exc: Exception) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Placeholders keep the merged output aligned with the question bank.
+    solutions = [
+        {
+            "question": item.get("question", "") if isinstance(item, dict) else str(item),
+            "steps": [],
+            "final_answer": "",
+        }
+        for item in shard["items"]
+    ]
+    return {shard["section"]: solutions}, {"strategy": "failed", "error": str(exc)}
+
+
+def _no_prompt(shard: Dict[str, Any]) -> ContextBudgetError:
+    return ContextBudgetError(
+        f"Solver question {shard['section']}:{shard['offset']} does not fit the context budget"
+    )
+
+
+def _solve_shard(llm, prompt: Optional[str], shard: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if prompt is None:
+        raise _no_prompt(shard)
+    cleaned, report = _invoke_solver_output(llm, prompt)
+    try:
+        _check_shard(shard, cleaned, report)
+    except ValueError:
+        forget_responses(llm, prompt)
+        raise
+    return cleaned, report
+
+
+async def _asolve_shard(llm, prompt: Optional[str], shard: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if prompt is None:
+        raise _no_prompt(shard)
+    cleaned, report = await _ainvoke_solver_output(llm, prompt)
+    try:
+        _check_shard(shard, cleaned, report)
+    except ValueError:
+        forget_responses(llm, prompt)
+        raise
+    return cleaned, report
+
+
+def _merge_shards(
+    task: Dict[str, Any],
+    shards: List[Dict[str, Any]],
+    prompts: List[Tuple[str, Dict[str, Any]]],
+    results: List[Tuple[Any, Dict[str, Any]]],
+) -> Dict[str, Any]:
+    if all(meta["fallback_used"] for _result, meta in results):
+        raise RuntimeError("Solver failed on every shard")
+
+    reports = shard_reports(
+        shards,
+        [diagnostics["prompt_tokens"] for _prompt, diagnostics in prompts],
+        results,
+    )
+    cleaned = merge_shard_outputs(shards, [cleaned for (cleaned, _report), _meta in results])
+    return {
+        "solver_output": cleaned,
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": {
+            "prompt_tokens": sum(report["prompt_tokens"] for report in reports),
+            "json_extraction": {"strategy": "sharded"},
+            "shards": reports,
+        },
+    }
+
+
+def _solve_sharded(llm, task: Dict[str, Any], state: TutoringState, shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    prompts = [_shard_prompt(state, shard) for shard in shards]
+    prompt_of = {id(shard): prompt for shard, (prompt, _diagnostics) in zip(shards, prompts)}
+
+    def _solve(shard: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        return _solve_shard(llm, prompt_of[id(shard)], shard)
+
+    logger.info("Running solver on %d shards", len(shards))
+    results = run_shards(
+        "solver",
+        shards,
+        _solve,
+        max_parallel=SOLVER_MAX_PARALLEL_SHARDS,
+        retries=SOLVER_SHARD_RETRIES,
+        fallback=_unsolved_shard,
+        deadline=state.deadline_at,
+    )
+    return _merge_shards(task, shards, prompts, results)
+
+
+async def _asolve_sharded(llm, task: Dict[str, Any], state: TutoringState, shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    prompts = [_shard_prompt(state, shard) for shard in shards]
+    prompt_of = {id(shard): prompt for shard, (prompt, _diagnostics) in zip(shards, prompts)}
+
+    async def _solve(shard: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        return await _asolve_shard(llm, prompt_of[id(shard)], shard)
+
+    logger.info("Running solver on %d shards (async)", len(shards))
+    results = await arun_shards(
+        "solver",
+        shards,
+        _solve,
+        max_parallel=SOLVER_MAX_PARALLEL_SHARDS,
+        retries=SOLVER_SHARD_RETRIES,
+        fallback=_unsolved_shard,
+        deadline=state.deadline_at,
+    )
+    return _merge_shards(task, shards, prompts, results)
+
+
+# -------------------------------------------------
+# Pipelined solving (questions solved while they are generated)
+# -------------------------------------------------
+
+def _first_solution(shard: Dict[str, Any], cleaned: Dict[str, Any]) -> Dict[str, Any]:
+    return merge_shard_outputs([shard], [cleaned])[shard["section"]][0]
+
+
+def _pipelined_merge(
+    shards: List[Dict[str, Any]],
+    solved: List[Tuple[int, Tuple[Any, Dict[str, Any]]]],
+    streamed: int,
+) -> Tuple[Dict[str, List[Any]], Dict[str, Any]]:
+    output: Dict[str, List[Any]] = {section: [] for section in QUESTION_SECTIONS}
+    for shard, (_tokens, ((cleaned, _report), _meta)) in zip(shards, solved):
+        output[shard["section"]].append(_first_solution(shard, cleaned))
+    reports = shard_reports(shards, [tokens for tokens, _result in solved], [result for _tokens, result in solved])
+    return output, {
+        "questions": len(shards),
+        "streamed": streamed,
+        "prompt_tokens": sum(tokens for tokens, _result in solved),
+        "shards": reports,
+    }
+
+
+class PipelinedSolver:
+    """
+    Solves questions one at a time while the question generator is still
+    streaming them. The solves run on a bounded pool of their own, never on
+    the shared resilience pool the agent bodies hold, and stop at the
+    request deadline. The generator hands the solver over to the solver
+    task (see core.handoff), whose finish() lines the solutions up with the
+    final question bank, solving whatever was not streamed (or streamed
+    differently); failed questions keep placeholder solutions. close()
+    cancels queued solves and keeps running ones from retrying.
+    """
+
+    HANDOFF_KEY = "pipelined_solver"
+
+    def __init__(self, llm, state: TutoringState, max_parallel: int = SOLVER_MAX_PARALLEL_SHARDS) -> None:
+        self._llm = llm
+        self._state = state
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_parallel),
+            thread_name_prefix="pipelined-solver",
+        )
+        self._submitted: Dict[Tuple[str, int], Tuple[Dict[str, Any], Future]] = {}
+        self._closed = threading.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def _solve(self, shard: Dict[str, Any]) -> Tuple[int, Tuple[Any, Dict[str, Any]]]:
+        prompt, diagnostics = _shard_prompt(self._state, shard)
+
+        def _attempt():
+            # Checked before every attempt; a call already sent runs to the end.
+            if self.closed:
+                raise DeadlineExceeded("pipelined solving was cancelled")
+            remaining = remaining_time(self._state.deadline_at)
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded("request deadline exceeded")
+            return _solve_shard(self._llm, prompt, shard)
+
+        result = run_with_retry(
+            shard_label("solver", shard),
+            _attempt,
+            retries=SOLVER_SHARD_RETRIES,
+            delay_sec=PIPELINE_RETRY_DELAY_SEC,
+            fallback=lambda exc: _unsolved_shard(shard, exc),
+        )
+        return diagnostics["prompt_tokens"], result
+
+    def submit(self, section: str, index: int, item: Any) -> None:
+        shard = {"section": section, "offset": index, "items": [item]}
+        self._submitted[(section, index)] = (shard, self._pool.submit(self._solve, shard))
+
+    def finish(self, question_bank: Dict[str, Any]) -> Tuple[Dict[str, List[Any]], Dict[str, Any]]:
+        shards = shard_question_bank(question_bank, 1)
+        futures = []
+        streamed = 0
+        for shard in shards:
+            submitted = self._submitted.get((shard["section"], shard["offset"]))
+            if submitted is not None and submitted[0]["items"] == shard["items"]:
+                futures.append(submitted[1])
+                streamed += 1
+            else:
+                futures.append(self._pool.submit(self._solve, shard))
+        return _pipelined_merge(shards, [future.result() for future in futures], streamed)
+
+    def close(self) -> None:
+        self._closed.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncPipelinedSolver:
+    """
+    Async counterpart of PipelinedSolver; submit(), finish() and close()
+    must be called from the running event loop.
+    """
+
+    HANDOFF_KEY = "async_pipelined_solver"
+
+    def __init__(self, llm, state: TutoringState, max_parallel: int = SOLVER_MAX_PARALLEL_SHARDS) -> None:
+        self._llm = llm
+        self._state = state
+        self._semaphore = asyncio.Semaphore(max(1, max_parallel))
+        self._submitted: Dict[Tuple[str, int], Tuple[Dict[str, Any], asyncio.Task]] = {}
+        self._extra: List[asyncio.Task] = []
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def _solve(self, shard: Dict[str, Any]) -> Tuple[int, Tuple[Any, Dict[str, Any]]]:
+        async with self._semaphore:
+            prompt, diagnostics = _shard_prompt(self._state, shard)
+            result = await arun_with_retry(
+                shard_label("solver", shard),
+                lambda: _asolve_shard(self._llm, prompt, shard),
+                retries=SOLVER_SHARD_RETRIES,
+                delay_sec=PIPELINE_RETRY_DELAY_SEC,
+                timeout_sec=AGENT_TIMEOUT_SEC,
+                fallback=lambda exc: _unsolved_shard(shard, exc),
+                deadline=self._state.deadline_at,
+            )
+        return diagnostics["prompt_tokens"], result
+
+    def submit(self, section: str, index: int, item: Any) -> None:
+        shard = {"section": section, "offset": index, "items": [item]}
+        self._submitted[(section, index)] = (shard, asyncio.ensure_future(self._solve(shard)))
+
+    async def finish(self, question_bank: Dict[str, Any]) -> Tuple[Dict[str, List[Any]], Dict[str, Any]]:
+        shards = shard_question_bank(question_bank, 1)
+        jobs = []
+        streamed = 0
+        for shard in shards:
+            submitted = self._submitted.get((shard["section"], shard["offset"]))
+            if submitted is not None and submitted[0]["items"] == shard["items"]:
+                jobs.append(submitted[1])
+                streamed += 1
+            else:
+                job = asyncio.ensure_future(self._solve(shard))
+                self._extra.append(job)
+                jobs.append(job)
+        return _pipelined_merge(shards, list(await asyncio.gather(*jobs)), streamed)
+
+    def close(self) -> None:
+        self._closed = True
+        for _shard, job in self._submitted.values():
+            job.cancel()
+        for job in self._extra:
+            job.cancel()
+
+
+def _pipelined_solver(state: TutoringState, kind: type) -> Optional[Any]:
+    """
+    The solver pipelined generation handed over for this run, while it can
+    still answer the question bank.
+    """
+    solver = take_over(state.run_id, kind.HANDOFF_KEY)
+    if solver is None:
+        return None
+    if solver.closed or not isinstance(state.question_bank, dict) or not count_questions(state.question_bank):
+        solver.close()
+        return None
+    return solver
+
+
+def _unsolved_shards(state: TutoringState, output: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"section": section, "offset": index, "items": [state.question_bank[section][index]]}
+        for section in QUESTION_SECTIONS
+        for index, solution in enumerate(output[section])
+        if not isinstance(solution, dict) or not (solution.get("final_answer") or solution.get("steps"))
+    ]
+
+
+def _patch_pipelined(
+    task: Dict[str, Any],
+    output: Dict[str, List[Any]],
+    pipelined: Dict[str, Any],
+    shards: List[Dict[str, Any]],
+    prompts: List[Tuple[str, Dict[str, Any]]],
+    results: List[Tuple[Any, Dict[str, Any]]],
+) -> Dict[str, Any]:
+    for shard, ((cleaned, _report), meta) in zip(shards, results):
+        if not meta["fallback_used"]:
+            output[shard["section"]][shard["offset"]] = _first_solution(shard, cleaned)
+    reports = shard_reports(
+        shards,
+        [diagnostics["prompt_tokens"] for _prompt, diagnostics in prompts],
+        results,
+    )
+    return {
+        "solver_output": output,
+        "knowledge_base": {task["task_id"]: output},
+        "diagnostics": {
+            "prompt_tokens": pipelined["prompt_tokens"] + sum(report["prompt_tokens"] for report in reports),
+            "json_extraction": {"strategy": "pipelined"},
+            "pipelined_solver": pipelined,
+            "shards": reports,
+        },
+    }
+
+
+def _complete_pipelined(llm, task: Dict[str, Any], state: TutoringState, solver: PipelinedSolver) -> Dict[str, Any]:
+    # The solves were started by the generator but are waited for (and
+    # timed) here, within this task's own attempt.
+    on_abandon(solver.close)
+    try:
+        output, pipelined = solver.finish(state.question_bank)
+    finally:
+        solver.close()
+
+    shards = _unsolved_shards(state, output)
+    prompts = [_shard_prompt(state, shard) for shard in shards]
+    prompt_of = {id(shard): prompt for shard, (prompt, _diagnostics) in zip(shards, prompts)}
+
+    logger.info("Reusing pipelined solutions; re-solving %d questions", len(shards))
+    results = run_shards(
+        "solver",
+        shards,
+        lambda shard: _solve_shard(llm, prompt_of[id(shard)], shard),
+        max_parallel=SOLVER_MAX_PARALLEL_SHARDS,
+        retries=SOLVER_SHARD_RETRIES,
+        fallback=_unsolved_shard,
+        deadline=state.deadline_at,
+    )
+    return _patch_pipelined(task, output, pipelined, shards, prompts, results)
+
+
+async def _acomplete_pipelined(llm, task: Dict[str, Any], state: TutoringState, solver: AsyncPipelinedSolver) -> Dict[str, Any]:
+    try:
+        output, pipelined = await solver.finish(state.question_bank)
+    finally:
+        solver.close()
+
+    shards = _unsolved_shards(state, output)
+    prompts = [_shard_prompt(state, shard) for shard in shards]
+    prompt_of = {id(shard): prompt for shard, (prompt, _diagnostics) in zip(shards, prompts)}
+
+    logger.info("Reusing pipelined solutions; re-solving %d questions (async)", len(shards))
+    results = await arun_shards(
+        "solver",
+        shards,
+        lambda shard: _asolve_shard(llm, prompt_of[id(shard)], shard),
+        max_parallel=SOLVER_MAX_PARALLEL_SHARDS,
+        retries=SOLVER_SHARD_RETRIES,
+        fallback=_unsolved_shard,
+        deadline=state.deadline_at,
+    )
+    return _patch_pipelined(task, output, pipelined, shards, prompts, results)
+
+
+def _solve(llm, task: Dict[str, Any], state: TutoringState) -> Dict[str, Any]:
+    pipelined = _pipelined_solver(state, PipelinedSolver)
+    if pipelined is not None:
+        return _complete_pipelined(llm, task, state, pipelined)
+
+    shards = _shards(state)
+    if shards:
+        return _solve_sharded(llm, task, state, shards)
+
+    solver_prompt, diagnostics = _build_prompt(state, state.question_bank)
+
+    logger.info("Running solver")
+
+    cleaned, report = _invoke_solver_output(llm, solver_prompt)
+
+    return {
+        "solver_output": cleaned,
+        "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": {**diagnostics, "json_extraction": report},
+    }
+
+
+async def _asolve(llm, task: Dict[str, Any], state: TutoringState) -> Dict[str, Any]:
+    pipelined = _pipelined_solver(state, AsyncPipelinedSolver)
+    if pipelined is not None:
+        return await _acomplete_pipelined(llm, task, state, pipelined)
+
+    shards = _shards(state)
+    if shards:
+        return await _asolve_sharded(llm, task, state, shards)
+
+    solver_prompt, diagnostics = _build_prompt(state, state.question_bank)
+
+    logger.info("Running solver (async)")
+
+    cleaned, report = await _ainvoke_solver_output(llm, solver_prompt)
+
     return {
         "solver_output": cleaned,
         "knowledge_base": {task["task_id"]: cleaned},
+        "diagnostics": {**diagnostics, "json_extraction": report},
     }
+
+
+def _with_answer_checks(task: Dict[str, Any], state: TutoringState, update: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Post-pass: checks numeric final answers against the question bank's
+    answer keys locally and annotates the compared solutions.
+    """
+    solver_output = update.get("solver_output")
+    if not ANSWER_CHECK_ENABLED or not isinstance(solver_output, dict):
+        return update
+    start = time.perf_counter()
+    checked, summary = verify_solver_output(state.question_bank, solver_output)
+    summary["duration_us"] = int((time.perf_counter() - start) * 1_000_000)
+    if summary["mismatches"]:
+        logger.warning("Answer check: %d solver answers disagree with the answer key", len(summary["mismatches"]))
+    return {
+        **update,
+        "solver_output": checked,
+        "knowledge_base": {task["task_id"]: checked},
+        "diagnostics": {**update.get("diagnostics", {}), "answer_checks": summary},
+    }
+
+
+def solver_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Solver agent: LLM solutions, checked locally against the answer keys.
+    """
+
+    if llm is None or not hasattr(llm, "invoke"):
+        raise RuntimeError("LLM is not configured for solver agent")
+
+    return _with_answer_checks(task, state, _solve(llm, task, state))
+
+
+async def asolver_agent(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+) -> Dict[str, Any]:
+    """
+    Async variant of solver_agent.
+    """
+
+    if llm is None or not hasattr(llm, "ainvoke"):
+        raise RuntimeError("LLM is not configured for solver agent")
+
+    return _with_answer_checks(task, state, await _asolve(llm, task, state))
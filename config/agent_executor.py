@@ -4,12 +4,12 @@ Maps agent IDs to their executable Python functions.
 This is used ONLY at runtime by the task executor.
 """
 
-from agents.analysis.content_analyzer import content_analyzer_agent
-from agents.analysis.exam_pattern_analyst import exam_pattern_analyst_agent
-from agents.design.question_designer import question_designer_agent
-from agents.generation.question_generator import question_generator_agent
-from agents.solving.solver_agent import solver_agent
-from agents.evaluation.evaluator_agent import evaluator_agent
+from agents.analysis.content_analyzer import content_analyzer_agent, acontent_analyzer_agent
+from agents.analysis.exam_pattern_analyst import exam_pattern_analyst_agent, aexam_pattern_analyst_agent
+from agents.design.question_designer import question_designer_agent, aquestion_designer_agent
+from agents.generation.question_generator import question_generator_agent, aquestion_generator_agent
+from agents.solving.solver_agent import solver_agent, asolver_agent
+from agents.evaluation.evaluator_agent import evaluator_agent, aevaluator_agent
 
 
 AGENT_EXECUTORS = {
@@ -20,3 +20,15 @@ AGENT_EXECUTORS = {
     "solver": solver_agent,
     "evaluator": evaluator_agent,
 }
+
+
+# Coroutine entry points used by the async executor. Agents missing here
+# fall back to their AGENT_EXECUTORS function run in a worker thread.
+ASYNC_AGENT_EXECUTORS = {
+    "content_analyzer": acontent_analyzer_agent,
+    "exam_pattern_analyst": aexam_pattern_analyst_agent,
+    "question_designer": aquestion_designer_agent,
+    "question_generator": aquestion_generator_agent,
+    "solver": asolver_agent,
+    "evaluator": aevaluator_agent,
+}
@@ -51,3 +51,53 @@ AGENT_DESCRIPTIONS = {
         "and suggests improvements."
     ),
 }
+
+
+# ------------------------------------------------------------------
+# State fields each agent reads and writes (for task scheduling)
+# ------------------------------------------------------------------
+# Paths are top-level TutoringState fields, optionally narrowed to a
+# knowledge_base section with a dot ("knowledge_base.content_analyzer").
+# A bare "knowledge_base" read means the agent consumes every section.
+
+AGENT_STATE_IO = {
+    "content_analyzer": {
+        "reads": ("plan", "grounded_context"),
+        "writes": ("knowledge_base.content_analyzer",),
+    },
+
+    "exam_pattern_analyst": {
+        "reads": ("plan", "knowledge_base.content_analyzer"),
+        "writes": ("knowledge_base.exam_pattern_analyst",),
+    },
+
+    "question_designer": {
+        "reads": (
+            "plan",
+            "knowledge_base.content_analyzer",
+            "knowledge_base.exam_pattern_analyst",
+        ),
+        "writes": ("knowledge_base.question_designer",),
+    },
+
+    "question_generator": {
+        "reads": (
+            "plan",
+            "knowledge_base.content_analyzer",
+            "knowledge_base.exam_pattern_analyst",
+            "knowledge_base.question_designer",
+        ),
+        # solver_output: pipelined generation solves questions as they stream.
+        "writes": ("question_bank", "solver_output", "knowledge_base.question_generator"),
+    },
+
+    "solver": {
+        "reads": ("plan", "question_bank"),
+        "writes": ("solver_output", "knowledge_base.solver"),
+    },
+
+    "evaluator": {
+        "reads": ("plan", "question_bank", "solver_output"),
+        "writes": ("evaluation", "knowledge_base.evaluator"),
+    },
+}
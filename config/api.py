@@ -1,8 +1,34 @@
 #!/usr/bin/env python3
 """
-API input validation settings.
+API input validation and request coalescing settings.
 """
 
 MAX_IMAGE_BYTES = 5 * 1024 * 1024
-ALLOWED_IMAGE_TYPES = {"image/png", "image/jpeg", "image/jpg"}
+IMAGE_READ_CHUNK_BYTES = 64 * 1024
+# PDFs are sent to the multimodal model as documents.
+ALLOWED_IMAGE_TYPES = {"image/png", "image/jpeg", "image/jpg", "application/pdf"}
+
+# Pages per request (repeated "image" form fields) and their combined size.
+MAX_IMAGES_PER_REQUEST = 10
+MAX_TOTAL_IMAGE_BYTES = 20 * 1024 * 1024
 MAX_FIELD_LENGTH = 64
+
+# -------------------------------------------------
+# Request coalescing (single flight)
+# -------------------------------------------------
+
+# Concurrent /generate requests with the same image and profile share one
+# pipeline run. REQUEST_COALESCING_PATH makes in-flight runs visible to every
+# worker on the host; set it to None to coalesce within a worker only.
+REQUEST_COALESCING_ENABLED = True
+REQUEST_COALESCING_PATH = "cache/inflight.sqlite3"
+
+# How often a worker waiting on another worker's run checks for its result.
+REQUEST_COALESCING_POLL_SEC = 0.25
+
+# Finished results stay readable this long for workers still polling.
+REQUEST_COALESCING_RESULT_TTL_SEC = 60
+
+# A claim older than this is treated as abandoned and taken over; keep it
+# above the end-to-end request deadline (REQUEST_DEADLINE_SEC).
+REQUEST_COALESCING_STALE_SEC = 330
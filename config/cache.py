@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Result cache settings.
+"""
+
+# -------------------------------------------------
+# Planner plan cache
+# -------------------------------------------------
+
+PLAN_CACHE_ENABLED = True
+PLAN_CACHE_MAX_ENTRIES = 512
+PLAN_CACHE_TTL_SEC = 24 * 60 * 60
+
+# Snapshot store (or ".jsonl" log) read at startup for previously validated
+# planner output; from a store only the PLAN_CACHE_MAX_ENTRIES most recent
+# runs are read. Set to None to start with an empty cache.
+PLAN_CACHE_SEED_SNAPSHOTS = "logs/snapshots.sqlite3"
+
+# The six-agent chain the planner produces for almost every request.
+STANDARD_PLAN_TEMPLATE = {
+    "match": {},
+    "subtasks": [
+        {
+            "task_id": "content_analyzer",
+            "purpose": "Extract key concepts, facts, definitions and equations",
+            "expected_output": "Structured list of concepts and facts",
+            "priority": "High",
+            "executed_by": "content_analyzer",
+        },
+        {
+            "task_id": "exam_pattern_analyst",
+            "purpose": "Identify how the content is tested in the target exam",
+            "expected_output": "Exam-aligned insights",
+            "priority": "High",
+            "executed_by": "exam_pattern_analyst",
+        },
+        {
+            "task_id": "question_designer",
+            "purpose": "Design question types, difficulty and distractors",
+            "expected_output": "Question design guidance",
+            "priority": "Medium",
+            "executed_by": "question_designer",
+        },
+        {
+            "task_id": "question_generator",
+            "purpose": "Generate final questions and answers",
+            "expected_output": "Structured question bank",
+            "priority": "High",
+            "executed_by": "question_generator",
+        },
+        {
+            "task_id": "solver",
+            "purpose": "Solve the generated questions step-by-step",
+            "expected_output": "Structured solutions",
+            "priority": "High",
+            "executed_by": "solver",
+        },
+        {
+            "task_id": "evaluator",
+            "purpose": "Evaluate solutions against board and exam criteria",
+            "expected_output": "Structured evaluation",
+            "priority": "Medium",
+            "executed_by": "evaluator",
+        },
+    ],
+    "execution_order": [
+        "content_analyzer",
+        "exam_pattern_analyst",
+        "question_designer",
+        "question_generator",
+        "solver",
+        "evaluator",
+    ],
+}
+
+# Templates consulted when no exact cached plan exists. "match" keys are any
+# of class, board, target_exam, subject, chapter, sub_topic; missing keys or
+# "*" match everything. First match wins.
+# Example: PLAN_TEMPLATES = [STANDARD_PLAN_TEMPLATE]
+PLAN_TEMPLATES = []
+
+
+# -------------------------------------------------
+# Multimodal grounding cache (persistent, shared by workers)
+# -------------------------------------------------
+
+GROUNDING_CACHE_ENABLED = True
+GROUNDING_CACHE_PATH = "cache/grounding.sqlite3"
+GROUNDING_CACHE_MAX_ENTRIES = 5000
+GROUNDING_CACHE_MAX_BYTES = 64 * 1024 * 1024
+GROUNDING_CACHE_TTL_SEC = 30 * 24 * 60 * 60
+
+
+# -------------------------------------------------
+# Text LLM response memoization
+# -------------------------------------------------
+
+LLM_CACHE_ENABLED = True
+LLM_CACHE_MEMORY_ENTRIES = 256
+LLM_CACHE_PATH = "cache/llm.sqlite3"
+LLM_CACHE_MAX_ENTRIES = 20000
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LLM_CACHE_TTL_SEC = 7 * 24 * 60 * 60
+
+# Agent IDs (or "planner") whose calls always go to the model.
+LLM_CACHE_DISABLED_AGENTS = set()
+
+
+# -------------------------------------------------
+# Near-duplicate question index (persistent, shared by workers)
+# -------------------------------------------------
+
+# Generated questions are checked against earlier ones for the same board,
+# exam and chapter (MinHash over character 5-grams, LSH banding).
+QUESTION_INDEX_ENABLED = True
+QUESTION_INDEX_PATH = "cache/questions.sqlite3"
+
+# "drop" removes near-duplicates from the generated bank (and their
+# pipelined solutions); "flag" keeps them with a "duplicate_of" note.
+QUESTION_INDEX_ACTION = "drop"
+
+# Estimated Jaccard similarity at or above which a question is a duplicate.
+QUESTION_INDEX_THRESHOLD = 0.8
+QUESTION_INDEX_NUM_PERM = 64
+QUESTION_INDEX_BANDS = 16
+
+# Newest questions kept per scope; older ones (and anything past the TTL)
+# are compacted away. Only the QUESTION_INDEX_MEMORY_SCOPES most recently
+# used scopes are held in memory; the rest stay on disk.
+QUESTION_INDEX_MAX_PER_SCOPE = 5000
+QUESTION_INDEX_MEMORY_SCOPES = 8
+QUESTION_INDEX_TTL_SEC = 180 * 24 * 60 * 60
+
+# Seconds before an in-memory scope picks up rows added by other workers.
+QUESTION_INDEX_REFRESH_SEC = 60
+
+# Recent question stems listed in the generator prompt as ones to avoid.
+QUESTION_INDEX_PROMPT_STEMS = 15
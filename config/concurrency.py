@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Concurrency limits for parallel task execution and per-item agent work.
+"""
+
+# Maximum number of planner subtasks executed at the same time.
+# Set to 1 to force strictly sequential execution.
+MAX_PARALLEL_AGENTS = 4
+
+# -------------------------------------------------
+# Sharded solving
+# -------------------------------------------------
+
+# Solve the question bank in shards of at most SOLVER_SHARD_SIZE questions
+# (one section per shard) instead of one prompt. Banks that fit in a single
+# shard are always solved in one call.
+SOLVER_SHARDING_ENABLED = True
+SOLVER_SHARD_SIZE = 5
+
+# Shards solved at the same time within one solver run.
+SOLVER_MAX_PARALLEL_SHARDS = 4
+
+# Extra attempts for a shard whose call or output parsing failed.
+SOLVER_SHARD_RETRIES = 1
+
+# -------------------------------------------------
+# Batched evaluation
+# -------------------------------------------------
+
+# Evaluate questions in batches of at most EVALUATOR_BATCH_SIZE (one section
+# per batch), up to EVALUATOR_MAX_PARALLEL_BATCHES at a time. Small banks are
+# still evaluated in one call.
+EVALUATOR_BATCH_SIZE = 5
+EVALUATOR_MAX_PARALLEL_BATCHES = 4
+EVALUATOR_BATCH_RETRIES = 1
+
+# Sampling: evaluate only this fraction of the questions (1.0 = all), or
+# exactly EVALUATOR_SAMPLE_COUNT questions when that is set. The overall
+# feedback is then extrapolated from the sample.
+EVALUATOR_SAMPLE_FRACTION = 1.0
+EVALUATOR_SAMPLE_COUNT = None
+
+# -------------------------------------------------
+# Pipelined generation
+# -------------------------------------------------
+
+# When the plan also runs the solver, the question generator streams its
+# output and hands every completed question to a solver worker straight
+# away; the solver task then waits for those solves (on its own timeout)
+# and re-solves the questions that failed. Needs a
+# model with stream(). Off by default: the streamed question bank is text
+# JSON, so turning this on gives up the generator's schema-constrained
+# output (config/structured_output.py) for earlier solving.
+PIPELINED_SOLVING_ENABLED = False
+
+# -------------------------------------------------
+# Multi-page grounding
+# -------------------------------------------------
+
+# Pages (images or documents) of one request grounded at the same time.
+MAX_PARALLEL_GROUNDING = 4
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Prompt context settings: which earlier outputs each agent sees and how much.
+"""
+
+# Knowledge-base sections (keyed by the producing agent) included in each
+# agent's prompt. Keep in sync with the reads in AGENT_STATE_IO.
+AGENT_CONTEXT_SECTIONS = {
+    "exam_pattern_analyst": ("content_analyzer",),
+    "question_designer": ("content_analyzer", "exam_pattern_analyst"),
+    "question_generator": ("content_analyzer", "exam_pattern_analyst", "question_designer"),
+}
+
+# Approximate token budget for the context an agent receives (grounded
+# content, knowledge-base sections, questions, solutions), excluding the
+# fixed instructions of its prompt.
+AGENT_CONTEXT_TOKEN_BUDGETS = {
+    "content_analyzer": 4000,
+    "exam_pattern_analyst": 4000,
+    "question_designer": 6000,
+    "question_generator": 8000,
+    "solver": 8000,
+    "evaluator": 12000,
+}
+DEFAULT_CONTEXT_TOKEN_BUDGET = 8000
+
+# Sections holding the items an agent has to answer. Their items are never
+# dropped: over budget they only lose CONTEXT_SUMMARY_DROP_FIELDS, and when
+# they still do not fit, building the context raises ContextBudgetError so
+# the agent can split the bank instead. Other sections share what is left.
+AGENT_CONTEXT_REQUIRED_SECTIONS = {
+    "solver": ("question_bank",),
+    "evaluator": ("question_bank", "solver_output"),
+}
+
+# Over-budget handling: "summarize" first condenses sections (first sentence
+# per line for text, CONTEXT_SUMMARY_DROP_FIELDS for structured output) and
+# truncates only what still does not fit; "truncate" cuts straight away.
+AGENT_CONTEXT_POLICIES = {
+    "question_generator": "summarize",
+    "solver": "summarize",
+    "evaluator": "summarize",
+}
+DEFAULT_CONTEXT_POLICY = "truncate"
+
+# Fields removed from structured sections when an agent's context is summarized.
+CONTEXT_SUMMARY_DROP_FIELDS = {
+    "solver": {"answer", "explanation"},
+    "evaluator": {"explanation", "key_points"},
+}
+
+# Token estimate used for budgets and diagnostics.
+CHARS_PER_TOKEN = 4
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Image normalization applied before multimodal grounding.
+"""
+
+# Sniff the real format, downscale and re-encode uploads before they are
+# sent to the multimodal model. Without Pillow installed only the MIME type
+# is corrected.
+IMAGE_NORMALIZATION_ENABLED = True
+
+# Longest side (px) of the image sent to the model; larger images are
+# downscaled, preserving aspect ratio.
+IMAGE_MAX_DIMENSION = 1600
+
+# JPEG quality used when re-encoding.
+IMAGE_JPEG_QUALITY = 85
+
+# An image that needs no downscaling is only re-encoded when that saves at
+# least this fraction of its size; otherwise the original bytes are sent.
+IMAGE_MIN_SAVINGS_FRACTION = 0.1
+
+# Worker threads for normalization (decode/resize/encode release the GIL).
+IMAGE_NORMALIZE_WORKERS = 4
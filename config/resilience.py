@@ -18,3 +18,39 @@ NODE_TIMEOUT_SEC = {
 }
 
 AGENT_TIMEOUT_SEC = 120
+
+# End-to-end budget for one pipeline run. Every node/agent attempt only gets
+# the time left until this deadline. Set to None to disable.
+REQUEST_DEADLINE_SEC = 300
+
+# Shared worker pool used to enforce per-attempt timeouts on sync calls.
+RESILIENCE_MAX_WORKERS = 32
+
+# Separate pool for the fanned-out calls of one agent (solver shards,
+# evaluator batches). Agent bodies run on the pool above and wait on these
+# calls, so they must never compete with them for a worker.
+RESILIENCE_FANOUT_MAX_WORKERS = 32
+
+# -------------------------------------------------
+# Latency budget degradation
+# -------------------------------------------------
+
+# Agents the executor may shorten or skip to meet a request's latency budget.
+OPTIONAL_AGENTS = {"question_designer", "evaluator"}
+
+# Starting per-agent latency estimates (ms) before any run has been observed.
+AGENT_LATENCY_PRIORS_MS = {
+    "content_analyzer": 8000,
+    "exam_pattern_analyst": 8000,
+    "question_designer": 8000,
+    "question_generator": 20000,
+    "solver": 20000,
+    "evaluator": 15000,
+}
+
+# Weight of the newest observation in the running latency estimate.
+LATENCY_EWMA_ALPHA = 0.3
+
+# An optional agent still runs, with its timeout capped to the spare budget,
+# when that spare budget covers at least this fraction of its estimate.
+SHORTEN_MIN_FRACTION = 0.5
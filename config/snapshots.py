@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+State snapshot logging settings.
+"""
+
+# "full" records every stage of every run, "sampled" records every stage of
+# SNAPSHOT_SAMPLE_RATE of the runs (chosen per run_id), "off" records nothing
+# and skips the state dump entirely.
+SNAPSHOT_LEVEL = "full"
+SNAPSHOT_SAMPLE_RATE = 0.1
+
+# Snapshots are written by a background thread: the first snapshot of a run
+# holds the full state, later ones only the changes since the previous one.
+# Records are flushed in batches of up to SNAPSHOT_FLUSH_BATCH, or after
+# SNAPSHOT_FLUSH_INTERVAL_SEC.
+SNAPSHOT_FLUSH_BATCH = 64
+SNAPSHOT_FLUSH_INTERVAL_SEC = 1.0
+
+# Snapshots waiting to be written; beyond this they are dropped (and counted)
+# rather than slowing the request down.
+SNAPSHOT_QUEUE_MAX = 10000
+
+# Runs whose last snapshot is kept as the base for the next delta. A run
+# evicted from this set starts over with a full snapshot.
+SNAPSHOT_MAX_OPEN_RUNS = 256
+
+# Where snapshots go. A ".jsonl" path keeps the append-only log (read back
+# with core.snapshots.iter_snapshots); any other path is a SQLite snapshot
+# store indexed by run_id and stage (core.snapshot_store).
+SNAPSHOT_PATH = "logs/snapshots.sqlite3"
+
+# -------------------------------------------------
+# Snapshot store
+# -------------------------------------------------
+
+# Every SNAPSHOT_KEYFRAME_EVERY-th record of a run holds the full state and
+# the rest hold deltas, so loading any stage reads at most this many rows.
+SNAPSHOT_KEYFRAME_EVERY = 4
+
+# zlib level for stored records (1 fastest .. 9 smallest).
+SNAPSHOT_COMPRESSION_LEVEL = 6
+
+# Whole runs are deleted once their last record is older than
+# SNAPSHOT_RETENTION_SEC, then oldest first while the store holds more than
+# SNAPSHOT_RETENTION_MAX_BYTES of records. Checked at most every
+# SNAPSHOT_RETENTION_CHECK_SEC by the writer thread. None disables a bound.
+SNAPSHOT_RETENTION_SEC = 7 * 24 * 60 * 60
+SNAPSHOT_RETENTION_MAX_BYTES = 512 * 1024 * 1024
+SNAPSHOT_RETENTION_CHECK_SEC = 60
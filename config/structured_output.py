@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""
+Schema-constrained LLM output settings.
+"""
+
+# Ask the text model for schema-constrained JSON (with_structured_output)
+# when it supports it; otherwise agents parse JSON out of the response text.
+STRUCTURED_OUTPUT_ENABLED = True
+
+# Agents that request structured output when it is enabled.
+STRUCTURED_OUTPUT_AGENTS = {"question_generator", "solver", "evaluator"}
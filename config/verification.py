@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Local (non-LLM) answer checking settings.
+"""
+
+# Compare the solver's numeric final answers with the question bank's
+# answer keys after every solver run (see tools/math_solver.py).
+ANSWER_CHECK_ENABLED = True
+
+# Tolerances for numeric answer comparison; the relative tolerance absorbs
+# rounding (e.g. g = 9.8 vs 9.81 m/s^2).
+ANSWER_REL_TOL = 0.01
+ANSWER_ABS_TOL = 1e-9
+
+# -------------------------------------------------
+# Rule-based pre-evaluation
+# -------------------------------------------------
+
+# Run structural checks on question_bank / solver_output right before the
+# evaluator task (see core/pre_evaluation.py). The report is always filed
+# under run_diagnostics["pre_evaluation"].
+PRE_EVALUATION_ENABLED = True
+
+# Checks to run, in order; a check left out is reported as disabled.
+PRE_EVALUATION_CHECKS = (
+    "mcq_answer_in_options",
+    "duplicate_options",
+    "empty_solutions",
+    "section_counts",
+    "answer_key_agreement",
+)
+
+# Skip the LLM evaluator when every check passes and at least this fraction
+# of the questions had their answer verified against the key. Set to None
+# to always run the evaluator (it is still skipped for the latency budget).
+PRE_EVALUATION_SKIP_CONFIDENCE = 0.9
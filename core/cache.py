@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Shared cache primitives used by the pipeline's result caches.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with an optional per-entry TTL.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_sec: Optional[float] = None) -> None:
+        self._max_entries = max(1, max_entries)
+        self._ttl_sec = ttl_sec if ttl_sec and ttl_sec > 0 else None
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self._ttl_sec is not None and time.time() - stored_at > self._ttl_sec:
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+        }
+
+
+class SQLiteCacheStore:
+    """
+    Persistent key/value cache in a single SQLite file.
+
+    Safe to share between API worker processes on one host (WAL journal,
+    short transactions). Entries are evicted least-recently-used once a
+    namespace exceeds max_entries or max_bytes, and expire after ttl_sec.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        *,
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = None,
+        ttl_sec: Optional[float] = None,
+    ) -> None:
+        self._path = path
+        self._namespace = namespace
+        self._max_entries = max(1, max_entries)
+        self._max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self._ttl_sec = ttl_sec if ttl_sec and ttl_sec > 0 else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_lru "
+                "ON cache_entries (namespace, accessed_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=10)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self._namespace, key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self._ttl_sec is not None and now - created_at > self._ttl_sec:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self._namespace, key),
+                )
+                self.evictions += 1
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self._namespace, key),
+            )
+        self.hits += 1
+        return bytes(value)
+
+    def set(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._namespace, key, sqlite3.Binary(value), len(value), now, now),
+            )
+            self._evict(conn, now)
+
+    def delete(self, key: str) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self._namespace, key),
+            )
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self._ttl_sec is not None:
+            cursor = conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?",
+                (self._namespace, now - self._ttl_sec),
+            )
+            self.evictions += max(0, cursor.rowcount)
+
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self._namespace,),
+        ).fetchone()
+        if count <= self._max_entries and (self._max_bytes is None or total <= self._max_bytes):
+            return
+
+        rows = conn.execute(
+            "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at ASC",
+            (self._namespace,),
+        )
+        doomed = []
+        for key, size in rows:
+            if count <= self._max_entries and (self._max_bytes is None or total <= self._max_bytes):
+                break
+            doomed.append((self._namespace, key))
+            count -= 1
+            total -= size
+        conn.executemany(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+            doomed,
+        )
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self._namespace,),
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": count,
+            "bytes": total,
+        }
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Builds the context block of each agent's prompt.
+
+Every agent gets only the sections it needs, serialized compactly (plain
+text as-is, structured output as minified JSON without empty fields), and
+kept within a per-agent token budget by the configured policy. Sections
+holding the items an agent has to answer are never cut.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from config.context import (
+    AGENT_CONTEXT_SECTIONS,
+    AGENT_CONTEXT_REQUIRED_SECTIONS,
+    AGENT_CONTEXT_TOKEN_BUDGETS,
+    DEFAULT_CONTEXT_TOKEN_BUDGET,
+    AGENT_CONTEXT_POLICIES,
+    DEFAULT_CONTEXT_POLICY,
+    CONTEXT_SUMMARY_DROP_FIELDS,
+    CHARS_PER_TOKEN,
+)
+
+TRUNCATION_MARKER = " [...truncated]"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s")
+
+
+class ContextBudgetError(ValueError):
+    """Raised when the items an agent has to answer do not fit its budget."""
+    pass
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~CHARS_PER_TOKEN characters per token).
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+# -------------------------------------------------
+# Compact serialization
+# -------------------------------------------------
+
+def _prune(value: Any, drop_fields=frozenset()) -> Any:
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            if key in drop_fields:
+                continue
+            item = _prune(item, drop_fields)
+            if item in ("", None, [], {}):
+                continue
+            pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        return [_prune(item, drop_fields) for item in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def compact(value: Any) -> str:
+    """
+    Serializes a section for a prompt: strings stripped, everything else as
+    minified JSON with empty fields dropped.
+    """
+    if isinstance(value, str):
+        return value.strip()
+    return json.dumps(_prune(value), ensure_ascii=False, separators=(",", ":"))
+
+
+# -------------------------------------------------
+# Policies
+# -------------------------------------------------
+
+def _summarize_text(text: str) -> str:
+    # Extractive: first sentence of every distinct line, order preserved.
+    lines: List[str] = []
+    seen = set()
+    for line in text.splitlines():
+        line = _SENTENCE_END.split(line.strip(), maxsplit=1)[0]
+        if line and line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _truncate_text(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    limit = max(0, max_chars - len(TRUNCATION_MARKER))
+    cut = text.rfind("\n", 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut].rstrip() + TRUNCATION_MARKER
+
+
+def _truncate_structured(value: Any, max_chars: int) -> str:
+    """
+    Drops trailing items from the longest lists of a dict of lists until it
+    fits, noting how many were omitted. Other shapes fall back to text
+    truncation. Only used for supporting sections, never required ones.
+    """
+    text = compact(value)
+    if len(text) <= max_chars:
+        return text
+    if not isinstance(value, dict) or not any(isinstance(v, list) for v in value.values()):
+        return _truncate_text(text, max_chars)
+
+    trimmed = {key: list(v) if isinstance(v, list) else v for key, v in value.items()}
+    omitted: Dict[str, int] = {}
+    while len(text) > max_chars:
+        longest = max(
+            (key for key, v in trimmed.items() if isinstance(v, list) and v),
+            key=lambda key: len(trimmed[key]),
+            default=None,
+        )
+        if longest is None:
+            return _truncate_text(text, max_chars)
+        trimmed[longest].pop()
+        omitted[longest] = omitted.get(longest, 0) + 1
+        text = compact({**trimmed, "omitted_items": omitted})
+    return text
+
+
+def _allocate(sizes: Dict[str, int], budget: int) -> Dict[str, int]:
+    """
+    Splits a character budget so small sections keep everything and the
+    rest is shared evenly among the larger ones.
+    """
+    shares: Dict[str, int] = {}
+    remaining = budget
+    pending = sorted(sizes, key=lambda name: sizes[name])
+    while pending:
+        share = remaining // len(pending)
+        name = pending.pop(0)
+        shares[name] = min(sizes[name], share)
+        remaining -= shares[name]
+    return shares
+
+
+# -------------------------------------------------
+# Public API
+# -------------------------------------------------
+
+def knowledge_sections(agent_id: str, knowledge_base: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The knowledge-base sections configured for agent_id, in configured order.
+    """
+    return {
+        name: knowledge_base[name]
+        for name in AGENT_CONTEXT_SECTIONS.get(agent_id, ())
+        if name in knowledge_base
+    }
+
+
+def build_context(
+    agent_id: str,
+    sections: Dict[str, Any],
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Serializes sections and fits them into the agent's token budget.
+
+    Returns (rendered sections, report); the report lists per-section token
+    estimates before and after fitting and what the policy changed. Required
+    sections (AGENT_CONTEXT_REQUIRED_SECTIONS) are only condensed, never
+    cut; raises ContextBudgetError when they alone exceed the budget.
+    """
+    budget = AGENT_CONTEXT_TOKEN_BUDGETS.get(agent_id, DEFAULT_CONTEXT_TOKEN_BUDGET)
+    policy = AGENT_CONTEXT_POLICIES.get(agent_id, DEFAULT_CONTEXT_POLICY)
+    required = [name for name in AGENT_CONTEXT_REQUIRED_SECTIONS.get(agent_id, ()) if name in sections]
+    sections = dict(sections)
+    rendered = {name: compact(value) for name, value in sections.items()}
+    report: Dict[str, Any] = {
+        "budget_tokens": budget,
+        "policy": policy,
+        "input_tokens": {name: estimate_tokens(text) for name, text in rendered.items()},
+        "summarized": [],
+        "truncated": [],
+    }
+
+    max_chars = budget * CHARS_PER_TOKEN
+    if sum(len(text) for text in rendered.values()) > max_chars:
+        drop_fields = frozenset(CONTEXT_SUMMARY_DROP_FIELDS.get(agent_id, ()))
+        for name, value in sections.items():
+            if name in required:
+                # Cannot be cut, so condensed under either policy; only
+                # structured sections lose fields, text is kept whole.
+                if isinstance(value, str):
+                    continue
+            elif policy != "summarize":
+                continue
+            if isinstance(value, str):
+                summary = _summarize_text(rendered[name])
+            else:
+                sections[name] = value = _prune(value, drop_fields)
+                summary = compact(value)
+            if len(summary) < len(rendered[name]):
+                rendered[name] = summary
+                report["summarized"].append(name)
+
+    required_chars = sum(len(rendered[name]) for name in required)
+    if required_chars > max_chars:
+        raise ContextBudgetError(
+            f"{agent_id} context needs ~{-(-required_chars // CHARS_PER_TOKEN)} tokens for "
+            f"{', '.join(required)}, over its budget of {budget}"
+        )
+
+    supporting = {name: text for name, text in rendered.items() if name not in required}
+    if sum(len(text) for text in supporting.values()) > max_chars - required_chars:
+        shares = _allocate({name: len(text) for name, text in supporting.items()}, max_chars - required_chars)
+        for name, text in supporting.items():
+            if len(text) <= shares[name]:
+                continue
+            value = sections[name]
+            if isinstance(value, str):
+                rendered[name] = _truncate_text(text, shares[name])
+            else:
+                rendered[name] = _truncate_structured(value, shares[name])
+            report["truncated"].append(name)
+
+    report["output_tokens"] = {name: estimate_tokens(text) for name, text in rendered.items()}
+    return rendered, report
+
+
+def fits_context(agent_id: str, sections: Dict[str, Any]) -> bool:
+    """
+    Whether build_context can fit sections without raising ContextBudgetError.
+    """
+    try:
+        build_context(agent_id, sections)
+    except ContextBudgetError:
+        return False
+    return True
+
+
+def render_sections(rendered: Dict[str, str]) -> str:
+    """
+    Joins knowledge-base sections under headings for a prompt.
+    """
+    return "\n\n".join(
+        f"{name.upper()}:\n{text}" for name, text in rendered.items() if text
+    )
+
+
+def prompt_diagnostics(prompt: str, context_report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Agent "diagnostics" entries for a built prompt.
+    """
+    return {
+        "prompt_tokens": estimate_tokens(prompt),
+        "context": context_report,
+    }
@@ -7,17 +7,41 @@ This file:
 4. Does NOT contain agent logic
 """
 
+import asyncio
 import logging
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
-from core.state import TutoringState, save_state_snapshot, GroundedContext
-from core.routing import task_executor
-from core.resilience import run_with_retry
+from core.state import TutoringState, UserProfile, save_state_snapshot, GroundedContext, ensure_state
+from core.routing import task_executor, atask_executor
+from core.resilience import run_with_retry, arun_with_retry
+from core.stream_events import emit_stage_event
+from core.llm_cache import agent_llm, forget_responses, cache_stats
 from core.planner_repair import validate_plan_schema, repair_plan, fallback_plan
+from core.plan_cache import PlanCache
+from core.grounding_cache import GroundingCache
+from core.question_index import QuestionIndex
+from core.image_store import IMAGES, image_digest
+from core.snapshot_store import SnapshotStore
+from core.latency import request_deadline
+from core.page_grounding import (
+    aground_pages,
+    ground_pages,
+    merge_grounded_contexts,
+    page_label,
+    summarize_page_meta,
+)
 from config.resilience import NODE_RETRIES, NODE_TIMEOUT_SEC, PIPELINE_RETRY_DELAY_SEC
-from agents.multimodal.vision_agent import multimodal_vision_agent
-from agents.planner.planner_agent import planner_agent
+from config.image import IMAGE_NORMALIZATION_ENABLED
+from config.concurrency import MAX_PARALLEL_GROUNDING
+from preprocessing.image_normalizer import submit_normalization
+from agents.multimodal.vision_agent import multimodal_vision_agent, amultimodal_vision_agent
+from agents.planner.planner_agent import planner_agent, aplanner_agent
 
 logger = logging.getLogger(__name__)
 
@@ -65,56 +89,219 @@ def _normalize_plan_task_ids(plan):
 # Graph node wrappers
 # -------------------------------------------------
 
-def multimodal_node(state: TutoringState):
-    logger.info("Entering multimodal node")
+def _cache_hit_meta(label: str, start: float, source: str) -> dict:
+    return {
+        "label": label,
+        "attempts": 1,
+        "retries": 0,
+        "fallback_used": False,
+        "timeout": False,
+        "error": None,
+        "duration_ms": int((time.time() - start) * 1000),
+        "cache": source,
+    }
+
+
+def _finish_grounding(
+    state: TutoringState,
+    pages: List[Dict[str, Any]],
+    start: float,
+    cache_stats: Optional[Dict[str, int]],
+) -> None:
+    grounded = merge_grounded_contexts([page["grounded"] for page in pages])
+    state.grounded_context = grounded
+    # Nothing after grounding reads the images; drop this request's references.
+    for ref in state.image_refs:
+        IMAGES.release(ref)
+    if cache_stats is not None:
+        hits = sum(1 for page in pages if page["cache_hit"])
+        state.run_diagnostics["grounding_cache"] = {"hit": hits == len(pages), "hits": hits, "pages": len(pages)}
+        state.run_diagnostics["grounding_cache"].update(cache_stats)
+        if hits == len(pages):
+            logger.info("Grounding cache hit; skipping multimodal model")
+    reports = [page["normalization"] for page in pages if page["normalization"] is not None]
+    if reports:
+        state.run_diagnostics["image_normalization"] = {
+            "bytes_saved": sum(report["bytes_saved"] for report in reports),
+            "pages": reports,
+        }
+    metas = [page["meta"] for page in pages]
+    if len(metas) > 1:
+        for page_meta in metas:
+            _record_diagnostic(state, page_meta)
+    meta = summarize_page_meta("multimodal", metas, int((time.time() - start) * 1000))
+    _record_diagnostic(state, meta)
+    logger.info("Multimodal grounding complete (%d page(s))", len(pages))
+    save_state_snapshot(state, "multimodal")
+    emit_stage_event("multimodal", grounded.model_dump(), meta)
+
+
+def _start_normalization(ref: str) -> Optional[Future]:
+    image = IMAGES.get(ref)
+    if image is None or not IMAGE_NORMALIZATION_ENABLED:
+        return None
+    return submit_normalization(image, IMAGES.mime_type(ref))
+
+
+def _image_for_model(ref: str, normalized=None) -> Tuple[Optional[bytes], str, Optional[dict]]:
+    """
+    (bytes, MIME type, normalization report) sent to the model: the
+    normalized image when normalization ran, otherwise the stored buffer.
+    Retries reuse it.
+    """
+    if normalized is None:
+        return IMAGES.get(ref), IMAGES.mime_type(ref), None
+    return normalized
+
+
+def _require_image(ref: str, image: Optional[bytes]) -> bytes:
+    if image is None:
+        raise LookupError(f"Image {ref!r} is not in the image store")
+    return image
+
+
+def _cached_grounding(
+    grounding_cache: Optional[GroundingCache],
+    digest: Optional[str],
+    user_profile: UserProfile,
+) -> Optional[GroundedContext]:
+    if grounding_cache is None or digest is None:
+        return None
+    return grounding_cache.get(digest, user_profile)
+
+
+def _remember_grounding(
+    grounding_cache: Optional[GroundingCache],
+    digest: Optional[str],
+    user_profile: UserProfile,
+    grounded: GroundedContext,
+    meta: dict,
+) -> None:
+    if grounding_cache is None or digest is None or meta.get("fallback_used"):
+        return
+    grounding_cache.set(digest, user_profile, grounded)
+
+
+def _page_result(grounded: GroundedContext, meta: dict, cache_hit: bool, normalization=None) -> Dict[str, Any]:
+    return {"grounded": grounded, "meta": meta, "cache_hit": cache_hit, "normalization": normalization}
+
+
+def _ground_page(
+    state: TutoringState,
+    grounding_cache: Optional[GroundingCache],
+    position: int,
+    ref: str,
+) -> Dict[str, Any]:
+    # Pages run in parallel: read state here, never write it.
+    start = time.time()
+    label = page_label("multimodal", position, len(state.image_refs))
+    digest = image_digest(ref)
+    cached = _cached_grounding(grounding_cache, digest, state.user_profile)
+    if cached is not None:
+        return _page_result(cached, _cache_hit_meta(label, start, "grounding"), True)
+
+    pending = _start_normalization(ref)
+    image, mime_type, report = _image_for_model(ref, pending.result() if pending else None)
+
     def _run():
         return multimodal_vision_agent(
-            image_base64=state.image_base64,
+            image_bytes=_require_image(ref, image),
             user_profile=state.user_profile,
+            mime_type=mime_type,
         )
 
     def _fallback(_exc: Exception):
         return GroundedContext()
 
     grounded, meta = run_with_retry(
-        "multimodal",
+        label,
         _run,
         retries=NODE_RETRIES.get("multimodal", 0),
         delay_sec=PIPELINE_RETRY_DELAY_SEC,
         timeout_sec=NODE_TIMEOUT_SEC.get("multimodal"),
         fallback=_fallback,
+        deadline=state.deadline_at,
     )
-    state.grounded_context = grounded
-    _record_diagnostic(state, meta)
-    logger.info("Multimodal grounding complete")
-    save_state_snapshot(state, "multimodal")
-    return state
+    _remember_grounding(grounding_cache, digest, state.user_profile, grounded, meta)
+    return _page_result(grounded, meta, False, report)
 
 
-def planner_node(state: TutoringState, llm):
-    logger.info("Entering planner node")
+async def _aground_page(
+    state: TutoringState,
+    grounding_cache: Optional[GroundingCache],
+    position: int,
+    ref: str,
+) -> Dict[str, Any]:
+    start = time.time()
+    label = page_label("multimodal", position, len(state.image_refs))
+    digest = image_digest(ref)
+    # SQLite lookups may wait on another worker's lock; keep them off the loop.
+    cached = await asyncio.to_thread(_cached_grounding, grounding_cache, digest, state.user_profile)
+    if cached is not None:
+        return _page_result(cached, _cache_hit_meta(label, start, "grounding"), True)
+
+    pending = _start_normalization(ref)
+    normalized = await asyncio.wrap_future(pending) if pending else None
+    image, mime_type, report = _image_for_model(ref, normalized)
+
     def _run():
-        return planner_agent(
-            llm=llm,
+        return amultimodal_vision_agent(
+            image_bytes=_require_image(ref, image),
             user_profile=state.user_profile,
-            grounded_context=state.grounded_context,
+            mime_type=mime_type,
         )
 
     def _fallback(_exc: Exception):
-        return fallback_plan(
-            state.user_profile,
-            state.grounded_context,
-        )
+        return GroundedContext()
 
-    plan, meta = run_with_retry(
-        "planner",
+    grounded, meta = await arun_with_retry(
+        label,
         _run,
-        retries=NODE_RETRIES.get("planner", 0),
+        retries=NODE_RETRIES.get("multimodal", 0),
         delay_sec=PIPELINE_RETRY_DELAY_SEC,
-        timeout_sec=NODE_TIMEOUT_SEC.get("planner"),
+        timeout_sec=NODE_TIMEOUT_SEC.get("multimodal"),
         fallback=_fallback,
+        deadline=state.deadline_at,
     )
-    _record_diagnostic(state, meta)
+    await asyncio.to_thread(_remember_grounding, grounding_cache, digest, state.user_profile, grounded, meta)
+    return _page_result(grounded, meta, False, report)
+
+
+def multimodal_node(state: TutoringState, grounding_cache: Optional[GroundingCache] = None):
+    logger.info("Entering multimodal node")
+    start = time.time()
+    pages = ground_pages(
+        state.image_refs,
+        lambda position, ref: _ground_page(state, grounding_cache, position, ref),
+        max_parallel=MAX_PARALLEL_GROUNDING,
+    )
+    cache_stats = grounding_cache.stats() if grounding_cache is not None else None
+    _finish_grounding(state, pages, start, cache_stats)
+    return state
+
+
+async def amultimodal_node(
+    state: TutoringState,
+    grounding_cache: Optional[GroundingCache] = None,
+):
+    logger.info("Entering multimodal node (async)")
+    start = time.time()
+    pages = await aground_pages(
+        state.image_refs,
+        lambda position, ref: _aground_page(state, grounding_cache, position, ref),
+        max_parallel=MAX_PARALLEL_GROUNDING,
+    )
+    cache_stats = await asyncio.to_thread(grounding_cache.stats) if grounding_cache is not None else None
+    _finish_grounding(state, pages, start, cache_stats)
+    return state
+
+
+def _apply_plan(state: TutoringState, plan) -> str:
+    """
+    Validates, repairs or replaces the plan. Returns "valid", "repaired"
+    or "fallback" depending on which path produced state.plan.
+    """
+    status = "valid"
     try:
         validate_plan_schema(plan)
         state.plan = _normalize_plan_task_ids(plan)
@@ -123,21 +310,163 @@ def planner_node(state: TutoringState, llm):
         try:
             repaired = repair_plan(plan)
             state.plan = _normalize_plan_task_ids(repaired)
+            status = "repaired"
         except Exception:
             fallback = fallback_plan(
                 state.user_profile,
                 state.grounded_context,
             )
             state.plan = _normalize_plan_task_ids(fallback)
+            status = "fallback"
+    # Recorded before the snapshot so seeding can apply the live cache filter.
+    state.run_diagnostics["plan_status"] = status
     logger.info("Planning complete")
     save_state_snapshot(state, "planner")
+    return status
+
+
+def _plan_from_cache(state: TutoringState, plan_cache: Optional[PlanCache]) -> bool:
+    """
+    Applies a cached or templated plan if one exists. Returns True on a hit.
+    """
+    if plan_cache is None:
+        return False
+    start = time.time()
+    plan, source = plan_cache.lookup(state.user_profile, state.grounded_context)
+    state.run_diagnostics["plan_cache"] = {"hit": plan is not None, "source": source}
+    state.run_diagnostics["plan_cache"].update(plan_cache.stats())
+    if plan is None:
+        return False
+
+    logger.info("Planner cache hit (%s); skipping planner LLM", source)
+    meta = _cache_hit_meta("planner", start, source)
+    _record_diagnostic(state, meta)
+    _apply_plan(state, plan)
+    emit_stage_event("planner", state.plan.model_dump(), meta)
+    return True
+
+
+def _record_llm_cache(state: TutoringState, label: str, view) -> None:
+    stats = cache_stats(view)
+    if stats is not None:
+        state.run_diagnostics.setdefault("llm_cache", {})[label] = stats
+
+
+def _remember_plan(
+    state: TutoringState,
+    plan_cache: Optional[PlanCache],
+    meta: dict,
+    status: str,
+) -> None:
+    # Only plans the LLM produced and that validated without repair are reused.
+    if plan_cache is None or meta.get("fallback_used") or status != "valid":
+        return
+    plan_cache.store(state.user_profile, state.grounded_context, state.plan)
+    state.run_diagnostics["plan_cache"].update(plan_cache.stats())
+
+
+def planner_node(state: TutoringState, llm, plan_cache: Optional[PlanCache] = None):
+    logger.info("Entering planner node")
+    if _plan_from_cache(state, plan_cache):
+        return state
+    view = agent_llm(llm, "planner")
+    def _run():
+        try:
+            return planner_agent(
+                llm=view,
+                user_profile=state.user_profile,
+                grounded_context=state.grounded_context,
+            )
+        except Exception:
+            forget_responses(view)
+            raise
+
+    def _fallback(_exc: Exception):
+        return fallback_plan(
+            state.user_profile,
+            state.grounded_context,
+        )
+
+    plan, meta = run_with_retry(
+        "planner",
+        _run,
+        retries=NODE_RETRIES.get("planner", 0),
+        delay_sec=PIPELINE_RETRY_DELAY_SEC,
+        timeout_sec=NODE_TIMEOUT_SEC.get("planner"),
+        fallback=_fallback,
+        deadline=state.deadline_at,
+    )
+    _record_diagnostic(state, meta)
+    _record_llm_cache(state, "planner", view)
+    status = _apply_plan(state, plan)
+    _remember_plan(state, plan_cache, meta, status)
+    emit_stage_event("planner", state.plan.model_dump(), meta)
+    return state
+
+
+async def aplanner_node(state: TutoringState, llm, plan_cache: Optional[PlanCache] = None):
+    logger.info("Entering planner node (async)")
+    if _plan_from_cache(state, plan_cache):
+        return state
+    view = agent_llm(llm, "planner")
+    async def _run():
+        try:
+            return await aplanner_agent(
+                llm=view,
+                user_profile=state.user_profile,
+                grounded_context=state.grounded_context,
+            )
+        except Exception:
+            forget_responses(view)
+            raise
+
+    def _fallback(_exc: Exception):
+        return fallback_plan(
+            state.user_profile,
+            state.grounded_context,
+        )
+
+    plan, meta = await arun_with_retry(
+        "planner",
+        _run,
+        retries=NODE_RETRIES.get("planner", 0),
+        delay_sec=PIPELINE_RETRY_DELAY_SEC,
+        timeout_sec=NODE_TIMEOUT_SEC.get("planner"),
+        fallback=_fallback,
+        deadline=state.deadline_at,
+    )
+    _record_diagnostic(state, meta)
+    _record_llm_cache(state, "planner", view)
+    status = _apply_plan(state, plan)
+    _remember_plan(state, plan_cache, meta, status)
+    emit_stage_event("planner", state.plan.model_dump(), meta)
     return state
 
 
-def executor_node(state: TutoringState, llm):
+def _finish_executor(state: TutoringState, start: float) -> None:
+    duration_ms = int((time.time() - start) * 1000)
+    state.run_diagnostics["timings_ms"]["executor"] = duration_ms
+    save_state_snapshot(state, "executor", final=True)
+    emit_stage_event(
+        "executor",
+        state.run_diagnostics["output_counts"],
+        {"duration_ms": duration_ms},
+    )
+
+
+def executor_node(state: TutoringState, llm, question_index: Optional[QuestionIndex] = None):
     logger.info("Entering executor node")
-    updated = task_executor(llm=llm, state=state)
-    save_state_snapshot(updated, "executor")
+    start = time.time()
+    updated = task_executor(llm=llm, state=state, question_index=question_index)
+    _finish_executor(updated, start)
+    return updated
+
+
+async def aexecutor_node(state: TutoringState, llm, question_index: Optional[QuestionIndex] = None):
+    logger.info("Entering executor node (async)")
+    start = time.time()
+    updated = await atask_executor(llm=llm, state=state, question_index=question_index)
+    _finish_executor(updated, start)
     return updated
 
 
@@ -145,18 +474,119 @@ def executor_node(state: TutoringState, llm):
 # Graph construction
 # -------------------------------------------------
 
-def build_graph(llm):
+def build_graph(
+    llm,
+    *,
+    plan_cache: Optional[PlanCache] = None,
+    grounding_cache: Optional[GroundingCache] = None,
+    question_index: Optional[QuestionIndex] = None,
+    entry_point: str = "multimodal",
+):
+    """
+    plan_cache: optional PlanCache consulted before calling the planner LLM.
+    grounding_cache: optional GroundingCache consulted before the multimodal model.
+    question_index: optional QuestionIndex screening generated questions for repeats.
+    entry_point: node the run starts at ("planner" or "executor" to resume).
+    """
     logger.info("Building LangGraph pipeline")
     graph = StateGraph(TutoringState)
 
-    graph.add_node("multimodal", lambda s: multimodal_node(s))
-    graph.add_node("planner", lambda s: planner_node(s, llm))
-    graph.add_node("executor", lambda s: executor_node(s, llm))
+    async def _amultimodal(s):
+        return await amultimodal_node(s, grounding_cache)
+
+    async def _aplanner(s):
+        return await aplanner_node(s, llm, plan_cache)
+
+    async def _aexecutor(s):
+        return await aexecutor_node(s, llm, question_index)
 
-    graph.set_entry_point("multimodal")
+    # Each node carries a sync and an async implementation:
+    # graph.invoke() uses the former, graph.ainvoke() the latter.
+    graph.add_node(
+        "multimodal",
+        RunnableLambda(lambda s: multimodal_node(s, grounding_cache), afunc=_amultimodal),
+    )
+    graph.add_node(
+        "planner",
+        RunnableLambda(lambda s: planner_node(s, llm, plan_cache), afunc=_aplanner),
+    )
+    graph.add_node(
+        "executor",
+        RunnableLambda(lambda s: executor_node(s, llm, question_index), afunc=_aexecutor),
+    )
+
+    graph.set_entry_point(entry_point)
 
     graph.add_edge("multimodal", "planner")
     graph.add_edge("planner", "executor")
     graph.add_edge("executor", END)
 
     return graph.compile()
+
+
+# -------------------------------------------------
+# Resume
+# -------------------------------------------------
+
+def resume_node(stage: str) -> Optional[str]:
+    """
+    The node that follows a snapshot stage; None once the executor is done.
+    """
+    if stage == "multimodal":
+        return "planner"
+    if stage == "planner" or stage.startswith("task:"):
+        return "executor"
+    if stage == "executor":
+        return None
+    raise ValueError(f"Unknown snapshot stage: {stage}")
+
+
+def resume_run(
+    store: SnapshotStore,
+    run_id: str,
+    llm,
+    *,
+    stage: Optional[str] = None,
+    seq: Optional[int] = None,
+    max_latency_ms: Optional[int] = None,
+    **graph_kwargs: Any,
+) -> TutoringState:
+    """
+    Loads a stored stage of a run (see SnapshotStore.load) and runs the
+    graph on from the node after it, as a new run that records where it
+    resumed from. Tasks the run had finished are not run again. A run
+    loaded at its executor stage is returned as stored.
+
+    Images are released after grounding, so a run can only be resumed
+    from its multimodal snapshot onwards.
+    """
+    record = store.load(run_id, stage=stage, seq=seq)
+    if record is None:
+        where = stage if stage is not None else f"seq {seq}" if seq is not None else "any stage"
+        raise KeyError(f"No snapshot of run {run_id} at {where}")
+    state = TutoringState(**record["state"])
+    node = resume_node(record["stage"])
+    if node is None:
+        return state
+
+    completed: List[str] = []
+    if record["stage"].startswith("task:"):
+        inherited = state.run_diagnostics.get("resumed_from") or {}
+        completed = list(inherited.get("completed_tasks", []))
+        completed += [
+            entry["stage"][len("task:"):]
+            for entry in store.stages(run_id)
+            if entry["seq"] <= record["seq"] and entry["stage"].startswith("task:")
+        ]
+    state = state.model_copy(
+        update={"run_id": uuid.uuid4().hex, "deadline_at": request_deadline(max_latency_ms)}
+    )
+    state.run_diagnostics["resumed_from"] = {
+        "run_id": run_id,
+        "stage": record["stage"],
+        "seq": record["seq"],
+        "completed_tasks": list(dict.fromkeys(completed)),
+    }
+    logger.info("Resuming run %s after %s at node %s", run_id, record["stage"], node)
+    graph = build_graph(llm, entry_point=node, **graph_kwargs)
+    return ensure_state(graph.invoke(state))
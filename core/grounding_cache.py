@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for multimodal grounding results.
+
+The key hashes the image digest together with the exact prompt
+(which embeds the profile fields) and the multimodal model name, so a
+re-uploaded textbook page with the same profile skips the Gemini call.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from core.cache import SQLiteCacheStore
+from core.state import GroundedContext, UserProfile
+from agents.multimodal.vision_agent import build_multimodal_prompt
+from config.cache import (
+    GROUNDING_CACHE_PATH,
+    GROUNDING_CACHE_MAX_ENTRIES,
+    GROUNDING_CACHE_MAX_BYTES,
+    GROUNDING_CACHE_TTL_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def grounding_cache_key(image_digest: str, user_profile: UserProfile) -> str:
+    """
+    image_digest is the image's SHA-256 hex digest (see core.image_store).
+    """
+    digest = hashlib.sha256()
+    digest.update(bytes.fromhex(image_digest))
+    digest.update(build_multimodal_prompt(user_profile).encode("utf-8"))
+    digest.update(os.getenv("MULTIMODAL_MODEL_NAME", "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class GroundingCache:
+    def __init__(self, store: SQLiteCacheStore) -> None:
+        self._store = store
+
+    @classmethod
+    def from_config(cls) -> "GroundingCache":
+        return cls(
+            SQLiteCacheStore(
+                GROUNDING_CACHE_PATH,
+                "grounding",
+                max_entries=GROUNDING_CACHE_MAX_ENTRIES,
+                max_bytes=GROUNDING_CACHE_MAX_BYTES,
+                ttl_sec=GROUNDING_CACHE_TTL_SEC,
+            )
+        )
+
+    def get(self, image_digest: str, user_profile: UserProfile) -> Optional[GroundedContext]:
+        try:
+            raw = self._store.get(grounding_cache_key(image_digest, user_profile))
+            if raw is None:
+                return None
+            return GroundedContext(**json.loads(raw.decode("utf-8")))
+        except Exception:
+            # A broken cache must never fail grounding.
+            logger.exception("Grounding cache lookup failed")
+            return None
+
+    def set(
+        self,
+        image_digest: str,
+        user_profile: UserProfile,
+        grounded_context: GroundedContext,
+    ) -> None:
+        # Only real groundings are worth keeping; empty metadata means the
+        # model output could not be parsed.
+        if not grounded_context.metadata:
+            return
+        try:
+            payload = json.dumps(grounded_context.model_dump(), ensure_ascii=True)
+            self._store.set(
+                grounding_cache_key(image_digest, user_profile),
+                payload.encode("utf-8"),
+            )
+        except Exception:
+            logger.exception("Grounding cache store failed")
+
+    def stats(self) -> Dict[str, int]:
+        return self._store.stats()
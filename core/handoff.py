@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Per-run handoff of work still in flight from one agent to a later one, e.g.
+the solves pipelined generation starts, which the solver task finishes.
+Handed-over objects must have close(); the task executor closes whatever
+was not taken over by the end of the run.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_handoffs: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def hand_over(run_id: str, key: str, obj: Any) -> None:
+    """
+    Leaves obj for a later agent of the run; an object handed over earlier
+    under the same key (a retried agent's) is closed.
+    """
+    with _lock:
+        replaced = _handoffs.setdefault(run_id, {}).pop(key, None)
+        _handoffs[run_id][key] = obj
+    if replaced is not None:
+        replaced.close()
+
+
+def take_over(run_id: str, key: str) -> Optional[Any]:
+    """
+    Removes and returns what was handed over under key, if anything; the
+    caller is responsible for closing it.
+    """
+    with _lock:
+        pending = _handoffs.get(run_id)
+        if not pending:
+            return None
+        obj = pending.pop(key, None)
+        if not pending:
+            del _handoffs[run_id]
+    return obj
+
+
+def release(run_id: str) -> None:
+    """
+    Closes everything of the run that no agent took over.
+    """
+    with _lock:
+        leftover = _handoffs.pop(run_id, {})
+    for key, obj in leftover.items():
+        logger.info("Closing %s handed over but never taken over", key)
+        try:
+            obj.close()
+        except Exception:
+            logger.exception("Closing handed-over %s failed", key)
+
+
+@contextmanager
+def handoff_scope(run_id: str) -> Iterator[None]:
+    """
+    release() for the run once the block exits, however it exits.
+    """
+    try:
+        yield
+    finally:
+        release(run_id)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Process-local store for request images.
+
+Each distinct image is kept once as an immutable bytes object, keyed by
+its SHA-256; pipeline state carries only a reference string
+("sha256:<hex>#<n>"). References are handed out per request, identical
+uploads share the buffer, and the buffer is dropped when its last
+reference is released (the multimodal node releases after grounding).
+"""
+
+import hashlib
+import itertools
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_MIME_TYPE = "image/png"
+
+
+def image_digest(ref: str) -> Optional[str]:
+    """
+    SHA-256 hex digest named by a reference, without touching the store.
+    """
+    if not isinstance(ref, str) or not ref.startswith("sha256:"):
+        return None
+    digest = ref[len("sha256:"):].split("#", 1)[0]
+    return digest if len(digest) == 64 else None
+
+
+class ImageStore:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._images: Dict[str, Tuple[bytes, str]] = {}
+        self._refs: Dict[str, str] = {}
+        # Live references per digest; the image goes when it reaches zero.
+        self._counts: Dict[str, int] = {}
+        self._counter = itertools.count(1)
+
+    def put(self, data: bytes, mime_type: str = DEFAULT_MIME_TYPE, digest: Optional[str] = None) -> str:
+        """
+        Registers image bytes and returns a new reference to them. Pass the
+        digest when it was computed while reading.
+        """
+        data = bytes(data)
+        digest = digest or hashlib.sha256(data).hexdigest()
+        ref = f"sha256:{digest}#{next(self._counter)}"
+        with self._lock:
+            self._images.setdefault(digest, (data, mime_type or DEFAULT_MIME_TYPE))
+            self._refs[ref] = digest
+            self._counts[digest] = self._counts.get(digest, 0) + 1
+        return ref
+
+    def put_chunks(self, chunks: Iterable[bytes], mime_type: str = DEFAULT_MIME_TYPE) -> str:
+        """
+        Hashes chunks as they arrive and stores the joined image once.
+        """
+        digest = hashlib.sha256()
+        parts = []
+        for chunk in chunks:
+            digest.update(chunk)
+            parts.append(chunk)
+        return self.put(b"".join(parts), mime_type, digest=digest.hexdigest())
+
+    def get(self, ref: str) -> Optional[bytes]:
+        with self._lock:
+            digest = self._refs.get(ref)
+            entry = self._images.get(digest) if digest else None
+        return entry[0] if entry else None
+
+    def mime_type(self, ref: str) -> str:
+        with self._lock:
+            digest = self._refs.get(ref)
+            entry = self._images.get(digest) if digest else None
+        return entry[1] if entry else DEFAULT_MIME_TYPE
+
+    def release(self, ref: str) -> None:
+        """
+        Drops a reference; safe to call more than once.
+        """
+        with self._lock:
+            digest = self._refs.pop(ref, None)
+            if digest is None:
+                return
+            count = self._counts[digest] - 1
+            if count:
+                self._counts[digest] = count
+            else:
+                del self._counts[digest]
+                self._images.pop(digest, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "images": len(self._images),
+                "references": len(self._refs),
+                "bytes": sum(len(data) for data, _ in self._images.values()),
+            }
+
+
+IMAGES = ImageStore()
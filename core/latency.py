@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Latency-budget decisions for optional pipeline stages.
+
+Observed agent durations feed a per-process running estimate. When a request
+has a deadline, optional agents are run, shortened (timeout capped to the
+spare budget) or skipped so the required stages still finish on time.
+"""
+
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional
+
+from config.resilience import (
+    REQUEST_DEADLINE_SEC,
+    OPTIONAL_AGENTS,
+    AGENT_LATENCY_PRIORS_MS,
+    LATENCY_EWMA_ALPHA,
+    SHORTEN_MIN_FRACTION,
+)
+
+_DEFAULT_ESTIMATE_MS = 10000
+
+
+class LatencyTracker:
+    """
+    Exponentially weighted moving average of agent durations.
+    """
+
+    def __init__(
+        self,
+        priors_ms: Optional[Dict[str, float]] = None,
+        alpha: float = LATENCY_EWMA_ALPHA,
+    ) -> None:
+        self._estimates: Dict[str, float] = dict(priors_ms or {})
+        self._alpha = alpha
+        self._lock = threading.Lock()
+
+    def record(self, agent_id: str, duration_ms: float) -> None:
+        with self._lock:
+            previous = self._estimates.get(agent_id)
+            if previous is None:
+                self._estimates[agent_id] = float(duration_ms)
+            else:
+                self._estimates[agent_id] = (
+                    self._alpha * duration_ms + (1 - self._alpha) * previous
+                )
+
+    def estimate(self, agent_id: str) -> float:
+        return self._estimates.get(agent_id, _DEFAULT_ESTIMATE_MS)
+
+
+LATENCY_TRACKER = LatencyTracker(AGENT_LATENCY_PRIORS_MS)
+
+
+def request_deadline(max_latency_ms: Optional[int] = None) -> Optional[float]:
+    """
+    Absolute deadline (epoch seconds) for a request starting now: the
+    caller's latency budget, capped by REQUEST_DEADLINE_SEC.
+    """
+    budgets = [
+        budget
+        for budget in (
+            REQUEST_DEADLINE_SEC,
+            max_latency_ms / 1000 if max_latency_ms else None,
+        )
+        if budget is not None
+    ]
+    if not budgets:
+        return None
+    return time.time() + min(budgets)
+
+
+def budget_decision(
+    agent_id: str,
+    remaining_ms: Optional[float],
+    downstream_agents: Iterable[str],
+    tracker: Optional[LatencyTracker] = None,
+) -> Dict[str, Any]:
+    """
+    Returns {"action": "run" | "shorten" | "skip", ...} for one ready task.
+
+    downstream_agents are the not-yet-started tasks; the required ones among
+    them are assumed to run back to back after this one.
+    """
+    if remaining_ms is None or agent_id not in OPTIONAL_AGENTS:
+        return {"action": "run"}
+
+    tracker = tracker or LATENCY_TRACKER
+    estimate_ms = tracker.estimate(agent_id)
+    reserved_ms = sum(
+        tracker.estimate(other)
+        for other in downstream_agents
+        if other not in OPTIONAL_AGENTS
+    )
+    slack_ms = remaining_ms - reserved_ms
+    decision = {
+        "estimate_ms": int(estimate_ms),
+        "reserved_ms": int(reserved_ms),
+        "slack_ms": int(slack_ms),
+    }
+
+    if slack_ms >= estimate_ms:
+        decision["action"] = "run"
+    elif slack_ms > 0 and slack_ms >= estimate_ms * SHORTEN_MIN_FRACTION:
+        decision["action"] = "shorten"
+        decision["timeout_sec"] = slack_ms / 1000
+    else:
+        decision["action"] = "skip"
+    return decision
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Transparent response memoization for the text LLM.
+
+The text model runs at temperature=0, so identical prompts can reuse an
+earlier response. Responses are kept in an in-memory LRU backed by the
+shared SQLite cache store, keyed on a normalized prompt hash plus the
+model name.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from pydantic import BaseModel
+
+from core.cache import LRUCache, SQLiteCacheStore
+from config.cache import (
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_TTL_SEC,
+    LLM_CACHE_DISABLED_AGENTS,
+)
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_SPACE = re.compile(r"[ \t]+\n")
+
+
+def _normalize_text(text: str) -> str:
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return _TRAILING_SPACE.sub("\n", text).strip()
+
+
+def _normalize_prompt(prompt: Any) -> str:
+    if isinstance(prompt, str):
+        return _normalize_text(prompt)
+    if isinstance(prompt, (list, tuple)):
+        messages = []
+        for message in prompt:
+            if isinstance(message, BaseMessage):
+                role, content = message.type, message.content
+            elif isinstance(message, dict):
+                role, content = message.get("role", ""), message.get("content", "")
+            else:
+                role, content = "", message
+            if isinstance(content, str):
+                content = _normalize_text(content)
+            messages.append([role, content])
+        return json.dumps(messages, ensure_ascii=True, sort_keys=True, default=str)
+    raise TypeError(f"Unsupported prompt type for caching: {type(prompt)}")
+
+
+def structured_output_variant(schema: type) -> str:
+    """
+    Cache-key suffix for schema-constrained calls; changes with the schema.
+    """
+    schema_json = json.dumps(schema.model_json_schema(), sort_keys=True)
+    return f"structured:{schema.__name__}:{hashlib.sha256(schema_json.encode('utf-8')).hexdigest()}"
+
+
+def llm_cache_key(prompt: Any, model_name: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_normalize_prompt(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CachedLLM:
+    """
+    Wraps a LangChain chat model; invoke/ainvoke are memoized, every other
+    attribute is delegated to the wrapped model.
+    """
+
+    def __init__(
+        self,
+        llm,
+        *,
+        model_name: str,
+        memory: Optional[LRUCache] = None,
+        store: Optional[SQLiteCacheStore] = None,
+        disabled_agents: Iterable[str] = (),
+    ) -> None:
+        self._llm = llm
+        self._model_name = model_name
+        self._memory = memory if memory is not None else LRUCache(LLM_CACHE_MEMORY_ENTRIES)
+        self._store = store
+        self._disabled_agents = set(disabled_agents)
+
+    @classmethod
+    def from_config(cls, llm, model_name: str) -> "CachedLLM":
+        return cls(
+            llm,
+            model_name=model_name,
+            memory=LRUCache(LLM_CACHE_MEMORY_ENTRIES, ttl_sec=LLM_CACHE_TTL_SEC),
+            store=SQLiteCacheStore(
+                LLM_CACHE_PATH,
+                "llm",
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                max_bytes=LLM_CACHE_MAX_BYTES,
+                ttl_sec=LLM_CACHE_TTL_SEC,
+            ),
+            disabled_agents=LLM_CACHE_DISABLED_AGENTS,
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
+
+    def for_agent(self, agent_id: str) -> "AgentLLM":
+        """
+        Returns a per-call view that tracks hits/misses for one agent run.
+        """
+        return AgentLLM(self, agent_id, enabled=agent_id not in self._disabled_agents)
+
+    def invoke(self, prompt: Any, **kwargs: Any) -> Any:
+        return self.for_agent("").invoke(prompt, **kwargs)
+
+    async def ainvoke(self, prompt: Any, **kwargs: Any) -> Any:
+        return await self.for_agent("").ainvoke(prompt, **kwargs)
+
+    def stream(self, prompt: Any, **kwargs: Any) -> Iterator[Any]:
+        return self.for_agent("").stream(prompt, **kwargs)
+
+    def astream(self, prompt: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        return self.for_agent("").astream(prompt, **kwargs)
+
+    @property
+    def with_structured_output(self):
+        # Raises AttributeError when the wrapped model has no structured mode.
+        self._llm.with_structured_output
+        return self.for_agent("").with_structured_output
+
+    # -------------------------------------------------
+    # Tiered lookup
+    # -------------------------------------------------
+
+    def _key(self, prompt: Any, variant: str = "") -> Optional[str]:
+        model_name = f"{self._model_name}|{variant}" if variant else self._model_name
+        try:
+            return llm_cache_key(prompt, model_name)
+        except TypeError:
+            return None
+
+    def _get(self, key: str) -> Optional[str]:
+        content = self._memory.get(key)
+        if content is not None:
+            return content
+        if self._store is None:
+            return None
+        try:
+            raw = self._store.get(key)
+        except Exception:
+            logger.exception("LLM cache lookup failed")
+            return None
+        if raw is None:
+            return None
+        content = raw.decode("utf-8")
+        self._memory.set(key, content)
+        return content
+
+    def _set(self, key: str, content: str) -> None:
+        self._memory.set(key, content)
+        if self._store is None:
+            return
+        try:
+            self._store.set(key, content.encode("utf-8"))
+        except Exception:
+            logger.exception("LLM cache store failed")
+
+    def _forget(self, keys: List[str]) -> None:
+        for key in keys:
+            self._memory.delete(key)
+        if self._store is not None:
+            for key in keys:
+                try:
+                    self._store.delete(key)
+                except Exception:
+                    logger.exception("LLM cache delete failed")
+
+
+class AgentLLM:
+    """
+    Per-agent view of a CachedLLM. Not shared between concurrent runs.
+    """
+
+    def __init__(self, cache: CachedLLM, agent_id: str, *, enabled: bool) -> None:
+        self._cache = cache
+        self.agent_id = agent_id
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._stored: List[str] = []
+        # Key variants looked up through this view ("" plus one per schema).
+        self._variants: Set[str] = {""}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cache, name)
+
+    def _lookup(self, prompt: Any, kwargs: Dict[str, Any], variant: str = "") -> tuple:
+        # Extra call options change the response; don't try to key on them.
+        if not self.enabled or kwargs:
+            return None, None
+        key = self._cache._key(prompt, variant)
+        if key is None:
+            return None, None
+        with self._lock:
+            self._variants.add(variant)
+        return key, self._cache._get(key)
+
+    def _record(self, key: Optional[str], content: Optional[str]) -> None:
+        with self._lock:
+            self.misses += 1 if key is not None else 0
+            if key is not None and isinstance(content, str) and content.strip():
+                self._stored.append(key)
+        if key is not None and isinstance(content, str) and content.strip():
+            self._cache._set(key, content)
+
+    def invoke(self, prompt: Any, **kwargs: Any) -> Any:
+        key, content = self._lookup(prompt, kwargs)
+        if content is not None:
+            with self._lock:
+                self.hits += 1
+            return AIMessage(content=content)
+        response = self._cache._llm.invoke(prompt, **kwargs)
+        self._record(key, getattr(response, "content", None))
+        return response
+
+    async def ainvoke(self, prompt: Any, **kwargs: Any) -> Any:
+        key, content = await asyncio.to_thread(self._lookup, prompt, kwargs)
+        if content is not None:
+            with self._lock:
+                self.hits += 1
+            return AIMessage(content=content)
+        response = await self._cache._llm.ainvoke(prompt, **kwargs)
+        await asyncio.to_thread(self._record, key, getattr(response, "content", None))
+        return response
+
+    def stream(self, prompt: Any, **kwargs: Any) -> Iterator[Any]:
+        """
+        Streams chunks from the model; a cached response comes back as one
+        chunk, and a completed stream is cached like an invoke() response.
+        """
+        key, content = self._lookup(prompt, kwargs)
+        if content is not None:
+            with self._lock:
+                self.hits += 1
+            yield AIMessageChunk(content=content)
+            return
+        parts: List[str] = []
+        for chunk in self._cache._llm.stream(prompt, **kwargs):
+            text = getattr(chunk, "content", None)
+            if isinstance(text, str):
+                parts.append(text)
+            yield chunk
+        self._record(key, "".join(parts))
+
+    async def astream(self, prompt: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        key, content = await asyncio.to_thread(self._lookup, prompt, kwargs)
+        if content is not None:
+            with self._lock:
+                self.hits += 1
+            yield AIMessageChunk(content=content)
+            return
+        parts: List[str] = []
+        async for chunk in self._cache._llm.astream(prompt, **kwargs):
+            text = getattr(chunk, "content", None)
+            if isinstance(text, str):
+                parts.append(text)
+            yield chunk
+        await asyncio.to_thread(self._record, key, "".join(parts))
+
+    @property
+    def with_structured_output(self):
+        # Raises AttributeError when the wrapped model has no structured mode.
+        bind = self._cache._llm.with_structured_output
+
+        def _with_structured_output(schema: type, **kwargs: Any) -> "StructuredAgentLLM":
+            return StructuredAgentLLM(self, bind(schema, **kwargs), schema, cacheable=not kwargs)
+
+        return _with_structured_output
+
+    def forget(self, prompt: Any = None) -> None:
+        """
+        Drops responses this view stored, e.g. because the agent could not
+        use them; the next attempt then goes to the model again. Given a
+        prompt, only that prompt's responses go, so calls sharing the view
+        (e.g. concurrent shards) keep theirs.
+        """
+        with self._lock:
+            if prompt is None:
+                keys, self._stored = self._stored, []
+            else:
+                prompt_keys = {self._cache._key(prompt, variant) for variant in self._variants}
+                keys = [key for key in self._stored if key in prompt_keys]
+                self._stored = [key for key in self._stored if key not in prompt_keys]
+        if keys:
+            self._cache._forget(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses}
+
+
+class StructuredAgentLLM:
+    """
+    Schema-constrained counterpart of AgentLLM. Responses are cached as the
+    validated model's JSON under a schema-specific key and re-validated on
+    a hit; hits and misses count towards the owning AgentLLM.
+    """
+
+    def __init__(self, view: AgentLLM, runnable, schema: type, *, cacheable: bool) -> None:
+        self._view = view
+        self._runnable = runnable
+        self._schema = schema
+        self._variant = structured_output_variant(schema) if cacheable else None
+
+    def _lookup(self, prompt: Any, kwargs: Dict[str, Any]) -> tuple:
+        if self._variant is None:
+            return None, None
+        return self._view._lookup(prompt, kwargs, self._variant)
+
+    def _hit(self, content: str) -> BaseModel:
+        with self._view._lock:
+            self._view.hits += 1
+        return self._schema.model_validate_json(content)
+
+    @staticmethod
+    def _content(result: Any) -> Optional[str]:
+        return result.model_dump_json() if isinstance(result, BaseModel) else None
+
+    def invoke(self, prompt: Any, **kwargs: Any) -> Any:
+        key, content = self._lookup(prompt, kwargs)
+        if content is not None:
+            return self._hit(content)
+        result = self._runnable.invoke(prompt, **kwargs)
+        self._view._record(key, self._content(result))
+        return result
+
+    async def ainvoke(self, prompt: Any, **kwargs: Any) -> Any:
+        key, content = await asyncio.to_thread(self._lookup, prompt, kwargs)
+        if content is not None:
+            return self._hit(content)
+        result = await self._runnable.ainvoke(prompt, **kwargs)
+        await asyncio.to_thread(self._view._record, key, self._content(result))
+        return result
+
+
+# -------------------------------------------------
+# Helpers for callers holding a possibly-uncached LLM
+# -------------------------------------------------
+
+def agent_llm(llm, agent_id: str):
+    """
+    Returns a per-agent cache view when llm is a CachedLLM, else llm itself.
+    """
+    for_agent = getattr(llm, "for_agent", None)
+    return for_agent(agent_id) if for_agent is not None else llm
+
+
+def forget_responses(llm, prompt: Any = None) -> None:
+    if isinstance(llm, AgentLLM):
+        llm.forget(prompt)
+
+
+def cache_stats(llm) -> Optional[Dict[str, Any]]:
+    return llm.stats() if isinstance(llm, AgentLLM) else None
@@ -5,10 +5,15 @@ import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from core.llm_cache import CachedLLM
+from config.cache import LLM_CACHE_ENABLED
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+TEXT_MODEL_NAME = "gemini-2.5-flash"
+
 
 def _get_api_key() -> str:
     api_key = os.getenv("GEMINI_API_KEY")
@@ -23,8 +28,13 @@ def load_text_llm():
     LLM used for planner, analyzers, generator, solver, evaluator.
     """
     logger.info("Loading text LLM")
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
+    llm = ChatGoogleGenerativeAI(
+        model=TEXT_MODEL_NAME,
         temperature=0,
         google_api_key=_get_api_key(),
     )
+    if LLM_CACHE_ENABLED:
+        logger.info("Text LLM responses are memoized")
+        return CachedLLM.from_config(llm, TEXT_MODEL_NAME)
+    return llm
+
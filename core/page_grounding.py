@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Grounding for requests with several pages (photos or documents).
+
+Every page is grounded on its own, up to MAX_PARALLEL_GROUNDING at a time,
+and the per-page contexts are merged into the single GroundedContext the
+planner reads. A one-page request grounds and reports exactly as before.
+"""
+
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, TypeVar
+
+from core.state import GroundedContext
+
+T = TypeVar("T")
+
+# Keys that define the scope of the run take the majority value across
+# pages; any other metadata keeps every distinct value.
+_MAJORITY_KEYS = ("subject", "chapter")
+
+
+def page_label(label: str, position: int, pages: int) -> str:
+    return label if pages == 1 else f"{label}:page{position + 1}"
+
+
+def _majority(values: List[str]) -> str:
+    counts = Counter(values)
+    best = max(counts.values())
+    return next(value for value in values if counts[value] == best)
+
+
+def merge_grounded_contexts(contexts: List[GroundedContext]) -> GroundedContext:
+    """
+    One context for all pages: subject/chapter by majority (earliest page
+    wins ties), other metadata as the distinct values joined with "; ",
+    and each page's analysis prefixed with its page number.
+    """
+    if len(contexts) == 1:
+        return contexts[0]
+    values: Dict[str, List[str]] = {}
+    for context in contexts:
+        for key, value in context.metadata.items():
+            value = str(value).strip()
+            if value:
+                values.setdefault(key, []).append(value)
+    metadata = {
+        key: _majority(found) if key in _MAJORITY_KEYS else "; ".join(dict.fromkeys(found))
+        for key, found in values.items()
+    }
+    analyses = [
+        f"Page {position}: {context.image_analysis.strip()}"
+        for position, context in enumerate(contexts, start=1)
+        if context.image_analysis.strip()
+    ]
+    return GroundedContext(metadata=metadata, image_analysis="\n\n".join(analyses))
+
+
+def summarize_page_meta(label: str, metas: List[Dict[str, Any]], duration_ms: int) -> Dict[str, Any]:
+    """
+    Node-level meta for a multi-page grounding; it counts as a fallback
+    only when every page fell back.
+    """
+    if len(metas) == 1:
+        return metas[0]
+    failed = [position + 1 for position, meta in enumerate(metas) if meta.get("fallback_used")]
+    return {
+        "label": label,
+        "attempts": max(meta.get("attempts", 1) for meta in metas),
+        "retries": sum(meta.get("retries", 0) for meta in metas),
+        "fallback_used": len(failed) == len(metas),
+        "timeout": any(meta.get("timeout") for meta in metas),
+        "error": next((meta["error"] for meta in metas if meta.get("error")), None),
+        "duration_ms": duration_ms,
+        "pages": len(metas),
+        "failed_pages": failed,
+    }
+
+
+def ground_pages(refs: List[str], fn: Callable[[int, str], T], *, max_parallel: int) -> List[T]:
+    """
+    Runs fn(position, ref) for every page with at most max_parallel at a
+    time; results come back in page order.
+    """
+    workers = min(max(1, max_parallel), len(refs))
+    if workers <= 1:
+        return [fn(position, ref) for position, ref in enumerate(refs)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page") as pool:
+        return list(pool.map(fn, range(len(refs)), refs))
+
+
+async def aground_pages(
+    refs: List[str],
+    fn: Callable[[int, str], Awaitable[T]],
+    *,
+    max_parallel: int,
+) -> List[T]:
+    """
+    Async counterpart of ground_pages.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def _run(position: int, ref: str) -> T:
+        async with semaphore:
+            return await fn(position, ref)
+
+    return list(await asyncio.gather(*(_run(position, ref) for position, ref in enumerate(refs))))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Caches validated planner output so repeat requests can skip the planner LLM.
+
+Plans are keyed on the normalized user profile plus the grounded subject,
+chapter and sub-topic. Misses fall back to configurable templates.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.cache import LRUCache
+from core.snapshots import iter_stage_snapshots
+from core.planner_repair import validate_plan_schema
+from core.state import PlannerOutput, UserProfile, GroundedContext
+from config.cache import (
+    PLAN_CACHE_MAX_ENTRIES,
+    PLAN_CACHE_TTL_SEC,
+    PLAN_CACHE_SEED_SNAPSHOTS,
+    PLAN_TEMPLATES,
+)
+
+logger = logging.getLogger(__name__)
+
+_KEY_FIELDS = ("class", "board", "target_exam", "subject", "chapter", "sub_topic")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: Any) -> str:
+    return _WHITESPACE.sub(" ", str(value or "")).strip().lower()
+
+
+def plan_cache_key(
+    user_profile: UserProfile,
+    grounded_context: GroundedContext,
+) -> Tuple[str, ...]:
+    meta = grounded_context.metadata
+    return (
+        _normalize(user_profile.class_level),
+        _normalize(user_profile.board),
+        _normalize(user_profile.target_exam),
+        _normalize(meta.get("subject", "")),
+        _normalize(meta.get("chapter", "")),
+        _normalize(meta.get("sub_topic", "")),
+    )
+
+
+def _planning_context(
+    user_profile: UserProfile,
+    grounded_context: GroundedContext,
+) -> Dict[str, str]:
+    meta = grounded_context.metadata
+    return {
+        "class": user_profile.class_level,
+        "board": user_profile.board,
+        "target_exam": user_profile.target_exam,
+        "subject": meta.get("subject", ""),
+        "chapter": meta.get("chapter", ""),
+        "sub_topic": meta.get("sub_topic", ""),
+    }
+
+
+class PlanCache:
+    def __init__(
+        self,
+        max_entries: int = PLAN_CACHE_MAX_ENTRIES,
+        ttl_sec: Optional[float] = PLAN_CACHE_TTL_SEC,
+        templates: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._plans = LRUCache(max_entries=max_entries, ttl_sec=ttl_sec)
+        self._templates = list(templates or [])
+        self.template_hits = 0
+
+    @classmethod
+    def from_config(cls) -> "PlanCache":
+        cache = cls(templates=PLAN_TEMPLATES)
+        if PLAN_CACHE_SEED_SNAPSHOTS:
+            cache.seed_from_snapshots(PLAN_CACHE_SEED_SNAPSHOTS)
+        return cache
+
+    # -------------------------------------------------
+    # Lookup / store
+    # -------------------------------------------------
+
+    def lookup(
+        self,
+        user_profile: UserProfile,
+        grounded_context: GroundedContext,
+    ) -> Tuple[Optional[PlannerOutput], Optional[str]]:
+        """
+        Returns (plan, source) where source is "cache", "template" or None.
+        The returned plan is a fresh copy with this request's planning context.
+        """
+        key = plan_cache_key(user_profile, grounded_context)
+        cached = self._plans.get(key)
+        if cached is not None:
+            return self._instantiate(cached, user_profile, grounded_context), "cache"
+
+        template = self._match_template(key)
+        if template is not None:
+            self.template_hits += 1
+            return self._instantiate(template, user_profile, grounded_context), "template"
+        return None, None
+
+    def store(
+        self,
+        user_profile: UserProfile,
+        grounded_context: GroundedContext,
+        plan: PlannerOutput,
+    ) -> None:
+        self._plans.set(
+            plan_cache_key(user_profile, grounded_context),
+            {
+                "subtasks": [dict(task) for task in plan.subtasks],
+                "execution_order": list(plan.execution_order),
+                "objective": plan.objective,
+            },
+        )
+
+    def stats(self) -> Dict[str, int]:
+        stats = self._plans.stats()
+        stats["template_hits"] = self.template_hits
+        return stats
+
+    # -------------------------------------------------
+    # Seeding
+    # -------------------------------------------------
+
+    def seed_from_snapshots(self, path: str) -> int:
+        """
+        Loads planner-stage snapshots (from a snapshot log or store) that the
+        live path would have stored: the plan came from the LLM, not the cache
+        or a template, and validated without repair or fallback. Returns
+        plans loaded.
+        """
+        loaded = 0
+        for record in iter_stage_snapshots(path, "planner", limit=self._max_entries):
+            if self._seed_record(record.get("state") or {}):
+                loaded += 1
+        logger.info("Seeded plan cache with %d plans from %s", loaded, path)
+        return loaded
+
+    def _seed_record(self, state: Dict[str, Any]) -> bool:
+        diagnostics = state.get("run_diagnostics") or {}
+        if diagnostics.get("plan_status") != "valid":
+            return False
+        if "planner" in diagnostics.get("fallbacks", []):
+            return False
+        if (diagnostics.get("plan_cache") or {}).get("hit"):
+            return False
+        try:
+            plan = PlannerOutput(**(state.get("plan") or {}))
+            validate_plan_schema(plan)
+            user_profile = UserProfile(**state["user_profile"])
+            grounded_context = GroundedContext(**state["grounded_context"])
+        except Exception:
+            return False
+        if not plan.subtasks:
+            return False
+        self.store(user_profile, grounded_context, plan)
+        return True
+
+    # -------------------------------------------------
+    # Helpers
+    # -------------------------------------------------
+
+    def _match_template(self, key: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        values = dict(zip(_KEY_FIELDS, key))
+        for template in self._templates:
+            match = template.get("match") or {}
+            if all(
+                pattern == "*" or _normalize(pattern) == values.get(field, "")
+                for field, pattern in match.items()
+            ):
+                return template
+        return None
+
+    @staticmethod
+    def _instantiate(
+        entry: Dict[str, Any],
+        user_profile: UserProfile,
+        grounded_context: GroundedContext,
+    ) -> PlannerOutput:
+        return PlannerOutput(
+            planning_context=_planning_context(user_profile, grounded_context),
+            objective=entry.get("objective") or "generate_exam_aligned_questions",
+            subtasks=[dict(task) for task in entry.get("subtasks", [])],
+            execution_order=list(entry.get("execution_order", [])),
+        )
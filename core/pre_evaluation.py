@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Rule-based checks run on question_bank / solver_output before the
+evaluator task.
+
+Catches the structural findings that do not need a model: MCQ keys that
+are not among the options, duplicate options, empty solutions, section
+counts that differ from the design, and solver answers that disagree with
+the answer key. The report records exactly which checks ran; the
+executor uses it to skip the LLM evaluator for a clean, verified bank or
+when the deadline leaves no time for it.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.sharding import QUESTION_SECTIONS, count_questions
+from tools.math_solver import check_answer, resolve_option
+from config.verification import PRE_EVALUATION_CHECKS, PRE_EVALUATION_SKIP_CONFIDENCE
+
+logger = logging.getLogger(__name__)
+
+_SECTION_NAMES = (
+    ("mcq", r"mcqs?|multiple[- ]choice(?: questions?)?"),
+    ("short_answer", r"short[- ]answers?(?: questions?)?|saqs?"),
+    ("long_answer", r"long[- ]answers?(?: questions?)?|laqs?"),
+)
+
+
+def _text(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value)).strip().casefold()
+
+
+def _question_text(question: Any) -> str:
+    return question.get("question", "") if isinstance(question, dict) else str(question)
+
+
+def _items(payload: Any, section: str) -> List[Any]:
+    items = payload.get(section) if isinstance(payload, dict) else None
+    return items if isinstance(items, list) else []
+
+
+def design_counts(design: Any) -> Dict[str, int]:
+    """
+    Question counts per section stated in the question designer's output
+    ("5 MCQs", "Short answer: 3"). A section mentioned with two different
+    counts is left out as ambiguous.
+    """
+    if isinstance(design, dict):
+        design = " ".join(str(value) for value in design.values())
+    if not isinstance(design, str):
+        return {}
+    counts: Dict[str, int] = {}
+    for section, names in _SECTION_NAMES:
+        found = {
+            int(number)
+            for pattern in (
+                rf"\b(\d+)\s+(?:[a-z]+\s+)?(?:{names})\b",
+                rf"\b(?:{names})\s*(?:\([^)]*\)\s*)?[:=\-–]\s*(\d+)\b",
+            )
+            for number in re.findall(pattern, design, re.IGNORECASE)
+        }
+        if len(found) == 1:
+            counts[section] = found.pop()
+    return counts
+
+
+def _issue(check: str, section: str, index: Optional[int], detail: str) -> Dict[str, Any]:
+    return {"check": check, "section": section, "index": index, "detail": detail}
+
+
+def _check_mcq_answers(question_bank: Dict[str, Any], _solver_output: Dict[str, Any], _design: Any):
+    mcqs = _items(question_bank, "mcq")
+    if not mcqs:
+        return None, "no MCQs"
+    issues = []
+    for index, question in enumerate(mcqs):
+        if not isinstance(question, dict):
+            continue
+        options = question.get("options") or []
+        if not isinstance(options, list) or not options:
+            issues.append(_issue("mcq_answer_in_options", "mcq", index, "MCQ has no options"))
+            continue
+        key = resolve_option(question.get("answer"), options)
+        if _text(key) not in {_text(option) for option in options}:
+            issues.append(_issue(
+                "mcq_answer_in_options", "mcq", index,
+                f"answer {question.get('answer')!r} is not one of the options",
+            ))
+    return len(mcqs), issues
+
+
+def _check_duplicate_options(question_bank: Dict[str, Any], _solver_output: Dict[str, Any], _design: Any):
+    mcqs = _items(question_bank, "mcq")
+    if not mcqs:
+        return None, "no MCQs"
+    issues = []
+    for index, question in enumerate(mcqs):
+        options = question.get("options") if isinstance(question, dict) else None
+        if not isinstance(options, list):
+            continue
+        seen = set()
+        duplicates = []
+        for option in options:
+            normalized = _text(option)
+            if normalized in seen and option not in duplicates:
+                duplicates.append(option)
+            seen.add(normalized)
+        if duplicates:
+            issues.append(_issue(
+                "duplicate_options", "mcq", index,
+                f"duplicate options: {', '.join(map(str, duplicates))}",
+            ))
+    return len(mcqs), issues
+
+
+def _empty_solution(solution: Any) -> bool:
+    if not isinstance(solution, dict):
+        return not str(solution or "").strip()
+    answer = solution.get("final_answer", solution.get("solution", ""))
+    return not str(answer if answer is not None else "").strip() and not solution.get("steps")
+
+
+def _check_empty_solutions(question_bank: Dict[str, Any], solver_output: Dict[str, Any], _design: Any):
+    if not count_questions(solver_output) and not count_questions(question_bank):
+        return None, "no questions"
+    issues = []
+    checked = 0
+    for section in QUESTION_SECTIONS:
+        questions = _items(question_bank, section)
+        solutions = _items(solver_output, section)
+        for index in range(max(len(questions), len(solutions))):
+            checked += 1
+            if index >= len(solutions):
+                issues.append(_issue("empty_solutions", section, index, "no solution"))
+            elif _empty_solution(solutions[index]):
+                issues.append(_issue("empty_solutions", section, index, "empty solution"))
+    return checked, issues
+
+
+def _check_section_counts(question_bank: Dict[str, Any], _solver_output: Dict[str, Any], design: Any):
+    expected = design_counts(design)
+    if not expected:
+        return None, "design states no section counts"
+    issues = [
+        _issue(
+            "section_counts", section, None,
+            f"design asked for {count}, got {len(_items(question_bank, section))}",
+        )
+        for section, count in expected.items()
+        if len(_items(question_bank, section)) != count
+    ]
+    return len(expected), issues
+
+
+def _agreement(question: Any, solution: Any) -> Optional[Dict[str, Any]]:
+    """
+    {"status": ...} comparing a solution with its answer key, or None when
+    the answers cannot be compared without a model.
+    """
+    if not isinstance(question, dict) or not isinstance(solution, dict):
+        return None
+    try:
+        result = solution.get("answer_check") or check_answer(question, solution)
+    except Exception:
+        # A rule-based check must never fail the run; count it as not comparable.
+        logger.warning("Answer check failed; leaving the answer unverified", exc_info=True)
+        return None
+    if result is not None:
+        return result
+    options = question.get("options") or []
+    if not isinstance(options, list) or not options:
+        return None
+    key = _text(resolve_option(question.get("answer"), options))
+    actual = _text(resolve_option(solution.get("final_answer"), options))
+    option_texts = {_text(option) for option in options}
+    if actual == key:
+        return {"status": "match"}
+    if actual in option_texts:
+        return {"status": "mismatch", "expected": key, "actual": actual}
+    return None
+
+
+def _check_answer_agreement(question_bank: Dict[str, Any], solver_output: Dict[str, Any], _design: Any):
+    if not count_questions(solver_output):
+        return None, "no solver output"
+    issues = []
+    compared = 0
+    for section in QUESTION_SECTIONS:
+        for index, (question, solution) in enumerate(zip(_items(question_bank, section), _items(solver_output, section))):
+            result = _agreement(question, solution)
+            if result is None:
+                continue
+            compared += 1
+            if result["status"] != "match":
+                issues.append(_issue(
+                    "answer_key_agreement", section, index,
+                    f"{result['status']}: key {result.get('expected')!r}, solver {result.get('actual')!r}",
+                ))
+    return compared, issues
+
+
+CHECKS = {
+    "mcq_answer_in_options": _check_mcq_answers,
+    "duplicate_options": _check_duplicate_options,
+    "empty_solutions": _check_empty_solutions,
+    "section_counts": _check_section_counts,
+    "answer_key_agreement": _check_answer_agreement,
+}
+
+
+def _verified(question_bank: Dict[str, Any], solver_output: Dict[str, Any]) -> Dict[Tuple[str, int], bool]:
+    verdicts = {}
+    for section in QUESTION_SECTIONS:
+        for index, (question, solution) in enumerate(zip(_items(question_bank, section), _items(solver_output, section))):
+            result = _agreement(question, solution)
+            if result is not None:
+                verdicts[(section, index)] = result["status"] == "match"
+    return verdicts
+
+
+def pre_evaluate(
+    question_bank: Dict[str, Any],
+    solver_output: Dict[str, Any],
+    design: Any = None,
+    checks: Tuple[str, ...] = PRE_EVALUATION_CHECKS,
+) -> Dict[str, Any]:
+    """
+    Runs the configured checks. Returns the report:
+    {"checks": {name: {"ran": True, "checked", "issues"} | {"ran": False, "reason"}},
+     "ran", "failed", "issues", "questions", "verified", "confidence", "clean",
+     "duration_us"}. A check that raises is reported under "failed".
+    """
+    start = time.perf_counter()
+    question_bank = question_bank if isinstance(question_bank, dict) else {}
+    solver_output = solver_output if isinstance(solver_output, dict) else {}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    issues: List[Dict[str, Any]] = []
+    failed: List[str] = []
+    for name in CHECKS:
+        if name not in checks:
+            results[name] = {"ran": False, "reason": "disabled"}
+            continue
+        try:
+            checked, found = CHECKS[name](question_bank, solver_output, design)
+        except Exception as exc:
+            logger.warning("Pre-evaluation check %s failed", name, exc_info=True)
+            results[name] = {"ran": False, "reason": f"error: {exc}"}
+            failed.append(name)
+            continue
+        if checked is None:
+            results[name] = {"ran": False, "reason": found}
+            continue
+        results[name] = {"ran": True, "checked": checked, "issues": len(found)}
+        issues.extend(found)
+
+    verdicts = _verified(question_bank, solver_output) if "answer_key_agreement" in checks else {}
+    questions = count_questions(question_bank)
+    verified = sum(verdicts.values())
+    return {
+        "checks": results,
+        "ran": [name for name, result in results.items() if result["ran"]],
+        "failed": failed,
+        "issues": issues,
+        "questions": questions,
+        "verified": verified,
+        "confidence": round(verified / questions, 3) if questions else 0.0,
+        "clean": not issues,
+        "duration_us": int((time.perf_counter() - start) * 1_000_000),
+    }
+
+
+def can_skip_evaluator(report: Dict[str, Any], min_confidence: Optional[float] = PRE_EVALUATION_SKIP_CONFIDENCE) -> bool:
+    return (
+        min_confidence is not None
+        and not report.get("failed")
+        and report["clean"]
+        and report["questions"] > 0
+        and report["confidence"] >= min_confidence
+    )
+
+
+def rule_based_evaluation(
+    question_bank: Dict[str, Any],
+    solver_output: Dict[str, Any],
+    report: Dict[str, Any],
+    status: str,
+    overall_feedback: str,
+) -> Dict[str, Any]:
+    """
+    Evaluation in the evaluator's shape built from the check results only:
+    verified answers are correct, disagreeing or empty ones incorrect, and
+    the rest left unjudged (is_correct None).
+    """
+    question_bank = question_bank if isinstance(question_bank, dict) else {}
+    solver_output = solver_output if isinstance(solver_output, dict) else {}
+    verdicts = _verified(question_bank, solver_output)
+    findings: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+    for issue in report["issues"]:
+        if issue["index"] is not None:
+            findings.setdefault((issue["section"], issue["index"]), []).append(issue)
+
+    evaluation: Dict[str, Any] = {"status": status, "overall_feedback": overall_feedback}
+    for section in QUESTION_SECTIONS:
+        results = []
+        for index, question in enumerate(_items(question_bank, section)):
+            found = findings.get((section, index), [])
+            if any(issue["check"] in ("empty_solutions", "answer_key_agreement") for issue in found):
+                is_correct = False
+            else:
+                is_correct = verdicts.get((section, index))
+            feedback = "; ".join(issue["detail"] for issue in found)
+            if not feedback and is_correct:
+                feedback = "Answer matches the answer key."
+            results.append({
+                "question": _question_text(question),
+                "is_correct": is_correct,
+                "score": None if is_correct is None else float(is_correct),
+                "feedback": feedback,
+                "improvements": [],
+            })
+        evaluation[section] = results
+    evaluation["pre_evaluation"] = {
+        key: report[key] for key in ("ran", "questions", "verified", "confidence", "clean")
+    }
+    evaluation["pre_evaluation"]["issues"] = len(report["issues"])
+    return evaluation
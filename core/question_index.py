@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Persistent near-duplicate index of generated question stems.
+
+Stems are normalized, split into character 5-grams and sketched with
+one-permutation MinHash (one hash per shingle, binned, empty bins filled
+by rotation), so a signature costs about a tenth of a millisecond. LSH
+banding over the signature finds candidates with a few dict lookups; a
+candidate is a duplicate when its estimated Jaccard similarity reaches
+the threshold.
+
+Rows live in one SQLite table keyed by scope (board | exam | chapter).
+Only the most recently used scopes are held in memory, each capped at
+max_per_scope entries; compaction drops the oldest rows and expired ones.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.state import TutoringState
+from core.sharding import QUESTION_SECTIONS
+from config.cache import (
+    QUESTION_INDEX_PATH,
+    QUESTION_INDEX_ACTION,
+    QUESTION_INDEX_THRESHOLD,
+    QUESTION_INDEX_NUM_PERM,
+    QUESTION_INDEX_BANDS,
+    QUESTION_INDEX_MAX_PER_SCOPE,
+    QUESTION_INDEX_MEMORY_SCOPES,
+    QUESTION_INDEX_TTL_SEC,
+    QUESTION_INDEX_REFRESH_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+_VALUE_BITS = 24
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_stem(text: Any) -> str:
+    return _NON_WORD.sub(" ", str(text).lower()).strip()
+
+
+def question_stem(question: Any) -> str:
+    if isinstance(question, dict):
+        return str(question.get("question") or "")
+    return str(question or "")
+
+
+def minhash(text: str, num_perm: int = QUESTION_INDEX_NUM_PERM) -> Optional[array]:
+    """
+    One-permutation MinHash signature of the normalized text's character
+    shingles; None when there is nothing to sketch.
+    """
+    normalized = normalize_stem(text)
+    if not normalized:
+        return None
+    empty = 1 << _VALUE_BITS
+    bins = [empty] * num_perm
+    encoded = normalized.encode("utf-8")
+    for start in range(max(1, len(encoded) - SHINGLE_SIZE + 1)):
+        digest = hashlib.blake2b(encoded[start:start + SHINGLE_SIZE], digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        slot = value % num_perm
+        value >>= 64 - _VALUE_BITS
+        if value < bins[slot]:
+            bins[slot] = value
+    # Rotation densification: an empty bin borrows the next filled bin's
+    # value, offset by the distance so borrowed values stay distinct.
+    if empty in bins:
+        source = list(bins)
+        for slot in range(num_perm):
+            distance = 0
+            while source[(slot + distance) % num_perm] == empty:
+                distance += 1
+            bins[slot] = source[(slot + distance) % num_perm] + distance * empty
+    return array("I", bins)
+
+
+def similarity(signature: array, other: array) -> float:
+    return sum(a == b for a, b in zip(signature, other)) / len(signature)
+
+
+def question_scope(state: TutoringState) -> str:
+    context = state.plan.planning_context
+    board = context.get("board") or state.user_profile.board
+    exam = context.get("target_exam") or state.user_profile.target_exam
+    chapter = context.get("chapter") or context.get("subject") or ""
+    return "|".join(part.strip().lower() for part in (board, exam, chapter))
+
+
+class _ScopeView:
+    """
+    In-memory LSH tables for one scope: per band, band key -> row ids.
+    """
+
+    def __init__(self, bands: int, rows: int) -> None:
+        self.bands = [dict() for _ in range(bands)]
+        self.rows = rows
+        self.signatures: Dict[int, array] = {}
+        self.last_id = 0
+        self.loaded_at = time.time()
+
+    def _keys(self, signature: array) -> List[bytes]:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(len(self.bands))
+        ]
+
+    def add(self, row_id: int, signature: array) -> None:
+        self.signatures[row_id] = signature
+        for table, key in zip(self.bands, self._keys(signature)):
+            table.setdefault(key, []).append(row_id)
+        self.last_id = max(self.last_id, row_id)
+
+    def best_match(self, signature: array) -> Tuple[Optional[int], float]:
+        candidates = set()
+        for table, key in zip(self.bands, self._keys(signature)):
+            candidates.update(table.get(key, ()))
+        best_id, best = None, 0.0
+        for row_id in candidates:
+            score = similarity(signature, self.signatures[row_id])
+            if score > best:
+                best_id, best = row_id, score
+        return best_id, best
+
+
+class QuestionIndex:
+    def __init__(
+        self,
+        path: str,
+        *,
+        threshold: float = QUESTION_INDEX_THRESHOLD,
+        num_perm: int = QUESTION_INDEX_NUM_PERM,
+        bands: int = QUESTION_INDEX_BANDS,
+        max_per_scope: int = QUESTION_INDEX_MAX_PER_SCOPE,
+        memory_scopes: int = QUESTION_INDEX_MEMORY_SCOPES,
+        ttl_sec: Optional[float] = QUESTION_INDEX_TTL_SEC,
+        refresh_sec: Optional[float] = QUESTION_INDEX_REFRESH_SEC,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self._path = path
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._bands = bands
+        self._max_per_scope = max(1, max_per_scope)
+        self._memory_scopes = max(1, memory_scopes)
+        self._ttl_sec = ttl_sec if ttl_sec and ttl_sec > 0 else None
+        self._refresh_sec = refresh_sec
+        self._views: "OrderedDict[str, _ScopeView]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.checked = 0
+        self.duplicates = 0
+        self.compacted = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT NOT NULL,
+                    stem TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_scope ON questions (scope, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_created ON questions (created_at)")
+
+    @classmethod
+    def from_config(cls) -> "QuestionIndex":
+        index = cls(QUESTION_INDEX_PATH)
+        index.compact()
+        return index
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=10)
+
+    def _signature(self, blob: bytes) -> array:
+        signature = array("I")
+        signature.frombytes(blob)
+        return signature
+
+    def _load(self, conn: sqlite3.Connection, scope: str, view: _ScopeView) -> None:
+        rows = conn.execute(
+            "SELECT id, signature FROM questions WHERE scope = ? AND id > ? ORDER BY id",
+            (scope, view.last_id),
+        )
+        for row_id, blob in rows:
+            view.add(row_id, self._signature(blob))
+        view.loaded_at = time.time()
+
+    def _view(self, conn: sqlite3.Connection, scope: str) -> _ScopeView:
+        view = self._views.get(scope)
+        if view is None:
+            view = _ScopeView(self._bands, self._num_perm // self._bands)
+            self._load(conn, scope, view)
+            self._views[scope] = view
+            while len(self._views) > self._memory_scopes:
+                self._views.popitem(last=False)
+        elif self._refresh_sec is not None and time.time() - view.loaded_at > self._refresh_sec:
+            # Pick up rows other workers added since the last load.
+            self._load(conn, scope, view)
+        self._views.move_to_end(scope)
+        return view
+
+    def find(self, scope: str, text: str) -> Optional[Dict[str, Any]]:
+        """
+        The closest indexed question at or above the threshold, as
+        {"id", "question", "similarity"}; None when there is none.
+        """
+        signature = minhash(text, self._num_perm)
+        if signature is None:
+            return None
+        with self._lock, closing(self._connect()) as conn:
+            return self._match(conn, self._view(conn, scope), signature)
+
+    def _match(self, conn: sqlite3.Connection, view: _ScopeView, signature: array) -> Optional[Dict[str, Any]]:
+        row_id, score = view.best_match(signature)
+        if row_id is None or score < self._threshold:
+            return None
+        row = conn.execute("SELECT stem FROM questions WHERE id = ?", (row_id,)).fetchone()
+        return {"id": row_id, "question": row[0] if row else "", "similarity": round(score, 3)}
+
+    def add(self, scope: str, texts: List[str]) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            view = self._view(conn, scope)
+            for text in texts:
+                self._insert(conn, scope, view, text, minhash(text, self._num_perm))
+            self._compact_view(conn, scope, view)
+
+    def _insert(self, conn: sqlite3.Connection, scope: str, view: _ScopeView, text: str, signature: Optional[array]) -> None:
+        if signature is None:
+            return
+        cursor = conn.execute(
+            "INSERT INTO questions (scope, stem, signature, created_at) VALUES (?, ?, ?, ?)",
+            (scope, text, sqlite3.Binary(signature.tobytes()), time.time()),
+        )
+        view.add(cursor.lastrowid, signature)
+
+    def screen(
+        self,
+        scope: str,
+        question_bank: Dict[str, Any],
+        action: str = QUESTION_INDEX_ACTION,
+    ) -> Tuple[Dict[str, Any], Dict[str, List[int]], Dict[str, Any]]:
+        """
+        Checks every question against the index (and against the questions
+        before it in the same bank), indexing the ones that are new.
+
+        Returns (bank with duplicates dropped or flagged, kept positions per
+        section, report).
+        """
+        start = time.perf_counter()
+        screened = dict(question_bank)
+        kept: Dict[str, List[int]] = {}
+        duplicates: List[Dict[str, Any]] = []
+        checked = 0
+        with self._lock, closing(self._connect()) as conn, conn:
+            view = self._view(conn, scope)
+            for section in QUESTION_SECTIONS:
+                questions = question_bank.get(section)
+                if not isinstance(questions, list):
+                    continue
+                results, positions = [], []
+                for index, question in enumerate(questions):
+                    stem = question_stem(question)
+                    signature = minhash(stem, self._num_perm)
+                    checked += 1
+                    match = self._match(conn, view, signature) if signature is not None else None
+                    if match is None:
+                        self._insert(conn, scope, view, stem, signature)
+                    else:
+                        duplicates.append({"section": section, "index": index, **match})
+                        if action == "drop":
+                            continue
+                        if isinstance(question, dict):
+                            question = {
+                                **question,
+                                "duplicate_of": {"question": match["question"], "similarity": match["similarity"]},
+                            }
+                    results.append(question)
+                    positions.append(index)
+                screened[section] = results
+                kept[section] = positions
+            self._compact_view(conn, scope, view)
+        self.checked += checked
+        self.duplicates += len(duplicates)
+        duration_us = int((time.perf_counter() - start) * 1_000_000)
+        report = {
+            "scope": scope,
+            "action": action,
+            "checked": checked,
+            "duplicates": duplicates,
+            "duration_us": duration_us,
+            "per_question_us": duration_us // checked if checked else 0,
+        }
+        return screened, kept, report
+
+    def recent(self, scope: str, limit: int) -> List[str]:
+        if limit <= 0:
+            return []
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT stem FROM questions WHERE scope = ? ORDER BY id DESC LIMIT ?",
+                (scope, limit),
+            ).fetchall()
+        return [stem for (stem,) in rows]
+
+    def _compact_view(self, conn: sqlite3.Connection, scope: str, view: _ScopeView) -> None:
+        # Compact with some headroom so a full scope is not rebuilt on every insert.
+        if len(view.signatures) <= self._max_per_scope * 1.1:
+            return
+        self._compact_scope(conn, scope)
+        fresh = _ScopeView(self._bands, self._num_perm // self._bands)
+        self._load(conn, scope, fresh)
+        self._views[scope] = fresh
+
+    def _compact_scope(self, conn: sqlite3.Connection, scope: str) -> None:
+        cursor = conn.execute(
+            "DELETE FROM questions WHERE scope = ? AND id NOT IN "
+            "(SELECT id FROM questions WHERE scope = ? ORDER BY id DESC LIMIT ?)",
+            (scope, scope, self._max_per_scope),
+        )
+        self.compacted += max(0, cursor.rowcount)
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Drops expired rows and trims every scope to max_per_scope; in-memory
+        views are rebuilt on next use.
+        """
+        before = self.compacted
+        with self._lock, closing(self._connect()) as conn, conn:
+            if self._ttl_sec is not None:
+                cursor = conn.execute(
+                    "DELETE FROM questions WHERE created_at < ?",
+                    (time.time() - self._ttl_sec,),
+                )
+                self.compacted += max(0, cursor.rowcount)
+            oversized = conn.execute(
+                "SELECT scope FROM questions GROUP BY scope HAVING COUNT(*) > ?",
+                (self._max_per_scope,),
+            ).fetchall()
+            for (scope,) in oversized:
+                self._compact_scope(conn, scope)
+            self._views.clear()
+        return {"removed": self.compacted - before}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_memory = sum(len(view.signatures) for view in self._views.values())
+            return {
+                "checked": self.checked,
+                "duplicates": self.duplicates,
+                "compacted": self.compacted,
+                "scopes_in_memory": len(self._views),
+                "entries_in_memory": in_memory,
+            }
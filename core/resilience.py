@@ -1,16 +1,160 @@
 #!/usr/bin/env python3
 """
 Shared retry/fallback helpers for pipeline nodes and agents.
+
+Timeouts return control to the caller on time: sync calls run on a shared,
+bounded worker pool and a timed-out call is abandoned (never joined), async
+calls are cancelled. Work a sync call started in the background can be
+stopped with it via on_abandon(). Calls fanned out by run_all_with_retry get
+a pool of their own, as the caller waiting on them may itself hold a shared
+worker. An optional absolute deadline (epoch seconds) caps the whole retry
+loop; every attempt only gets the budget that is left.
 """
 
+import asyncio
 import logging
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
-from typing import Callable, Any, Optional, Dict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError, wait
+from typing import Callable, Any, Awaitable, Optional, Dict, List, Tuple
+
+from config.resilience import RESILIENCE_MAX_WORKERS, RESILIENCE_FANOUT_MAX_WORKERS
 
 logger = logging.getLogger(__name__)
 
 
+class DeadlineExceeded(TimeoutError):
+    """Raised when the request deadline leaves no time for another attempt."""
+
+
+# Worker count per pool: "resilience" runs timed attempts (node and agent
+# bodies), "fanout" only runs the leaf calls of run_all_with_retry.
+_POOL_SIZES = {
+    "resilience": RESILIENCE_MAX_WORKERS,
+    "fanout": RESILIENCE_FANOUT_MAX_WORKERS,
+}
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+_abandoned = 0
+# The timed attempt running on this thread: {"abandoned": bool, "callbacks": [...]}.
+_current = threading.local()
+
+
+def _get_executor(pool: str = "resilience") -> ThreadPoolExecutor:
+    executor = _executors.get(pool)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                executor = _executors[pool] = ThreadPoolExecutor(
+                    max_workers=_POOL_SIZES[pool],
+                    thread_name_prefix=pool,
+                )
+    return executor
+
+
+def _abandon(future, attempt: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Gives up on a timed-out call without waiting for it. Queued calls are
+    cancelled outright; running ones finish in the background, and the
+    callbacks they registered with on_abandon() run now.
+    """
+    global _abandoned
+    if future.cancel():
+        return
+    with _executor_lock:
+        _abandoned += 1
+        callbacks = []
+        if attempt is not None:
+            attempt["abandoned"] = True
+            callbacks, attempt["callbacks"] = attempt["callbacks"], []
+    logger.warning(
+        "Abandoned a timed-out call still running in the background (%d so far)",
+        _abandoned,
+    )
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Callback of an abandoned call failed")
+
+
+def _run_attempt(fn: Callable[[], Any], attempt: Dict[str, Any]) -> Any:
+    _current.attempt = attempt
+    try:
+        return fn()
+    finally:
+        _current.attempt = None
+
+
+def on_abandon(callback: Callable[[], None]) -> None:
+    """
+    Runs callback if the timed run_with_retry attempt calling this is
+    abandoned (right away if it already was), so background work the
+    attempt started can be stopped. Does nothing outside a timed attempt.
+    """
+    attempt = getattr(_current, "attempt", None)
+    if attempt is None:
+        return
+    with _executor_lock:
+        if not attempt["abandoned"]:
+            attempt["callbacks"].append(callback)
+            return
+    callback()
+
+
+def remaining_time(deadline: Optional[float]) -> Optional[float]:
+    """
+    Seconds left until deadline (epoch seconds), or None when unbounded.
+    """
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def _attempt_timeout(
+    timeout_sec: Optional[float],
+    deadline: Optional[float],
+) -> Optional[float]:
+    timeout = timeout_sec if timeout_sec and timeout_sec > 0 else None
+    remaining = remaining_time(deadline)
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _retry_delay(delay_sec: float, deadline: Optional[float]) -> float:
+    remaining = remaining_time(deadline)
+    if remaining is None:
+        return delay_sec
+    return max(0.0, min(delay_sec, remaining))
+
+
+def _meta(
+    label: str,
+    attempts: int,
+    max_attempts: int,
+    start: float,
+    *,
+    fallback_used: bool = False,
+    timed_out: bool = False,
+    deadline_exceeded: bool = False,
+    error: Optional[Exception] = None,
+) -> Dict[str, Any]:
+    return {
+        "label": label,
+        "attempts": attempts,
+        "retries": max_attempts - 1,
+        "fallback_used": fallback_used,
+        "timeout": timed_out,
+        "deadline_exceeded": deadline_exceeded,
+        "error": str(error) if error is not None else None,
+        "duration_ms": int((time.time() - start) * 1000),
+    }
+
+
 def run_with_retry(
     label: str,
     fn: Callable[[], Any],
@@ -19,32 +163,35 @@ def run_with_retry(
     delay_sec: float = 0.0,
     timeout_sec: Optional[float] = None,
     fallback: Optional[Callable[[Exception], Any]] = None,
+    deadline: Optional[float] = None,
 ) -> tuple[Any, Dict[str, Any]]:
     attempt = 0
     last_exc: Optional[Exception] = None
     max_attempts = max(0, retries) + 1
     start = time.time()
-    used_fallback = False
     timed_out = False
+    deadline_exceeded = False
 
     while attempt < max_attempts:
         try:
-            if timeout_sec and timeout_sec > 0:
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(fn)
-                    result = future.result(timeout=timeout_sec)
+            timeout = _attempt_timeout(timeout_sec, deadline)
+            if timeout is not None:
+                attempt_state = {"abandoned": False, "callbacks": []}
+                future = _get_executor().submit(_run_attempt, fn, attempt_state)
+                try:
+                    result = future.result(timeout=timeout)
+                except TimeoutError:
+                    _abandon(future, attempt_state)
+                    raise
             else:
                 result = fn()
-            duration_ms = int((time.time() - start) * 1000)
-            return result, {
-                "label": label,
-                "attempts": attempt + 1,
-                "retries": max_attempts - 1,
-                "fallback_used": False,
-                "timeout": False,
-                "error": None,
-                "duration_ms": duration_ms,
-            }
+            return result, _meta(label, attempt + 1, max_attempts, start)
+        except DeadlineExceeded as exc:
+            deadline_exceeded = True
+            timed_out = True
+            last_exc = exc
+            logger.warning("%s skipped: request deadline exceeded", label)
+            break
         except TimeoutError as exc:
             timed_out = True
             last_exc = exc
@@ -55,7 +202,190 @@ def run_with_retry(
                 max_attempts,
             )
             if attempt + 1 < max_attempts and delay_sec > 0:
-                time.sleep(delay_sec)
+                time.sleep(_retry_delay(delay_sec, deadline))
+            attempt += 1
+        except Exception as exc:
+            last_exc = exc
+            logger.exception(
+                "%s failed on attempt %d/%d",
+                label,
+                attempt + 1,
+                max_attempts,
+            )
+            if attempt + 1 < max_attempts and delay_sec > 0:
+                time.sleep(_retry_delay(delay_sec, deadline))
+            attempt += 1
+
+    if fallback is not None and last_exc is not None:
+        logger.warning("%s failed; using fallback", label)
+        result = fallback(last_exc)
+        return result, _meta(
+            label,
+            max(attempt, 1),
+            max_attempts,
+            start,
+            fallback_used=True,
+            timed_out=timed_out,
+            deadline_exceeded=deadline_exceeded,
+            error=last_exc,
+        )
+
+    if last_exc is not None:
+        raise last_exc
+    raise RuntimeError(f"{label} failed without exception context")
+
+
+def run_all_with_retry(
+    calls: List[Tuple[str, Callable[[], Any]]],
+    *,
+    max_parallel: int,
+    retries: int = 0,
+    delay_sec: float = 0.0,
+    fallback: Optional[Callable[[int, Exception], Any]] = None,
+    deadline: Optional[float] = None,
+) -> List[Tuple[Any, Dict[str, Any]]]:
+    """
+    run_with_retry for several (label, fn) calls, at most max_parallel in
+    flight on the fan-out pool. The calling thread schedules every attempt
+    and retry itself; it may be a shared-pool worker (an agent body), which
+    is why the calls get a pool of their own. fn must not fan out again.
+    Once the deadline passes, calls still running are abandoned and fall
+    back. fallback gets the call's index. Returns (result, meta) in call
+    order.
+    """
+    max_attempts = max(0, retries) + 1
+    limit = max(1, max_parallel)
+    executor = _get_executor("fanout")
+    results: List[Optional[Tuple[Any, Dict[str, Any]]]] = [None] * len(calls)
+    attempts = [0] * len(calls)
+    starts = [0.0] * len(calls)
+    # (earliest start, index) of calls waiting for their next attempt.
+    waiting: List[Tuple[float, int]] = [(0.0, index) for index in range(len(calls))]
+    running: Dict[Future, int] = {}
+
+    def _fail(index: int, exc: Exception, deadline_exceeded: bool = False) -> None:
+        if fallback is None:
+            for future in running:
+                _abandon(future)
+            raise exc
+        label = calls[index][0]
+        logger.warning("%s failed; using fallback", label)
+        results[index] = (
+            fallback(index, exc),
+            _meta(
+                label,
+                max(attempts[index], 1),
+                max_attempts,
+                starts[index] or time.time(),
+                fallback_used=True,
+                timed_out=deadline_exceeded,
+                deadline_exceeded=deadline_exceeded,
+                error=exc,
+            ),
+        )
+
+    while waiting or running:
+        remaining = remaining_time(deadline)
+        if remaining is not None and remaining <= 0:
+            exc = DeadlineExceeded("request deadline exceeded")
+            for future, index in list(running.items()):
+                _abandon(future)
+                logger.warning("%s abandoned: request deadline exceeded", calls[index][0])
+            pending = sorted(list(running.values()) + [index for _ready, index in waiting])
+            running.clear()
+            waiting.clear()
+            for index in pending:
+                _fail(index, exc, deadline_exceeded=True)
+            break
+
+        now = time.time()
+        waiting.sort()
+        while waiting and len(running) < limit and waiting[0][0] <= now:
+            _ready, index = waiting.pop(0)
+            attempts[index] += 1
+            starts[index] = starts[index] or now
+            running[executor.submit(calls[index][1])] = index
+
+        waits = [remaining]
+        if waiting and len(running) < limit:
+            waits.append(waiting[0][0] - now)
+        timeout = min((value for value in waits if value is not None), default=None)
+        if not running:
+            time.sleep(max(0.0, timeout or 0.0))
+            continue
+        finished, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in finished:
+            index = running.pop(future)
+            label = calls[index][0]
+            try:
+                results[index] = (
+                    future.result(),
+                    _meta(label, attempts[index], max_attempts, starts[index]),
+                )
+            except Exception as exc:
+                logger.exception(
+                    "%s failed on attempt %d/%d",
+                    label,
+                    attempts[index],
+                    max_attempts,
+                )
+                if attempts[index] < max_attempts:
+                    waiting.append((time.time() + _retry_delay(delay_sec, deadline), index))
+                else:
+                    _fail(index, exc)
+
+    return results
+
+
+async def arun_with_retry(
+    label: str,
+    fn: Callable[[], Awaitable[Any]],
+    *,
+    retries: int = 0,
+    delay_sec: float = 0.0,
+    timeout_sec: Optional[float] = None,
+    fallback: Optional[Callable[[Exception], Any]] = None,
+    deadline: Optional[float] = None,
+) -> tuple[Any, Dict[str, Any]]:
+    """
+    Async counterpart of run_with_retry.
+
+    fn is a zero-argument coroutine factory; a fresh coroutine is created per
+    attempt. Timeouts cancel the pending coroutine instead of leaving a
+    worker thread behind.
+    """
+    attempt = 0
+    last_exc: Optional[Exception] = None
+    max_attempts = max(0, retries) + 1
+    start = time.time()
+    timed_out = False
+    deadline_exceeded = False
+
+    while attempt < max_attempts:
+        try:
+            timeout = _attempt_timeout(timeout_sec, deadline)
+            if timeout is not None:
+                result = await asyncio.wait_for(fn(), timeout=timeout)
+            else:
+                result = await fn()
+            return result, _meta(label, attempt + 1, max_attempts, start)
+        except DeadlineExceeded as exc:
+            deadline_exceeded = True
+            timed_out = True
+            last_exc = exc
+            logger.warning("%s skipped: request deadline exceeded", label)
+            break
+        except asyncio.TimeoutError as exc:
+            timed_out = True
+            last_exc = exc
+            logger.exception(
+                "%s timed out on attempt %d/%d",
+                label,
+                attempt + 1,
+                max_attempts,
+            )
+            if attempt + 1 < max_attempts and delay_sec > 0:
+                await asyncio.sleep(_retry_delay(delay_sec, deadline))
             attempt += 1
         except Exception as exc:
             last_exc = exc
@@ -66,23 +396,22 @@ def run_with_retry(
                 max_attempts,
             )
             if attempt + 1 < max_attempts and delay_sec > 0:
-                time.sleep(delay_sec)
+                await asyncio.sleep(_retry_delay(delay_sec, deadline))
             attempt += 1
 
     if fallback is not None and last_exc is not None:
         logger.warning("%s failed; using fallback", label)
-        used_fallback = True
         result = fallback(last_exc)
-        duration_ms = int((time.time() - start) * 1000)
-        return result, {
-            "label": label,
-            "attempts": max_attempts,
-            "retries": max_attempts - 1,
-            "fallback_used": used_fallback,
-            "timeout": timed_out,
-            "error": str(last_exc),
-            "duration_ms": duration_ms,
-        }
+        return result, _meta(
+            label,
+            max(attempt, 1),
+            max_attempts,
+            start,
+            fallback_used=True,
+            timed_out=timed_out,
+            deadline_exceeded=deadline_exceeded,
+            error=last_exc,
+        )
 
     if last_exc is not None:
         raise last_exc
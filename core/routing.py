@@ -1,15 +1,28 @@
 #!/usr/bin/env python3
 """
-Executes planner-defined subtasks in order and updates the shared state.
+Executes planner-defined subtasks (concurrently where their state
+dependencies allow) and updates the shared state.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 from core.state import TutoringState, save_state_snapshot
-from core.resilience import run_with_retry
+from core.resilience import run_with_retry, arun_with_retry, remaining_time
+from core.task_graph import build_task_dependencies
+from core.stream_events import emit_stage_event
+from core.llm_cache import agent_llm, forget_responses, cache_stats
+from core.handoff import handoff_scope, release as release_handoffs
+from core.latency import LATENCY_TRACKER, budget_decision
+from core.pre_evaluation import pre_evaluate, can_skip_evaluator, rule_based_evaluation
+from core.question_index import QuestionIndex, question_scope
 from config.resilience import AGENT_RETRIES, AGENT_TIMEOUT_SEC, PIPELINE_RETRY_DELAY_SEC
-from config.agent_executor import AGENT_EXECUTORS
+from config.agent_executor import AGENT_EXECUTORS, ASYNC_AGENT_EXECUTORS
+from config.concurrency import MAX_PARALLEL_AGENTS
+from config.verification import PRE_EVALUATION_ENABLED
+from config.cache import QUESTION_INDEX_PROMPT_STEMS
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +73,47 @@ def _agent_fallback(agent_id: str) -> Dict[str, Any]:
     return {"knowledge_base": {agent_id: ""}}
 
 
+def _checks_summary(report: Dict[str, Any]) -> str:
+    return (
+        f"{len(report['ran'])} rule-based checks ran with {len(report['issues'])} issues; "
+        f"{report['verified']} of {report['questions']} answers match the answer key."
+    )
+
+
+def _skipped_update(
+    agent_id: str,
+    state: TutoringState,
+    report: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    if agent_id == "evaluator":
+        if report is None:
+            evaluation = {
+                "status": "deferred",
+                "overall_feedback": "Evaluation deferred to meet the latency budget.",
+                "mcq": [],
+                "short_answer": [],
+                "long_answer": [],
+            }
+        elif report["decision"] == "skip_clean":
+            evaluation = rule_based_evaluation(
+                state.question_bank,
+                state.solver_output,
+                report,
+                "pre_evaluated",
+                f"Model evaluation skipped: {_checks_summary(report)}",
+            )
+        else:
+            evaluation = rule_based_evaluation(
+                state.question_bank,
+                state.solver_output,
+                report,
+                "deferred",
+                f"Evaluation deferred to meet the latency budget. {_checks_summary(report)}",
+            )
+        return {"evaluation": evaluation, "knowledge_base": {agent_id: evaluation}}
+    return {"knowledge_base": {agent_id: ""}}
+
+
 def _count_sections(payload: Any) -> Dict[str, int]:
     if not isinstance(payload, dict):
         return {}
@@ -78,12 +132,27 @@ def _merge_knowledge_base(
     if not isinstance(update, dict):
         raise TypeError("knowledge_base update must be a dict")
     if agent_id in update:
-        state.knowledge_base[agent_id] = update[agent_id]
-        return
-    if len(update) == 1:
-        state.knowledge_base[agent_id] = next(iter(update.values()))
-        return
-    state.knowledge_base[agent_id] = update
+        value = update[agent_id]
+    elif len(update) == 1:
+        value = next(iter(update.values()))
+    else:
+        value = update
+
+    # Copy-on-write: agents still running may be reading the current dict.
+    # Sections keep plan order so prompts built from the whole knowledge
+    # base do not depend on which concurrent task finished first.
+    merged = dict(state.knowledge_base)
+    merged[agent_id] = value
+    subtasks = {task.get("task_id"): task for task in state.plan.subtasks}
+    order = [
+        subtasks[task_id].get("executed_by")
+        for task_id in state.plan.execution_order
+        if task_id in subtasks
+    ]
+    rank = {key: index for index, key in enumerate(order)}
+    state.knowledge_base = dict(
+        sorted(merged.items(), key=lambda item: rank.get(item[0], -1))
+    )
 
 
 def _normalize_state_field(key: str, value: Any) -> Any:
@@ -115,13 +184,305 @@ def _normalize_state_field(key: str, value: Any) -> Any:
     return value
 
 
-def task_executor(
+def _with_recent_questions(
+    task: Dict[str, Any],
+    state: TutoringState,
+    question_index: Optional[QuestionIndex],
+) -> Dict[str, Any]:
+    # The generator prompt lists recent stems for this board/exam/chapter.
+    if question_index is None or task.get("executed_by") != "question_generator":
+        return task
+    try:
+        recent = question_index.recent(question_scope(state), QUESTION_INDEX_PROMPT_STEMS)
+    except Exception:
+        logger.exception("Question index lookup failed")
+        return task
+    return {**task, "avoid_questions": recent} if recent else task
+
+
+def _screen_questions(
+    state: TutoringState,
+    agent_id: str,
+    agent_update: Any,
+    question_index: Optional[QuestionIndex],
+) -> Any:
+    """
+    Drops (or flags) generated questions that near-duplicate ones already
+    indexed for this board/exam/chapter, keeping pipelined solutions
+    aligned, and indexes the new ones.
+    """
+    if (
+        question_index is None
+        or agent_id != "question_generator"
+        or not isinstance(agent_update, dict)
+        or not isinstance(agent_update.get("question_bank"), dict)
+    ):
+        return agent_update
+    question_bank = agent_update["question_bank"]
+    try:
+        screened, kept, report = question_index.screen(question_scope(state), question_bank)
+    except Exception:
+        # A broken index must never fail generation.
+        logger.exception("Question index screening failed")
+        return agent_update
+
+    update = {**agent_update, "question_bank": screened}
+    knowledge_base = agent_update.get("knowledge_base")
+    if isinstance(knowledge_base, dict):
+        update["knowledge_base"] = {
+            key: screened if value is question_bank else value
+            for key, value in knowledge_base.items()
+        }
+    solver_output = agent_update.get("solver_output")
+    if isinstance(solver_output, dict):
+        # Pipelined solutions line up with the bank by section and index.
+        aligned = dict(solver_output)
+        for section, positions in kept.items():
+            solutions = solver_output.get(section)
+            if isinstance(solutions, list):
+                aligned[section] = [solutions[index] for index in positions if index < len(solutions)]
+        update["solver_output"] = aligned
+    update["diagnostics"] = {**(agent_update.get("diagnostics") or {}), "question_index": report}
+    return update
+
+
+def _run_agent_task(
     llm,
+    task: Dict[str, Any],
     state: TutoringState,
-) -> TutoringState:
+    timeout_sec: float = AGENT_TIMEOUT_SEC,
+    question_index: Optional[QuestionIndex] = None,
+) -> Tuple[Any, Dict[str, Any]]:
+    agent_id = task.get("executed_by")
+    agent_fn = AGENT_EXECUTORS[agent_id]
+    view = agent_llm(llm, agent_id)
+    task = _with_recent_questions(task, state, question_index)
+
+    logger.info("Running task %s with agent %s", task["task_id"], agent_id)
+    def _run():
+        try:
+            return agent_fn(
+                llm=view,
+                task=task,
+                state=state,
+            )
+        except Exception:
+            # Don't replay a response the agent could not use on retry.
+            forget_responses(view)
+            raise
+
+    def _fallback(_exc: Exception):
+        return _agent_fallback(agent_id)
+
+    agent_update, meta = run_with_retry(
+        f"agent:{agent_id}",
+        _run,
+        retries=AGENT_RETRIES,
+        delay_sec=PIPELINE_RETRY_DELAY_SEC,
+        timeout_sec=timeout_sec,
+        fallback=_fallback,
+        deadline=state.deadline_at,
+    )
+    meta["llm_cache"] = cache_stats(view)
+    return _screen_questions(state, agent_id, agent_update, question_index), meta
+
+
+async def _arun_agent_task(
+    llm,
+    task: Dict[str, Any],
+    state: TutoringState,
+    timeout_sec: float = AGENT_TIMEOUT_SEC,
+    question_index: Optional[QuestionIndex] = None,
+) -> Tuple[Any, Dict[str, Any]]:
+    agent_id = task.get("executed_by")
+    async_fn = ASYNC_AGENT_EXECUTORS.get(agent_id)
+    sync_fn = AGENT_EXECUTORS[agent_id]
+    view = agent_llm(llm, agent_id)
+    task = await asyncio.to_thread(_with_recent_questions, task, state, question_index)
+
+    logger.info("Running task %s with agent %s (async)", task["task_id"], agent_id)
+    async def _run():
+        try:
+            if async_fn is not None:
+                return await async_fn(llm=view, task=task, state=state)
+            return await asyncio.to_thread(sync_fn, llm=view, task=task, state=state)
+        except Exception:
+            forget_responses(view)
+            raise
+
+    def _fallback(_exc: Exception):
+        return _agent_fallback(agent_id)
+
+    agent_update, meta = await arun_with_retry(
+        f"agent:{agent_id}",
+        _run,
+        retries=AGENT_RETRIES,
+        delay_sec=PIPELINE_RETRY_DELAY_SEC,
+        timeout_sec=timeout_sec,
+        fallback=_fallback,
+        deadline=state.deadline_at,
+    )
+    meta["llm_cache"] = cache_stats(view)
+    agent_update = await asyncio.to_thread(_screen_questions, state, agent_id, agent_update, question_index)
+    return agent_update, meta
+
+
+def _apply_agent_update(
+    state: TutoringState,
+    task_id: str,
+    agent_id: str,
+    agent_update: Any,
+    meta: Dict[str, Any],
+) -> None:
+    _record_diagnostic(state, meta)
+    llm_cache = meta.get("llm_cache")
+    if llm_cache is not None:
+        state.run_diagnostics.setdefault("llm_cache", {})[agent_id] = llm_cache
+    # Only real model calls say anything about how slow the provider is.
+    if not meta.get("fallback_used") and not (llm_cache or {}).get("hits"):
+        LATENCY_TRACKER.record(agent_id, meta.get("duration_ms", 0))
+
+    if not isinstance(agent_update, dict):
+        logger.warning(
+            "Agent '%s' returned non-dict output: %s; using fallback",
+            agent_id,
+            type(agent_update),
+        )
+        agent_update = _agent_fallback(agent_id)
+        state.run_diagnostics["fallbacks"].append(f"agent:{agent_id}")
+
+    _merge_agent_update(state, agent_id, agent_update)
+
+    logger.info("Completed task %s", task_id)
+    save_state_snapshot(state, f"task:{task_id}")
+    emit_stage_event(f"agent:{agent_id}", agent_update, meta)
+
+
+def _merge_agent_update(
+    state: TutoringState,
+    agent_id: str,
+    agent_update: Dict[str, Any],
+) -> None:
+    # Merge state updates
+    for key, value in agent_update.items():
+        if key == "knowledge_base":
+            _merge_knowledge_base(state, value, agent_id)
+        elif key == "diagnostics":
+            # Agent-reported diagnostics, filed per agent under each name.
+            for name, entry in (value or {}).items():
+                state.run_diagnostics.setdefault(name, {})[agent_id] = entry
+        elif hasattr(state, key):
+            normalized = _normalize_state_field(key, value)
+            setattr(state, key, normalized)
+        else:
+            logger.warning("Ignoring unknown state field: %s", key)
+
+    output_counts = {}
+    if "question_bank" in agent_update:
+        output_counts["question_bank"] = _count_sections(agent_update.get("question_bank"))
+    if "solver_output" in agent_update:
+        output_counts["solver_output"] = _count_sections(agent_update.get("solver_output"))
+    if "evaluation" in agent_update:
+        output_counts["evaluation"] = _count_sections(agent_update.get("evaluation"))
+    if output_counts:
+        state.run_diagnostics["output_counts"][agent_id] = output_counts
+
+
+def _skip_agent_task(
+    state: TutoringState,
+    task_id: str,
+    agent_id: str,
+    decision: Dict[str, Any],
+    report: Optional[Dict[str, Any]] = None,
+) -> None:
+    if decision["action"] == "skip":
+        logger.warning(
+            "Skipping task %s (%s) to meet the latency budget: slack %sms, estimate %sms",
+            task_id,
+            agent_id,
+            decision.get("slack_ms"),
+            decision.get("estimate_ms"),
+        )
+    else:
+        logger.info(
+            "Skipping task %s (%s): rule-based checks passed with confidence %s",
+            task_id,
+            agent_id,
+            report["confidence"],
+        )
+    agent_update = _skipped_update(agent_id, state, report)
+    state.run_diagnostics.setdefault("skipped", []).append(agent_id)
+    _merge_agent_update(state, agent_id, agent_update)
+    save_state_snapshot(state, f"task:{task_id}")
+    meta = {"label": f"agent:{agent_id}", "skipped": True}
+    if report is not None:
+        meta["pre_evaluation"] = report["decision"]
+    emit_stage_event(f"agent:{agent_id}", agent_update, meta)
+
+
+def _pre_evaluate(
+    state: TutoringState,
+    agent_id: str,
+    decision: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    """
+    Runs the rule-based checks (core.pre_evaluation) right before the
+    evaluator and decides whether the model evaluation is still needed:
+    "skip_deadline" when the latency budget already skips it, "skip_clean"
+    when every check passed with enough verified answers, otherwise
+    "run_evaluator". The report is filed under
+    run_diagnostics["pre_evaluation"]. If the checks themselves fail, the
+    evaluator runs as if they were disabled.
     """
-    Executes planner-defined subtasks in the specified order.
+    if agent_id != "evaluator" or not PRE_EVALUATION_ENABLED:
+        return None
+    try:
+        report = pre_evaluate(
+            state.question_bank,
+            state.solver_output,
+            state.knowledge_base.get("question_designer"),
+        )
+    except Exception:
+        logger.exception("Pre-evaluation failed; running the evaluator without it")
+        return None
+    if decision["action"] == "skip":
+        report["decision"] = "skip_deadline"
+    elif can_skip_evaluator(report):
+        report["decision"] = "skip_clean"
+    else:
+        report["decision"] = "run_evaluator"
+    state.run_diagnostics["pre_evaluation"] = report
+    return report
+
+
+def _budget_decision(
+    state: TutoringState,
+    task_id: str,
+    subtasks: Dict[str, Dict[str, Any]],
+    pending: List[str],
+) -> Dict[str, Any]:
     """
+    Decides whether a ready task runs, runs with a capped timeout, or is
+    skipped, keeping enough of the request deadline for the required tasks
+    still waiting behind it.
+    """
+    agent_id = subtasks[task_id].get("executed_by")
+    remaining = remaining_time(state.deadline_at)
+    decision = budget_decision(
+        agent_id,
+        remaining * 1000 if remaining is not None else None,
+        [subtasks[other].get("executed_by") for other in pending],
+    )
+    if "slack_ms" in decision:
+        state.run_diagnostics.setdefault("latency_budget", {})[agent_id] = dict(decision)
+    if decision["action"] == "shorten":
+        decision["timeout_sec"] = min(decision["timeout_sec"], AGENT_TIMEOUT_SEC)
+    return decision
+
+
+def _prepare_schedule(
+    state: TutoringState,
+) -> Tuple[Dict[str, Dict[str, Any]], List[str], Dict[str, Set[str]]]:
     plan = state.plan
     subtasks = {task["task_id"]: task for task in plan.subtasks}
     execution_order = plan.execution_order
@@ -133,64 +494,176 @@ def task_executor(
         if task is None:
             logger.warning("Skipping unknown task_id: %s", task_id)
             continue
-
         agent_id = task.get("executed_by")
-        agent_fn = AGENT_EXECUTORS.get(agent_id)
-        if agent_fn is None:
+        if AGENT_EXECUTORS.get(agent_id) is None:
             raise RuntimeError(f"No executor found for agent: {agent_id}")
 
-        logger.info("Running task %s with agent %s", task_id, agent_id)
-        def _run():
-            return agent_fn(
-                llm=llm,
-                task=task,
-                state=state,
-            )
+    dependencies = build_task_dependencies(execution_order, subtasks)
+    state.run_diagnostics["task_dependencies"] = {
+        task_id: sorted(deps) for task_id, deps in dependencies.items()
+    }
+    return subtasks, list(execution_order), dependencies
 
-        def _fallback(_exc: Exception):
-            return _agent_fallback(agent_id)
 
-        agent_update, meta = run_with_retry(
-            f"agent:{agent_id}",
-            _run,
-            retries=AGENT_RETRIES,
-            delay_sec=PIPELINE_RETRY_DELAY_SEC,
-            timeout_sec=AGENT_TIMEOUT_SEC,
-            fallback=_fallback,
-        )
-        _record_diagnostic(state, meta)
+def _resumed_tasks(state: TutoringState, dependencies: Dict[str, Set[str]]) -> Set[str]:
+    # Tasks the run this state was resumed from had finished (see
+    # core.graph.resume_run); their outputs are already in state.
+    resumed = state.run_diagnostics.get("resumed_from") or {}
+    done = set(resumed.get("completed_tasks", [])) & set(dependencies)
+    if done:
+        logger.info("Resuming after completed tasks: %s", sorted(done))
+    return done
 
-        if not isinstance(agent_update, dict):
-            logger.warning(
-                "Agent '%s' returned non-dict output: %s; using fallback",
-                agent_id,
-                type(agent_update),
-            )
-            agent_update = _agent_fallback(agent_id)
-            state.run_diagnostics["fallbacks"].append(f"agent:{agent_id}")
-
-        # Merge state updates
-        for key, value in agent_update.items():
-            if key == "knowledge_base":
-                _merge_knowledge_base(state, value, agent_id)
-            elif hasattr(state, key):
-                normalized = _normalize_state_field(key, value)
-                setattr(state, key, normalized)
-            else:
-                logger.warning("Ignoring unknown state field: %s", key)
-
-        output_counts = {}
-        if "question_bank" in agent_update:
-            output_counts["question_bank"] = _count_sections(agent_update.get("question_bank"))
-        if "solver_output" in agent_update:
-            output_counts["solver_output"] = _count_sections(agent_update.get("solver_output"))
-        if "evaluation" in agent_update:
-            output_counts["evaluation"] = _count_sections(agent_update.get("evaluation"))
-        if output_counts:
-            state.run_diagnostics["output_counts"][agent_id] = output_counts
-
-        logger.info("Completed task %s", task_id)
-        save_state_snapshot(state, f"task:{task_id}")
+
+def task_executor(
+    llm,
+    state: TutoringState,
+    question_index: Optional[QuestionIndex] = None,
+) -> TutoringState:
+    """
+    Executes planner-defined subtasks as a dependency graph.
+
+    Tasks whose declared state reads/writes do not conflict run concurrently
+    (up to MAX_PARALLEL_AGENTS); conflicting tasks keep their execution_order.
+    Updates are merged on the calling thread as tasks finish, so two tasks
+    touching the same field are never in flight together. With a request
+    deadline, optional agents may be shortened or skipped (see core.latency).
+    With a question_index, generated questions are screened for
+    near-duplicates of earlier runs (see core.question_index).
+    """
+    subtasks, execution_order, dependencies = _prepare_schedule(state)
+
+    completed = _resumed_tasks(state, dependencies)
+    pending = [
+        task_id for task_id in execution_order
+        if task_id in dependencies and task_id not in completed
+    ]
+    running: Dict[Future, str] = {}
+
+    # Work one agent handed to another that never took it over is closed
+    # once the run is done.
+    with ThreadPoolExecutor(max_workers=max(1, MAX_PARALLEL_AGENTS)) as pool, handoff_scope(state.run_id):
+        while pending or running:
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for task_id in list(pending):
+                    if len(running) >= max(1, MAX_PARALLEL_AGENTS):
+                        break
+                    if not dependencies[task_id] <= completed:
+                        continue
+                    pending.remove(task_id)
+                    decision = _budget_decision(state, task_id, subtasks, pending)
+                    agent_id = subtasks[task_id].get("executed_by")
+                    report = _pre_evaluate(state, agent_id, decision)
+                    if decision["action"] == "skip" or (report or {}).get("decision") == "skip_clean":
+                        _skip_agent_task(state, task_id, agent_id, decision, report)
+                        completed.add(task_id)
+                        # Skipping may have unblocked tasks earlier in the list.
+                        scheduled = True
+                        continue
+                    future = pool.submit(
+                        _run_agent_task,
+                        llm,
+                        subtasks[task_id],
+                        state,
+                        decision.get("timeout_sec", AGENT_TIMEOUT_SEC),
+                        question_index,
+                    )
+                    running[future] = task_id
+
+            if not running:
+                if not pending:
+                    break
+                raise RuntimeError(f"Unschedulable tasks: {pending}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(finished, key=lambda f: execution_order.index(running[f])):
+                task_id = running.pop(future)
+                agent_update, meta = future.result()
+                _apply_agent_update(
+                    state,
+                    task_id,
+                    subtasks[task_id].get("executed_by"),
+                    agent_update,
+                    meta,
+                )
+                completed.add(task_id)
+
+    logger.info("Task execution complete")
+    return state
+
+
+async def atask_executor(
+    llm,
+    state: TutoringState,
+    question_index: Optional[QuestionIndex] = None,
+) -> TutoringState:
+    """
+    Async variant of task_executor: same dependency graph and merge rules,
+    with tasks scheduled as coroutines on the running event loop.
+    """
+    subtasks, execution_order, dependencies = _prepare_schedule(state)
+
+    completed = _resumed_tasks(state, dependencies)
+    pending = [
+        task_id for task_id in execution_order
+        if task_id in dependencies and task_id not in completed
+    ]
+    running: Dict[asyncio.Task, str] = {}
+    limit = max(1, MAX_PARALLEL_AGENTS)
+
+    try:
+        while pending or running:
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for task_id in list(pending):
+                    if len(running) >= limit:
+                        break
+                    if not dependencies[task_id] <= completed:
+                        continue
+                    pending.remove(task_id)
+                    decision = _budget_decision(state, task_id, subtasks, pending)
+                    agent_id = subtasks[task_id].get("executed_by")
+                    report = _pre_evaluate(state, agent_id, decision)
+                    if decision["action"] == "skip" or (report or {}).get("decision") == "skip_clean":
+                        _skip_agent_task(state, task_id, agent_id, decision, report)
+                        completed.add(task_id)
+                        scheduled = True
+                        continue
+                    job = asyncio.ensure_future(
+                        _arun_agent_task(
+                            llm,
+                            subtasks[task_id],
+                            state,
+                            decision.get("timeout_sec", AGENT_TIMEOUT_SEC),
+                            question_index,
+                        )
+                    )
+                    running[job] = task_id
+
+            if not running:
+                if not pending:
+                    break
+                raise RuntimeError(f"Unschedulable tasks: {pending}")
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for job in sorted(finished, key=lambda j: execution_order.index(running[j])):
+                task_id = running.pop(job)
+                agent_update, meta = job.result()
+                _apply_agent_update(
+                    state,
+                    task_id,
+                    subtasks[task_id].get("executed_by"),
+                    agent_update,
+                    meta,
+                )
+                completed.add(task_id)
+    finally:
+        for job in running:
+            job.cancel()
+        release_handoffs(state.run_id)
 
     logger.info("Task execution complete")
     return state
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Typed output schemas for the question generator, solver and evaluator.
+
+Used as schema-constrained output formats for the text LLM; agents store
+the validated result in state as plain dicts (model_dump()).
+"""
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+# -------------------------------------------------
+# Question bank
+# -------------------------------------------------
+
+class MCQItem(BaseModel):
+    question: str
+    options: List[str] = Field(default_factory=list)
+    answer: str = ""
+    explanation: str = ""
+    difficulty: str = ""
+
+
+class ShortAnswerItem(BaseModel):
+    question: str
+    answer: str = ""
+    marks: Optional[float] = None
+    difficulty: str = ""
+
+
+class LongAnswerItem(BaseModel):
+    question: str
+    answer: str = ""
+    key_points: List[str] = Field(default_factory=list)
+    marks: Optional[float] = None
+    difficulty: str = ""
+
+
+class QuestionBank(BaseModel):
+    mcq: List[MCQItem] = Field(default_factory=list)
+    short_answer: List[ShortAnswerItem] = Field(default_factory=list)
+    long_answer: List[LongAnswerItem] = Field(default_factory=list)
+
+
+# -------------------------------------------------
+# Solutions
+# -------------------------------------------------
+
+class SolutionItem(BaseModel):
+    question: str
+    steps: List[str] = Field(default_factory=list)
+    final_answer: str = ""
+
+
+class SolverOutput(BaseModel):
+    mcq: List[SolutionItem] = Field(default_factory=list)
+    short_answer: List[SolutionItem] = Field(default_factory=list)
+    long_answer: List[SolutionItem] = Field(default_factory=list)
+
+
+# -------------------------------------------------
+# Evaluation
+# -------------------------------------------------
+
+class EvaluationItem(BaseModel):
+    question: str
+    is_correct: Optional[bool] = None
+    score: Optional[float] = None
+    feedback: str = ""
+    improvements: List[str] = Field(default_factory=list)
+
+
+class Evaluation(BaseModel):
+    overall_feedback: str = ""
+    mcq: List[EvaluationItem] = Field(default_factory=list)
+    short_answer: List[EvaluationItem] = Field(default_factory=list)
+    long_answer: List[EvaluationItem] = Field(default_factory=list)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Splits a question bank into shards and runs per-shard work concurrently.
+
+A shard is a dict {"section", "offset", "items"}: a contiguous run of at
+most shard_size questions from one section. Results come back in shard
+order, so per-shard outputs can be merged back into the
+{mcq, short_answer, long_answer} shape.
+"""
+
+import asyncio
+import math
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.resilience import PIPELINE_RETRY_DELAY_SEC
+from core.resilience import run_all_with_retry, arun_with_retry
+
+QUESTION_SECTIONS = ("mcq", "short_answer", "long_answer")
+
+
+def shard_question_bank(question_bank: Dict[str, Any], shard_size: int) -> List[Dict[str, Any]]:
+    """
+    Shards in section order, then question order.
+    """
+    shard_size = max(1, shard_size)
+    shards: List[Dict[str, Any]] = []
+    for section in QUESTION_SECTIONS:
+        items = question_bank.get(section) or []
+        if not isinstance(items, list):
+            continue
+        for offset in range(0, len(items), shard_size):
+            shards.append({
+                "section": section,
+                "offset": offset,
+                "items": items[offset:offset + shard_size],
+            })
+    return shards
+
+
+def split_to_fit(
+    shards: List[Dict[str, Any]],
+    fits: Callable[[Dict[str, Any]], bool],
+) -> List[Dict[str, Any]]:
+    """
+    Splits every shard that does not fit one prompt into single-question
+    shards, keeping offsets into the original section. A question too large
+    on its own is left for its prompt to reject.
+    """
+    fitted: List[Dict[str, Any]] = []
+    for shard in shards:
+        if len(shard["items"]) <= 1 or fits(shard):
+            fitted.append(shard)
+            continue
+        fitted.extend(
+            {"section": shard["section"], "offset": shard["offset"] + index, "items": [item]}
+            for index, item in enumerate(shard["items"])
+        )
+    return fitted
+
+
+def count_questions(question_bank: Dict[str, Any]) -> int:
+    return sum(
+        len(items)
+        for items in (question_bank.get(section) for section in QUESTION_SECTIONS)
+        if isinstance(items, list)
+    )
+
+
+def sample_question_bank(
+    question_bank: Dict[str, Any],
+    fraction: float = 1.0,
+    count: Optional[int] = None,
+) -> Tuple[Dict[str, List[Any]], Dict[str, List[int]]]:
+    """
+    Picks count questions (or the given fraction, rounded up) spread evenly
+    over the bank in section order. Returns the sampled bank and, per
+    section, the original index of every sampled question. Deterministic,
+    so repeat runs sample (and cache) the same questions.
+    """
+    located = [
+        (section, index)
+        for section in QUESTION_SECTIONS
+        if isinstance(question_bank.get(section), list)
+        for index in range(len(question_bank[section]))
+    ]
+    total = len(located)
+    size = total if count is None else max(0, count)
+    if count is None and fraction < 1:
+        size = math.ceil(max(0.0, fraction) * total)
+    size = min(size, total)
+
+    sampled: Dict[str, List[Any]] = {section: [] for section in QUESTION_SECTIONS}
+    positions: Dict[str, List[int]] = {section: [] for section in QUESTION_SECTIONS}
+    for step in range(size):
+        section, index = located[step * total // size]
+        sampled[section].append(question_bank[section][index])
+        positions[section].append(index)
+    return sampled, positions
+
+
+def shard_bank(shard: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    The shard as a question bank with only its own section filled in.
+    """
+    bank: Dict[str, List[Any]] = {section: [] for section in QUESTION_SECTIONS}
+    bank[shard["section"]] = list(shard["items"])
+    return bank
+
+
+def shard_label(label: str, shard: Dict[str, Any]) -> str:
+    return f"{label}[{shard['section']}:{shard['offset']}]"
+
+
+def merge_shard_outputs(
+    shards: List[Dict[str, Any]],
+    outputs: List[Dict[str, Any]],
+) -> Dict[str, List[Any]]:
+    """
+    Concatenates per-shard outputs back into one section dict. A shard's
+    items are taken from its own section, or from whatever sections the
+    model filed them under when that one is empty.
+    """
+    merged: Dict[str, List[Any]] = {section: [] for section in QUESTION_SECTIONS}
+    for shard, output in zip(shards, outputs):
+        if not isinstance(output, dict):
+            continue
+        items = output.get(shard["section"])
+        if not items:
+            items = [
+                item
+                for section in QUESTION_SECTIONS
+                for item in (output.get(section) or [])
+            ]
+        merged[shard["section"]].extend(items)
+    return merged
+
+
+def shard_reports(
+    shards: List[Dict[str, Any]],
+    prompt_tokens: List[int],
+    results: List[Tuple[Tuple[Any, Dict[str, Any]], Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """
+    Per-shard diagnostics for ((output, extraction report), meta) results.
+    """
+    return [
+        {
+            "section": shard["section"],
+            "offset": shard["offset"],
+            "questions": len(shard["items"]),
+            "attempts": meta["attempts"],
+            "fallback_used": meta["fallback_used"],
+            "duration_ms": meta["duration_ms"],
+            "prompt_tokens": tokens,
+            "json_extraction": report,
+        }
+        for shard, tokens, ((_output, report), meta) in zip(shards, prompt_tokens, results)
+    ]
+
+
+def run_shards(
+    label: str,
+    shards: List[Dict[str, Any]],
+    fn: Callable[[Dict[str, Any]], Any],
+    *,
+    max_parallel: int,
+    retries: int,
+    fallback: Callable[[Dict[str, Any], Exception], Any],
+    deadline: Optional[float] = None,
+) -> List[Tuple[Any, Dict[str, Any]]]:
+    """
+    Runs fn on every shard with at most max_parallel at a time; each shard is
+    retried on its own and falls back on its own. Returns (result, meta)
+    pairs in shard order. Shards run on the resilience fan-out pool and stop
+    at the request deadline; other timeouts are left to the caller's attempt.
+    """
+    return run_all_with_retry(
+        [(shard_label(label, shard), lambda shard=shard: fn(shard)) for shard in shards],
+        max_parallel=max_parallel,
+        retries=retries,
+        delay_sec=PIPELINE_RETRY_DELAY_SEC,
+        fallback=lambda index, exc: fallback(shards[index], exc),
+        deadline=deadline,
+    )
+
+
+async def arun_shards(
+    label: str,
+    shards: List[Dict[str, Any]],
+    fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+    *,
+    max_parallel: int,
+    retries: int,
+    fallback: Callable[[Dict[str, Any], Exception], Any],
+    deadline: Optional[float] = None,
+) -> List[Tuple[Any, Dict[str, Any]]]:
+    """
+    Async counterpart of run_shards; cancelling the caller cancels every
+    pending shard.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def _run(shard: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        async with semaphore:
+            return await arun_with_retry(
+                shard_label(label, shard),
+                lambda: fn(shard),
+                retries=retries,
+                delay_sec=PIPELINE_RETRY_DELAY_SEC,
+                fallback=lambda exc: fallback(shard, exc),
+                deadline=deadline,
+            )
+
+    return list(await asyncio.gather(*(_run(shard) for shard in shards)))
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing of identical concurrent requests.
+
+The first caller for a key runs the work; callers arriving while it is in
+flight wait for its result instead of running it again. Within a worker
+this covers threads and coroutines alike (one shared Future per key).
+With a shared SQLite file, the in-flight claim and the result are visible
+to every worker on the host: a worker whose key is already claimed
+elsewhere polls for that flight's result, and takes over when the owning
+process has died or the claim has gone stale.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import closing
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config.api import (
+    REQUEST_COALESCING_PATH,
+    REQUEST_COALESCING_POLL_SEC,
+    REQUEST_COALESCING_RESULT_TTL_SEC,
+    REQUEST_COALESCING_STALE_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescedRequestError(RuntimeError):
+    """Raised in waiting workers when the flight they attached to failed."""
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _SharedFlights:
+    """
+    Cross-worker claims and results in one SQLite file.
+    """
+
+    def __init__(self, path: str, *, result_ttl_sec: float, stale_sec: float) -> None:
+        self._path = path
+        self._result_ttl_sec = result_ttl_sec
+        self._stale_sec = stale_sec
+        self._host = socket.gethostname()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS flights (
+                    key TEXT PRIMARY KEY,
+                    flight_id TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    host TEXT NOT NULL,
+                    started_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS flight_results (
+                    flight_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    finished_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=10, isolation_level=None)
+
+    def _alive(self, pid: int, host: str, started_at: float) -> bool:
+        if time.time() - started_at > self._stale_sec:
+            return False
+        return host != self._host or _process_alive(pid)
+
+    def claim(self, key: str) -> Tuple[bool, str]:
+        """
+        (True, new flight id) when this worker now owns the key, otherwise
+        (False, id of the live flight another worker is running).
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT flight_id, pid, host, started_at FROM flights WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None and self._alive(row[1], row[2], row[3]):
+                    conn.execute("COMMIT")
+                    return False, row[0]
+                flight_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT OR REPLACE INTO flights (key, flight_id, pid, host, started_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, flight_id, os.getpid(), self._host, time.time()),
+                )
+                conn.execute("COMMIT")
+                return True, flight_id
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def publish(self, key: str, flight_id: str, status: str, payload: str) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO flight_results (flight_id, status, payload, finished_at) VALUES (?, ?, ?, ?)",
+                (flight_id, status, payload, now),
+            )
+            conn.execute("DELETE FROM flights WHERE key = ? AND flight_id = ?", (key, flight_id))
+            conn.execute("DELETE FROM flight_results WHERE finished_at < ?", (now - self._result_ttl_sec,))
+            conn.execute("COMMIT")
+
+    def poll(self, key: str, flight_id: str) -> Tuple[str, Optional[str]]:
+        """
+        ("done" | "error", payload) once the flight finished, ("waiting",
+        None) while it is running, ("lost", None) when its owner is gone.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT status, payload FROM flight_results WHERE flight_id = ?",
+                (flight_id,),
+            ).fetchone()
+            if row is not None:
+                return row[0], row[1]
+            claim = conn.execute(
+                "SELECT flight_id, pid, host, started_at FROM flights WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if claim is None or claim[0] != flight_id or not self._alive(claim[1], claim[2], claim[3]):
+            return "lost", None
+        return "waiting", None
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        poll_sec: float = REQUEST_COALESCING_POLL_SEC,
+        result_ttl_sec: float = REQUEST_COALESCING_RESULT_TTL_SEC,
+        stale_sec: float = REQUEST_COALESCING_STALE_SEC,
+    ) -> None:
+        self._shared = (
+            _SharedFlights(path, result_ttl_sec=result_ttl_sec, stale_sec=stale_sec)
+            if path
+            else None
+        )
+        self._poll_sec = poll_sec
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced_local = 0
+        self.coalesced_shared = 0
+
+    @classmethod
+    def from_config(cls) -> "SingleFlight":
+        return cls(REQUEST_COALESCING_PATH)
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced_local += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _settle(self, key: str, future: Future, value: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def _publish(self, key: str, flight_id: str, value: Any = None, error: Optional[BaseException] = None) -> None:
+        try:
+            if error is not None:
+                self._shared.publish(key, flight_id, "error", str(error) or type(error).__name__)
+            else:
+                self._shared.publish(key, flight_id, "done", json.dumps(value, default=str))
+        except Exception:
+            logger.exception("Could not publish coalesced result for %s", key)
+
+    @staticmethod
+    def _shared_outcome(status: str, payload: Optional[str]) -> Any:
+        if status == "error":
+            raise CoalescedRequestError(payload or "coalesced request failed")
+        return json.loads(payload)
+
+    # -------------------------------------------------
+    # Sync
+    # -------------------------------------------------
+
+    def run(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Returns (fn()'s result, {"role": "leader" | "follower", ...}).
+        Results crossing workers must be JSON-serializable.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), {"role": "follower", "source": "local"}
+        try:
+            value, meta = self._lead(key, fn)
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        self._settle(key, future, value)
+        return value, meta
+
+    def _lead(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+        while True:
+            if self._shared is None:
+                owner, flight_id = True, None
+            else:
+                owner, flight_id = self._shared.claim(key)
+            if owner:
+                self.leaders += 1
+                try:
+                    value = fn()
+                except BaseException as exc:
+                    if flight_id is not None:
+                        self._publish(key, flight_id, error=exc)
+                    raise
+                if flight_id is not None:
+                    self._publish(key, flight_id, value)
+                return value, {"role": "leader"}
+            while True:
+                status, payload = self._shared.poll(key, flight_id)
+                if status == "lost":
+                    break
+                if status != "waiting":
+                    self.coalesced_shared += 1
+                    return self._shared_outcome(status, payload), {"role": "follower", "source": "shared"}
+                time.sleep(self._poll_sec)
+
+    # -------------------------------------------------
+    # Async
+    # -------------------------------------------------
+
+    async def arun(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Async variant of run(); waiting never blocks the event loop.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future), {"role": "follower", "source": "local"}
+        try:
+            value, meta = await self._alead(key, fn)
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        self._settle(key, future, value)
+        return value, meta
+
+    async def _alead(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict[str, Any]]:
+        while True:
+            if self._shared is None:
+                owner, flight_id = True, None
+            else:
+                owner, flight_id = await asyncio.to_thread(self._shared.claim, key)
+            if owner:
+                self.leaders += 1
+                try:
+                    value = await fn()
+                except BaseException as exc:
+                    if flight_id is not None:
+                        await asyncio.to_thread(self._publish, key, flight_id, None, exc)
+                    raise
+                if flight_id is not None:
+                    await asyncio.to_thread(self._publish, key, flight_id, value)
+                return value, {"role": "leader"}
+            while True:
+                status, payload = await asyncio.to_thread(self._shared.poll, key, flight_id)
+                if status == "lost":
+                    break
+                if status != "waiting":
+                    self.coalesced_shared += 1
+                    return self._shared_outcome(status, payload), {"role": "follower", "source": "shared"}
+                await asyncio.sleep(self._poll_sec)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._inflight)
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced_local + self.coalesced_shared,
+            "coalesced_local": self.coalesced_local,
+            "coalesced_shared": self.coalesced_shared,
+            "in_flight": in_flight,
+        }
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Run-indexed SQLite store for state snapshots.
+
+Records are keyed by (run_id, seq) and indexed by stage. Every
+keyframe_every-th record of a run holds the full state and the others the
+delta from the record before it, zlib-compressed, so loading any stage of
+any run reads at most keyframe_every rows however large the store grows.
+Whole runs are pruned by age and by the store's total size.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.state_delta import apply_delta, diff_state
+from config.snapshots import (
+    SNAPSHOT_KEYFRAME_EVERY,
+    SNAPSHOT_COMPRESSION_LEVEL,
+    SNAPSHOT_RETENTION_SEC,
+    SNAPSHOT_RETENTION_MAX_BYTES,
+    SNAPSHOT_RETENTION_CHECK_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class SnapshotStore:
+    """
+    Snapshot sink and reader over one SQLite file (WAL journal, so API
+    workers on one host can share it).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        keyframe_every: int = SNAPSHOT_KEYFRAME_EVERY,
+        compression_level: int = SNAPSHOT_COMPRESSION_LEVEL,
+        retention_sec: Optional[float] = SNAPSHOT_RETENTION_SEC,
+        retention_max_bytes: Optional[int] = SNAPSHOT_RETENTION_MAX_BYTES,
+        retention_check_sec: float = SNAPSHOT_RETENTION_CHECK_SEC,
+    ) -> None:
+        self.path = path
+        self._keyframe_every = max(1, keyframe_every)
+        self._compression_level = compression_level
+        self._retention_sec = retention_sec if retention_sec and retention_sec > 0 else None
+        self._retention_max_bytes = (
+            retention_max_bytes if retention_max_bytes and retention_max_bytes > 0 else None
+        )
+        self._retention_check_sec = retention_check_sec
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+        self.pruned_runs = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS snapshot_runs (
+                    run_id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    last_seq INTEGER NOT NULL,
+                    keyframe_seq INTEGER NOT NULL,
+                    last_stage TEXT NOT NULL,
+                    final INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    run_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    stage TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (run_id, seq)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_snapshots_stage ON snapshots (run_id, stage, seq)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_snapshots_by_stage ON snapshots (stage, created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_snapshot_runs_age ON snapshot_runs (updated_at)"
+            )
+
+    @classmethod
+    def from_config(cls, path: str) -> "SnapshotStore":
+        return cls(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    # -------------------------------------------------
+    # Writing
+    # -------------------------------------------------
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Stores a batch of snapshot writer entries in one transaction.
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            for entry in entries:
+                self._insert(conn, entry)
+            now = time.time()
+            if now - self._last_prune >= self._retention_check_sec:
+                self._last_prune = now
+                self._prune(conn, now)
+
+    def _insert(self, conn: sqlite3.Connection, entry: Dict[str, Any]) -> None:
+        run_id = entry["run_id"]
+        row = conn.execute(
+            "SELECT last_seq, keyframe_seq FROM snapshot_runs WHERE run_id = ?",
+            (run_id,),
+        ).fetchone()
+        # A run the store does not know yet (new, or pruned meanwhile) and a
+        # writer without a delta base both start over with a keyframe.
+        if row is None:
+            seq, keyframe = 0, True
+        else:
+            seq = row[0] + 1
+            keyframe = entry["previous"] is None or seq - row[1] >= self._keyframe_every
+        body = entry["state"] if keyframe else diff_state(entry["previous"], entry["state"])
+        payload = zlib.compress(
+            json.dumps(body, ensure_ascii=True).encode("utf-8"),
+            self._compression_level,
+        )
+        conn.execute(
+            "INSERT INTO snapshots (run_id, seq, stage, created_at, kind, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                seq,
+                entry["stage"],
+                entry["timestamp"],
+                "full" if keyframe else "delta",
+                sqlite3.Binary(payload),
+            ),
+        )
+        conn.execute(
+            """
+            INSERT INTO snapshot_runs
+                (run_id, created_at, updated_at, last_seq, keyframe_seq, last_stage, final, bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id) DO UPDATE SET
+                updated_at = excluded.updated_at,
+                last_seq = excluded.last_seq,
+                keyframe_seq = CASE WHEN ? THEN excluded.keyframe_seq ELSE keyframe_seq END,
+                last_stage = excluded.last_stage,
+                final = excluded.final,
+                bytes = bytes + excluded.bytes
+            """,
+            (
+                run_id,
+                entry["timestamp"],
+                entry["timestamp"],
+                seq,
+                seq,
+                entry["stage"],
+                int(entry["final"]),
+                len(payload),
+                keyframe,
+            ),
+        )
+
+    # -------------------------------------------------
+    # Retention
+    # -------------------------------------------------
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Applies the age and size bounds now; returns the runs deleted.
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            return self._prune(conn, time.time() if now is None else now)
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> int:
+        doomed: List[str] = []
+        if self._retention_sec is not None:
+            doomed = [
+                run_id
+                for (run_id,) in conn.execute(
+                    "SELECT run_id FROM snapshot_runs WHERE updated_at < ?",
+                    (now - self._retention_sec,),
+                )
+            ]
+        if self._retention_max_bytes is not None:
+            expired = set(doomed)
+            rows = conn.execute(
+                "SELECT run_id, bytes FROM snapshot_runs ORDER BY updated_at ASC"
+            ).fetchall()
+            total = sum(size for run_id, size in rows if run_id not in expired)
+            for run_id, size in rows:
+                if total <= self._retention_max_bytes:
+                    break
+                if run_id not in expired:
+                    doomed.append(run_id)
+                    total -= size
+        if doomed:
+            conn.executemany("DELETE FROM snapshots WHERE run_id = ?", [(run_id,) for run_id in doomed])
+            conn.executemany("DELETE FROM snapshot_runs WHERE run_id = ?", [(run_id,) for run_id in doomed])
+            self.pruned_runs += len(doomed)
+            logger.info("Pruned snapshots of %d runs from %s", len(doomed), self.path)
+        return len(doomed)
+
+    # -------------------------------------------------
+    # Reading
+    # -------------------------------------------------
+
+    def load(
+        self,
+        run_id: str,
+        stage: Optional[str] = None,
+        seq: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The record of one stage of a run with its full "state": the given
+        seq, else the latest record of stage, else the run's last record.
+        None when the run or stage is not stored.
+        """
+        with closing(self._connect()) as conn:
+            if seq is None:
+                if stage is None:
+                    found = conn.execute(
+                        "SELECT last_seq FROM snapshot_runs WHERE run_id = ?",
+                        (run_id,),
+                    ).fetchone()
+                else:
+                    found = conn.execute(
+                        "SELECT MAX(seq) FROM snapshots WHERE run_id = ? AND stage = ?",
+                        (run_id, stage),
+                    ).fetchone()
+                if found is None or found[0] is None:
+                    return None
+                seq = found[0]
+            return self._load(conn, run_id, seq)
+
+    def _load(self, conn: sqlite3.Connection, run_id: str, seq: int) -> Optional[Dict[str, Any]]:
+        (keyframe_seq,) = conn.execute(
+            "SELECT MAX(seq) FROM snapshots WHERE run_id = ? AND seq <= ? AND kind = 'full'",
+            (run_id, seq),
+        ).fetchone()
+        if keyframe_seq is None:
+            return None
+        rows = conn.execute(
+            "SELECT seq, stage, created_at, kind, payload FROM snapshots "
+            "WHERE run_id = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+            (run_id, keyframe_seq, seq),
+        ).fetchall()
+        if not rows or rows[-1][0] != seq:
+            return None
+        state: Dict[str, Any] = {}
+        for _seq, _stage, _created_at, kind, payload in rows:
+            body = json.loads(zlib.decompress(payload).decode("utf-8"))
+            state = body if kind == "full" else apply_delta(state, body)
+        _seq, stage, created_at, _kind, _payload = rows[-1]
+        return {
+            "timestamp": _iso(created_at),
+            "run_id": run_id,
+            "stage": stage,
+            "seq": seq,
+            "state": state,
+        }
+
+    def stages(self, run_id: str) -> List[Dict[str, Any]]:
+        """
+        The stored records of a run, oldest first, without their states.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT seq, stage, created_at, kind, LENGTH(payload) FROM snapshots "
+                "WHERE run_id = ? ORDER BY seq",
+                (run_id,),
+            ).fetchall()
+        return [
+            {"seq": seq, "stage": stage, "timestamp": _iso(created_at), "kind": kind, "bytes": size}
+            for seq, stage, created_at, kind, size in rows
+        ]
+
+    def runs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        The most recently updated runs, newest first.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT run_id, created_at, updated_at, last_seq, last_stage, final, bytes "
+                "FROM snapshot_runs ORDER BY updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "run_id": run_id,
+                "created_at": _iso(created_at),
+                "updated_at": _iso(updated_at),
+                "records": last_seq + 1,
+                "last_stage": last_stage,
+                "final": bool(final),
+                "bytes": size,
+            }
+            for run_id, created_at, updated_at, last_seq, last_stage, final, size in rows
+        ]
+
+    def iter_stage(self, stage: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the latest record of stage for each of the (at most limit)
+        most recent runs that have one, in the order they were written.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT run_id, MAX(seq), MAX(created_at) AS latest FROM snapshots "
+                "WHERE stage = ? GROUP BY run_id ORDER BY latest DESC LIMIT ?",
+                (stage, -1 if limit is None else limit),
+            ).fetchall()
+            for run_id, seq, _latest in reversed(rows):
+                record = self._load(conn, run_id, seq)
+                if record is not None:
+                    yield record
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            runs, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM snapshot_runs"
+            ).fetchone()
+            (records,) = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()
+        return {
+            "runs": runs,
+            "records": records,
+            "bytes": total,
+            "pruned_runs": self.pruned_runs,
+        }
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Background, delta-encoded state snapshot writer.
+
+save_state_snapshot only dumps the state and queues it; a writer thread
+pairs each dump with the run's previous one and hands them to a sink in
+batches. The JSONL log sink writes the first record of a run as the full
+state ("state") and later records as the changes since the previous one
+("delta", see core.state_delta); iter_snapshots rebuilds the full state
+of every record when reading the log back. The SQLite sink is
+core.snapshot_store.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.snapshot_store import SnapshotStore
+from core.state_delta import apply_delta, diff_state
+from config.snapshots import (
+    SNAPSHOT_LEVEL,
+    SNAPSHOT_SAMPLE_RATE,
+    SNAPSHOT_FLUSH_BATCH,
+    SNAPSHOT_FLUSH_INTERVAL_SEC,
+    SNAPSHOT_QUEUE_MAX,
+    SNAPSHOT_MAX_OPEN_RUNS,
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_LEVELS = ("off", "sampled", "full")
+
+# -------------------------------------------------
+# JSONL log
+# -------------------------------------------------
+
+class JsonlSink:
+    """
+    Appends records to an append-only JSONL log.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lines = "".join(json.dumps(self._record(entry), ensure_ascii=True) + "\n" for entry in entries)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+    @staticmethod
+    def _record(entry: Dict[str, Any]) -> Dict[str, Any]:
+        record: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(entry["timestamp"], timezone.utc).isoformat(),
+            "run_id": entry["run_id"],
+            "stage": entry["stage"],
+            "seq": entry["seq"],
+        }
+        if entry["previous"] is None:
+            record["state"] = entry["state"]
+        else:
+            record["delta"] = diff_state(entry["previous"], entry["state"])
+        if entry["final"]:
+            record["final"] = True
+        return record
+
+
+def open_sink(path: str):
+    return JsonlSink(path) if path.endswith(".jsonl") else SnapshotStore.from_config(path)
+
+
+# -------------------------------------------------
+# Writer
+# -------------------------------------------------
+
+def sampled(run_id: str, rate: float) -> bool:
+    # Decided by run_id alone, so every stage (and worker) of a run agrees.
+    bucket = int(hashlib.sha256(run_id.encode("utf-8")).hexdigest()[:8], 16)
+    return bucket < rate * 0x100000000
+
+
+class SnapshotWriter:
+    def __init__(
+        self,
+        path: str,
+        *,
+        level: str = SNAPSHOT_LEVEL,
+        sample_rate: float = SNAPSHOT_SAMPLE_RATE,
+        flush_batch: int = SNAPSHOT_FLUSH_BATCH,
+        flush_interval_sec: float = SNAPSHOT_FLUSH_INTERVAL_SEC,
+        queue_max: int = SNAPSHOT_QUEUE_MAX,
+        max_open_runs: int = SNAPSHOT_MAX_OPEN_RUNS,
+        sink: Any = None,
+    ) -> None:
+        """
+        sink receives each batch of entries (see _entry); by default it is
+        chosen from path (see open_sink) on the first write.
+        """
+        if level not in SNAPSHOT_LEVELS:
+            raise ValueError(f"Unknown snapshot level: {level}")
+        self.path = path
+        self.sink = sink
+        self.level = level
+        self._sample_rate = sample_rate
+        self._flush_batch = max(1, flush_batch)
+        self._flush_interval_sec = flush_interval_sec
+        self._max_open_runs = max_open_runs
+        self._queue: "queue.Queue[Tuple]" = queue.Queue(maxsize=queue_max)
+        self._flushing = threading.Event()
+        self._bases: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def records(self, run_id: str) -> bool:
+        if self.level == "off":
+            return False
+        return self.level == "full" or sampled(run_id, self._sample_rate)
+
+    def submit(self, state: Any, stage: str, *, final: bool = False) -> bool:
+        """
+        Queues a snapshot of state; never blocks. Returns False when the
+        level skips this run or the queue is full.
+        """
+        if not self.records(state.run_id):
+            return False
+        item = (time.time(), state.run_id, stage, state.model_dump(), final)
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning("Snapshot queue full; dropped %s snapshot of run %s", stage, state.run_id)
+            return False
+        return True
+
+    def flush(self) -> None:
+        """
+        Blocks until every queued snapshot is on disk.
+        """
+        if self._thread is None:
+            return
+        self._flushing.set()
+        try:
+            self._queue.join()
+        finally:
+            self._flushing.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "level": self.level,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize(),
+            "open_runs": len(self._bases),
+        }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="snapshots", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self._flush_interval_sec
+            while len(items) < self._flush_batch and not self._flushing.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=min(remaining, 0.05)))
+                except queue.Empty:
+                    continue
+            while len(items) < self._flush_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write([self._entry(*item) for item in items])
+            except Exception:
+                logger.exception("Writing %d snapshots to %s failed", len(items), self.path)
+                # The lost records cannot be delta bases; restart those runs
+                # with a full state.
+                for item in items:
+                    self._bases.pop(item[1], None)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _entry(
+        self,
+        timestamp: float,
+        run_id: str,
+        stage: str,
+        data: Dict[str, Any],
+        final: bool,
+    ) -> Dict[str, Any]:
+        # previous is the run's last dump handed to the sink, or None for
+        # its first (or the first after its base was evicted).
+        previous = self._bases.pop(run_id, None)
+        seq = 0 if previous is None else previous[0] + 1
+        if not final:
+            self._bases[run_id] = (seq, data)
+            while len(self._bases) > self._max_open_runs:
+                self._bases.popitem(last=False)
+        return {
+            "timestamp": timestamp,
+            "run_id": run_id,
+            "stage": stage,
+            "seq": seq,
+            "state": data,
+            "previous": None if previous is None else previous[1],
+            "final": final,
+        }
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        if self.sink is None:
+            self.sink = open_sink(self.path)
+        self.sink.write(entries)
+        self.written += len(entries)
+
+
+_writers: Dict[str, SnapshotWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def snapshot_writer(path: str) -> SnapshotWriter:
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.setdefault(path, SnapshotWriter(path))
+    return writer
+
+
+@atexit.register
+def flush_snapshots() -> None:
+    for writer in list(_writers.values()):
+        writer.flush()
+
+
+# -------------------------------------------------
+# Reader
+# -------------------------------------------------
+
+def iter_snapshots(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every record of a snapshot log with its full "state" rebuilt.
+    Records written before delta encoding (no run_id) pass through as
+    they are; a delta whose run has no earlier record is skipped.
+    """
+    if not os.path.exists(path):
+        return
+    current: Dict[str, Dict[str, Any]] = {}
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            run_id = record.get("run_id")
+            if run_id is None:
+                yield record
+                continue
+            if "delta" in record:
+                base = current.get(run_id)
+                if base is None:
+                    continue
+                record["state"] = apply_delta(base, record.pop("delta"))
+            if record.get("final"):
+                current.pop(run_id, None)
+            else:
+                current[run_id] = record.get("state") or {}
+            yield record
+
+
+def iter_stage_snapshots(path: str, stage: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the records of stage, with full states, from a snapshot log or
+    store (chosen by path as for writing). From a store, only the latest
+    record per run and at most limit runs.
+    """
+    if not os.path.exists(path):
+        return
+    if path.endswith(".jsonl"):
+        for record in iter_snapshots(path):
+            if record.get("stage") == stage:
+                yield record
+        return
+    yield from SnapshotStore.from_config(path).iter_stage(stage, limit)
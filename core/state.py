@@ -4,12 +4,13 @@ This file defines what information exists in the system at any point in time.
 (Pydantic-based state schema for LangGraph)
 """
 
-from typing import Dict, List, Any
-import json
-import os
-from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+import uuid
 from pydantic import BaseModel, Field
 
+from core.snapshots import snapshot_writer
+from config.snapshots import SNAPSHOT_PATH
+
 
 # -------------------------------------------------
 # User Profile
@@ -46,9 +47,20 @@ class PlannerOutput(BaseModel):
 # -------------------------------------------------
 
 class TutoringState(BaseModel):
+    # ---- Run ----
+    # Identifies the run's snapshots (deltas are chained per run, and the
+    # snapshot store is indexed by it).
+    run_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+
     # ---- User Input ----
     user_profile: UserProfile
-    image_base64: str
+    # References into core.image_store, one per page (the bytes are kept
+    # there, once); pages are grounded in parallel and merged.
+    image_refs: List[str] = Field(..., min_length=1)
+
+    # ---- Request Budget ----
+    # Absolute end-to-end deadline (epoch seconds); None means unbounded.
+    deadline_at: Optional[float] = None
 
     # ---- Multimodal Output ----
     grounded_context: GroundedContext = Field(default_factory=GroundedContext)
@@ -86,21 +98,13 @@ def save_state_snapshot(
     state: "TutoringState",
     stage: str,
     *,
-    output_dir: str = "logs",
-    redact_image: bool = True,
+    path: str = SNAPSHOT_PATH,
+    final: bool = False,
 ) -> str:
-    data = state.model_dump()
-    if redact_image:
-        data["image_base64"] = "[redacted]"
-
-    payload = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "stage": stage,
-        "state": data,
-    }
-
-    os.makedirs(output_dir, exist_ok=True)
-    path = os.path.join(output_dir, "state.jsonl")
-    with open(path, "a", encoding="utf-8") as handle:
-        handle.write(json.dumps(payload, ensure_ascii=True) + "\n")
+    """
+    Queues a snapshot for the background writer (core.snapshots); the
+    caller only pays for the state dump, and nothing at level "off".
+    final marks the run's last snapshot.
+    """
+    snapshot_writer(path).submit(state, stage, final=final)
     return path
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Deltas between two JSON-like state dumps.
+
+A delta holds set / unset / append operations on JSON-pointer paths; it
+is what the snapshot log and the snapshot store write in place of the
+full state for most stages.
+"""
+
+from typing import Any, Dict, List
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _parts(pointer: str) -> List[str]:
+    if not pointer:
+        return []
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+
+def _diff(old: Any, new: Any, pointer: str, delta: Dict[str, Any]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            child = f"{pointer}/{_escape(key)}"
+            if key not in old:
+                delta["set"][child] = value
+            elif old[key] != value:
+                _diff(old[key], value, child, delta)
+        for key in old:
+            if key not in new:
+                delta["unset"].append(f"{pointer}/{_escape(key)}")
+        return
+    if (
+        isinstance(old, list)
+        and isinstance(new, list)
+        and len(new) > len(old)
+        and new[:len(old)] == old
+    ):
+        delta["append"][pointer] = new[len(old):]
+        return
+    delta["set"][pointer] = new
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Changes turning old into new. Dicts are compared key by key, a list
+    that only grew is recorded as the appended items, anything else is
+    replaced whole.
+    """
+    delta: Dict[str, Any] = {"set": {}, "unset": [], "append": {}}
+    _diff(old, new, "", delta)
+    return {op: value for op, value in delta.items() if value}
+
+
+def _update(node: Any, parts: List[str], fn) -> Any:
+    if not parts:
+        return fn(node)
+    copy = dict(node)
+    copy[parts[0]] = _update(node.get(parts[0]), parts[1:], fn)
+    return copy
+
+
+def _remove(node: Dict[str, Any], parts: List[str]) -> Dict[str, Any]:
+    copy = dict(node)
+    if len(parts) == 1:
+        copy.pop(parts[0], None)
+    else:
+        copy[parts[0]] = _remove(node[parts[0]], parts[1:])
+    return copy
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The state after delta. base is left untouched: changed paths are
+    copied, unchanged branches shared.
+    """
+    state = base
+    for pointer in delta.get("unset", []):
+        state = _remove(state, _parts(pointer))
+    for pointer, value in delta.get("set", {}).items():
+        state = _update(state, _parts(pointer), lambda _old, value=value: value)
+    for pointer, items in delta.get("append", {}).items():
+        state = _update(state, _parts(pointer), lambda old, items=items: list(old or []) + items)
+    return state
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Per-stage progress events for streaming clients.
+
+Events go through LangGraph's custom stream channel, so they are only
+delivered when the graph runs with stream_mode="custom"; plain
+invoke()/ainvoke() calls ignore them.
+"""
+
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from langgraph.config import get_stream_writer
+
+logger = logging.getLogger(__name__)
+
+
+def stage_event_writer() -> Optional[Callable[[Any], None]]:
+    """
+    Returns the active stream writer, or None outside of a graph run.
+
+    Must be called on the node's own thread/task: worker threads do not
+    inherit the runnable context.
+    """
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return None
+
+
+def build_stage_event(
+    stage: str,
+    output: Any,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    meta = meta or {}
+    return {
+        "event": "stage",
+        "stage": stage,
+        "output": output,
+        "timing": {
+            "duration_ms": meta.get("duration_ms", 0),
+            "attempts": meta.get("attempts", 1),
+            "fallback_used": meta.get("fallback_used", False),
+            "timeout": meta.get("timeout", False),
+        },
+    }
+
+
+def emit_stage_event(
+    stage: str,
+    output: Any,
+    meta: Optional[Dict[str, Any]] = None,
+    *,
+    writer: Optional[Callable[[Any], None]] = None,
+) -> None:
+    writer = writer or stage_event_writer()
+    if writer is None:
+        return
+    try:
+        writer(build_stage_event(stage, output, meta))
+    except Exception:
+        # A broken stream must never fail the pipeline itself.
+        logger.exception("Failed to emit stage event for %s", stage)
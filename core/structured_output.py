@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Schema-constrained LLM calls for agents with typed outputs.
+"""
+
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+from config.structured_output import STRUCTURED_OUTPUT_ENABLED, STRUCTURED_OUTPUT_AGENTS
+
+
+def supports_structured_output(llm, agent_id: str) -> bool:
+    return (
+        STRUCTURED_OUTPUT_ENABLED
+        and agent_id in STRUCTURED_OUTPUT_AGENTS
+        and callable(getattr(llm, "with_structured_output", None))
+    )
+
+
+def _validated(schema: Type[BaseModel], result: Any) -> Dict[str, Any]:
+    if result is None:
+        raise ValueError(f"LLM returned no {schema.__name__}")
+    if not isinstance(result, schema):
+        result = schema.model_validate(result)
+    return result.model_dump()
+
+
+def invoke_structured(llm, prompt: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Invokes llm constrained to schema and returns the validated output as a
+    plain dict. Raises when the model output does not fit the schema.
+    """
+    return _validated(schema, llm.with_structured_output(schema).invoke(prompt))
+
+
+async def ainvoke_structured(llm, prompt: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    return _validated(schema, await llm.with_structured_output(schema).ainvoke(prompt))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Builds the dependency graph (DAG) between planner subtasks.
+
+Two tasks conflict when one writes a state field the other reads or writes.
+Conflicting tasks keep their relative position from plan.execution_order;
+everything else may run concurrently.
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from config.agent_registry import AGENT_STATE_IO
+
+logger = logging.getLogger(__name__)
+
+
+def _fields_overlap(left: str, right: str) -> bool:
+    """
+    "knowledge_base" overlaps "knowledge_base.solver";
+    "knowledge_base.solver" does not overlap "knowledge_base.evaluator".
+    """
+    if left == right:
+        return True
+    return left.startswith(right + ".") or right.startswith(left + ".")
+
+
+def _any_overlap(left: Tuple[str, ...], right: Tuple[str, ...]) -> bool:
+    return any(_fields_overlap(a, b) for a in left for b in right)
+
+
+def _agent_io(agent_id: Optional[str]) -> Optional[Dict[str, Tuple[str, ...]]]:
+    io = AGENT_STATE_IO.get(agent_id) if agent_id else None
+    if io is None:
+        return None
+    return {
+        "reads": tuple(io.get("reads", ())),
+        "writes": tuple(io.get("writes", ())),
+    }
+
+
+def _conflicts(
+    earlier: Optional[Dict[str, Tuple[str, ...]]],
+    later: Optional[Dict[str, Tuple[str, ...]]],
+) -> bool:
+    # Agents without a declaration are treated as full barriers.
+    if earlier is None or later is None:
+        return True
+    return (
+        _any_overlap(later["reads"], earlier["writes"])
+        or _any_overlap(later["writes"], earlier["writes"])
+        or _any_overlap(later["writes"], earlier["reads"])
+    )
+
+
+def build_task_dependencies(
+    execution_order: List[str],
+    subtasks: Dict[str, Dict[str, Any]],
+) -> Dict[str, Set[str]]:
+    """
+    Returns {task_id: set of task_ids that must complete first}.
+
+    Only tasks present in both execution_order and subtasks are included.
+    """
+    ordered = [task_id for task_id in execution_order if task_id in subtasks]
+    io_by_task = {
+        task_id: _agent_io(subtasks[task_id].get("executed_by"))
+        for task_id in ordered
+    }
+
+    dependencies: Dict[str, Set[str]] = {}
+    for index, task_id in enumerate(ordered):
+        deps = set()
+        for earlier_id in ordered[:index]:
+            if _conflicts(io_by_task[earlier_id], io_by_task[task_id]):
+                deps.add(earlier_id)
+        dependencies[task_id] = deps
+
+    logger.debug("Task dependencies: %s", dependencies)
+    return dependencies
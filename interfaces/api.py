@@ -3,18 +3,35 @@
 FastAPI interface for the tutoring pipeline.
 """
 
-import base64
+import hashlib
+import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List
 
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from core.graph import build_graph
+from core.plan_cache import PlanCache
+from core.grounding_cache import GroundingCache
+from core.question_index import QuestionIndex
+from core.single_flight import SingleFlight
+from core.image_store import IMAGES, image_digest
 from core.llm_loader import load_text_llm
 from core.state import TutoringState, UserProfile, ensure_state
+from core.latency import request_deadline
 from core.logging_config import configure_logging
-from config.api import MAX_IMAGE_BYTES, ALLOWED_IMAGE_TYPES, MAX_FIELD_LENGTH
+from config.api import (
+    MAX_IMAGE_BYTES,
+    MAX_IMAGES_PER_REQUEST,
+    MAX_TOTAL_IMAGE_BYTES,
+    IMAGE_READ_CHUNK_BYTES,
+    ALLOWED_IMAGE_TYPES,
+    MAX_FIELD_LENGTH,
+    REQUEST_COALESCING_ENABLED,
+)
+from config.cache import PLAN_CACHE_ENABLED, GROUNDING_CACHE_ENABLED, QUESTION_INDEX_ENABLED
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +39,13 @@ app = FastAPI(title="AI Tutoring Question Generator", version="1.0.0")
 
 
 class GenerateRequest(BaseModel):
-    image_base64: str = Field(..., min_length=1)
+    # References into core.image_store, one per page; the uploads' bytes are
+    # kept there once.
+    image_refs: List[str] = Field(..., min_length=1)
     class_level: str = Field(..., min_length=1)
     board: str = Field(..., min_length=1)
     target_exam: str = Field(..., min_length=1)
+    max_latency_ms: Optional[int] = Field(None, gt=0)
 
 
 class GenerateResponse(BaseModel):
@@ -35,22 +55,55 @@ class GenerateResponse(BaseModel):
     diagnostics: Dict[str, Any] = Field(default_factory=dict)
 
 
+def request_key(request: GenerateRequest) -> str:
+    """
+    Coalescing key: hash of the pages' bytes (in order) plus the student
+    profile. The latency budget is left out, so a request joins an identical
+    run already in flight even if it asked for a different budget.
+    """
+    pages = ",".join(image_digest(ref) or ref for ref in request.image_refs)
+    image = hashlib.sha256(pages.encode("utf-8")).hexdigest()
+    profile = "|".join(
+        value.strip().lower()
+        for value in (request.class_level, request.board, request.target_exam)
+    )
+    return image + ":" + hashlib.sha256(profile.encode("utf-8")).hexdigest()[:16]
+
+
+def _release_images(refs: List[str]) -> None:
+    for ref in refs:
+        IMAGES.release(ref)
+
+
 class Pipeline:
     def __init__(self) -> None:
         configure_logging()
         self._llm = load_text_llm()
-        self._graph = build_graph(self._llm)
+        self._plan_cache = PlanCache.from_config() if PLAN_CACHE_ENABLED else None
+        self._grounding_cache = GroundingCache.from_config() if GROUNDING_CACHE_ENABLED else None
+        self._question_index = QuestionIndex.from_config() if QUESTION_INDEX_ENABLED else None
+        self._graph = build_graph(
+            self._llm,
+            plan_cache=self._plan_cache,
+            grounding_cache=self._grounding_cache,
+            question_index=self._question_index,
+        )
+        self._single_flight = SingleFlight.from_config() if REQUEST_COALESCING_ENABLED else None
 
-    def run(self, request: GenerateRequest) -> GenerateResponse:
-        state = TutoringState(
+    @staticmethod
+    def _initial_state(request: GenerateRequest) -> TutoringState:
+        return TutoringState(
             user_profile=UserProfile(
                 class_level=request.class_level,
                 board=request.board,
                 target_exam=request.target_exam,
             ),
-            image_base64=request.image_base64,
+            image_refs=request.image_refs,
+            deadline_at=request_deadline(request.max_latency_ms),
         )
-        final_state = ensure_state(self._graph.invoke(state))
+
+    @staticmethod
+    def _to_response(final_state: TutoringState) -> GenerateResponse:
         return GenerateResponse(
             questions=final_state.question_bank,
             solutions=final_state.solver_output,
@@ -58,6 +111,79 @@ class Pipeline:
             diagnostics=final_state.run_diagnostics,
         )
 
+    def _coalesced_response(self, payload: Dict[str, Any], meta: Dict[str, Any]) -> GenerateResponse:
+        response = GenerateResponse(**payload)
+        response.diagnostics = {
+            **response.diagnostics,
+            "request_coalescing": {**meta, **self._single_flight.stats()},
+        }
+        return response
+
+    def _invoke(self, request: GenerateRequest) -> GenerateResponse:
+        state = self._initial_state(request)
+        final_state = ensure_state(self._graph.invoke(state))
+        return self._to_response(final_state)
+
+    async def _ainvoke(self, request: GenerateRequest) -> GenerateResponse:
+        state = self._initial_state(request)
+        final_state = ensure_state(await self._graph.ainvoke(state))
+        return self._to_response(final_state)
+
+    def run(self, request: GenerateRequest) -> GenerateResponse:
+        """
+        Identical concurrent requests (same pages and profile) share one run.
+        The request's image references are released when it returns.
+        """
+        try:
+            if self._single_flight is None:
+                return self._invoke(request)
+            payload, meta = self._single_flight.run(
+                request_key(request),
+                lambda: self._invoke(request).model_dump(),
+            )
+            return self._coalesced_response(payload, meta)
+        finally:
+            _release_images(request.image_refs)
+
+    async def arun(self, request: GenerateRequest) -> GenerateResponse:
+        """
+        Non-blocking run: awaits the graph on the caller's event loop.
+        Identical concurrent requests share one run, as in run().
+        """
+        try:
+            if self._single_flight is None:
+                return await self._ainvoke(request)
+
+            async def invoke() -> Dict[str, Any]:
+                return (await self._ainvoke(request)).model_dump()
+
+            payload, meta = await self._single_flight.arun(request_key(request), invoke)
+            return self._coalesced_response(payload, meta)
+        finally:
+            _release_images(request.image_refs)
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        return self._single_flight.stats() if self._single_flight is not None else {}
+
+    async def astream(self, request: GenerateRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields per-stage events as the graph runs, then a final result event.
+        """
+        state = self._initial_state(request)
+        final_state = None
+        try:
+            async for mode, chunk in self._graph.astream(state, stream_mode=["custom", "values"]):
+                if mode == "custom":
+                    yield chunk
+                else:
+                    final_state = chunk
+        finally:
+            _release_images(request.image_refs)
+        if final_state is None:
+            raise RuntimeError("Pipeline produced no final state")
+        response = self._to_response(ensure_state(final_state))
+        yield {"event": "result", "output": response.model_dump()}
+
 
 _pipeline: Optional[Pipeline] = None
 
@@ -74,6 +200,15 @@ def health_check() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics/coalescing")
+def coalescing_metrics(pipeline: Pipeline = Depends(get_pipeline)) -> Dict[str, int]:
+    """
+    Single-flight counters for this worker: runs led, requests coalesced
+    (within the worker and from other workers), and runs in flight.
+    """
+    return pipeline.coalescing_stats()
+
+
 def _validate_text_field(name: str, value: str) -> str:
     cleaned = value.strip()
     if not cleaned:
@@ -83,35 +218,155 @@ def _validate_text_field(name: str, value: str) -> str:
     return cleaned
 
 
+async def _store_upload(image: UploadFile, budget: int) -> str:
+    """
+    Reads the upload in chunks, hashing as it goes and stopping as soon as
+    it exceeds the per-image limit or the request's remaining byte budget;
+    returns the image store reference.
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    while True:
+        chunk = await image.read(IMAGE_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=400, detail="Image too large")
+        if size > budget:
+            raise HTTPException(status_code=400, detail="Images too large in total")
+        digest.update(chunk)
+        chunks.append(chunk)
+    if not size:
+        raise HTTPException(status_code=400, detail="Empty file uploaded")
+    return IMAGES.put(b"".join(chunks), image.content_type, digest=digest.hexdigest())
+
+
+async def _store_uploads(images: List[UploadFile]) -> List[str]:
+    refs: List[str] = []
+    budget = MAX_TOTAL_IMAGE_BYTES
+    try:
+        for image in images:
+            ref = await _store_upload(image, budget)
+            refs.append(ref)
+            budget -= len(IMAGES.get(ref))
+    except BaseException:
+        _release_images(refs)
+        raise
+    return refs
+
+
+async def _build_generate_request(
+    class_level: str,
+    board: str,
+    target_exam: str,
+    images: List[UploadFile],
+    max_latency_ms: Optional[int] = None,
+) -> GenerateRequest:
+    if not images:
+        raise HTTPException(status_code=400, detail="At least one image is required")
+    if len(images) > MAX_IMAGES_PER_REQUEST:
+        raise HTTPException(status_code=400, detail="Too many images")
+    if any(image.content_type not in ALLOWED_IMAGE_TYPES for image in images):
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    class_level_clean = _validate_text_field("class", class_level)
+    board_clean = _validate_text_field("board", board)
+    target_exam_clean = _validate_text_field("target_exam", target_exam)
+    if max_latency_ms is not None and max_latency_ms <= 0:
+        raise HTTPException(status_code=400, detail="max_latency_ms must be positive")
+    # Read last so a rejected form never holds an image in the store.
+    image_refs = await _store_uploads(images)
+    return GenerateRequest(
+        image_refs=image_refs,
+        class_level=class_level_clean,
+        board=board_clean,
+        target_exam=target_exam_clean,
+        max_latency_ms=max_latency_ms,
+    )
+
+
 @app.post("/generate", response_model=GenerateResponse)
 async def generate_questions(
     class_level: str = Form(..., alias="class"),
     board: str = Form(...),
     target_exam: str = Form(...),
-    image: UploadFile = File(...),
+    image: List[UploadFile] = File(...),
+    max_latency_ms: Optional[int] = Form(None),
     pipeline: Pipeline = Depends(get_pipeline),
 ) -> GenerateResponse:
     logger.info("Received generate request")
     try:
-        if image.content_type not in ALLOWED_IMAGE_TYPES:
-            raise HTTPException(status_code=400, detail="Unsupported image type")
-        content = await image.read()
-        if len(content) > MAX_IMAGE_BYTES:
-            raise HTTPException(status_code=400, detail="Image too large")
-        if not content:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
-        class_level_clean = _validate_text_field("class", class_level)
-        board_clean = _validate_text_field("board", board)
-        target_exam_clean = _validate_text_field("target_exam", target_exam)
-        request = GenerateRequest(
-            image_base64=base64.b64encode(content).decode("utf-8"),
-            class_level=class_level_clean,
-            board=board_clean,
-            target_exam=target_exam_clean,
+        request = await _build_generate_request(
+            class_level, board, target_exam, image, max_latency_ms
         )
-        return pipeline.run(request)
+        return await pipeline.arun(request)
     except HTTPException:
         raise
     except Exception as exc:
         logger.exception("Pipeline failed: %s", exc)
         raise HTTPException(status_code=500, detail="Pipeline execution failed")
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    name = event.get("event", "message")
+    data = json.dumps(event, ensure_ascii=True, default=str)
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+async def _sse_stream(
+    pipeline: Pipeline,
+    request: GenerateRequest,
+) -> AsyncIterator[str]:
+    try:
+        async for event in pipeline.astream(request):
+            yield _format_sse(event)
+    except Exception as exc:
+        logger.exception("Streaming pipeline failed: %s", exc)
+        yield _format_sse({"event": "error", "detail": "Pipeline execution failed"})
+
+
+class _ImageStreamingResponse(StreamingResponse):
+    """
+    Releases the request's images however the response ends: the body may
+    never be iterated if the client disconnects before it starts, so the
+    pipeline's own release cannot be relied on here.
+    """
+
+    def __init__(self, content: AsyncIterator[str], image_refs: List[str], **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self._image_refs = image_refs
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _release_images(self._image_refs)
+
+
+@app.post("/generate/stream")
+async def generate_questions_stream(
+    class_level: str = Form(..., alias="class"),
+    board: str = Form(...),
+    target_exam: str = Form(...),
+    image: List[UploadFile] = File(...),
+    max_latency_ms: Optional[int] = Form(None),
+    pipeline: Pipeline = Depends(get_pipeline),
+) -> StreamingResponse:
+    """
+    Server-Sent Events variant of /generate.
+
+    Emits one "stage" event per graph node and per executed agent, then a
+    final "result" event with the same payload /generate returns.
+    Disconnecting cancels the remaining pipeline work.
+    """
+    logger.info("Received streaming generate request")
+    request = await _build_generate_request(
+        class_level, board, target_exam, image, max_latency_ms
+    )
+    return _ImageStreamingResponse(
+        _sse_stream(pipeline, request),
+        request.image_refs,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -10,10 +10,20 @@ This file:
 # main.py
 
 import logging
+from typing import Optional, Sequence, Union
 
-from core.graph import build_graph
+from core.graph import build_graph, resume_run
+from core.snapshot_store import SnapshotStore
 from core.logging_config import configure_logging
 from core.llm_loader import load_text_llm
+from core.plan_cache import PlanCache
+from core.grounding_cache import GroundingCache
+from core.question_index import QuestionIndex
+from core.image_store import IMAGES
+from config.cache import PLAN_CACHE_ENABLED, GROUNDING_CACHE_ENABLED, QUESTION_INDEX_ENABLED
+from core.latency import request_deadline
+from config.api import IMAGE_READ_CHUNK_BYTES
+from config.snapshots import SNAPSHOT_PATH
 
 # -------------------------------------------------
 # LLM SETUP (example: Gemini / OpenAI / Claude)
@@ -29,14 +39,18 @@ logger = logging.getLogger(__name__)
 
 
 # -------------------------------------------------
-# Image loader (base64)
+# Image loader
 # -------------------------------------------------
 
-import base64
+import mimetypes
 
-def load_image_base64(path: str) -> str:
+def load_image(path: str) -> str:
+    """
+    Reads the image into the image store; returns its reference.
+    """
+    mime_type = mimetypes.guess_type(path)[0] or "image/png"
     with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+        return IMAGES.put_chunks(iter(lambda: f.read(IMAGE_READ_CHUNK_BYTES), b""), mime_type)
 
 
 # -------------------------------------------------
@@ -44,15 +58,24 @@ def load_image_base64(path: str) -> str:
 # -------------------------------------------------
 
 def run_pipeline(
-    image_path: str,
+    image_path: Union[str, Sequence[str]],
     class_level: str,
     board: str,
     target_exam: str,
+    max_latency_ms: Optional[int] = None,
 ):
     configure_logging()
     logger.info("Starting pipeline run")
     llm = load_text_llm()
-    graph = build_graph(llm)
+    plan_cache = PlanCache.from_config() if PLAN_CACHE_ENABLED else None
+    grounding_cache = GroundingCache.from_config() if GROUNDING_CACHE_ENABLED else None
+    question_index = QuestionIndex.from_config() if QUESTION_INDEX_ENABLED else None
+    graph = build_graph(
+        llm,
+        plan_cache=plan_cache,
+        grounding_cache=grounding_cache,
+        question_index=question_index,
+    )
 
     # Initialize state (Pydantic handles defaults)
     initial_state = TutoringState(
@@ -61,7 +84,9 @@ def run_pipeline(
             board=board,
             target_exam=target_exam,
         ),
-        image_base64=load_image_base64(image_path),
+        # One path, or several pages of the same chapter.
+        image_refs=[load_image(path) for path in ([image_path] if isinstance(image_path, str) else image_path)],
+        deadline_at=request_deadline(max_latency_ms),
     )
 
     # Run workflow
@@ -75,6 +100,36 @@ def run_pipeline(
     }
 
 
+def resume_pipeline(
+    run_id: str,
+    stage: Optional[str] = None,
+    max_latency_ms: Optional[int] = None,
+):
+    """
+    Re-runs a stored run from the stage after `stage` (default: its last
+    stored stage), e.g. to reproduce an incident from its snapshots.
+    """
+    configure_logging()
+    if SNAPSHOT_PATH.endswith(".jsonl"):
+        raise RuntimeError("Resuming needs the snapshot store; SNAPSHOT_PATH is a JSONL log")
+    logger.info("Resuming run %s", run_id)
+    final_state = resume_run(
+        SnapshotStore.from_config(SNAPSHOT_PATH),
+        run_id,
+        load_text_llm(),
+        stage=stage,
+        max_latency_ms=max_latency_ms,
+        plan_cache=PlanCache.from_config() if PLAN_CACHE_ENABLED else None,
+        question_index=QuestionIndex.from_config() if QUESTION_INDEX_ENABLED else None,
+    )
+    return {
+        "run_id": final_state.run_id,
+        "questions": final_state.question_bank,
+        "solutions": final_state.solver_output,
+        "evaluation": final_state.evaluation,
+    }
+
+
 # -------------------------------------------------
 # Example usage
 # -------------------------------------------------
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Normalizes uploaded images before multimodal grounding.
+
+Sniffs the real format from the file header (the declared content type is
+often wrong), applies the EXIF orientation, downscales to
+IMAGE_MAX_DIMENSION and re-encodes as JPEG. The result is used when the
+image was downscaled or re-encoding saves enough bytes; otherwise the
+original bytes go out with the corrected MIME type. Documents (PDF) are
+passed through unchanged. Pillow is optional: without it only the MIME
+type is corrected.
+"""
+
+import io
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from config.image import (
+    IMAGE_MAX_DIMENSION,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_MIN_SAVINGS_FRACTION,
+    IMAGE_NORMALIZE_WORKERS,
+)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - exercised only without Pillow
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+)
+
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """
+    MIME type from the file header, or None when it is not recognized.
+    """
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic"
+    return None
+
+
+def _flatten(image):
+    # JPEG has no alpha channel: composite transparent images onto white.
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if image.mode not in ("RGB", "L"):
+        return image.convert("RGB")
+    return image
+
+
+def _reencode(data: bytes, max_dimension: int, quality: int) -> Tuple[bytes, Tuple[int, int], Tuple[int, int]]:
+    with Image.open(io.BytesIO(data)) as image:
+        original_size = image.size
+        if image.format == "JPEG":
+            # Lets the JPEG decoder skip straight to a reduced scale.
+            image.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        image = _flatten(image)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality, optimize=True)
+        return buffer.getvalue(), original_size, image.size
+
+
+def normalize_image(
+    data: bytes,
+    declared_mime_type: Optional[str] = None,
+    *,
+    max_dimension: int = IMAGE_MAX_DIMENSION,
+    quality: int = IMAGE_JPEG_QUALITY,
+    min_savings: float = IMAGE_MIN_SAVINGS_FRACTION,
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Returns (image bytes, MIME type, report). The report records the
+    declared and sniffed types, byte counts before/after, bytes saved,
+    pixel sizes, and whether the image was resized or re-encoded.
+    """
+    start = time.perf_counter()
+    mime_type = sniff_mime_type(data) or declared_mime_type or "image/png"
+    report: Dict[str, Any] = {
+        "declared_mime_type": declared_mime_type,
+        "mime_type": mime_type,
+        "original_bytes": len(data),
+        "bytes": len(data),
+        "bytes_saved": 0,
+        "resized": False,
+        "reencoded": False,
+    }
+    result = data
+    if not mime_type.startswith("image/"):
+        report["skipped"] = "not an image"
+    elif Image is None:
+        report["skipped"] = "Pillow not installed"
+    else:
+        try:
+            encoded, original_size, size = _reencode(data, max_dimension, quality)
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            logger.warning("Image normalization failed, sending the original: %s", exc)
+            report["error"] = str(exc)
+        else:
+            resized = size != original_size and max(original_size) > max_dimension
+            report.update(original_size=list(original_size), size=list(original_size), resized=resized)
+            if resized or len(encoded) <= len(data) * (1 - min_savings):
+                result, mime_type = encoded, "image/jpeg"
+                report.update(mime_type=mime_type, size=list(size), reencoded=True)
+    report["bytes"] = len(result)
+    report["bytes_saved"] = len(data) - len(result)
+    report["duration_ms"] = int((time.perf_counter() - start) * 1000)
+    return result, mime_type, report
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=max(1, IMAGE_NORMALIZE_WORKERS),
+                    thread_name_prefix="image",
+                )
+    return _pool
+
+
+def submit_normalization(data: bytes, declared_mime_type: Optional[str] = None) -> Future:
+    """
+    Runs normalize_image on the shared image worker pool.
+    """
+    return _get_pool().submit(normalize_image, data, declared_mime_type)
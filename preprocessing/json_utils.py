@@ -6,8 +6,22 @@ This file guarantees valid JSON
 # preprocessing/json_utils.py
 
 import json
+import logging
 import re
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CODE_FENCE = re.compile(r"```(?:json)?")
+_OPENING = re.compile(r"[\{\[]")
+_CLOSERS = {"{": "}", "[": "]"}
+_DECODER = json.JSONDecoder()
+
+# How many cut points a truncated-output repair tries before giving up.
+MAX_REPAIR_ATTEMPTS = 32
+
+# A walk frame: (closing bracket, inside an array item, parent frame).
+_Frame = Tuple[str, bool, Any]
 
 
 class JSONExtractionError(Exception):
@@ -15,40 +29,319 @@ class JSONExtractionError(Exception):
     pass
 
 
-def extract_json_from_llm(raw_text: str) -> Any:
+def _closing(frame: Optional[_Frame]) -> str:
+    closers: List[str] = []
+    while frame is not None:
+        closers.append(frame[0])
+        frame = frame[2]
+    return "".join(closers)
+
+
+def _truncation_cuts(
+    text: str,
+    start: int,
+) -> Tuple[Optional[List[Tuple[int, _Frame]]], int]:
     """
-    Extracts the first valid JSON object or array from LLM output.
+    Walks the container opened at text[start] and returns the places it can
+    be cut and closed, as (end_index, open_frame), plus the index the walk
+    stopped at. Cuts are None when the container is closed (or malformed)
+    before the text ends, i.e. it is not a truncation.
+
+    No cut falls inside an object that is an array element, so a repaired
+    array only keeps items that were complete.
+    """
+    # Frames are linked to their parent, so a push or pop is constant time
+    # and a cut only keeps its innermost open frame; the closing brackets
+    # are spelled out by _closing() for the few cuts a repair tries.
+    frame: Optional[_Frame] = None
+    cuts: List[Tuple[int, _Frame]] = []
+    in_string = False
+    escaped = False
+
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            parent_closer, parent_in_item = (frame[0], frame[1]) if frame else ("", False)
+            in_item = parent_in_item or (char == "{" and parent_closer == "]")
+            frame = (_CLOSERS[char], in_item, frame)
+            if not in_item:
+                cuts.append((index + 1, frame))
+        elif char in "}]":
+            if frame is None or frame[0] != char or frame[2] is None:
+                return None, index + 1
+            frame = frame[2]
+            if not frame[1]:
+                cuts.append((index + 1, frame))
+        elif char == "," and not frame[1]:
+            cuts.append((index, frame))
+
+    return (cuts if frame is not None else None), len(text)
+
+
+def _complete_values(text: str, start: int, end: int) -> List[Tuple[int, int, Any]]:
+    """
+    Returns the outermost containers that open and close inside
+    text[start:end], decoded, as (start, end, value). Used on the prefix a
+    failed decode got through, which is known to be well formed.
+    """
+    spans: List[Tuple[int, int]] = []
+    openers: List[int] = []
+    in_string = False
+    escaped = False
+    for index in range(start, end):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            openers.append(index)
+        elif char in "}]" and openers:
+            opened = openers.pop()
+            # Anything this container encloses was recorded first; drop it.
+            while spans and spans[-1][0] > opened:
+                spans.pop()
+            spans.append((opened, index + 1))
+
+    values: List[Tuple[int, int, Any]] = []
+    for opened, closed in spans:
+        try:
+            value, _ = _DECODER.raw_decode(text, opened)
+        except (json.JSONDecodeError, RecursionError):
+            continue
+        values.append((opened, closed, value))
+    return values
+
+
+def _repair_truncated(
+    text: str,
+    start: int,
+    cuts: List[Tuple[int, _Frame]],
+) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    for end, frame in reversed(cuts[-MAX_REPAIR_ATTEMPTS:]):
+        closers = _closing(frame)
+        try:
+            value = json.loads(text[start:end] + closers)
+        except (json.JSONDecodeError, RecursionError):
+            continue
+        return value, {
+            "closed": closers,
+            "dropped_chars": len(text) - end,
+        }
+    return None
+
+
+def extract_json_with_report(raw_text: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Extracts the best JSON object or array from LLM output.
 
-    Handles cases where JSON is wrapped in Markdown or surrounded by text.
+    Returns (value, report). report["strategy"] is "direct" (the whole
+    response parsed), "scan" (picked the largest of report["candidates"]
+    embedded values) or "repaired" (output was truncated; open arrays and
+    objects were closed after the last complete item, see report["repair"]).
     """
 
     if not isinstance(raw_text, str):
         raise JSONExtractionError("LLM output is not a string")
 
     # Remove Markdown code fences if present
-    cleaned = re.sub(r"```(?:json)?", "", raw_text).strip()
+    cleaned = _CODE_FENCE.sub("", raw_text).strip()
 
     # Try direct parsing first
     try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
+        return json.loads(cleaned), {"strategy": "direct", "candidates": 1}
+    except (json.JSONDecodeError, RecursionError):
         pass
 
-    # Fallback: extract JSON object or array using regex
-    json_pattern = re.compile(
-        r"(\{.*\}|\[.*\])",
-        re.DOTALL
-    )
+    # Scan every opening bracket once; a parsed value is skipped over whole,
+    # so nested containers are never decoded twice. A container that fails
+    # to decode is walked once to see whether it runs to the end of the text
+    # (truncated output); brackets inside an already walked container are
+    # not walked again. The scan then resumes where the decode failed: every
+    # bracket before that point either opens a value that was complete (taken
+    # from the well-formed prefix) or encloses the error and would fail again.
+    candidates: List[Tuple[int, int, Any]] = []
+    truncated: Optional[Tuple[int, List[Tuple[int, _Frame]]]] = None
+    walked_until = 0
+    position = 0
+    while True:
+        match = _OPENING.search(cleaned, position)
+        if match is None:
+            break
+        start = match.start()
+        try:
+            value, end = _DECODER.raw_decode(cleaned, start)
+        except (json.JSONDecodeError, RecursionError) as exc:
+            stopped = None
+            if truncated is None and start >= walked_until:
+                cuts, walked_until = _truncation_cuts(cleaned, start)
+                stopped = walked_until
+                if cuts:
+                    truncated = (start, cuts)
+            if isinstance(exc, json.JSONDecodeError):
+                failed_at = exc.pos
+            else:
+                # Nested too deeply to decode at all; skip the container.
+                failed_at = stopped if stopped is not None else _truncation_cuts(cleaned, start)[1]
+            failed_at = max(failed_at, start + 1)
+            candidates.extend(_complete_values(cleaned, start + 1, failed_at))
+            position = failed_at
+            continue
+        candidates.append((start, end, value))
+        position = end
+
+    best = max(candidates, key=lambda item: item[1] - item[0], default=None)
+
+    # Recover truncated output unless a complete value covering more text
+    # was found.
+    if truncated is not None:
+        truncated_start, cuts = truncated
+        repaired = _repair_truncated(cleaned, truncated_start, cuts)
+        if repaired is not None:
+            value, repair = repaired
+            span = len(cleaned) - repair["dropped_chars"] - truncated_start
+            if best is None or span > best[1] - best[0]:
+                logger.warning(
+                    "Repaired truncated JSON: closed %r, dropped %d chars",
+                    repair["closed"],
+                    repair["dropped_chars"],
+                )
+                return value, {
+                    "strategy": "repaired",
+                    "candidates": len(candidates),
+                    "repair": repair,
+                }
 
-    match = json_pattern.search(cleaned)
-    if not match:
+    if best is None:
         raise JSONExtractionError("No JSON object found in LLM output")
+    return best[2], {"strategy": "scan", "candidates": len(candidates)}
 
-    json_str = match.group(1)
 
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError as e:
-        raise JSONExtractionError(
-            f"Extracted JSON is invalid: {e}"
-        ) from e
+def extract_json_from_llm(raw_text: str) -> Any:
+    """
+    Extracts the first valid JSON object or array from LLM output.
+
+    Handles cases where JSON is wrapped in Markdown or surrounded by text,
+    and recovers the complete items of truncated output.
+    """
+    value, _report = extract_json_with_report(raw_text)
+    return value
+
+
+class IncrementalJSONItems:
+    """
+    Picks complete items out of a question-bank-shaped JSON document while
+    it is still being streamed.
+
+    feed() takes the next chunk of text and returns (section, index, item)
+    for every object that finished inside a top-level section array
+    ({"mcq": [{...}, ...], ...}); a bare top-level array counts as "mcq",
+    as in the agents' parsers. Leading prose and code fences are skipped,
+    and parsing stops after the first top-level value that yielded items.
+    Items that do not decode are dropped; the final document should still
+    be parsed with extract_json_with_report.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._position = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = ""
+        self._section: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self._counts: Dict[str, int] = {}
+        self._done = False
+
+    @property
+    def items(self) -> int:
+        return sum(self._counts.values())
+
+    def _section_depth(self) -> int:
+        # Depth of a section array: inside the top-level object, or the
+        # top-level array itself.
+        return 1 if self._stack[:1] == ["["] else 2
+
+    def feed(self, chunk: str) -> List[Tuple[str, int, Any]]:
+        found: List[Tuple[str, int, Any]] = []
+        if self._done or not chunk:
+            return found
+        self._text += chunk
+        text = self._text
+
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._stack == ["{"]:
+                        self._last_string = text[self._string_start:index]
+                continue
+            if not self._stack and char not in "{[":
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = index + 1
+            elif char in "{[":
+                if char == "{" and self._item_start is None and self._section is not None \
+                        and len(self._stack) == self._section_depth():
+                    self._item_start = index
+                if char == "[" and not self._stack:
+                    self._section = "mcq"
+                elif char == "[" and self._stack == ["{"]:
+                    self._section = self._last_string
+                self._stack.append(char)
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if not self._stack:
+                    self._section = None
+                    self._item_start = None
+                    if self.items:
+                        self._done = True
+                        self._position = index + 1
+                        return found
+                    # A bracketed aside in leading prose; keep looking.
+                    continue
+                if char == "}" and self._item_start is not None \
+                        and len(self._stack) == self._section_depth():
+                    item = self._decode(text[self._item_start:index + 1])
+                    self._item_start = None
+                    if item is not None:
+                        count = self._counts.get(self._section, 0)
+                        self._counts[self._section] = count + 1
+                        found.append((self._section, count, item))
+                elif char == "]" and len(self._stack) == self._section_depth() - 1:
+                    self._section = None
+
+        self._position = len(text)
+        return found
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
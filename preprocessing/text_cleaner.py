@@ -7,6 +7,9 @@ line-preserving educational content?
 # preprocessing/text_cleaner.py
 
 import re
+import threading
+from functools import lru_cache
+
 import markdown
 from bs4 import BeautifulSoup
 from pylatexenc.latex2text import LatexNodes2Text
@@ -26,6 +29,36 @@ SUBSCRIPT_MAP = str.maketrans({
 })
 
 
+# -------------------------------------------------
+# Precompiled patterns
+# -------------------------------------------------
+
+_XRIGHTARROW = re.compile(r"\\xrightarrow\s*\{([^}]+)\}")
+_LEFTRIGHTARROW = re.compile(r"\\leftrightarrow")
+_SIMPLE_ARROW = re.compile(r"\\rightarrow|\\to")
+_SUBSCRIPT = re.compile(r"_\{?([0-9]+)\}?")
+_SUPERSCRIPT = re.compile(r"\^\{?([0-9]+)\}?")
+_MATH_DELIMITERS = re.compile(r"\$(.*?)\$")
+_WHITESPACE = re.compile(r"\s+")
+
+# Document-level variants: identical to the per-line patterns above, but
+# never match across a newline, so one pass over the text equals one pass
+# per line.
+_DOC_XRIGHTARROW = re.compile(r"\\xrightarrow[^\S\n]*\{([^}\n]+)\}")
+
+# Lines without any of these reach markdown as a single plain paragraph and
+# come back unchanged (up to whitespace, which is collapsed afterwards).
+_MARKDOWN_SYNTAX = re.compile(
+    r"[\\`*_\[\]<>&|{}~\t]"
+    r"|^\s*(?:[#>+=-]|\d+\.)"
+    r"|^ {4}"
+)
+
+# Characters and ligatures LatexNodes2Text rewrites; anything else passes
+# through it unchanged.
+_LATEX_SYNTAX = re.compile(r"[$%&\\{}~]|!`|\?`|``|''|--")
+
+
 # -------------------------------------------------
 # Chemistry-safe arrow normalization
 # -------------------------------------------------
@@ -33,23 +66,29 @@ SUBSCRIPT_MAP = str.maketrans({
 def normalize_reaction_arrows(text: str) -> str:
     if not isinstance(text, str):
         return text
+    if "\\" not in text:
+        return text
 
     # Arrow with catalyst / condition written on it
-    text = re.sub(
-        r"\\xrightarrow\s*\{([^}]+)\}",
-        r" →[\1] ",
-        text
-    )
+    text = _XRIGHTARROW.sub(r" →[\1] ", text)
 
     # Equilibrium arrow
-    text = re.sub(r"\\leftrightarrow", " ⇌ ", text)
+    text = _LEFTRIGHTARROW.sub(" ⇌ ", text)
 
     # Simple arrows
-    text = re.sub(r"\\rightarrow|\\to", " → ", text)
+    text = _SIMPLE_ARROW.sub(" → ", text)
 
     return text
 
 
+def _normalize_reaction_arrows_document(text: str) -> str:
+    if "\\" not in text:
+        return text
+    text = _DOC_XRIGHTARROW.sub(r" →[\1] ", text)
+    text = _LEFTRIGHTARROW.sub(" ⇌ ", text)
+    return _SIMPLE_ARROW.sub(" → ", text)
+
+
 # -------------------------------------------------
 # Subscript / Superscript normalization
 # -------------------------------------------------
@@ -59,18 +98,12 @@ def normalize_scripts(text: str) -> str:
         return text
 
     # Subscripts: _2 or _{2}
-    text = re.sub(
-        r"_\{?([0-9]+)\}?",
-        lambda m: m.group(1).translate(SUBSCRIPT_MAP),
-        text
-    )
+    if "_" in text:
+        text = _SUBSCRIPT.sub(lambda m: m.group(1).translate(SUBSCRIPT_MAP), text)
 
     # Superscripts: ^2 or ^{2}
-    text = re.sub(
-        r"\^\{?([0-9]+)\}?",
-        lambda m: m.group(1).translate(SUPERSCRIPT_MAP),
-        text
-    )
+    if "^" in text:
+        text = _SUPERSCRIPT.sub(lambda m: m.group(1).translate(SUPERSCRIPT_MAP), text)
 
     return text
 
@@ -79,8 +112,25 @@ def normalize_scripts(text: str) -> str:
 # Markdown → plain text (structure-safe)
 # -------------------------------------------------
 
+_MARKDOWN = threading.local()
+
+
+def _markdown_to_html(md_text: str) -> str:
+    # Building a Markdown instance loads every "extra" extension; reuse one
+    # per thread (instances are not thread-safe) and reset it between calls.
+    converter = getattr(_MARKDOWN, "converter", None)
+    if converter is None:
+        converter = _MARKDOWN.converter = markdown.Markdown(extensions=["extra"])
+    return converter.reset().convert(md_text)
+
+
 def markdown_to_text(md_text: str) -> str:
-    html = markdown.markdown(md_text, extensions=["extra"])
+    html = _markdown_to_html(md_text)
+    # A bare paragraph without tags or entities needs no HTML parse.
+    if html.startswith("<p>") and html.endswith("</p>"):
+        inner = html[3:-4]
+        if "<" not in inner and "&" not in inner:
+            return inner
     soup = BeautifulSoup(html, "html.parser")
     return soup.get_text(separator=" ")
 
@@ -101,6 +151,21 @@ def latex_to_text_safe(text: str) -> str:
 # Line-preserving normalization (CORE LOGIC)
 # -------------------------------------------------
 
+@lru_cache(maxsize=4096)
+def _clean_line(line: str) -> str:
+    """
+    Markdown, script and LaTeX cleanup for one line whose math delimiters
+    and arrows are already handled. Stages are skipped when the line has
+    nothing they would change.
+    """
+    if _MARKDOWN_SYNTAX.search(line):
+        line = markdown_to_text(line)
+    line = normalize_scripts(line)
+    if _LATEX_SYNTAX.search(line):
+        line = latex_to_text_safe(line)
+    return _WHITESPACE.sub(" ", line).strip()
+
+
 def normalize_text_preserve_lines(text: str) -> str:
     """
     Cleans text while preserving line order and paragraph structure.
@@ -115,28 +180,17 @@ def normalize_text_preserve_lines(text: str) -> str:
     # Normalize line endings
     text = text.replace("\r\n", "\n").replace("\r", "\n")
 
-    lines = text.split("\n")
+    # Math delimiters and arrow semantics never span lines, so both run once
+    # over the whole text instead of once per line.
+    if "$" in text:
+        text = _MATH_DELIMITERS.sub(r"\1", text)
+    text = _normalize_reaction_arrows_document(text)
+
     cleaned_lines = []
     previous_blank = False
 
-    for line in lines:
-        # Remove math delimiters
-        line = re.sub(r"\$(.*?)\$", r"\1", line)
-
-        # Arrow semantics first
-        line = normalize_reaction_arrows(line)
-
-        # Markdown → text
-        line = markdown_to_text(line)
-
-        # Sub / superscripts
-        line = normalize_scripts(line)
-
-        # LaTeX → text
-        line = latex_to_text_safe(line)
-
-        # Normalize spaces inside line
-        line = re.sub(r"\s+", " ", line).strip()
+    for line in text.split("\n"):
+        line = _clean_line(line)
 
         if line == "":
             if not previous_blank:
@@ -0,0 +1,67 @@
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+class FakeLLM:
+    """
+    Minimal stand-in for the LangChain chat model used by the agents.
+
+    `responder` maps a prompt to the response text; every call is recorded.
+    Unless `structured=False`, with_structured_output() is supported too:
+    the response text (or dict) is validated against the requested schema.
+    stream()/astream() yield the response text in `chunk_size` pieces.
+    """
+
+    def __init__(self, responder, *, structured=True, chunk_size=16):
+        self._responder = responder if callable(responder) else (lambda _prompt: responder)
+        self._structured = structured
+        self._chunk_size = chunk_size
+        self.calls = []
+        self.structured_calls = []
+        self.stream_calls = []
+
+    def invoke(self, prompt, **kwargs):
+        self.calls.append(prompt)
+        return AIMessage(content=self._responder(prompt))
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+    def stream(self, prompt, **kwargs):
+        self.calls.append(prompt)
+        self.stream_calls.append(prompt)
+        content = self._responder(prompt)
+        for start in range(0, len(content), self._chunk_size):
+            yield AIMessageChunk(content=content[start:start + self._chunk_size])
+
+    async def astream(self, prompt, **kwargs):
+        for chunk in self.stream(prompt, **kwargs):
+            yield chunk
+
+    @property
+    def with_structured_output(self):
+        if not self._structured:
+            raise AttributeError("with_structured_output")
+        return lambda schema, **kwargs: FakeStructuredLLM(self, schema)
+
+
+class FakeStructuredLLM:
+    def __init__(self, llm, schema):
+        self._llm = llm
+        self._schema = schema
+
+    def invoke(self, prompt, **kwargs):
+        self._llm.calls.append(prompt)
+        self._llm.structured_calls.append(self._schema.__name__)
+        response = self._llm._responder(prompt)
+        if isinstance(response, str):
+            return self._schema.model_validate_json(response)
+        return self._schema.model_validate(response)
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+
+@pytest.fixture
+def fake_llm():
+    return FakeLLM
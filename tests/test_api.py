@@ -1,5 +1,8 @@
+import asyncio
+
 from fastapi.testclient import TestClient
 
+from core.image_store import IMAGES, image_digest
 from interfaces import api
 
 
@@ -12,6 +15,13 @@ class FakePipeline:
             diagnostics={"events": [], "fallbacks": [], "retries": {}, "timings_ms": {}},
         )
 
+    async def arun(self, request: api.GenerateRequest) -> api.GenerateResponse:
+        return self.run(request)
+
+    async def astream(self, request: api.GenerateRequest):
+        yield {"event": "stage", "stage": "multimodal", "output": {}, "timing": {"duration_ms": 1}}
+        yield {"event": "result", "output": self.run(request).model_dump()}
+
 
 def test_health_endpoint():
     client = TestClient(api.app)
@@ -38,3 +48,131 @@ def test_generate_endpoint(monkeypatch):
     assert "diagnostics" in body
 
     api.app.dependency_overrides = {}
+
+
+def test_generate_stream_endpoint():
+    api.app.dependency_overrides[api.get_pipeline] = lambda: FakePipeline()
+    client = TestClient(api.app)
+
+    files = {"image": ("test.png", b"fake", "image/png")}
+    data = {"class": "11", "board": "CBSE", "target_exam": "NEET"}
+    with client.stream("POST", "/generate/stream", data=data, files=files) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    assert body.index("event: stage") < body.index("event: result")
+    assert '"stage": "multimodal"' in body
+
+    api.app.dependency_overrides = {}
+
+
+def test_stream_releases_images_when_the_client_disconnects_early():
+    ref = IMAGES.put(b"streamed page", "image/png")
+    started = []
+
+    async def body():
+        started.append(True)
+        yield "event: result\n\n"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    response = api._ImageStreamingResponse(body(), [ref], media_type="text/event-stream")
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    try:
+        asyncio.run(response(scope, receive, send))
+    except Exception:
+        pass
+
+    assert not started
+    assert IMAGES.get(ref) is None
+
+
+def test_generate_stores_upload_once_and_passes_a_reference():
+    seen = {}
+
+    class RecordingPipeline(FakePipeline):
+        async def arun(self, request):
+            seen["ref"] = request.image_refs[0]
+            seen["bytes"] = IMAGES.get(request.image_refs[0])
+            seen["mime"] = IMAGES.mime_type(request.image_refs[0])
+            IMAGES.release(request.image_refs[0])
+            return self.run(request)
+
+    api.app.dependency_overrides[api.get_pipeline] = lambda: RecordingPipeline()
+    client = TestClient(api.app)
+
+    files = {"image": ("test.jpg", b"jpeg bytes", "image/jpeg")}
+    data = {"class": "11", "board": "CBSE", "target_exam": "NEET"}
+    response = client.post("/generate", data=data, files=files)
+
+    assert response.status_code == 200
+    assert image_digest(seen["ref"]) is not None
+    assert seen["bytes"] == b"jpeg bytes"
+    assert seen["mime"] == "image/jpeg"
+    assert IMAGES.get(seen["ref"]) is None
+
+    api.app.dependency_overrides = {}
+
+
+def test_generate_rejects_oversized_upload(monkeypatch):
+    monkeypatch.setattr(api, "MAX_IMAGE_BYTES", 4)
+    monkeypatch.setattr(api, "IMAGE_READ_CHUNK_BYTES", 2)
+    api.app.dependency_overrides[api.get_pipeline] = lambda: FakePipeline()
+    client = TestClient(api.app)
+    before = IMAGES.stats()["references"]
+
+    files = {"image": ("test.png", b"too many bytes", "image/png")}
+    data = {"class": "11", "board": "CBSE", "target_exam": "NEET"}
+    response = client.post("/generate", data=data, files=files)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Image too large"
+    assert IMAGES.stats()["references"] == before
+
+    api.app.dependency_overrides = {}
+
+
+def test_generate_accepts_several_pages():
+    seen = {}
+
+    class RecordingPipeline(FakePipeline):
+        async def arun(self, request):
+            seen["pages"] = [IMAGES.get(ref) for ref in request.image_refs]
+            for ref in request.image_refs:
+                IMAGES.release(ref)
+            return self.run(request)
+
+    api.app.dependency_overrides[api.get_pipeline] = lambda: RecordingPipeline()
+    client = TestClient(api.app)
+
+    files = [
+        ("image", ("page1.png", b"first page", "image/png")),
+        ("image", ("page2.pdf", b"%PDF-1.7 second", "application/pdf")),
+    ]
+    data = {"class": "11", "board": "CBSE", "target_exam": "NEET"}
+    response = client.post("/generate", data=data, files=files)
+
+    assert response.status_code == 200
+    assert seen["pages"] == [b"first page", b"%PDF-1.7 second"]
+
+    api.app.dependency_overrides = {}
+
+
+def test_generate_rejects_too_many_pages(monkeypatch):
+    monkeypatch.setattr(api, "MAX_IMAGES_PER_REQUEST", 1)
+    api.app.dependency_overrides[api.get_pipeline] = lambda: FakePipeline()
+    client = TestClient(api.app)
+
+    files = [("image", ("a.png", b"a", "image/png")), ("image", ("b.png", b"b", "image/png"))]
+    data = {"class": "11", "board": "CBSE", "target_exam": "NEET"}
+    response = client.post("/generate", data=data, files=files)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Too many images"
+
+    api.app.dependency_overrides = {}
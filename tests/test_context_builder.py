@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from agents.evaluation.evaluator_agent import evaluator_agent
+from agents.generation.question_generator import build_question_generator_prompt, question_generator_agent
+from core.context_builder import (
+    TRUNCATION_MARKER,
+    ContextBudgetError,
+    build_context,
+    compact,
+    estimate_tokens,
+    knowledge_sections,
+    render_sections,
+)
+from core.state import PlannerOutput, TutoringState, UserProfile
+
+TASK = {"task_id": "question_generator", "purpose": "Generate", "expected_output": "Questions"}
+
+
+def _state(**fields):
+    return TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(planning_context={"subject": "Chemistry"}),
+        **fields,
+    )
+
+
+def _bank(n):
+    return {
+        "mcq": [
+            {
+                "question": f"Question {i} about equilibrium constants?",
+                "options": ["A", "B", "C", "D"],
+                "answer": "A",
+                "explanation": "Because Le Chatelier's principle applies here. " * 4,
+                "difficulty": "",
+            }
+            for i in range(n)
+        ],
+        "short_answer": [],
+    }
+
+
+def test_compact_drops_empty_fields_and_whitespace():
+    assert compact("  text \n") == "text"
+    assert compact({"a": " x ", "b": "", "c": [], "d": {"e": None}, "f": 0}) == '{"a":"x","f":0}'
+
+
+def test_knowledge_sections_only_configured():
+    kb = {"content_analyzer": "c", "exam_pattern_analyst": "e", "solver": {"x": 1}}
+    assert knowledge_sections("question_designer", kb) == {
+        "content_analyzer": "c",
+        "exam_pattern_analyst": "e",
+    }
+    assert knowledge_sections("content_analyzer", kb) == {}
+
+
+def test_within_budget_is_unchanged():
+    rendered, report = build_context("solver", {"question_bank": _bank(2)})
+    assert rendered["question_bank"] == compact(_bank(2))
+    assert report["summarized"] == [] and report["truncated"] == []
+    assert report["output_tokens"] == report["input_tokens"]
+
+
+def test_truncate_policy_cuts_text_to_budget():
+    text = "\n".join(f"Line {i}. Extra detail for line {i}." for i in range(3000))
+    rendered, report = build_context("content_analyzer", {"source": text})
+
+    assert report["policy"] == "truncate"
+    assert report["truncated"] == ["source"]
+    assert rendered["source"].endswith(TRUNCATION_MARKER)
+    assert estimate_tokens(rendered["source"]) <= report["budget_tokens"]
+
+
+def test_summarize_drops_fields_before_truncating():
+    bank = _bank(150)
+    rendered, report = build_context("solver", {"question_bank": bank})
+
+    assert report["summarized"] == ["question_bank"]
+    assert report["truncated"] == []
+    items = json.loads(rendered["question_bank"])["mcq"]
+    assert len(items) == 150
+    assert "answer" not in items[0] and "explanation" not in items[0]
+
+
+def test_questions_to_answer_are_never_truncated():
+    with pytest.raises(ContextBudgetError):
+        build_context("solver", {"question_bank": _bank(600)})
+    with pytest.raises(ContextBudgetError):
+        build_context("evaluator", {"question_bank": _bank(300), "solver_output": _bank(300)})
+
+
+def test_supporting_structured_sections_drop_trailing_items():
+    bank = _bank(600)
+    rendered, report = build_context("question_generator", {"question_designer": bank})
+
+    assert report["truncated"] == ["question_designer"]
+    trimmed = json.loads(rendered["question_designer"])
+    assert trimmed["omitted_items"]["mcq"] == 600 - len(trimmed["mcq"])
+    assert trimmed["mcq"][0]["question"] == bank["mcq"][0]["question"]
+    assert estimate_tokens(rendered["question_designer"]) <= report["budget_tokens"]
+
+
+def test_small_sections_keep_their_share():
+    sections = {"content_analyzer": "short note", "exam_pattern_analyst": "x" * 100000}
+    rendered, report = build_context("question_designer", sections)
+
+    assert rendered["content_analyzer"] == "short note"
+    assert report["truncated"] == ["exam_pattern_analyst"]
+
+
+def test_generator_prompt_gets_only_its_sections(fake_llm):
+    kb = {
+        "content_analyzer": "Topic: equilibrium",
+        "question_designer": {"mcq": 5, "notes": ""},
+        "solver": {"secret": "do not include"},
+    }
+    fake = fake_llm(json.dumps({"mcq": [], "short_answer": [], "long_answer": []}))
+    update = question_generator_agent(llm=fake, task=TASK, state=_state(knowledge_base=kb))
+
+    prompt = fake.calls[0]
+    assert "CONTENT_ANALYZER:\nTopic: equilibrium" in prompt
+    assert 'QUESTION_DESIGNER:\n{"mcq":5}' in prompt
+    assert "do not include" not in prompt
+    assert prompt == build_question_generator_prompt(
+        TASK,
+        {"subject": "Chemistry"},
+        render_sections({"content_analyzer": kb["content_analyzer"], "question_designer": '{"mcq":5}'}),
+    )
+
+    diagnostics = update["diagnostics"]
+    assert diagnostics["prompt_tokens"] == estimate_tokens(prompt)
+    assert set(diagnostics["context"]["input_tokens"]) == {"content_analyzer", "question_designer"}
+
+
+def test_evaluator_reports_context_diagnostics(fake_llm):
+    fake = fake_llm({"overall_feedback": "ok"})
+    update = evaluator_agent(
+        llm=fake,
+        task={"task_id": "evaluator"},
+        state=_state(question_bank=_bank(1), solver_output={"mcq": [{"final_answer": "A"}]}),
+    )
+
+    context = update["diagnostics"]["context"]
+    assert context["policy"] == "summarize"
+    assert set(context["output_tokens"]) == {"question_bank", "solver_output"}
+    assert '{"mcq":[{"final_answer":"A"}]}' in fake.calls[0]
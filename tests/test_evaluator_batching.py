@@ -0,0 +1,162 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+import agents.evaluation.evaluator_agent as evaluator_module
+from agents.evaluation.evaluator_agent import evaluator_agent, aevaluator_agent
+from core.sharding import sample_question_bank
+from core.state import PlannerOutput, TutoringState, UserProfile
+from config.context import AGENT_CONTEXT_TOKEN_BUDGETS
+
+TASK = {"task_id": "evaluator"}
+
+BANK = {
+    "mcq": [{"question": f"M{i}"} for i in range(6)],
+    "short_answer": [{"question": f"S{i}"} for i in range(4)],
+}
+SOLUTIONS = {
+    "mcq": [{"question": f"M{i}", "final_answer": f"m{i}"} for i in range(6)],
+    "short_answer": [{"question": f"S{i}", "final_answer": f"s{i}"} for i in range(4)],
+}
+
+
+def _state():
+    return TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(planning_context={"subject": "Physics"}),
+        question_bank=BANK,
+        solver_output=SOLUTIONS,
+    )
+
+
+def _evaluate(prompt):
+    section = re.search(r'QUESTIONS:\n\{"(\w+)"', prompt).group(1)
+    questions = re.findall(r'"question":"([^"]+)"', prompt.split("STUDENT ANSWERS")[0])
+    return json.dumps({
+        "overall_feedback": "Solid work.",
+        section: [
+            {"question": q, "is_correct": not q.endswith("1"), "score": 1.0 if not q.endswith("1") else 0.0}
+            for q in questions
+        ],
+    })
+
+
+@pytest.fixture(autouse=True)
+def _config(monkeypatch):
+    monkeypatch.setattr(evaluator_module, "EVALUATOR_BATCH_SIZE", 3)
+    monkeypatch.setattr(evaluator_module, "EVALUATOR_SAMPLE_FRACTION", 1.0)
+    monkeypatch.setattr(evaluator_module, "EVALUATOR_SAMPLE_COUNT", None)
+
+
+def test_sample_question_bank_spreads_over_sections():
+    sampled, positions = sample_question_bank(BANK, fraction=0.5)
+    assert positions == {"mcq": [0, 2, 4], "short_answer": [0, 2], "long_answer": []}
+    assert [q["question"] for q in sampled["short_answer"]] == ["S0", "S2"]
+
+    _sampled, positions = sample_question_bank(BANK, fraction=0.5, count=2)
+    assert positions == {"mcq": [0, 5], "short_answer": [], "long_answer": []}
+
+
+def test_batched_evaluation_merges_per_item_results(fake_llm):
+    fake = fake_llm(_evaluate)
+    update = evaluator_agent(llm=fake, task=TASK, state=_state())
+
+    assert len(fake.calls) == 4
+    evaluation = update["evaluation"]
+    assert [item["question"] for item in evaluation["mcq"]] == [f"M{i}" for i in range(6)]
+    assert [item["question"] for item in evaluation["short_answer"]] == ["S0", "S1", "S2", "S3"]
+    assert evaluation["overall_feedback"] == "Solid work."
+    assert evaluation["coverage"] == {
+        "evaluated": 10,
+        "total": 10,
+        "sampled": False,
+        "judged": 10,
+        "correct": 8,
+        "estimated_accuracy": 0.8,
+        "mean_score": 0.8,
+    }
+    assert update["diagnostics"]["json_extraction"] == {"strategy": "batched"}
+    assert len(update["diagnostics"]["batches"]) == 4
+
+
+def test_batch_prompt_pairs_questions_with_their_solutions(fake_llm):
+    fake = fake_llm(_evaluate)
+    evaluator_agent(llm=fake, task=TASK, state=_state())
+
+    prompt = next(p for p in fake.calls if '"question":"S3"' in p)
+    answers = prompt.split("STUDENT ANSWERS")[1]
+    assert '"final_answer":"s3"' in answers
+    assert '"final_answer":"s0"' not in answers
+
+
+def test_sampling_extrapolates_overall_feedback(fake_llm, monkeypatch):
+    monkeypatch.setattr(evaluator_module, "EVALUATOR_SAMPLE_COUNT", 4)
+    fake = fake_llm(_evaluate)
+    update = evaluator_agent(llm=fake, task=TASK, state=_state())
+
+    # Results sit at their bank positions; the rest are marked not sampled.
+    evaluation = update["evaluation"]
+    mcq, short_answer = evaluation["mcq"], evaluation["short_answer"]
+    assert [item["question"] for item in mcq] == [f"M{i}" for i in range(6)]
+    assert [i for i, item in enumerate(mcq) if item.get("sampled", True)] == [0, 2, 5]
+    assert [i for i, item in enumerate(mcq) if item["is_correct"] is not None] == [0, 2, 5]
+    assert [i for i, item in enumerate(short_answer) if item.get("sampled", True)] == [1]
+    assert short_answer[1]["question"] == "S1" and short_answer[1]["is_correct"] is False
+    assert short_answer[0] == {
+        "question": "S0",
+        "is_correct": None,
+        "score": None,
+        "feedback": "",
+        "improvements": [],
+        "sampled": False,
+    }
+    assert evaluation["coverage"]["sampled"] is True
+    assert evaluation["coverage"]["estimated_accuracy"] == 0.75
+    assert evaluation["overall_feedback"].startswith("Evaluated a sample of 4 of 10 questions.")
+    assert "about 75% of the full set" in evaluation["overall_feedback"]
+
+
+def test_failed_batch_keeps_placeholders(fake_llm):
+    def responder(prompt):
+        return "garbled" if '"question":"M3"' in prompt else _evaluate(prompt)
+
+    update = evaluator_agent(llm=fake_llm(responder, structured=False), task=TASK, state=_state())
+
+    mcq = update["evaluation"]["mcq"]
+    assert mcq[3]["question"] == "M3" and mcq[3]["is_correct"] is None
+    assert update["evaluation"]["coverage"]["judged"] == 7
+    assert update["diagnostics"]["batches"][1]["fallback_used"] is True
+
+
+def test_small_bank_single_call(fake_llm, monkeypatch):
+    monkeypatch.setattr(evaluator_module, "EVALUATOR_BATCH_SIZE", 10)
+    state = _state()
+    state.question_bank = {"mcq": BANK["mcq"][:2]}
+    fake = fake_llm({"overall_feedback": "ok"})
+
+    update = evaluator_agent(llm=fake, task=TASK, state=state)
+    assert len(fake.calls) == 1
+    assert "coverage" not in update["evaluation"]
+
+
+def test_bank_too_large_for_one_prompt_is_split_not_cut(fake_llm, monkeypatch):
+    monkeypatch.setattr(evaluator_module, "EVALUATOR_BATCH_SIZE", 10)
+    monkeypatch.setitem(AGENT_CONTEXT_TOKEN_BUDGETS, "evaluator", 40)
+    fake = fake_llm(_evaluate)
+    update = evaluator_agent(llm=fake, task=TASK, state=_state())
+
+    evaluation = update["evaluation"]
+    assert [item["question"] for item in evaluation["mcq"]] == [f"M{i}" for i in range(6)]
+    assert [item["question"] for item in evaluation["short_answer"]] == ["S0", "S1", "S2", "S3"]
+    assert len(fake.calls) == len(update["diagnostics"]["batches"]) > 2
+
+
+def test_async_batched_evaluation(fake_llm):
+    fake = fake_llm(_evaluate)
+    update = asyncio.run(aevaluator_agent(llm=fake, task=TASK, state=_state()))
+
+    assert len(fake.calls) == 4
+    assert update["evaluation"]["coverage"]["correct"] == 8
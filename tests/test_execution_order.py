@@ -1,4 +1,5 @@
 from core.graph import build_graph
+from core.image_store import IMAGES
 from core.state import TutoringState, UserProfile, GroundedContext, PlannerOutput
 from config import agent_executor
 
@@ -90,7 +91,7 @@ def test_execution_order(monkeypatch):
             board="CBSE",
             target_exam="NEET",
         ),
-        image_base64="dummy",
+        image_refs=[IMAGES.put(b"dummy")],
     )
 
     graph.invoke(state)
@@ -0,0 +1,81 @@
+from core.cache import SQLiteCacheStore
+from core.graph import build_graph
+from core.grounding_cache import GroundingCache
+from core.image_store import IMAGES
+from core.planner_repair import fallback_plan
+from core.state import TutoringState, UserProfile, GroundedContext, ensure_state
+from config import agent_executor
+
+
+PROFILE = UserProfile(class_level="11", board="CBSE", target_exam="NEET")
+
+
+def test_sqlite_store_lru_and_size_bounds(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "c.sqlite3"), "test", max_entries=2, max_bytes=10)
+
+    store.set("a", b"1234")
+    store.set("b", b"1234")
+    assert store.get("a") == b"1234"  # "a" is now most recently used
+    store.set("c", b"1234")           # exceeds both bounds -> evict "b"
+
+    assert store.get("b") is None
+    assert store.get("a") == b"1234"
+    assert store.get("c") == b"1234"
+
+    store.set("d", b"123456789")       # 13 bytes total > 10 -> evict LRU until it fits
+    assert store.stats()["bytes"] <= 10
+
+
+def test_sqlite_store_ttl_and_sharing(tmp_path, monkeypatch):
+    path = str(tmp_path / "c.sqlite3")
+    writer = SQLiteCacheStore(path, "test", ttl_sec=60)
+    reader = SQLiteCacheStore(path, "test", ttl_sec=60)
+    other_namespace = SQLiteCacheStore(path, "other")
+
+    writer.set("k", b"v")
+    assert reader.get("k") == b"v"
+    assert other_namespace.get("k") is None
+
+    import core.cache as cache_module
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 120)
+    assert reader.get("k") is None
+
+
+def test_grounding_cache_skips_multimodal_on_repeat(tmp_path, monkeypatch):
+    multimodal_calls = []
+
+    def fake_multimodal(*args, **kwargs):
+        multimodal_calls.append(1)
+        return GroundedContext(metadata={"subject": "Physics"}, image_analysis="A ramp")
+
+    def fake_planner(*args, **kwargs):
+        return fallback_plan(PROFILE, GroundedContext())
+
+    def fake_agent(agent_id):
+        def _run(*args, **kwargs):
+            return {"knowledge_base": {agent_id: agent_id}}
+        return _run
+
+    monkeypatch.setattr("core.graph.multimodal_vision_agent", fake_multimodal)
+    monkeypatch.setattr("core.graph.planner_agent", fake_planner)
+    for agent_id in ("content_analyzer", "exam_pattern_analyst", "question_generator"):
+        monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, agent_id, fake_agent(agent_id))
+
+    cache = GroundingCache(SQLiteCacheStore(str(tmp_path / "g.sqlite3"), "grounding"))
+    graph = build_graph(None, grounding_cache=cache)
+
+    def run(profile):
+        state = TutoringState(user_profile=profile, image_refs=[IMAGES.put(b"textbook page")])
+        return ensure_state(graph.invoke(state))
+
+    first = run(PROFILE)
+    second = run(PROFILE)
+    third = run(UserProfile(class_level="12", board="CBSE", target_exam="NEET"))
+
+    assert multimodal_calls == [1, 1]
+    assert first.run_diagnostics["grounding_cache"]["hit"] is False
+    assert second.run_diagnostics["grounding_cache"]["hit"] is True
+    assert second.grounded_context.image_analysis == "A ramp"
+    assert third.run_diagnostics["grounding_cache"]["hit"] is False
+    assert IMAGES.get(first.image_refs[0]) is None
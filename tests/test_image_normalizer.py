@@ -0,0 +1,113 @@
+import io
+
+import pytest
+
+from core.graph import multimodal_node
+from core.image_store import IMAGES
+from core.state import GroundedContext, TutoringState, UserProfile
+from preprocessing import image_normalizer
+from preprocessing.image_normalizer import normalize_image, sniff_mime_type
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def _photo(width, height):
+    # A gradient compresses like a photo rather than like a flat fill.
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    return image
+
+
+def test_sniff_mime_type_reads_the_header():
+    assert sniff_mime_type(_encode(_photo(8, 8), "PNG")) == "image/png"
+    assert sniff_mime_type(_encode(_photo(8, 8), "JPEG")) == "image/jpeg"
+    assert sniff_mime_type(_encode(_photo(8, 8), "WEBP")) == "image/webp"
+    assert sniff_mime_type(b"not an image") is None
+
+
+def test_large_image_is_downscaled_and_reencoded():
+    original = _encode(_photo(2000, 1500), "PNG", compress_level=1)
+    data, mime_type, report = normalize_image(original, "image/png", max_dimension=400)
+
+    assert mime_type == "image/jpeg"
+    with Image.open(io.BytesIO(data)) as image:
+        assert max(image.size) == 400
+    assert report["resized"] is True
+    assert report["original_size"] == [2000, 1500]
+    assert report["size"] == [400, 300]
+    assert report["bytes_saved"] == len(original) - len(data) > 0
+
+
+def test_wrong_declared_type_is_corrected_without_reencoding():
+    noise = Image.effect_noise((256, 256), 64).convert("RGB")
+    original = _encode(noise, "JPEG", quality=30)
+    data, mime_type, report = normalize_image(original, "image/png")
+
+    assert data is original
+    assert mime_type == "image/jpeg"
+    assert report["declared_mime_type"] == "image/png"
+    assert report["reencoded"] is False
+    assert report["bytes_saved"] == 0
+
+
+def test_transparent_png_is_flattened_onto_white():
+    image = Image.new("RGBA", (3000, 10), (0, 0, 0, 0))
+    data, mime_type, _ = normalize_image(_encode(image, "PNG"), max_dimension=100)
+
+    assert mime_type == "image/jpeg"
+    with Image.open(io.BytesIO(data)) as result:
+        assert result.mode == "RGB"
+        assert min(result.getpixel((50, 0))) > 240
+
+
+def test_documents_pass_through_unchanged():
+    document = b"%PDF-1.7 pages"
+    data, mime_type, report = normalize_image(document, "image/png")
+    assert data is document
+    assert mime_type == "application/pdf"
+    assert report["skipped"] == "not an image"
+
+
+def test_unreadable_image_is_sent_unchanged():
+    data, mime_type, report = normalize_image(b"\x89PNG\r\n\x1a\ngarbage", "image/png")
+    assert data == b"\x89PNG\r\n\x1a\ngarbage"
+    assert mime_type == "image/png"
+    assert "error" in report
+
+
+def test_without_pillow_only_the_mime_type_is_corrected(monkeypatch):
+    monkeypatch.setattr(image_normalizer, "Image", None)
+    original = _encode(_photo(4000, 10), "JPEG")
+    data, mime_type, report = normalize_image(original, "image/png", max_dimension=100)
+
+    assert data is original
+    assert mime_type == "image/jpeg"
+    assert report["skipped"] == "Pillow not installed"
+
+
+def test_multimodal_node_sends_the_normalized_image(monkeypatch):
+    seen = {}
+
+    def fake_multimodal(image_bytes, user_profile, mime_type):
+        seen.update(size=len(image_bytes), mime_type=mime_type)
+        return GroundedContext(metadata={"subject": "Physics"})
+
+    monkeypatch.setattr("core.graph.multimodal_vision_agent", fake_multimodal)
+    original = _encode(_photo(2000, 1000), "PNG", compress_level=1)
+    state = TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=[IMAGES.put(original, "image/jpeg")],
+    )
+
+    multimodal_node(state)
+
+    report = state.run_diagnostics["image_normalization"]["pages"][0]
+    assert seen == {"size": report["bytes"], "mime_type": "image/jpeg"}
+    assert report["declared_mime_type"] == "image/jpeg"
+    assert report["resized"] is True
+    assert seen["size"] < len(original)
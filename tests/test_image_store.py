@@ -0,0 +1,42 @@
+import hashlib
+
+from core.image_store import ImageStore, image_digest
+
+
+def test_identical_images_share_one_buffer():
+    store = ImageStore()
+    data = b"worksheet page"
+    first = store.put(data, "image/jpeg")
+    second = store.put(bytes(bytearray(data)))
+
+    assert first != second
+    assert image_digest(first) == image_digest(second) == hashlib.sha256(data).hexdigest()
+    assert store.get(first) is store.get(second)
+    assert store.mime_type(second) == "image/jpeg"
+    assert store.stats() == {"images": 1, "references": 2, "bytes": len(data)}
+
+
+def test_release_drops_the_buffer_with_its_last_reference():
+    store = ImageStore()
+    first = store.put(b"page")
+    second = store.put(b"page")
+
+    store.release(first)
+    store.release(first)
+    assert store.get(second) == b"page"
+
+    store.release(second)
+    assert store.get(second) is None
+    assert store.stats() == {"images": 0, "references": 0, "bytes": 0}
+
+
+def test_put_chunks_hashes_while_reading():
+    store = ImageStore()
+    ref = store.put_chunks(iter([b"abc", b"def"]))
+    assert store.get(ref) == b"abcdef"
+    assert image_digest(ref) == hashlib.sha256(b"abcdef").hexdigest()
+
+
+def test_image_digest_rejects_foreign_references():
+    assert image_digest("dummy") is None
+    assert image_digest("sha256:abc#1") is None
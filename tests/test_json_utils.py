@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from agents.generation.question_generator import _parse_question_bank
+from preprocessing.json_utils import (
+    JSONExtractionError,
+    extract_json_from_llm,
+    extract_json_with_report,
+)
+
+
+def test_direct_and_fenced_json():
+    assert extract_json_with_report('{"a": 1}') == ({"a": 1}, {"strategy": "direct", "candidates": 1})
+    assert extract_json_from_llm('```json\n{"mcq": []}\n```') == {"mcq": []}
+
+
+def test_trailing_prose_with_braces():
+    text = 'Here you go: {"mcq": [{"question": "Q1"}]} Note: use {curly} braces [1].'
+    value, report = extract_json_with_report(text)
+    assert value == {"mcq": [{"question": "Q1"}]}
+    assert report["strategy"] == "scan"
+    assert report["candidates"] == 2
+
+
+def test_truncated_output_keeps_complete_items():
+    text = (
+        '{"mcq": [{"question": "Q1", "options": ["a", "b"]}, '
+        '{"question": "Q2", "options": ["c", "d"]}, {"question": "Q3", "opt'
+    )
+    value, report = extract_json_with_report(text)
+    assert value == {
+        "mcq": [
+            {"question": "Q1", "options": ["a", "b"]},
+            {"question": "Q2", "options": ["c", "d"]},
+        ]
+    }
+    assert report["strategy"] == "repaired"
+    assert report["repair"]["closed"] == "]}"
+
+
+def test_truncated_after_prose_candidate():
+    text = 'See [1]. {"mcq": [{"q": "a"}], "short_answer": [{"q": "b", "answer": "par'
+    value, report = extract_json_with_report(text)
+    assert value == {"mcq": [{"q": "a"}], "short_answer": []}
+    assert report["strategy"] == "repaired"
+
+
+def test_strings_with_brackets_are_not_structure():
+    value, _ = extract_json_with_report('{"a": "x ] } \\" {", "b": [1, 2')
+    assert value == {"a": 'x ] } " {', "b": [1]}
+
+
+def test_values_inside_a_malformed_container_are_still_found():
+    value, report = extract_json_with_report('x {"n": {"a": 1}, bad} [2]')
+    assert value == {"a": 1}
+    assert report == {"strategy": "scan", "candidates": 2}
+
+
+def test_deeply_nested_output_is_scanned_in_linear_time():
+    texts = [
+        "{" * 20000,
+        "[" * 20000,
+        '{"a": ' * 5000,
+        '{"mcq": [' + "[" * 20000 + '{"question": "Q1"}, {"question": "Q2"',
+    ]
+    start = time.time()
+    for text in texts:
+        try:
+            extract_json_with_report(text)
+        except JSONExtractionError:
+            pass
+    assert time.time() - start < 2.0
+
+
+def test_no_json_raises():
+    with pytest.raises(JSONExtractionError):
+        extract_json_from_llm("no structured output here")
+
+
+def test_agent_parse_reports_extraction():
+    cleaned, report = _parse_question_bank('{"mcq": [{"question": "Q1"}], "short_answer": [')
+    assert cleaned["mcq"] == [{"question": "Q1"}]
+    assert report["strategy"] == "repaired"
+
+    cleaned, report = _parse_question_bank("nothing")
+    assert cleaned == {"mcq": [], "short_answer": [], "long_answer": []}
+    assert report["strategy"] == "failed"
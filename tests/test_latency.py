@@ -0,0 +1,79 @@
+import time
+
+from core import latency, routing
+from core.latency import LatencyTracker, budget_decision
+from core.routing import task_executor
+from core.state import PlannerOutput, TutoringState, UserProfile
+from config import agent_executor
+
+
+def _task(task_id, agent_id):
+    return {
+        "task_id": task_id,
+        "purpose": task_id,
+        "expected_output": task_id,
+        "priority": "High",
+        "executed_by": agent_id,
+    }
+
+
+def test_tracker_moves_towards_observations():
+    tracker = LatencyTracker({"solver": 1000}, alpha=0.5)
+    tracker.record("solver", 3000)
+    assert tracker.estimate("solver") == 2000
+    tracker.record("evaluator", 500)
+    assert tracker.estimate("evaluator") == 500
+
+
+def test_budget_decision_run_shorten_skip():
+    tracker = LatencyTracker({"evaluator": 4000, "solver": 6000})
+
+    # No deadline or required agents: always run.
+    assert budget_decision("evaluator", None, [], tracker)["action"] == "run"
+    assert budget_decision("solver", 1, [], tracker)["action"] == "run"
+
+    assert budget_decision("evaluator", 20000, ["solver"], tracker)["action"] == "run"
+
+    shortened = budget_decision("evaluator", 9000, ["solver"], tracker)
+    assert shortened["action"] == "shorten"
+    assert shortened["timeout_sec"] == 3.0
+
+    skipped = budget_decision("evaluator", 7000, ["solver"], tracker)
+    assert skipped["action"] == "skip"
+    assert skipped["slack_ms"] == 1000
+
+
+def test_executor_defers_evaluation_when_budget_is_short(monkeypatch):
+    tracker = LatencyTracker({"solver": 10, "evaluator": 60000})
+    monkeypatch.setattr(latency, "LATENCY_TRACKER", tracker)
+    monkeypatch.setattr(routing, "LATENCY_TRACKER", tracker)
+
+    def fake_solver(*args, **kwargs):
+        return {"solver_output": {"mcq": [{"solution": "A"}]}, "knowledge_base": {"solver": "sol"}}
+
+    def fail_evaluator(*args, **kwargs):
+        raise AssertionError("evaluator should have been skipped")
+
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "solver", fake_solver)
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "evaluator", fail_evaluator)
+
+    plan = PlannerOutput(
+        planning_context={},
+        objective="test",
+        subtasks=[_task("solve", "solver"), _task("evaluate", "evaluator")],
+        execution_order=["solve", "evaluate"],
+    )
+    state = TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=plan,
+        deadline_at=time.time() + 5,
+    )
+
+    updated = task_executor(llm=None, state=state)
+
+    assert updated.solver_output["mcq"] == [{"solution": "A"}]
+    assert updated.evaluation["status"] == "deferred"
+    assert updated.run_diagnostics["skipped"] == ["evaluator"]
+    assert updated.run_diagnostics["latency_budget"]["evaluator"]["action"] == "skip"
+    assert "agent:evaluator" not in updated.run_diagnostics["fallbacks"]
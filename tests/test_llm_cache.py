@@ -0,0 +1,81 @@
+import asyncio
+
+from core.cache import LRUCache, SQLiteCacheStore
+from core.llm_cache import CachedLLM, llm_cache_key
+from core.routing import task_executor
+from core.state import PlannerOutput, TutoringState, UserProfile
+
+
+def _cached(fake, tmp_path, **kwargs):
+    store = SQLiteCacheStore(str(tmp_path / "llm.sqlite3"), "llm")
+    return CachedLLM(fake, model_name="test-model", memory=LRUCache(8), store=store, **kwargs)
+
+
+def test_key_normalizes_whitespace_and_model():
+    assert llm_cache_key("Solve x\r\n  ", "m") == llm_cache_key("Solve x", "m")
+    assert llm_cache_key("Solve x", "m") != llm_cache_key("Solve x", "other")
+    messages = [{"role": "system", "content": "plan  \n"}, {"role": "user", "content": "go"}]
+    assert llm_cache_key(messages, "m") == llm_cache_key(
+        [{"role": "system", "content": "plan"}, {"role": "user", "content": "go"}], "m"
+    )
+
+
+def test_memory_and_sqlite_tiers(tmp_path, fake_llm):
+    fake = fake_llm(lambda prompt: f"answer to {prompt}")
+    llm = _cached(fake, tmp_path)
+
+    view = llm.for_agent("solver")
+    assert view.invoke("q1").content == "answer to q1"
+    assert view.invoke("q1").content == "answer to q1"
+    assert view.stats() == {"enabled": True, "hits": 1, "misses": 1}
+
+    # A second worker sharing the SQLite file reuses the response.
+    other = _cached(fake, tmp_path)
+    assert asyncio.run(other.for_agent("solver").ainvoke("q1")).content == "answer to q1"
+    assert fake.calls == ["q1"]
+
+
+def test_disabled_agent_and_forget(tmp_path, fake_llm):
+    fake = fake_llm("fresh")
+    llm = _cached(fake, tmp_path, disabled_agents={"question_generator"})
+
+    generator = llm.for_agent("question_generator")
+    generator.invoke("p")
+    generator.invoke("p")
+    assert len(fake.calls) == 2
+
+    solver = llm.for_agent("solver")
+    solver.invoke("p")
+    solver.forget()
+    llm.for_agent("solver").invoke("p")
+    assert len(fake.calls) == 4
+
+
+def test_executor_records_cache_stats(tmp_path, fake_llm):
+    llm = _cached(fake_llm("concepts"), tmp_path)
+    plan = PlannerOutput(
+        planning_context={},
+        objective="test",
+        subtasks=[{
+            "task_id": "content_analyzer",
+            "purpose": "Extract",
+            "expected_output": "Concepts",
+            "priority": "High",
+            "executed_by": "content_analyzer",
+        }],
+        execution_order=["content_analyzer"],
+    )
+
+    def run():
+        state = TutoringState(
+            user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+            image_refs=["dummy"],
+            plan=plan,
+        )
+        return task_executor(llm=llm, state=state)
+
+    first, second = run(), run()
+
+    assert first.run_diagnostics["llm_cache"]["content_analyzer"]["misses"] == 1
+    assert second.run_diagnostics["llm_cache"]["content_analyzer"]["hits"] == 1
+    assert second.knowledge_base["content_analyzer"] == "concepts"
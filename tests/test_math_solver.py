@@ -0,0 +1,160 @@
+import json
+
+import pytest
+
+from agents.solving.solver_agent import solver_agent
+from core.state import PlannerOutput, TutoringState, UserProfile
+from tools.math_solver import (
+    MathError,
+    check_answer,
+    compile_expression,
+    evaluate,
+    parse_quantity,
+    python_math,
+    resolve_option,
+    solve_linear,
+    verify_solver_output,
+)
+
+
+def test_evaluate_arithmetic_and_functions():
+    assert evaluate("2^10 + 7 // 2") == 1027
+    assert evaluate("sqrt(16) * sin(pi/2)") == pytest.approx(4.0)
+    assert evaluate("ln(e) + log(100, 10) + factorial(5)") == pytest.approx(123.0)
+    assert evaluate("v / t", {"v": 20, "t": 4}) == 5
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('true')",
+    "(1).__class__",
+    "open('x')",
+    "[1, 2]",
+    "lambda: 1",
+    "x if 1 else 2",
+    "'text'",
+    "True + 1",
+    "_pow(2, 3)",
+])
+def test_rejects_everything_outside_the_sandbox(expression):
+    with pytest.raises(MathError):
+        evaluate(expression, {"x": 1})
+
+
+def test_bounded_evaluation():
+    with pytest.raises(MathError):
+        evaluate("9**9**9")
+    with pytest.raises(MathError):
+        evaluate("factorial(10000)")
+    with pytest.raises(MathError):
+        evaluate("1/0")
+    with pytest.raises(MathError):
+        evaluate("x + 1")
+    assert evaluate("2**100") == pytest.approx(2.0 ** 100)
+
+
+def test_oversized_results_are_math_errors():
+    with pytest.raises(MathError):
+        evaluate("factorial(170)*factorial(170)")
+    with pytest.raises(MathError):
+        evaluate("((((9**64)**64)**64)**64)")
+    assert parse_quantity("factorial(170)*factorial(170)") is None
+    assert parse_quantity("1 x 10^400") is None
+    assert python_math.invoke({"code": "(((9**64)**64)**64)"}).startswith("Error:")
+
+    bank = {"short_answer": [{"question": "q", "answer": "4"}]}
+    output = {"short_answer": [{"final_answer": "factorial(170)**2"}]}
+    checked, summary = verify_solver_output(bank, output)
+    assert summary["compared"] == 0 and checked == output
+
+
+def test_compiled_expressions_are_cached():
+    compile_expression.cache_clear()
+    evaluate("a * b + 1", {"a": 1, "b": 2})
+    evaluate("a * b + 1", {"a": 3, "b": 4})
+    info = compile_expression.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_solve_linear():
+    assert solve_linear("2*x + 3 = 11", "x") == pytest.approx(4.0)
+    assert solve_linear("v = u + a*t", "t", {"v": 30, "u": 10, "a": 5}) == pytest.approx(4.0)
+    with pytest.raises(MathError):
+        solve_linear("x^2 = 4", "x")
+
+
+def test_python_math_tool_keeps_its_interface():
+    assert python_math.name == "python_math"
+    assert python_math.invoke({"code": "v = 20\nt = 4\nv / t"}) == "5.0"
+    assert python_math.invoke({"code": "m = 2; a = 3"}) == "{'m': 2, 'a': 3}"
+    assert python_math.invoke({"code": "import os"}).startswith("Error:")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("9.8 m/s^2", (9.8, "m/s^2")),
+    ("3 × 10^8 m/s", (3e8, "m/s")),
+    ("$6.02 \\times 10^{23}$", (6.02e23, "")),
+    ("12,000 J", (12000.0, "J")),
+    ("2*sqrt(3)", (pytest.approx(3.4641, rel=1e-4), "")),
+    (42, (42.0, "")),
+    ("The answer is five", None),
+    ("", None),
+])
+def test_parse_quantity(text, expected):
+    assert parse_quantity(text) == expected
+
+
+def test_resolve_option_letters():
+    options = ["10 m/s", "20 m/s"]
+    assert resolve_option("B", options) == "20 m/s"
+    assert resolve_option("(a)", options) == "10 m/s"
+    assert resolve_option("Option B", options) == "20 m/s"
+    assert resolve_option("Acceleration", options) == "Acceleration"
+
+
+def test_check_answer_unit_aware():
+    question = {"answer": "9.8 m/s^2"}
+    assert check_answer(question, {"final_answer": "9.81 m/s^2"})["status"] == "match"
+    assert check_answer(question, {"final_answer": "10.5 m/s^2"})["status"] == "mismatch"
+    assert check_answer(question, {"final_answer": "9.8 N"})["status"] == "unit_mismatch"
+    result = check_answer(question, {"final_answer": "9.8"})
+    assert result["status"] == "match" and result["unit"] == "missing"
+    assert check_answer({"answer": "Photosynthesis"}, {"final_answer": "Respiration"}) is None
+
+
+def test_check_answer_converts_compatible_units():
+    result = check_answer({"answer": "10 m/s"}, {"final_answer": "36 km/h"})
+    assert result["status"] == "match" and result["converted"] == pytest.approx(10.0)
+    assert check_answer({"answer": "1.5 kJ"}, {"final_answer": "1500 J"})["status"] == "match"
+    assert check_answer({"answer": "2 cm"}, {"final_answer": "2 m"})["status"] == "mismatch"
+
+    result = check_answer({"answer": "9.8 m/s^2"}, {"final_answer": "9.8 N"})
+    assert result["status"] == "unit_mismatch"
+    assert result["dimensions"] == ["L T^-2", "L M T^-2"]
+
+
+def test_verify_solver_output_annotates_by_position():
+    bank = {"mcq": [{"question": "q1", "options": ["1", "2"], "answer": "B"}, {"question": "q2", "answer": "x"}]}
+    output = {"mcq": [{"question": "q1", "final_answer": "1"}, {"question": "q2", "final_answer": "y"}]}
+    checked, summary = verify_solver_output(bank, output)
+
+    assert checked["mcq"][0]["answer_check"]["status"] == "mismatch"
+    assert "answer_check" not in checked["mcq"][1]
+    assert "answer_check" not in output["mcq"][0]
+    assert summary["compared"] == 1 and summary["mismatch"] == 1
+    assert summary["mismatches"][0]["index"] == 0
+
+
+def test_solver_agent_runs_answer_checks(fake_llm):
+    state = TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(planning_context={"subject": "Physics"}),
+        question_bank={"short_answer": [{"question": "Speed?", "answer": "20 m/s"}]},
+    )
+    fake = fake_llm(json.dumps({"short_answer": [{"question": "Speed?", "final_answer": "25 m/s"}]}))
+    update = solver_agent(llm=fake, task={"task_id": "solver"}, state=state)
+
+    solution = update["solver_output"]["short_answer"][0]
+    assert solution["answer_check"]["status"] == "mismatch"
+    assert update["knowledge_base"]["solver"] == update["solver_output"]
+    assert update["diagnostics"]["answer_checks"]["mismatch"] == 1
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+from core.cache import SQLiteCacheStore
+from core.graph import amultimodal_node, multimodal_node
+from core.grounding_cache import GroundingCache
+from core.image_store import IMAGES
+from core.page_grounding import merge_grounded_contexts, summarize_page_meta
+from core.state import GroundedContext, TutoringState, UserProfile
+from config.resilience import NODE_RETRIES
+
+
+PROFILE = UserProfile(class_level="11", board="CBSE", target_exam="NEET")
+
+
+def _page(subject, chapter, sub_topic, analysis):
+    return GroundedContext(
+        metadata={"subject": subject, "chapter": chapter, "sub_topic": sub_topic},
+        image_analysis=analysis,
+    )
+
+
+def test_merge_takes_majority_scope_and_keeps_every_sub_topic():
+    merged = merge_grounded_contexts([
+        _page("Physics", "Motion", "Velocity", "A velocity-time graph"),
+        _page("Physics", "Laws of Motion", "Friction", ""),
+        _page("Physics", "Motion", "Velocity", "A ramp"),
+    ])
+
+    assert merged.metadata == {"subject": "Physics", "chapter": "Motion", "sub_topic": "Velocity; Friction"}
+    assert merged.image_analysis == "Page 1: A velocity-time graph\n\nPage 3: A ramp"
+
+
+def test_merge_of_one_page_is_that_page():
+    page = _page("Chemistry", "Bonding", "Ionic", "Lattice")
+    assert merge_grounded_contexts([page]) is page
+
+
+def test_page_meta_falls_back_only_when_every_page_did():
+    ok = {"label": "multimodal:page1", "attempts": 1, "retries": 0, "fallback_used": False}
+    failed = {"label": "multimodal:page2", "attempts": 2, "retries": 1, "fallback_used": True, "error": "boom"}
+
+    partial = summarize_page_meta("multimodal", [ok, failed], 10)
+    assert partial["fallback_used"] is False
+    assert partial["failed_pages"] == [2]
+    assert partial["attempts"] == 2
+    assert partial["error"] == "boom"
+    assert summarize_page_meta("multimodal", [failed, failed], 10)["fallback_used"] is True
+
+
+def _state(*pages):
+    return TutoringState(user_profile=PROFILE, image_refs=[IMAGES.put(page) for page in pages])
+
+
+def test_pages_are_grounded_concurrently_and_merged(monkeypatch):
+    monkeypatch.setattr("core.graph.IMAGE_NORMALIZATION_ENABLED", False)
+
+    def fake_multimodal(image_bytes, user_profile, mime_type):
+        time.sleep(0.2)
+        return _page("Physics", "Motion", image_bytes.decode(), image_bytes.decode())
+
+    monkeypatch.setattr("core.graph.multimodal_vision_agent", fake_multimodal)
+    state = _state(b"page one", b"page two", b"page three")
+
+    started = time.perf_counter()
+    multimodal_node(state)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5
+    assert state.grounded_context.metadata["sub_topic"] == "page one; page two; page three"
+    assert state.grounded_context.image_analysis.startswith("Page 1: page one")
+    labels = [event["label"] for event in state.run_diagnostics["events"]]
+    assert labels == ["multimodal:page1", "multimodal:page2", "multimodal:page3", "multimodal"]
+    assert all(IMAGES.get(ref) is None for ref in state.image_refs)
+
+
+def test_async_pages_are_grounded_concurrently(monkeypatch):
+    monkeypatch.setattr("core.graph.IMAGE_NORMALIZATION_ENABLED", False)
+
+    async def fake_multimodal(image_bytes, user_profile, mime_type):
+        await asyncio.sleep(0.2)
+        return _page("Biology", "Cells", image_bytes.decode(), "")
+
+    monkeypatch.setattr("core.graph.amultimodal_vision_agent", fake_multimodal)
+    state = _state(b"a", b"b", b"c", b"d")
+
+    started = time.perf_counter()
+    asyncio.run(amultimodal_node(state))
+
+    assert time.perf_counter() - started < 0.6
+    assert state.grounded_context.metadata["sub_topic"] == "a; b; c; d"
+
+
+def test_failed_page_does_not_fail_the_others(monkeypatch):
+    monkeypatch.setattr("core.graph.IMAGE_NORMALIZATION_ENABLED", False)
+    monkeypatch.setitem(NODE_RETRIES, "multimodal", 0)
+
+    def fake_multimodal(image_bytes, user_profile, mime_type):
+        if image_bytes == b"blurry":
+            raise RuntimeError("unreadable")
+        return _page("Physics", "Motion", "Velocity", "clear page")
+
+    monkeypatch.setattr("core.graph.multimodal_vision_agent", fake_multimodal)
+    state = _state(b"clear", b"blurry")
+    multimodal_node(state)
+
+    assert state.grounded_context.metadata["chapter"] == "Motion"
+    assert state.run_diagnostics["fallbacks"] == ["multimodal:page2"]
+    assert state.run_diagnostics["events"][-1]["failed_pages"] == [2]
+
+
+def test_grounding_cache_is_per_page(monkeypatch, tmp_path):
+    monkeypatch.setattr("core.graph.IMAGE_NORMALIZATION_ENABLED", False)
+    calls = []
+
+    def fake_multimodal(image_bytes, user_profile, mime_type):
+        calls.append(image_bytes)
+        return _page("Physics", "Motion", image_bytes.decode(), "")
+
+    monkeypatch.setattr("core.graph.multimodal_vision_agent", fake_multimodal)
+    cache = GroundingCache(SQLiteCacheStore(str(tmp_path / "g.sqlite3"), "grounding"))
+
+    multimodal_node(_state(b"first"), cache)
+    state = _state(b"first", b"second")
+    multimodal_node(state, cache)
+
+    assert calls == [b"first", b"second"]
+    diagnostics = state.run_diagnostics["grounding_cache"]
+    assert (diagnostics["hit"], diagnostics["hits"], diagnostics["pages"]) == (False, 1, 2)
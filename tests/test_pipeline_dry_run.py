@@ -1,4 +1,5 @@
 from core.graph import build_graph
+from core.image_store import IMAGES
 from core.state import TutoringState, UserProfile, GroundedContext, PlannerOutput, ensure_state
 from config import agent_executor
 
@@ -124,7 +125,7 @@ def test_pipeline_dry_run(monkeypatch):
             board="CBSE",
             target_exam="NEET",
         ),
-        image_base64="DUMMY_IMAGE",
+        image_refs=[IMAGES.put(b"DUMMY_IMAGE")],
     )
 
     final_state = ensure_state(graph.invoke(initial_state))
@@ -135,3 +136,89 @@ def test_pipeline_dry_run(monkeypatch):
     assert "evaluator" in final_state.knowledge_base
     assert "mcq" in final_state.question_bank
     assert "mcq" in final_state.solver_output
+
+
+def test_async_pipeline_dry_run(monkeypatch):
+    import asyncio
+
+    async def fake_multimodal(*args, **kwargs):
+        return GroundedContext(
+            metadata={"subject": "Physics", "chapter": "Motion", "sub_topic": "Velocity"},
+            image_analysis="Dummy image analysis",
+        )
+
+    async def fake_planner(*args, **kwargs):
+        raise RuntimeError("planner down")
+
+    async def fake_content_analyzer(*args, **kwargs):
+        await asyncio.sleep(0)
+        return {"knowledge_base": {"content_analyzer": "concepts"}}
+
+    def sync_exam_analyst(*args, **kwargs):
+        return {"knowledge_base": {"exam_pattern_analyst": "patterns"}}
+
+    async def fake_generator(*args, **kwargs):
+        return {
+            "question_bank": {"mcq": [{"q": "Dummy", "answer": "A"}]},
+            "knowledge_base": {"question_generator": "questions"},
+        }
+
+    monkeypatch.setattr("core.graph.amultimodal_vision_agent", fake_multimodal)
+    monkeypatch.setattr("core.graph.aplanner_agent", fake_planner)
+    monkeypatch.setitem(agent_executor.ASYNC_AGENT_EXECUTORS, "content_analyzer", fake_content_analyzer)
+    # Agents without a coroutine entry point run their sync function in a thread
+    monkeypatch.delitem(agent_executor.ASYNC_AGENT_EXECUTORS, "exam_pattern_analyst")
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "exam_pattern_analyst", sync_exam_analyst)
+    monkeypatch.setitem(agent_executor.ASYNC_AGENT_EXECUTORS, "question_generator", fake_generator)
+
+    graph = build_graph(None)
+    initial_state = TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=[IMAGES.put(b"DUMMY_IMAGE")],
+    )
+
+    final_state = ensure_state(asyncio.run(graph.ainvoke(initial_state)))
+
+    # Planner failure falls back to the minimal three-agent plan
+    assert "planner" in final_state.run_diagnostics["fallbacks"]
+    assert final_state.grounded_context.metadata["subject"] == "Physics"
+    assert final_state.knowledge_base["content_analyzer"] == "concepts"
+    assert final_state.knowledge_base["exam_pattern_analyst"] == "patterns"
+    assert final_state.question_bank["mcq"] == [{"q": "Dummy", "answer": "A"}]
+
+
+def test_stage_events_streamed(monkeypatch):
+    def fake_multimodal(*args, **kwargs):
+        return GroundedContext(metadata={"subject": "Biology"}, image_analysis="cells")
+
+    def fake_planner(*args, **kwargs):
+        raise RuntimeError("planner down")
+
+    def fake_agent(agent_id):
+        def _run(*args, **kwargs):
+            return {"knowledge_base": {agent_id: agent_id}}
+        return _run
+
+    monkeypatch.setattr("core.graph.multimodal_vision_agent", fake_multimodal)
+    monkeypatch.setattr("core.graph.planner_agent", fake_planner)
+    for agent_id in ("content_analyzer", "exam_pattern_analyst", "question_generator"):
+        monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, agent_id, fake_agent(agent_id))
+
+    graph = build_graph(None)
+    initial_state = TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=[IMAGES.put(b"DUMMY_IMAGE")],
+    )
+
+    events = list(graph.stream(initial_state, stream_mode="custom"))
+
+    assert [event["stage"] for event in events] == [
+        "multimodal",
+        "planner",
+        "agent:content_analyzer",
+        "agent:exam_pattern_analyst",
+        "agent:question_generator",
+        "executor",
+    ]
+    assert events[0]["output"]["metadata"] == {"subject": "Biology"}
+    assert all("duration_ms" in event["timing"] for event in events)
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import re
+import time
+
+import pytest
+
+from agents.generation.question_generator import question_generator_agent, aquestion_generator_agent
+from agents.solving.solver_agent import PipelinedSolver, solver_agent, asolver_agent
+from core.cache import LRUCache
+from core.handoff import hand_over, take_over
+from core.llm_cache import CachedLLM
+from core.routing import task_executor
+from core.state import PlannerOutput, TutoringState, UserProfile
+from preprocessing.json_utils import IncrementalJSONItems
+
+BANK = {
+    "mcq": [{"question": f"M{i}", "options": ["A", "B"], "answer": "A"} for i in range(3)],
+    "short_answer": [{"question": "S0", "answer": "x"}],
+    "long_answer": [],
+}
+
+
+def _task(agent_id):
+    return {
+        "task_id": agent_id,
+        "purpose": agent_id,
+        "expected_output": agent_id,
+        "executed_by": agent_id,
+    }
+
+
+def _state(*agents):
+    return TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(
+            planning_context={"subject": "Physics"},
+            subtasks=[_task(agent) for agent in agents],
+            execution_order=list(agents),
+        ),
+    )
+
+
+def _respond(prompt, events=None):
+    if "solution-writing agent" not in prompt:
+        return "Here you go:\n```json\n" + json.dumps(BANK) + "\n```"
+    question = re.search(r'"question":"([^"]+)"', prompt).group(1)
+    section = re.search(r'QUESTIONS:\n\{"(\w+)"', prompt).group(1)
+    if events is not None:
+        events.append(f"solve:{question}")
+    return json.dumps({section: [{"question": question, "steps": ["s"], "final_answer": question.lower()}]})
+
+
+@pytest.fixture(autouse=True)
+def pipelined(monkeypatch):
+    monkeypatch.setattr("agents.generation.question_generator.PIPELINED_SOLVING_ENABLED", True)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, 10000])
+def test_incremental_items_across_chunk_sizes(chunk_size):
+    text = 'Note [1]: {"mcq": [{"question": "a}{\\"", "k": [{}]}, "skip", {"question": "b"}], "long_answer": [{"q": 1}]} trailing {"mcq": [{}]}'
+    parser = IncrementalJSONItems()
+    found = []
+    for start in range(0, len(text), chunk_size):
+        found += parser.feed(text[start:start + chunk_size])
+
+    assert found == [
+        ("mcq", 0, {"question": 'a}{"', "k": [{}]}),
+        ("mcq", 1, {"question": "b"}),
+        ("long_answer", 0, {"q": 1}),
+    ]
+    assert parser.items == 3
+
+
+def test_incremental_items_top_level_array():
+    parser = IncrementalJSONItems()
+    assert parser.feed('[{"question": "a"}, {"quest') == [("mcq", 0, {"question": "a"})]
+    assert parser.feed('ion": "b"}]') == [("mcq", 1, {"question": "b"})]
+
+
+def test_solving_starts_while_generator_streams(fake_llm):
+    events = []
+    fake = fake_llm(lambda prompt: _respond(prompt, events), chunk_size=8)
+    stream = fake.stream
+
+    def slow_stream(prompt, **kwargs):
+        for chunk in stream(prompt, **kwargs):
+            events.append("chunk")
+            time.sleep(0.002)
+            yield chunk
+
+    fake.stream = slow_stream
+    state = _state("question_generator", "solver")
+    update = question_generator_agent(llm=fake, task=_task("question_generator"), state=state)
+
+    assert events.index("solve:M0") < len(events) - 1 - events[::-1].index("chunk")
+    assert update["question_bank"]["mcq"][2]["question"] == "M2"
+    assert "solver_output" not in update
+    assert update["diagnostics"]["streaming"]["items"] == 4
+    assert update["diagnostics"]["json_extraction"]["strategy"] == "scan"
+
+    # The solver task picks up the solves the generator started.
+    state.question_bank = update["question_bank"]
+    update = solver_agent(llm=fake, task=_task("solver"), state=state)
+
+    assert [s["final_answer"] for s in update["solver_output"]["mcq"]] == ["m0", "m1", "m2"]
+    assert update["solver_output"]["short_answer"][0]["final_answer"] == "s0"
+    assert update["diagnostics"]["pipelined_solver"]["streamed"] == 4
+    assert update["diagnostics"]["json_extraction"] == {"strategy": "pipelined"}
+
+
+def test_solver_task_resolves_failed_pipelined_solves(fake_llm):
+    failures = []
+
+    def respond(prompt):
+        if '"question":"M1"' in prompt and len(failures) < 2:
+            failures.append(prompt)
+            raise RuntimeError("provider error")
+        return _respond(prompt)
+
+    fake = fake_llm(respond)
+    state = _state("question_generator", "solver")
+    state.question_bank = BANK
+    solver = PipelinedSolver(fake, state)
+    for section in ("mcq", "short_answer"):
+        for index, item in enumerate(BANK[section]):
+            solver.submit(section, index, item)
+    hand_over(state.run_id, PipelinedSolver.HANDOFF_KEY, solver)
+
+    update = solver_agent(llm=fake, task=_task("solver"), state=state)
+
+    # Both pipelined attempts at M1 failed; the solver task solved it again.
+    assert len(failures) == 2
+    assert len(fake.calls) == 6
+    assert [s["final_answer"] for s in update["solver_output"]["mcq"]] == ["m0", "m1", "m2"]
+    assert [report["offset"] for report in update["diagnostics"]["shards"]] == [1]
+    assert solver.closed
+    assert take_over(state.run_id, PipelinedSolver.HANDOFF_KEY) is None
+
+
+def test_pipelined_solves_stop_at_the_deadline(fake_llm):
+    calls = []
+    fake = fake_llm(lambda prompt: calls.append(prompt) or _respond(prompt))
+    state = _state("question_generator", "solver")
+    state.deadline_at = time.time() - 1
+    solver = PipelinedSolver(fake, state)
+    try:
+        solver.submit("mcq", 0, BANK["mcq"][0])
+        output, diagnostics = solver.finish(BANK)
+    finally:
+        solver.close()
+
+    assert calls == []
+    assert [s["final_answer"] for s in output["mcq"]] == ["", "", ""]
+    assert diagnostics["shards"][0]["fallback_used"] is True
+
+
+def test_no_streaming_without_solver_task(fake_llm):
+    fake = fake_llm(_respond, structured=False)
+    update = question_generator_agent(llm=fake, task=_task("question_generator"), state=_state("question_generator"))
+
+    assert fake.stream_calls == []
+    assert "solver_output" not in update
+
+
+def test_pipeline_through_task_executor(fake_llm):
+    fake = fake_llm(_respond)
+    llm = CachedLLM(fake, model_name="test-model", memory=LRUCache(32))
+    state = task_executor(llm=llm, state=_state("question_generator", "solver"))
+
+    # One generator stream plus one call per question; the solver task adds none.
+    assert len(fake.calls) == 5
+    assert len(fake.stream_calls) == 1
+    assert [s["final_answer"] for s in state.solver_output["mcq"]] == ["m0", "m1", "m2"]
+    assert state.knowledge_base["solver"] == state.solver_output
+    assert state.run_diagnostics["json_extraction"]["solver"] == {"strategy": "pipelined"}
+
+
+def test_async_pipelined_generation(fake_llm):
+    fake = fake_llm(_respond)
+    state = _state("question_generator", "solver")
+
+    async def run():
+        update = await aquestion_generator_agent(llm=fake, task=_task("question_generator"), state=state)
+        state.question_bank = update["question_bank"]
+        return await asolver_agent(llm=fake, task=_task("solver"), state=state)
+
+    update = asyncio.run(run())
+
+    assert len(fake.stream_calls) == 1
+    assert len(fake.calls) == 5
+    assert [s["final_answer"] for s in update["solver_output"]["mcq"]] == ["m0", "m1", "m2"]
+    assert update["diagnostics"]["pipelined_solver"]["streamed"] == 4
+
+
+def test_pipelined_solves_finish_while_agent_bodies_fill_the_pool(fake_llm, monkeypatch):
+    from core import resilience
+
+    # One shared worker: the generator body holds it while its solves run.
+    monkeypatch.setattr(resilience, "_executors", {})
+    monkeypatch.setitem(resilience._POOL_SIZES, "resilience", 1)
+    fake = fake_llm(_respond)
+    state = _state("question_generator", "solver")
+    state.deadline_at = time.time() + 5
+
+    start = time.time()
+    state = task_executor(llm=fake, state=state)
+
+    assert time.time() - start < 2
+    assert state.run_diagnostics["fallbacks"] == []
+    assert [s["final_answer"] for s in state.solver_output["mcq"]] == ["m0", "m1", "m2"]
+    assert state.run_diagnostics["shards"]["solver"] == []
+    pipelined = state.run_diagnostics["pipelined_solver"]["solver"]
+    assert not any(report["fallback_used"] for report in pipelined["shards"])
+
+
+def test_pipelined_solves_are_timed_with_the_solver(fake_llm, monkeypatch):
+    recorded = {}
+    monkeypatch.setattr(
+        "core.routing.LATENCY_TRACKER.record",
+        lambda agent_id, duration_ms: recorded.setdefault(agent_id, duration_ms),
+    )
+
+    def respond(prompt):
+        if "solution-writing agent" in prompt:
+            time.sleep(0.3)
+        return _respond(prompt)
+
+    state = task_executor(llm=fake_llm(respond), state=_state("question_generator", "solver"))
+
+    assert [s["final_answer"] for s in state.solver_output["mcq"]] == ["m0", "m1", "m2"]
+    timings = state.run_diagnostics["timings_ms"]
+    # The generator returns once its stream is parsed; the solver task waits.
+    assert timings["agent:question_generator"] < 200 <= timings["agent:solver"]
+    assert recorded["question_generator"] == timings["agent:question_generator"]
+    assert recorded["solver"] == timings["agent:solver"]
+
+
+def test_abandoned_generator_attempt_cancels_its_solves(fake_llm):
+    from core.resilience import run_with_retry
+
+    solves = []
+    bank = {"mcq": [{"question": f"M{i}", "options": ["A", "B"], "answer": "A"} for i in range(8)]}
+
+    def respond(prompt):
+        if "solution-writing agent" not in prompt:
+            return json.dumps(bank)
+        solves.append(prompt)
+        time.sleep(0.3)
+        return _respond(prompt)
+
+    fake = fake_llm(respond)
+    stream = fake.stream
+
+    def stalled_stream(prompt, **kwargs):
+        yield from stream(prompt, **kwargs)
+        time.sleep(1)
+
+    fake.stream = stalled_stream
+    state = _state("question_generator", "solver")
+    update, meta = run_with_retry(
+        "agent:question_generator",
+        lambda: question_generator_agent(llm=fake, task=_task("question_generator"), state=state),
+        timeout_sec=0.15,
+        fallback=lambda _exc: "fallback",
+    )
+    time.sleep(1.5)
+
+    assert (update, meta["timeout"]) == ("fallback", True)
+    # Only the solves already sent when the attempt was abandoned ran.
+    assert len(solves) == 4
+    assert take_over(state.run_id, PipelinedSolver.HANDOFF_KEY) is None
+
+
+def test_cached_stream_replays_as_one_chunk(fake_llm):
+    fake = fake_llm("streamed text", chunk_size=4)
+    view = CachedLLM(fake, model_name="m", memory=LRUCache(8)).for_agent("question_generator")
+
+    assert "".join(c.content for c in view.stream("p")) == "streamed text"
+    replay = list(view.stream("p"))
+    assert [c.content for c in replay] == ["streamed text"]
+    assert view.stats() == {"enabled": True, "hits": 1, "misses": 1}
@@ -0,0 +1,117 @@
+import json
+
+from core.graph import build_graph
+from core.plan_cache import PlanCache
+from core.planner_repair import fallback_plan
+from core.state import TutoringState, UserProfile, GroundedContext, ensure_state
+from config import agent_executor
+from config.cache import STANDARD_PLAN_TEMPLATE
+
+
+PROFILE = UserProfile(class_level="11", board="CBSE", target_exam="NEET")
+CONTEXT = GroundedContext(
+    metadata={"subject": "Chemistry", "chapter": "Atoms", "sub_topic": "Isotopes"},
+)
+
+
+def test_lookup_normalizes_profile_and_context():
+    cache = PlanCache()
+    cache.store(PROFILE, CONTEXT, fallback_plan(PROFILE, CONTEXT))
+
+    other_profile = UserProfile(class_level=" 11 ", board="cbse", target_exam="NEET")
+    other_context = GroundedContext(
+        metadata={"subject": "chemistry ", "chapter": "ATOMS", "sub_topic": "Isotopes"},
+    )
+    plan, source = cache.lookup(other_profile, other_context)
+
+    assert source == "cache"
+    assert plan.planning_context["board"] == "cbse"
+    assert [t["executed_by"] for t in plan.subtasks][0] == "content_analyzer"
+    assert cache.stats()["hits"] == 1
+
+
+def test_template_match_and_eviction():
+    template = dict(STANDARD_PLAN_TEMPLATE, match={"target_exam": "JEE"})
+    cache = PlanCache(max_entries=1, templates=[template])
+
+    plan, source = cache.lookup(PROFILE, CONTEXT)
+    assert (plan, source) == (None, None)
+
+    jee = UserProfile(class_level="12", board="CBSE", target_exam="jee")
+    plan, source = cache.lookup(jee, CONTEXT)
+    assert source == "template"
+    assert len(plan.execution_order) == 6
+
+    cache.store(PROFILE, CONTEXT, fallback_plan(PROFILE, CONTEXT))
+    cache.store(jee, CONTEXT, fallback_plan(jee, CONTEXT))
+    assert cache.lookup(PROFILE, CONTEXT) == (None, None)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_seed_from_snapshots_skips_plans_the_live_path_would_not_store(tmp_path):
+    plan = fallback_plan(PROFILE, CONTEXT).model_dump()
+    good = {
+        "stage": "planner",
+        "state": {
+            "user_profile": PROFILE.model_dump(),
+            "grounded_context": CONTEXT.model_dump(),
+            "plan": plan,
+            "run_diagnostics": {"fallbacks": [], "plan_status": "valid"},
+        },
+    }
+    rejected = []
+    for chapter, diagnostics in (
+        ("Bonding", {"fallbacks": ["planner"], "plan_status": "fallback"}),
+        ("Moles", {"fallbacks": [], "plan_status": "repaired"}),
+        ("Orbitals", {
+            "fallbacks": [],
+            "plan_status": "valid",
+            "plan_cache": {"hit": True, "source": "template"},
+        }),
+        ("Periodic", {"fallbacks": []}),
+    ):
+        record = json.loads(json.dumps(good))
+        record["state"]["grounded_context"]["metadata"]["chapter"] = chapter
+        record["state"]["run_diagnostics"] = diagnostics
+        rejected.append(record)
+
+    path = tmp_path / "state.jsonl"
+    records = [good, *rejected, {"stage": "multimodal"}]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+
+    cache = PlanCache()
+    assert cache.seed_from_snapshots(str(path)) == 1
+    assert cache.lookup(PROFILE, CONTEXT)[1] == "cache"
+
+
+def test_planner_llm_skipped_on_cache_hit(monkeypatch):
+    planner_calls = []
+
+    def fake_multimodal(*args, **kwargs):
+        return CONTEXT
+
+    def fake_planner(*args, **kwargs):
+        planner_calls.append(1)
+        return fallback_plan(PROFILE, CONTEXT)
+
+    def fake_agent(agent_id):
+        def _run(*args, **kwargs):
+            return {"knowledge_base": {agent_id: agent_id}}
+        return _run
+
+    monkeypatch.setattr("core.graph.multimodal_vision_agent", fake_multimodal)
+    monkeypatch.setattr("core.graph.planner_agent", fake_planner)
+    for agent_id in ("content_analyzer", "exam_pattern_analyst", "question_generator"):
+        monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, agent_id, fake_agent(agent_id))
+
+    graph = build_graph(None, plan_cache=PlanCache())
+    states = [
+        ensure_state(graph.invoke(TutoringState(user_profile=PROFILE, image_refs=["x"])))
+        for _ in range(2)
+    ]
+
+    assert planner_calls == [1]
+    assert states[0].run_diagnostics["plan_cache"]["hit"] is False
+    assert states[1].run_diagnostics["plan_cache"]["hit"] is True
+    assert states[1].run_diagnostics["plan_cache"]["source"] == "cache"
+    assert states[1].plan.execution_order == states[0].plan.execution_order
@@ -0,0 +1,180 @@
+import time
+
+from core import latency, pre_evaluation, routing
+from core.latency import LatencyTracker
+from core.pre_evaluation import can_skip_evaluator, design_counts, pre_evaluate
+from core.routing import task_executor
+from core.state import PlannerOutput, TutoringState, UserProfile
+from config import agent_executor
+
+BANK = {
+    "mcq": [
+        {"question": "Unit of force?", "options": ["N", "J", "W"], "answer": "A"},
+        {"question": "Speed of light?", "options": ["3e8 m/s", "3e6 m/s"], "answer": "3e8 m/s"},
+    ],
+    "short_answer": [{"question": "g on Earth?", "answer": "9.8 m/s^2"}],
+}
+SOLUTIONS = {
+    "mcq": [
+        {"question": "Unit of force?", "steps": ["F = ma"], "final_answer": "N"},
+        {"question": "Speed of light?", "steps": ["c"], "final_answer": "A"},
+    ],
+    "short_answer": [{"question": "g on Earth?", "steps": ["GM/R^2"], "final_answer": "9.81 m/s^2"}],
+}
+
+
+def _task(task_id, agent_id):
+    return {
+        "task_id": task_id,
+        "purpose": task_id,
+        "expected_output": task_id,
+        "priority": "High",
+        "executed_by": agent_id,
+    }
+
+
+def _state(**fields):
+    return TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(
+            subtasks=[_task("solve", "solver"), _task("evaluate", "evaluator")],
+            execution_order=["solve", "evaluate"],
+        ),
+        question_bank=BANK,
+        **fields,
+    )
+
+
+def test_design_counts():
+    assert design_counts("Create 5 MCQs (2 easy, 3 hard) and 3 short answer questions.") == {
+        "mcq": 5,
+        "short_answer": 3,
+    }
+    assert design_counts("Long answer: 2") == {"long_answer": 2}
+    assert design_counts("4 MCQs ... later 6 MCQs") == {}
+    assert design_counts(None) == {}
+
+
+def test_structural_checks_find_issues():
+    bank = {
+        "mcq": [
+            {"question": "q0", "options": ["a", "b", "A "], "answer": "e"},
+            {"question": "q1", "options": [], "answer": "a"},
+        ],
+        "short_answer": [{"question": "q2", "answer": "x"}],
+    }
+    solutions = {"mcq": [{"final_answer": "a"}, {"final_answer": "", "steps": []}]}
+    report = pre_evaluate(bank, solutions, "3 MCQs")
+
+    found = {(issue["check"], issue["section"], issue["index"]) for issue in report["issues"]}
+    assert found == {
+        ("mcq_answer_in_options", "mcq", 0),
+        ("mcq_answer_in_options", "mcq", 1),
+        ("duplicate_options", "mcq", 0),
+        ("empty_solutions", "mcq", 1),
+        ("empty_solutions", "short_answer", 0),
+        ("section_counts", "mcq", None),
+        ("answer_key_agreement", "mcq", 0),
+    }
+    assert report["clean"] is False
+
+
+def test_report_records_which_checks_ran():
+    report = pre_evaluate(BANK, {}, checks=("mcq_answer_in_options", "answer_key_agreement"))
+    assert report["ran"] == ["mcq_answer_in_options"]
+    assert report["checks"]["duplicate_options"] == {"ran": False, "reason": "disabled"}
+    assert report["checks"]["answer_key_agreement"] == {"ran": False, "reason": "no solver output"}
+    assert report["checks"]["mcq_answer_in_options"] == {"ran": True, "checked": 2, "issues": 0}
+
+
+def test_solver_key_disagreement():
+    solutions = {**SOLUTIONS, "mcq": [SOLUTIONS["mcq"][0], {"final_answer": "3e6 m/s"}]}
+    report = pre_evaluate(BANK, solutions)
+    assert [issue["check"] for issue in report["issues"]] == ["answer_key_agreement"]
+    assert report["verified"] == 2 and report["confidence"] == round(2 / 3, 3)
+
+
+def test_failing_checks_never_fail_the_run(monkeypatch):
+    def explode(*args, **kwargs):
+        raise OverflowError("int too large to convert to float")
+
+    monkeypatch.setattr(pre_evaluation, "check_answer", explode)
+    report = pre_evaluate(BANK, SOLUTIONS)
+    assert report["failed"] == [] and report["verified"] == 0
+
+    monkeypatch.setitem(pre_evaluation.CHECKS, "duplicate_options", explode)
+    report = pre_evaluate(BANK, SOLUTIONS)
+    assert report["failed"] == ["duplicate_options"]
+    assert report["checks"]["duplicate_options"]["ran"] is False
+    assert not can_skip_evaluator({**report, "verified": 3, "confidence": 1.0}, min_confidence=0.5)
+
+    calls = []
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "solver", lambda *a, **k: {"solver_output": SOLUTIONS})
+    monkeypatch.setitem(
+        agent_executor.AGENT_EXECUTORS,
+        "evaluator",
+        lambda *a, **k: calls.append("evaluator") or {"evaluation": {"overall_feedback": "ok"}},
+    )
+    updated = task_executor(llm=None, state=_state())
+    assert calls == ["evaluator"]
+    assert updated.run_diagnostics["pre_evaluation"]["decision"] == "run_evaluator"
+
+
+def test_clean_bank_skips_evaluator(monkeypatch):
+    def fake_solver(*args, **kwargs):
+        return {"solver_output": SOLUTIONS, "knowledge_base": {"solver": SOLUTIONS}}
+
+    def fail_evaluator(*args, **kwargs):
+        raise AssertionError("evaluator should have been skipped")
+
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "solver", fake_solver)
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "evaluator", fail_evaluator)
+    updated = task_executor(llm=None, state=_state())
+
+    evaluation = updated.evaluation
+    assert evaluation["status"] == "pre_evaluated"
+    assert [item["is_correct"] for item in evaluation["mcq"]] == [True, True]
+    assert evaluation["short_answer"][0]["score"] == 1.0
+    assert updated.run_diagnostics["pre_evaluation"]["decision"] == "skip_clean"
+    assert updated.run_diagnostics["skipped"] == ["evaluator"]
+
+
+def test_issues_keep_the_evaluator(monkeypatch):
+    solutions = {**SOLUTIONS, "short_answer": [{"final_answer": "12 m/s^2"}]}
+    calls = []
+
+    def fake_solver(*args, **kwargs):
+        return {"solver_output": solutions, "knowledge_base": {"solver": solutions}}
+
+    def fake_evaluator(*args, **kwargs):
+        calls.append("evaluator")
+        return {"evaluation": {"overall_feedback": "ok"}, "knowledge_base": {"evaluator": "ok"}}
+
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "solver", fake_solver)
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "evaluator", fake_evaluator)
+    updated = task_executor(llm=None, state=_state())
+
+    assert calls == ["evaluator"]
+    report = updated.run_diagnostics["pre_evaluation"]
+    assert report["decision"] == "run_evaluator"
+    assert report["issues"][0]["check"] == "answer_key_agreement"
+
+
+def test_deadline_skip_keeps_rule_based_results(monkeypatch):
+    tracker = LatencyTracker({"solver": 10, "evaluator": 60000})
+    monkeypatch.setattr(latency, "LATENCY_TRACKER", tracker)
+    monkeypatch.setattr(routing, "LATENCY_TRACKER", tracker)
+    solutions = {**SOLUTIONS, "mcq": [SOLUTIONS["mcq"][0], {"final_answer": "3e6 m/s"}]}
+
+    def fake_solver(*args, **kwargs):
+        return {"solver_output": solutions, "knowledge_base": {"solver": solutions}}
+
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "solver", fake_solver)
+    updated = task_executor(llm=None, state=_state(deadline_at=time.time() + 5))
+
+    evaluation = updated.evaluation
+    assert evaluation["status"] == "deferred"
+    assert [item["is_correct"] for item in evaluation["mcq"]] == [True, False]
+    assert "answer_key_agreement" in evaluation["pre_evaluation"]["ran"]
+    assert updated.run_diagnostics["pre_evaluation"]["decision"] == "skip_deadline"
@@ -0,0 +1,98 @@
+from core.question_index import QuestionIndex, minhash, question_scope, similarity
+from core.routing import task_executor
+from core.state import PlannerOutput, TutoringState, UserProfile
+from config import agent_executor
+
+KE = "A body of mass 2 kg moves with a velocity of 10 m/s. Find its kinetic energy."
+KE_NEAR = "A body of mass 3 kg moves with a velocity of 10 m/s. Find its kinetic energy?"
+CELL = "Which organelle is known as the powerhouse of the cell?"
+ACID = "What is the pH of a 0.01 M solution of hydrochloric acid?"
+
+
+def _index(tmp_path, **kwargs):
+    return QuestionIndex(str(tmp_path / "questions.sqlite3"), **kwargs)
+
+
+def test_minhash_estimates_similarity():
+    assert similarity(minhash(KE), minhash(KE_NEAR)) >= 0.8
+    assert similarity(minhash(KE), minhash(CELL)) < 0.2
+    assert minhash(KE) == minhash(KE.upper() + "  ")
+    assert len(minhash("ab")) == 64
+    assert minhash(" ?! ") is None
+
+
+def test_screen_drops_repeats_across_runs_and_within_a_bank(tmp_path):
+    index = _index(tmp_path)
+    bank = {"mcq": [{"question": KE}, {"question": KE_NEAR}], "short_answer": [{"question": CELL}]}
+    screened, kept, report = index.screen("cbse|neet|work", bank)
+
+    assert [q["question"] for q in screened["mcq"]] == [KE]
+    assert kept == {"mcq": [0], "short_answer": [0]}
+    assert report["duplicates"][0]["index"] == 1
+    assert report["duplicates"][0]["question"] == KE
+
+    # A fresh instance on the same file sees the indexed stems.
+    reopened = _index(tmp_path)
+    assert reopened.find("cbse|neet|work", CELL)["question"] == CELL
+    assert reopened.find("cbse|jee|work", CELL) is None
+    assert reopened.recent("cbse|neet|work", 5) == [CELL, KE]
+
+
+def test_flag_keeps_duplicates(tmp_path):
+    index = _index(tmp_path)
+    index.add("s", [KE])
+    screened, kept, report = index.screen("s", {"mcq": [{"question": KE_NEAR}, {"question": ACID}]}, action="flag")
+
+    assert kept["mcq"] == [0, 1]
+    assert screened["mcq"][0]["duplicate_of"]["question"] == KE
+    assert "duplicate_of" not in screened["mcq"][1]
+    assert report["action"] == "flag" and len(report["duplicates"]) == 1
+
+
+def test_compaction_and_memory_bounds(tmp_path):
+    index = _index(tmp_path, max_per_scope=10, memory_scopes=2)
+    for scope in ("a", "b", "c"):
+        index.add(scope, [f"Question number {i} about topic {scope} and nothing else" for i in range(12)])
+
+    stats = index.stats()
+    assert stats["scopes_in_memory"] == 2
+    assert stats["compacted"] == 6
+    assert len(index.recent("a", 100)) == 10
+    assert index.find("a", "Question number 0 about topic a and nothing else") is None
+    assert index.find("a", "Question number 11 about topic a and nothing else") is not None
+
+
+def _state():
+    return TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(
+            planning_context={"chapter": "Work and Energy"},
+            subtasks=[{"task_id": "generate", "executed_by": "question_generator"}],
+            execution_order=["generate"],
+        ),
+    )
+
+
+def test_executor_screens_generated_questions(tmp_path, monkeypatch):
+    tasks = []
+
+    def fake_generator(llm, task, state):
+        tasks.append(task)
+        bank = {"mcq": [{"question": KE}, {"question": ACID}], "short_answer": [], "long_answer": []}
+        solutions = {"mcq": [{"final_answer": "100 J"}, {"final_answer": "2"}], "short_answer": [], "long_answer": []}
+        return {"question_bank": bank, "solver_output": solutions, "knowledge_base": {"generate": bank}}
+
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "question_generator", fake_generator)
+    index = _index(tmp_path)
+    index.add("cbse|neet|work and energy", [KE_NEAR])
+
+    state = task_executor(llm=None, state=_state(), question_index=index)
+
+    assert question_scope(state) == "cbse|neet|work and energy"
+    assert tasks[0]["avoid_questions"] == [KE_NEAR]
+    assert [q["question"] for q in state.question_bank["mcq"]] == [ACID]
+    assert state.solver_output["mcq"] == [{"final_answer": "2"}]
+    assert state.knowledge_base["question_generator"] == state.question_bank
+    report = state.run_diagnostics["question_index"]["question_generator"]
+    assert report["checked"] == 2 and len(report["duplicates"]) == 1
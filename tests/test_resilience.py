@@ -56,10 +56,231 @@ def test_agent_fallback_on_failure(monkeypatch):
 
     state = TutoringState(
         user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
-        image_base64="dummy",
+        image_refs=["dummy"],
         plan=plan,
     )
 
     updated = task_executor(llm=None, state=state)
     assert "content_analyzer" in updated.knowledge_base
     assert "agent:content_analyzer" in updated.run_diagnostics.get("fallbacks", [])
+
+
+def test_async_retry_times_out_and_falls_back():
+    import asyncio
+
+    from core.resilience import arun_with_retry
+
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(5)
+
+    result, meta = asyncio.run(
+        arun_with_retry(
+            "slow",
+            slow,
+            retries=1,
+            timeout_sec=0.01,
+            fallback=lambda _exc: "fallback",
+        )
+    )
+
+    assert result == "fallback"
+    assert len(calls) == 2
+    assert meta["timeout"] is True
+    assert meta["fallback_used"] is True
+
+
+def test_timeout_returns_without_waiting_for_hung_call():
+    import threading
+    import time
+
+    from core.resilience import run_with_retry
+
+    release = threading.Event()
+
+    def hung():
+        release.wait(5)
+
+    start = time.time()
+    result, meta = run_with_retry(
+        "hung",
+        hung,
+        timeout_sec=0.05,
+        fallback=lambda _exc: "fallback",
+    )
+    elapsed = time.time() - start
+    release.set()
+
+    assert result == "fallback"
+    assert meta["timeout"] is True
+    assert elapsed < 1
+
+
+def test_retries_only_get_remaining_deadline_budget():
+    import time
+
+    from core.resilience import run_with_retry
+
+    calls = []
+
+    def slow():
+        calls.append(time.time())
+        time.sleep(0.3)
+
+    start = time.time()
+    result, meta = run_with_retry(
+        "slow",
+        slow,
+        retries=5,
+        timeout_sec=10,
+        fallback=lambda _exc: "fallback",
+        deadline=time.time() + 0.1,
+    )
+
+    assert result == "fallback"
+    assert len(calls) == 1
+    assert meta["deadline_exceeded"] is True
+    assert time.time() - start < 1
+
+
+def test_run_all_retries_each_call_and_stops_at_the_deadline():
+    import threading
+    import time
+
+    from core.resilience import run_all_with_retry
+
+    lock = threading.Lock()
+    active, peak, flaky = [0], [0], []
+    release = threading.Event()
+
+    def call(index):
+        def _run():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                time.sleep(0.02)
+                if index == 1 and not flaky:
+                    flaky.append(1)
+                    raise RuntimeError("flaky")
+                if index == 3:
+                    release.wait(5)
+                return index
+            finally:
+                with lock:
+                    active[0] -= 1
+        return _run
+
+    start = time.time()
+    results = run_all_with_retry(
+        [(f"call{index}", call(index)) for index in range(4)],
+        max_parallel=2,
+        retries=1,
+        fallback=lambda index, _exc: f"fallback{index}",
+        deadline=time.time() + 0.3,
+    )
+    elapsed = time.time() - start
+    release.set()
+
+    assert [result for result, _meta in results] == [0, 1, 2, "fallback3"]
+    assert results[1][1]["attempts"] == 2
+    assert results[3][1]["deadline_exceeded"] is True
+    assert peak[0] <= 2
+    assert elapsed < 1
+
+
+def test_fanned_out_calls_finish_while_agent_bodies_fill_the_pool(monkeypatch):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from core import resilience
+    from core.resilience import run_all_with_retry, run_with_retry
+
+    monkeypatch.setattr(resilience, "_executors", {})
+    monkeypatch.setitem(resilience._POOL_SIZES, "resilience", 2)
+    monkeypatch.setitem(resilience._POOL_SIZES, "fanout", 2)
+
+    def agent():
+        # Runs on one of the two shared workers, like a solver agent body.
+        return run_all_with_retry(
+            [(f"shard{index}", lambda index=index: index) for index in range(3)],
+            max_parallel=3,
+            fallback=lambda index, _exc: "fallback",
+            deadline=time.time() + 1.5,
+        )
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=2) as callers:
+        futures = [callers.submit(run_with_retry, "agent", agent, timeout_sec=5) for _ in range(2)]
+        outcomes = [future.result()[0] for future in futures]
+
+    assert [[result for result, _meta in outcome] for outcome in outcomes] == [[0, 1, 2]] * 2
+    assert time.time() - start < 1
+
+
+def test_abandoned_attempt_runs_its_callbacks():
+    import threading
+    import time
+
+    from core.resilience import on_abandon, run_with_retry
+
+    stopped = threading.Event()
+    finished = []
+
+    def body():
+        on_abandon(stopped.set)
+        # Background work started by the attempt, polling for a stop.
+        stopped.wait(2)
+        finished.append(stopped.is_set())
+        return "late"
+
+    result, meta = run_with_retry("agent", body, timeout_sec=0.1, fallback=lambda _exc: "fallback")
+    time.sleep(0.1)
+
+    assert (result, meta["timeout"]) == ("fallback", True)
+    assert finished == [True]
+
+    called = []
+    assert run_with_retry("agent", lambda: on_abandon(lambda: called.append(1)) or "ok", timeout_sec=1)[0] == "ok"
+    on_abandon(lambda: called.append(1))
+    assert called == []
+
+
+def test_expired_deadline_skips_agents(monkeypatch):
+    import time
+
+    calls = []
+
+    def agent(*args, **kwargs):
+        calls.append(1)
+        return {"knowledge_base": {"content_analyzer": "content"}}
+
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "content_analyzer", agent)
+
+    plan = PlannerOutput(
+        planning_context={},
+        objective="test",
+        subtasks=[
+            {
+                "task_id": "content_analyzer",
+                "purpose": "Extract",
+                "expected_output": "Extracted content",
+                "priority": "High",
+                "executed_by": "content_analyzer",
+            }
+        ],
+        execution_order=["content_analyzer"],
+    )
+    state = TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=plan,
+        deadline_at=time.time() - 1,
+    )
+
+    updated = task_executor(llm=None, state=state)
+
+    assert calls == []
+    assert "agent:content_analyzer" in updated.run_diagnostics["fallbacks"]
@@ -0,0 +1,206 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import closing
+
+import pytest
+
+from core.image_store import IMAGES
+from core.single_flight import CoalescedRequestError, SingleFlight
+from interfaces import api
+
+
+def _concurrently(count, target):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(position):
+        barrier.wait()
+        results[position] = target()
+
+    threads = [threading.Thread(target=worker, args=(position,)) for position in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_concurrent_threads_share_one_run():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"answer": 42}
+
+    results = _concurrently(5, lambda: flight.run("k", work))
+
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [{"answer": 42}] * 5
+    assert sorted(meta["role"] for _, meta in results) == ["follower"] * 4 + ["leader"]
+    assert flight.stats() == {
+        "leaders": 1, "coalesced": 4, "coalesced_local": 4, "coalesced_shared": 0, "in_flight": 0,
+    }
+
+
+def test_sequential_requests_are_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+    flight.run("k", lambda: calls.append(1))
+    flight.run("k", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_followers_receive_the_leaders_error():
+    flight = SingleFlight()
+
+    def work():
+        time.sleep(0.2)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            flight.run("k", work)
+        except RuntimeError as exc:
+            return str(exc)
+
+    assert _concurrently(3, call) == ["boom"] * 3
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_async_callers_share_one_run():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"answer": 1}
+
+    async def main():
+        return await asyncio.gather(*(flight.arun("k", work) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(value == {"answer": 1} for value, _ in results)
+    assert flight.stats()["coalesced_local"] == 3
+
+
+def test_workers_share_a_run_through_the_database(tmp_path):
+    path = str(tmp_path / "inflight.sqlite3")
+    first = SingleFlight(path, poll_sec=0.01)
+    second = SingleFlight(path, poll_sec=0.01)
+    started = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"answer": "shared"}
+
+    leader = threading.Thread(target=first.run, args=("k", work))
+    leader.start()
+    started.wait(timeout=5)
+    value, meta = second.run("k", work)
+    leader.join(timeout=5)
+
+    assert len(calls) == 1
+    assert value == {"answer": "shared"}
+    assert meta == {"role": "follower", "source": "shared"}
+    assert second.stats()["coalesced_shared"] == 1
+
+
+def test_shared_followers_receive_errors(tmp_path):
+    path = str(tmp_path / "inflight.sqlite3")
+    first = SingleFlight(path, poll_sec=0.01)
+    second = SingleFlight(path, poll_sec=0.01)
+    started = threading.Event()
+
+    def work():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("boom")
+
+    def lead():
+        with pytest.raises(RuntimeError):
+            first.run("k", work)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(timeout=5)
+    with pytest.raises(CoalescedRequestError, match="boom"):
+        second.run("k", lambda: {"answer": "never"})
+    leader.join(timeout=5)
+
+
+def test_claim_of_a_dead_worker_is_taken_over(tmp_path):
+    path = str(tmp_path / "inflight.sqlite3")
+    flight = SingleFlight(path, poll_sec=0.01)
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    flight._shared.claim("k")
+    with closing(flight._shared._connect()) as conn:
+        conn.execute("UPDATE flights SET pid = ? WHERE key = ?", (dead.pid, "k"))
+
+    value, meta = flight.run("k", lambda: {"answer": "mine"})
+    assert value == {"answer": "mine"}
+    assert meta == {"role": "leader"}
+
+
+def test_stale_claim_is_taken_over(tmp_path):
+    path = str(tmp_path / "inflight.sqlite3")
+    flight = SingleFlight(path, poll_sec=0.01, stale_sec=0)
+    flight._shared.claim("k")
+    with closing(flight._shared._connect()) as conn:
+        conn.execute("UPDATE flights SET pid = ?, started_at = started_at - 1 WHERE key = ?", (os.getpid(), "k"))
+
+    value, _ = flight.run("k", lambda: {"answer": "mine"})
+    assert value == {"answer": "mine"}
+
+
+def _request(image=b"worksheet", board="CBSE"):
+    return api.GenerateRequest(
+        image_refs=[IMAGES.put(image)],
+        class_level="11",
+        board=board,
+        target_exam="NEET",
+    )
+
+
+def test_request_key_covers_image_and_profile():
+    assert api.request_key(_request()) == api.request_key(_request())
+    assert api.request_key(_request()) != api.request_key(_request(image=b"other"))
+    assert api.request_key(_request()) != api.request_key(_request(board="ICSE"))
+
+
+class _SlowGraph:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, state):
+        self.calls += 1
+        time.sleep(0.2)
+        return state.model_copy(update={
+            "question_bank": {"mcq": [{"question": "q"}]},
+            "run_diagnostics": {"events": []},
+        })
+
+
+def test_pipeline_run_coalesces_identical_requests():
+    pipeline = api.Pipeline.__new__(api.Pipeline)
+    pipeline._graph = _SlowGraph()
+    pipeline._single_flight = SingleFlight()
+
+    responses = _concurrently(4, lambda: pipeline.run(_request()))
+
+    assert pipeline._graph.calls == 1
+    assert all(response.questions == {"mcq": [{"question": "q"}]} for response in responses)
+    roles = sorted(response.diagnostics["request_coalescing"]["role"] for response in responses)
+    assert roles == ["follower"] * 3 + ["leader"]
+    assert pipeline.coalescing_stats()["coalesced"] == 3
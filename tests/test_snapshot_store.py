@@ -0,0 +1,148 @@
+import time
+
+from core.graph import resume_run
+from core.plan_cache import PlanCache
+from core.planner_repair import fallback_plan
+from core.snapshot_store import SnapshotStore
+from core.snapshots import SnapshotWriter
+from core.state import GroundedContext, TutoringState, UserProfile
+from config import agent_executor
+
+
+PROFILE = UserProfile(class_level="11", board="CBSE", target_exam="NEET")
+CONTEXT = GroundedContext(metadata={"subject": "Physics", "chapter": "Motion", "sub_topic": "Velocity"})
+
+
+def _state():
+    return TutoringState(user_profile=PROFILE, image_refs=["dummy"])
+
+
+def _writer(store):
+    return SnapshotWriter(store.path, sink=store, flush_interval_sec=0.01)
+
+
+def _entry(run_id, stage, state, previous=None, timestamp=0.0):
+    return {
+        "timestamp": timestamp,
+        "run_id": run_id,
+        "stage": stage,
+        "seq": 0,
+        "state": state,
+        "previous": previous,
+        "final": False,
+    }
+
+
+def test_any_stage_loads_from_its_keyframe(tmp_path):
+    store = SnapshotStore(str(tmp_path / "s.sqlite3"), keyframe_every=3)
+    writer = _writer(store)
+    state, other = _state(), _state()
+    dumps = []
+    for index in range(7):
+        state.knowledge_base[f"task{index}"] = "x" * 200
+        state.run_diagnostics["events"].append({"label": f"task{index}"})
+        writer.submit(state, f"task:{index}", final=index == 6)
+        writer.submit(other, f"task:{index}")
+        dumps.append(state.model_dump())
+    writer.flush()
+
+    stages = store.stages(state.run_id)
+    assert [entry["kind"] for entry in stages] == ["full", "delta", "delta"] * 2 + ["full"]
+    assert [store.load(state.run_id, seq=seq)["state"] for seq in range(7)] == dumps
+    assert store.load(state.run_id, stage="task:4")["state"] == dumps[4]
+    assert store.load(state.run_id)["stage"] == "task:6"
+    assert store.load(state.run_id, stage="planner") is None
+    assert store.load("missing") is None
+
+    runs = {run["run_id"]: run for run in store.runs()}
+    assert runs[state.run_id]["final"] is True and runs[state.run_id]["records"] == 7
+    assert store.stats()["records"] == 14
+
+
+def test_retention_by_age_and_size(tmp_path):
+    now = time.time()
+    store = SnapshotStore(
+        str(tmp_path / "s.sqlite3"),
+        retention_sec=100,
+        retention_max_bytes=None,
+        retention_check_sec=3600,
+    )
+    store.write([_entry("new", "multimodal", {"a": 1}, timestamp=now - 10)])  # checks retention
+    store.write([_entry("old", "multimodal", {"a": 1}, timestamp=now - 1000)])  # too soon to check
+
+    assert len(store.runs()) == 2
+    assert store.prune() == 1
+    assert [run["run_id"] for run in store.runs()] == ["new"]
+
+    sized = SnapshotStore(str(tmp_path / "t.sqlite3"), retention_sec=None, retention_max_bytes=1)
+    sized.write([_entry("first", "multimodal", {"a": 1}, timestamp=1.0)])
+    sized.write([_entry("second", "multimodal", {"a": 1}, timestamp=2.0)])
+    sized.prune()
+    assert [run["run_id"] for run in sized.runs()] == []
+    assert sized.stats()["pruned_runs"] == 2
+
+
+def test_pruned_run_restarts_with_a_keyframe(tmp_path):
+    store = SnapshotStore(str(tmp_path / "s.sqlite3"), retention_sec=100)
+    store.write([_entry("run", "multimodal", {"a": 1}, timestamp=1000.0)])
+    store.prune(now=2000.0)
+    store.write([_entry("run", "planner", {"a": 2}, previous={"a": 1}, timestamp=2000.0)])
+
+    assert store.stages("run")[0]["kind"] == "full"
+    assert store.load("run", stage="planner")["state"] == {"a": 2}
+
+
+def test_plan_cache_seeds_from_the_store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "s.sqlite3"))
+    writer = _writer(store)
+    state = _state()
+    writer.submit(state, "multimodal")
+    state.grounded_context = CONTEXT
+    state.plan = fallback_plan(PROFILE, CONTEXT)
+    state.run_diagnostics["plan_status"] = "valid"
+    writer.submit(state, "planner")
+    writer.flush()
+
+    cache = PlanCache()
+    assert cache.seed_from_snapshots(store.path) == 1
+    assert cache.lookup(PROFILE, CONTEXT)[1] == "cache"
+    assert PlanCache().seed_from_snapshots(str(tmp_path / "missing.sqlite3")) == 0
+
+
+def test_resume_skips_finished_tasks(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_agent(agent_id):
+        def _run(*args, **kwargs):
+            calls.append(agent_id)
+            return {"knowledge_base": {agent_id: "resumed"}}
+        return _run
+
+    for agent_id in ("content_analyzer", "exam_pattern_analyst", "question_generator"):
+        monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, agent_id, fake_agent(agent_id))
+
+    store = SnapshotStore(str(tmp_path / "s.sqlite3"))
+    writer = _writer(store)
+    state = _state()
+    state.grounded_context = CONTEXT
+    state.plan = fallback_plan(PROFILE, CONTEXT)
+    writer.submit(state, "planner")
+    state.knowledge_base["content_analyzer"] = "original"
+    writer.submit(state, "task:extract_core_content")
+    writer.flush()
+
+    resumed = resume_run(store, state.run_id, None, stage="task:extract_core_content")
+
+    assert "content_analyzer" not in calls and "question_generator" in calls
+    assert resumed.knowledge_base["content_analyzer"] == "original"
+    assert resumed.run_id != state.run_id
+    assert resumed.run_diagnostics["resumed_from"] == {
+        "run_id": state.run_id,
+        "stage": "task:extract_core_content",
+        "seq": 1,
+        "completed_tasks": ["extract_core_content"],
+    }
+
+    calls.clear()
+    resume_run(store, state.run_id, None, stage="planner")
+    assert "content_analyzer" in calls
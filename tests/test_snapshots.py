@@ -0,0 +1,139 @@
+import json
+import threading
+
+import pytest
+
+from core.plan_cache import PlanCache
+from core.planner_repair import fallback_plan
+from core.snapshots import SnapshotWriter, apply_delta, diff_state, iter_snapshots, sampled
+from core.state import GroundedContext, TutoringState, UserProfile
+
+
+PROFILE = UserProfile(class_level="11", board="CBSE", target_exam="NEET")
+CONTEXT = GroundedContext(metadata={"subject": "Physics", "chapter": "Motion", "sub_topic": "Velocity"})
+
+
+def test_delta_round_trip():
+    old = {
+        "a": 1,
+        "nested": {"keep": [1, 2], "drop": True, "a/b": {"x": 1}},
+        "events": [{"label": "multimodal"}],
+        "shrinks": [1, 2, 3],
+    }
+    new = {
+        "a": 2,
+        "nested": {"keep": [1, 2], "a/b": {"x": 2}, "added": None},
+        "events": [{"label": "multimodal"}, {"label": "planner"}],
+        "shrinks": [1],
+        "fresh": {"k": "v"},
+    }
+    delta = diff_state(old, new)
+
+    assert delta["append"] == {"/events": [{"label": "planner"}]}
+    assert delta["unset"] == ["/nested/drop"]
+    assert "/nested/a~1b/x" in delta["set"]
+    assert apply_delta(old, delta) == new
+    assert old["events"] == [{"label": "multimodal"}]
+    assert diff_state(new, new) == {}
+
+
+def _state():
+    return TutoringState(user_profile=PROFILE, image_refs=["dummy"])
+
+
+def test_writer_records_a_full_state_then_deltas(tmp_path):
+    path = str(tmp_path / "state.jsonl")
+    writer = SnapshotWriter(path, flush_interval_sec=0.01)
+    state = _state()
+    dumps = []
+
+    for stage in ("multimodal", "planner", "executor"):
+        state.run_diagnostics["events"].append({"label": stage})
+        state.knowledge_base[stage] = stage * 100
+        writer.submit(state, stage, final=stage == "executor")
+        dumps.append(state.model_dump())
+    writer.flush()
+
+    lines = [json.loads(line) for line in open(path)]
+    assert [("state" in line, "delta" in line) for line in lines] == [(True, False), (False, True), (False, True)]
+    assert [line["seq"] for line in lines] == [0, 1, 2]
+    assert lines[2]["final"] is True
+    assert len(json.dumps(lines[2])) < len(json.dumps(lines[0]))
+    assert [record["state"] for record in iter_snapshots(path)] == dumps
+    assert writer.stats()["open_runs"] == 0
+
+
+def test_interleaved_runs_are_rebuilt_separately(tmp_path):
+    path = str(tmp_path / "state.jsonl")
+    writer = SnapshotWriter(path, flush_interval_sec=0.01)
+    first, second = _state(), _state()
+
+    writer.submit(first, "multimodal")
+    writer.submit(second, "multimodal")
+    first.knowledge_base["solver"] = "first"
+    second.knowledge_base["solver"] = "second"
+    writer.submit(second, "executor", final=True)
+    writer.submit(first, "executor", final=True)
+    writer.flush()
+
+    finals = {record["run_id"]: record["state"] for record in iter_snapshots(path) if record.get("final")}
+    assert finals[first.run_id]["knowledge_base"] == {"solver": "first"}
+    assert finals[second.run_id]["knowledge_base"] == {"solver": "second"}
+
+
+class _Undumpable:
+    run_id = "run"
+
+    def model_dump(self):
+        raise AssertionError("level off must not dump the state")
+
+
+def test_level_off_skips_the_dump(tmp_path):
+    writer = SnapshotWriter(str(tmp_path / "state.jsonl"), level="off")
+    assert writer.submit(_Undumpable(), "planner") is False
+    writer.flush()
+    assert not (tmp_path / "state.jsonl").exists()
+
+
+def test_sampled_level_keeps_whole_runs(tmp_path):
+    writer = SnapshotWriter(str(tmp_path / "state.jsonl"), level="sampled", sample_rate=0.5)
+    run_ids = [f"run-{index}" for index in range(200)]
+    kept = [run_id for run_id in run_ids if writer.records(run_id)]
+
+    assert 60 < len(kept) < 140
+    assert all(writer.records(run_id) == sampled(run_id, 0.5) for run_id in run_ids)
+    assert not SnapshotWriter("x", level="sampled", sample_rate=0.0).records("run-1")
+    with pytest.raises(ValueError):
+        SnapshotWriter("x", level="verbose")
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    path = str(tmp_path / "state.jsonl")
+    writer = SnapshotWriter(path, queue_max=1, flush_interval_sec=0.01)
+    release = threading.Event()
+    original_write = writer._write
+    writer._write = lambda records: (release.wait(5), original_write(records))
+    state = _state()
+
+    results = [writer.submit(state, f"stage{index}") for index in range(5)]
+    release.set()
+    writer.flush()
+
+    assert results.count(False) == writer.stats()["dropped"] >= 1
+    assert writer.stats()["written"] == results.count(True)
+
+
+def test_plan_cache_seeds_from_delta_snapshots(tmp_path):
+    path = str(tmp_path / "state.jsonl")
+    writer = SnapshotWriter(path, flush_interval_sec=0.01)
+    state = _state()
+    writer.submit(state, "multimodal")
+    state.grounded_context = CONTEXT
+    state.plan = fallback_plan(PROFILE, CONTEXT)
+    state.run_diagnostics["plan_status"] = "valid"
+    writer.submit(state, "planner")
+    writer.flush()
+
+    cache = PlanCache()
+    assert cache.seed_from_snapshots(path) == 1
+    assert cache.lookup(PROFILE, CONTEXT)[1] == "cache"
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import re
+import threading
+import time
+
+import pytest
+
+import agents.solving.solver_agent as solver_module
+from agents.solving.solver_agent import solver_agent, asolver_agent
+from core.cache import LRUCache
+from core.llm_cache import CachedLLM
+from core.sharding import shard_question_bank, merge_shard_outputs
+from core.state import PlannerOutput, TutoringState, UserProfile
+from config.context import AGENT_CONTEXT_TOKEN_BUDGETS
+
+TASK = {"task_id": "solver"}
+
+BANK = {
+    "mcq": [{"question": f"M{i}", "options": ["A", "B"]} for i in range(5)],
+    "short_answer": [{"question": f"S{i}"} for i in range(2)],
+    "long_answer": [],
+}
+
+
+def _state(bank=BANK):
+    return TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(planning_context={"subject": "Physics"}),
+        question_bank=bank,
+    )
+
+
+def _questions(prompt):
+    return re.findall(r'"question":"([^"]+)"', prompt)
+
+
+def _section(prompt):
+    return re.search(r'QUESTIONS:\n\{"(\w+)"', prompt).group(1)
+
+
+def _solve(prompt):
+    return json.dumps({
+        _section(prompt): [
+            {"question": q, "steps": ["think"], "final_answer": q.lower()}
+            for q in _questions(prompt)
+        ]
+    })
+
+
+@pytest.fixture(autouse=True)
+def _small_shards(monkeypatch):
+    monkeypatch.setattr(solver_module, "SOLVER_SHARD_SIZE", 2)
+    monkeypatch.setattr(solver_module, "SOLVER_MAX_PARALLEL_SHARDS", 3)
+
+
+def test_shard_question_bank_by_section_and_size():
+    shards = shard_question_bank(BANK, 2)
+    assert [(s["section"], s["offset"], len(s["items"])) for s in shards] == [
+        ("mcq", 0, 2), ("mcq", 2, 2), ("mcq", 4, 1), ("short_answer", 0, 2),
+    ]
+
+
+def test_merge_uses_misfiled_sections():
+    shards = shard_question_bank({"mcq": [{"question": "a"}], "long_answer": [{"question": "b"}]}, 5)
+    merged = merge_shard_outputs(shards, [{"mcq": ["x"]}, {"mcq": ["y"], "long_answer": []}])
+    assert merged == {"mcq": ["x"], "short_answer": [], "long_answer": ["y"]}
+
+
+def test_sharded_solver_merges_in_order(fake_llm):
+    fake = fake_llm(_solve)
+    update = solver_agent(llm=fake, task=TASK, state=_state())
+
+    assert len(fake.calls) == 4
+    output = update["solver_output"]
+    assert [s["question"] for s in output["mcq"]] == ["M0", "M1", "M2", "M3", "M4"]
+    assert [s["final_answer"] for s in output["short_answer"]] == ["s0", "s1"]
+    assert output["long_answer"] == []
+
+    diagnostics = update["diagnostics"]
+    assert diagnostics["json_extraction"] == {"strategy": "sharded"}
+    assert [s["questions"] for s in diagnostics["shards"]] == [2, 2, 1, 2]
+    assert diagnostics["prompt_tokens"] == sum(s["prompt_tokens"] for s in diagnostics["shards"])
+
+
+def test_bank_too_large_for_one_prompt_is_split_not_cut(fake_llm, monkeypatch):
+    monkeypatch.setattr(solver_module, "SOLVER_SHARDING_ENABLED", False)
+    monkeypatch.setitem(AGENT_CONTEXT_TOKEN_BUDGETS, "solver", 20)
+    fake = fake_llm(_solve)
+    update = solver_agent(llm=fake, task=TASK, state=_state())
+
+    output = update["solver_output"]
+    assert [s["question"] for s in output["mcq"]] == ["M0", "M1", "M2", "M3", "M4"]
+    assert [s["question"] for s in output["short_answer"]] == ["S0", "S1"]
+    assert len(fake.calls) == len(update["diagnostics"]["shards"]) > 2
+    assert all(s["prompt_tokens"] for s in update["diagnostics"]["shards"])
+
+
+def test_shards_run_concurrently_with_bounded_parallelism(fake_llm):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def responder(prompt):
+        with lock:
+            active.append(prompt)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(prompt)
+        return _solve(prompt)
+
+    solver_agent(llm=fake_llm(responder), task=TASK, state=_state())
+    assert max(peak) == 3
+
+
+def test_failed_shard_is_retried_alone(fake_llm):
+    attempts = {}
+
+    def responder(prompt):
+        key = _questions(prompt)[0]
+        attempts[key] = attempts.get(key, 0) + 1
+        if key == "M2" and attempts[key] == 1:
+            return "not json at all"
+        return _solve(prompt)
+
+    update = solver_agent(llm=fake_llm(responder, structured=False), task=TASK, state=_state())
+
+    assert attempts == {"M0": 1, "M2": 2, "M4": 1, "S0": 1}
+    assert update["solver_output"]["mcq"][2]["final_answer"] == "m2"
+    assert update["diagnostics"]["shards"][1]["attempts"] == 2
+
+
+def test_exhausted_shard_gets_placeholders(fake_llm):
+    def responder(prompt):
+        return "{}" if "M4" in _questions(prompt) else _solve(prompt)
+
+    update = solver_agent(llm=fake_llm(responder, structured=False), task=TASK, state=_state())
+
+    mcq = update["solver_output"]["mcq"]
+    assert mcq[4] == {"question": "M4", "steps": [], "final_answer": ""}
+    assert mcq[3]["final_answer"] == "m3"
+    assert update["diagnostics"]["shards"][2]["fallback_used"] is True
+
+
+@pytest.mark.parametrize("structured", [False, True])
+def test_failed_shard_forgets_only_its_own_response(fake_llm, structured):
+    def responder(prompt):
+        return "{}" if "M4" in _questions(prompt) else _solve(prompt)
+
+    fake = fake_llm(responder, structured=structured)
+    llm = CachedLLM(fake, model_name="test-model", memory=LRUCache(32))
+    solver_agent(llm=llm.for_agent("solver"), task=TASK, state=_state())
+    first = len(fake.calls)
+
+    # Only the failed shard goes back to the model; the others are cached.
+    solver_agent(llm=llm.for_agent("solver"), task=TASK, state=_state())
+    assert [_questions(prompt) for prompt in fake.calls[first:]] == [["M4"], ["M4"]]
+
+
+def test_every_shard_failing_raises(fake_llm):
+    with pytest.raises(RuntimeError):
+        solver_agent(llm=fake_llm("{}", structured=False), task=TASK, state=_state())
+
+
+def test_small_bank_uses_single_prompt(fake_llm):
+    fake = fake_llm(_solve)
+    update = solver_agent(llm=fake, task=TASK, state=_state({"mcq": [{"question": "M0"}]}))
+
+    assert len(fake.calls) == 1
+    assert update["diagnostics"]["json_extraction"] == {"strategy": "structured"}
+
+
+def test_async_sharded_solver(fake_llm):
+    fake = fake_llm(_solve)
+    update = asyncio.run(asolver_agent(llm=fake, task=TASK, state=_state()))
+
+    assert len(fake.calls) == 4
+    assert [s["question"] for s in update["solver_output"]["short_answer"]] == ["S0", "S1"]
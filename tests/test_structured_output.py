@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from agents.evaluation.evaluator_agent import aevaluator_agent
+from agents.generation.question_generator import question_generator_agent
+from core.cache import LRUCache
+from core.llm_cache import CachedLLM
+from core.schemas import QuestionBank
+from core.state import PlannerOutput, TutoringState, UserProfile
+
+BANK = {
+    "mcq": [{"question": "What is H_2O?", "options": ["Water", "Salt"], "answer": "Water"}],
+    "short_answer": [{"question": "Define pH.", "marks": 2}],
+}
+TASK = {"task_id": "question_generator", "purpose": "Generate", "expected_output": "Questions"}
+
+
+def _state(*agents):
+    return TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=PlannerOutput(
+            planning_context={"subject": "Chemistry"},
+            subtasks=[{"task_id": agent, "executed_by": agent} for agent in agents],
+            execution_order=list(agents),
+        ),
+    )
+
+
+def test_generator_uses_structured_output(fake_llm):
+    fake = fake_llm(json.dumps(BANK))
+    update = question_generator_agent(llm=fake, task=TASK, state=_state())
+
+    assert fake.structured_calls == ["QuestionBank"]
+    mcq = update["question_bank"]["mcq"][0]
+    assert mcq["question"] == "What is H₂O?"
+    assert mcq["explanation"] == ""
+    assert update["question_bank"]["short_answer"][0]["marks"] == 2
+    assert update["question_bank"]["long_answer"] == []
+    assert update["diagnostics"]["json_extraction"] == {"strategy": "structured"}
+
+
+def test_generator_stays_structured_when_the_plan_solves(fake_llm):
+    # Streaming is available and the plan runs the solver, but pipelined
+    # solving is off by default, so the bank is still schema-constrained.
+    fake = fake_llm(json.dumps(BANK))
+    update = question_generator_agent(llm=fake, task=TASK, state=_state("question_generator", "solver"))
+
+    assert fake.stream_calls == []
+    assert fake.structured_calls == ["QuestionBank"]
+    assert update["diagnostics"]["json_extraction"] == {"strategy": "structured"}
+
+
+def test_generator_falls_back_to_text_json(fake_llm):
+    fake = fake_llm("Here: " + json.dumps(BANK), structured=False)
+    update = question_generator_agent(llm=fake, task=TASK, state=_state())
+
+    assert fake.structured_calls == []
+    assert update["question_bank"]["mcq"][0]["answer"] == "Water"
+    assert update["diagnostics"]["json_extraction"]["strategy"] == "scan"
+
+
+def test_async_evaluator_structured(fake_llm):
+    fake = fake_llm({"overall_feedback": "Good", "mcq": [{"question": "Q1", "is_correct": True}]})
+    update = asyncio.run(
+        aevaluator_agent(llm=fake, task={"task_id": "evaluator"}, state=_state())
+    )
+
+    assert fake.structured_calls == ["Evaluation"]
+    assert update["evaluation"]["overall_feedback"] == "Good"
+    assert update["evaluation"]["mcq"][0]["is_correct"] is True
+
+
+def test_cached_structured_output(fake_llm):
+    fake = fake_llm(json.dumps(BANK))
+    llm = CachedLLM(fake, model_name="test-model", memory=LRUCache(8))
+
+    view = llm.for_agent("question_generator")
+    first = view.with_structured_output(QuestionBank).invoke("generate")
+    second = view.with_structured_output(QuestionBank).invoke("generate")
+
+    assert isinstance(second, QuestionBank)
+    assert second == first
+    assert fake.structured_calls == ["QuestionBank"]
+    assert view.stats() == {"enabled": True, "hits": 1, "misses": 1}
+
+    # Plain text calls for the same prompt use a separate cache entry.
+    assert view.invoke("generate").content == json.dumps(BANK)
+    assert len(fake.calls) == 2
+
+
+def test_cache_wrapper_without_structured_mode(fake_llm):
+    llm = CachedLLM(fake_llm("x", structured=False), model_name="m", memory=LRUCache(8))
+    assert not hasattr(llm, "with_structured_output")
+    assert not hasattr(llm.for_agent("solver"), "with_structured_output")
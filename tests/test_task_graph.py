@@ -0,0 +1,85 @@
+import threading
+
+from core.routing import task_executor
+from core.state import PlannerOutput, TutoringState, UserProfile
+from core.task_graph import build_task_dependencies
+from config import agent_executor
+
+
+def _task(task_id, agent_id):
+    return {
+        "task_id": task_id,
+        "purpose": task_id,
+        "expected_output": task_id,
+        "priority": "High",
+        "executed_by": agent_id,
+    }
+
+
+def test_default_chain_dependencies():
+    subtasks = {
+        agent: _task(agent, agent)
+        for agent in (
+            "content_analyzer",
+            "exam_pattern_analyst",
+            "question_designer",
+            "question_generator",
+            "solver",
+            "evaluator",
+        )
+    }
+    deps = build_task_dependencies(list(subtasks), subtasks)
+
+    assert deps["content_analyzer"] == set()
+    assert deps["exam_pattern_analyst"] == {"content_analyzer"}
+    assert "question_designer" in deps["question_generator"]
+    assert deps["solver"] == {"question_generator"}
+    assert deps["evaluator"] == {"question_generator", "solver"}
+
+
+def test_independent_and_unknown_tasks():
+    subtasks = {
+        "extract": _task("extract", "content_analyzer"),
+        "solve": _task("solve", "solver"),
+        "custom": _task("custom", "not_registered"),
+    }
+    deps = build_task_dependencies(["extract", "solve", "custom"], subtasks)
+
+    assert deps["extract"] == set()
+    assert deps["solve"] == set()
+    # Undeclared agents act as barriers
+    assert deps["custom"] == {"extract", "solve"}
+
+
+def test_independent_tasks_run_concurrently(monkeypatch):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_content_analyzer(*args, **kwargs):
+        barrier.wait()
+        return {"knowledge_base": {"content_analyzer": "content"}}
+
+    def fake_solver(*args, **kwargs):
+        barrier.wait()
+        return {"solver_output": {"mcq": [{"solution": "A"}]}, "knowledge_base": {"solver": "sol"}}
+
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "content_analyzer", fake_content_analyzer)
+    monkeypatch.setitem(agent_executor.AGENT_EXECUTORS, "solver", fake_solver)
+
+    plan = PlannerOutput(
+        planning_context={},
+        objective="test",
+        subtasks=[_task("solver", "solver"), _task("content_analyzer", "content_analyzer")],
+        execution_order=["solver", "content_analyzer"],
+    )
+    state = TutoringState(
+        user_profile=UserProfile(class_level="11", board="CBSE", target_exam="NEET"),
+        image_refs=["dummy"],
+        plan=plan,
+    )
+
+    updated = task_executor(llm=None, state=state)
+
+    assert updated.run_diagnostics["fallbacks"] == []
+    assert updated.solver_output["mcq"] == [{"solution": "A"}]
+    # knowledge_base sections follow execution_order, not completion order
+    assert list(updated.knowledge_base) == ["solver", "content_analyzer"]
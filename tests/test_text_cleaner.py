@@ -0,0 +1,79 @@
+import random
+import re
+
+import markdown
+from bs4 import BeautifulSoup
+from pylatexenc.latex2text import LatexNodes2Text
+
+from preprocessing.text_cleaner import (
+    SUBSCRIPT_MAP,
+    SUPERSCRIPT_MAP,
+    clean_llm_json,
+    normalize_text_preserve_lines,
+)
+
+
+# Verbatim copy of the original per-line engine; the fast path must match it.
+def _reference_normalize(text):
+    converter = LatexNodes2Text()
+    cleaned_lines = []
+    previous_blank = False
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    for line in text.split("\n"):
+        line = re.sub(r"\$(.*?)\$", r"\1", line)
+        line = re.sub(r"\\xrightarrow\s*\{([^}]+)\}", r" →[\1] ", line)
+        line = re.sub(r"\\leftrightarrow", " ⇌ ", line)
+        line = re.sub(r"\\rightarrow|\\to", " → ", line)
+        html = markdown.markdown(line, extensions=["extra"])
+        line = BeautifulSoup(html, "html.parser").get_text(separator=" ")
+        line = re.sub(r"_\{?([0-9]+)\}?", lambda m: m.group(1).translate(SUBSCRIPT_MAP), line)
+        line = re.sub(r"\^\{?([0-9]+)\}?", lambda m: m.group(1).translate(SUPERSCRIPT_MAP), line)
+        line = converter.latex_to_text(line)
+        line = re.sub(r"\s+", " ", line).strip()
+        if line == "":
+            if not previous_blank:
+                cleaned_lines.append("")
+            previous_blank = True
+        else:
+            cleaned_lines.append(line)
+            previous_blank = False
+    while cleaned_lines and cleaned_lines[0] == "":
+        cleaned_lines.pop(0)
+    while cleaned_lines and cleaned_lines[-1] == "":
+        cleaned_lines.pop()
+    return "\n".join(cleaned_lines)
+
+
+_TOKENS = list("abXZ09 .,;:?!'\"()/=+-*_#>&<|[]{}~`$%^\\\t\n\r\x0c\u00a0é→") + [
+    "1. ", "- ", "    ", "\\frac{1}{2}", "\\xrightarrow{heat}", "\\xrightarrow\n{x}",
+    "\\to", "\\leftrightarrow", "H_2O", "x^{2}", "$x$", "**b**", "`c`", "[l](u)",
+    "<b>", "&amp;", "--", "''", "```", "~~~", "---", "# ", "> ", "|a|b|", "*[HTML]: x",
+    "{: .c}", "\\{", "10. ", "CO_{2}", "%c", "\\alpha", "\u2028",
+]
+
+
+def test_matches_reference_on_examples():
+    samples = [
+        "",
+        "Plain sentence, nothing to clean.",
+        "1. First option\n\n\n2. Second option",
+        "**Bold** and `code` with $x^2$ and H_2O",
+        "N_2 + 3H_2 \\xrightarrow{Fe} 2NH_3\nA \\leftrightarrow B",
+        "\\frac{1}{2} mv^{2} -- energy 50% ``quoted''",
+        "    indented code\n# Heading\n> quote\n- item",
+        "A & B < C",
+    ]
+    for sample in samples:
+        assert normalize_text_preserve_lines(sample) == _reference_normalize(sample)
+
+
+def test_matches_reference_on_random_text():
+    rng = random.Random(1234)
+    for _ in range(1000):
+        sample = "".join(rng.choice(_TOKENS) for _ in range(rng.randint(0, 10)))
+        assert normalize_text_preserve_lines(sample) == _reference_normalize(sample), repr(sample)
+
+
+def test_clean_llm_json_cleans_string_leaves():
+    payload = {"mcq": [{"question": "**What** is H_2O?", "marks": 1}]}
+    assert clean_llm_json(payload) == {"mcq": [{"question": "What is H₂O?", "marks": 1}]}
@@ -0,0 +1,83 @@
+import pytest
+
+from tools.units import (
+    REGISTRY,
+    UnitError,
+    compatible,
+    conversion_factor,
+    convert,
+    convert_many,
+    format_dimension,
+    parse_unit,
+)
+
+
+@pytest.mark.parametrize("unit, factor, dimension", [
+    ("km/h", 1 / 3.6, "L T^-1"),
+    ("kg*m^2/s^2", 1.0, "L^2 M T^-2"),
+    ("m s^-1", 1.0, "L T^-1"),
+    ("m s-1", 1.0, "L T^-1"),
+    ("J/(mol K)", 1.0, "L^2 M T^-2 Θ^-1 N^-1"),
+    ("J/mol*K", 1.0, "L^2 M T^-2 Θ^-1 N^-1"),
+    ("mol L⁻¹", 1e3, "L^-3 N"),
+    ("(m/s)^2", 1.0, "L^2 T^-2"),
+    ("g/cm^3", 1e3, "L^-3 M"),
+    ("μF", 1e-6, "L^-2 M^-1 T^4 I^2"),
+    ("kΩ", 1e3, "L^2 M T^-3 I^-2"),
+    ("MeV", 1.602176634e-13, "L^2 M T^-2"),
+    ("min", 60.0, "T"),
+    ("%", 0.01, "1"),
+])
+def test_parse_unit(unit, factor, dimension):
+    parsed_factor, parsed_dimension, offset = parse_unit(unit)
+    assert parsed_factor == pytest.approx(factor)
+    assert format_dimension(parsed_dimension) == dimension
+    assert offset == 0.0
+
+
+def test_prefixes_are_precomputed():
+    assert REGISTRY["mm"][0] == pytest.approx(1e-3)
+    assert REGISTRY["kg"][0] == pytest.approx(1.0)
+    assert REGISTRY["um"] == REGISTRY["μm"]
+    # Plain symbols take precedence over prefixed readings.
+    assert REGISTRY["min"][0] == 60.0
+    assert REGISTRY["Pa"][0] == 1.0
+
+
+@pytest.mark.parametrize("unit", ["furlong", "m/(s", "m)", "m^", "°C/s"])
+def test_rejects_unknown_or_malformed_units(unit):
+    with pytest.raises(UnitError):
+        parse_unit(unit)
+
+
+def test_convert():
+    assert convert(36, "km/h", "m/s") == pytest.approx(10.0)
+    assert convert(1, "atm", "kPa") == pytest.approx(101.325)
+    assert convert(2, "kcal", "J") == pytest.approx(8368.0)
+    assert convert(100, "°C", "K") == pytest.approx(373.15)
+    assert convert(212, "°F", "°C") == pytest.approx(100.0)
+    assert conversion_factor("cm", "m") == pytest.approx(0.01)
+    with pytest.raises(UnitError):
+        convert(1, "N", "J")
+    with pytest.raises(UnitError):
+        conversion_factor("°C", "K")
+
+
+def test_compatible():
+    assert compatible("N*m", "J")
+    assert compatible("eV", "kJ")
+    assert not compatible("N", "kg")
+    assert not compatible("N", "furlong")
+
+
+def test_convert_many_parses_each_unit_once():
+    parse_unit.cache_clear()
+    values = convert_many([1, 2, 3, 4], ["km", "m", "km", "m"], "m")
+    assert values == pytest.approx([1000.0, 2.0, 3000.0, 4.0])
+    assert parse_unit.cache_info().misses == 2
+
+    assert convert_many([0, 273.15], ["°C", "K"], "K") == pytest.approx([273.15, 273.15])
+    with pytest.raises(UnitError):
+        convert_many([1], "s", "m")
+    with pytest.raises(ValueError):
+        convert_many([1, 2], ["m"], "m")
@@ -1,16 +1,432 @@
 #!/usr/bin/env python3
+"""
+Sandboxed arithmetic/algebra evaluation and numeric answer checking.
+
+Expressions are parsed into a restricted AST (numbers, + - * / // % **,
+whitelisted math functions and constants, caller-supplied variables);
+anything else is rejected before evaluation. Validated expressions are
+compiled once and cached, so repeat checks cost a dict lookup plus the
+arithmetic itself.
+"""
+
+import ast
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain.tools import tool
 
+from config.verification import ANSWER_REL_TOL, ANSWER_ABS_TOL
+from tools.units import UnitError, convert, format_dimension, parse_unit
+
+
+class MathError(ValueError):
+    """Raised for expressions outside the sandbox or that cannot be evaluated."""
+
+
+# Largest exponent / factorial argument allowed; keeps evaluation bounded.
+MAX_EXPONENT = 1000
+MAX_FACTORIAL = 170
+MAX_EXPRESSION_CHARS = 500
+
+# Integer powers whose result would exceed this many bits are computed in
+# floating point (and overflow) instead, so nested powers stay cheap.
+MAX_INT_POW_BITS = 4096
+
+
+def _pow(base: Any, exponent: Any) -> Any:
+    if abs(exponent) > MAX_EXPONENT:
+        raise MathError(f"exponent {exponent} is too large")
+    if (
+        isinstance(base, int)
+        and isinstance(exponent, int)
+        and abs(base) > 1
+        and (exponent > 64 or abs(base).bit_length() * exponent > MAX_INT_POW_BITS)
+    ):
+        return float(base) ** exponent
+    return base ** exponent
+
+
+def _factorial(value: Any) -> int:
+    if value != int(value) or not 0 <= value <= MAX_FACTORIAL:
+        raise MathError(f"factorial({value}) is out of range")
+    return math.factorial(int(value))
+
+
+def _log(value: Any, base: Any = math.e) -> float:
+    return math.log(value, base)
+
+
+FUNCTIONS = {
+    "sqrt": math.sqrt,
+    "cbrt": lambda value: math.copysign(abs(value) ** (1 / 3), value),
+    "exp": math.exp,
+    "ln": math.log,
+    "log": _log,
+    "log10": math.log10,
+    "log2": math.log2,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "atan2": math.atan2,
+    "sinh": math.sinh,
+    "cosh": math.cosh,
+    "tanh": math.tanh,
+    "radians": math.radians,
+    "degrees": math.degrees,
+    "abs": abs,
+    "round": round,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "min": min,
+    "max": max,
+    "factorial": _factorial,
+    "hypot": math.hypot,
+}
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+    "inf": math.inf,
+}
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+_RUNTIME = {"__builtins__": {}, "_pow": _pow, **FUNCTIONS, **CONSTANTS}
+
+
+class _Validator(ast.NodeTransformer):
+    """
+    Rejects every node outside the arithmetic subset and routes ** through
+    the bounded _pow.
+    """
+
+    def __init__(self) -> None:
+        self.names: set = set()
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        raise MathError(f"{type(node).__name__} is not allowed")
+
+    def visit_Expression(self, node: ast.Expression) -> ast.AST:
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise MathError(f"constant {node.value!r} is not allowed")
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id.startswith("_") or node.id in FUNCTIONS:
+            raise MathError(f"name {node.id!r} is not allowed")
+        self.names.add(node.id)
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        if not isinstance(node.op, _UNARY_OPERATORS):
+            raise MathError(f"{type(node.op).__name__} is not allowed")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        if not isinstance(node.op, _BINARY_OPERATORS):
+            raise MathError(f"{type(node.op).__name__} is not allowed")
+        left, right = self.visit(node.left), self.visit(node.right)
+        if isinstance(node.op, ast.Pow):
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id="_pow", ctx=ast.Load()), args=[left, right], keywords=[]),
+                node,
+            )
+        node.left, node.right = left, right
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise MathError("only calls to whitelisted math functions are allowed")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+
+def _normalize(expression: str) -> str:
+    expression = expression.strip().replace("^", "**").replace("×", "*").replace("·", "*")
+    return expression.replace("−", "-").replace("÷", "/")
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression: str) -> Tuple[Any, frozenset]:
+    """
+    Validates and compiles an expression; returns (code, free variable
+    names). Cached per expression string.
+    """
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise MathError("expression is too long")
+    try:
+        tree = ast.parse(_normalize(expression), mode="eval")
+    except SyntaxError as exc:
+        raise MathError(f"invalid expression: {exc.msg}") from None
+    validator = _Validator()
+    tree = ast.fix_missing_locations(validator.visit(tree))
+    variables = frozenset(name for name in validator.names if name not in CONSTANTS)
+    return compile(tree, "<expression>", "eval"), variables
+
+
+def evaluate(expression: str, variables: Optional[Dict[str, float]] = None) -> float:
+    """
+    Evaluates an arithmetic expression, e.g. "2*sqrt(3)^2 + v/t" with
+    variables={"v": 10, "t": 2}.
+    """
+    code, names = compile_expression(expression)
+    variables = variables or {}
+    missing = names - set(variables)
+    if missing:
+        raise MathError(f"undefined variables: {', '.join(sorted(missing))}")
+    scope = {name: variables[name] for name in names}
+    try:
+        value = eval(code, _RUNTIME, scope)
+        if isinstance(value, int):
+            # Raises OverflowError for integers no float can hold.
+            float(value)
+    except MathError:
+        raise
+    except (ArithmeticError, ValueError, TypeError) as exc:
+        raise MathError(str(exc)) from None
+    if isinstance(value, complex):
+        raise MathError("result is complex")
+    return value
+
+
+def solve_linear(equation: str, variable: str, variables: Optional[Dict[str, float]] = None) -> float:
+    """
+    Solves an equation that is linear in variable, e.g. "2*x + 3 = 11".
+    """
+    if equation.count("=") != 1:
+        raise MathError("equation needs exactly one '='")
+    left, right = equation.split("=")
+    expression = f"({left}) - ({right})"
+    known = dict(variables or {})
+
+    def residual(value: float) -> float:
+        return evaluate(expression, {**known, variable: value})
+
+    at_zero, at_one = residual(0.0), residual(1.0)
+    slope = at_one - at_zero
+    if slope == 0:
+        raise MathError(f"equation does not determine {variable}")
+    root = -at_zero / slope
+    if not math.isclose(residual(root), 0.0, abs_tol=1e-9 * max(1.0, abs(at_zero), abs(at_one))):
+        raise MathError(f"equation is not linear in {variable}")
+    return root
+
+
+def run_program(code: str) -> Any:
+    """
+    Runs newline/semicolon-separated "name = expression" assignments and an
+    optional final expression; returns its value, or the assigned names.
+    """
+    variables: Dict[str, float] = {}
+    result = None
+    for statement in re.split(r"[;\n]", code):
+        statement = statement.strip()
+        if not statement or statement.startswith("#"):
+            continue
+        match = re.fullmatch(r"([A-Za-z][A-Za-z0-9_]*)\s*=(?!=)\s*(.+)", statement)
+        if match:
+            name, expression = match.groups()
+            if name in FUNCTIONS or name in CONSTANTS:
+                raise MathError(f"cannot assign to {name!r}")
+            variables[name] = evaluate(expression, variables)
+            result = None
+        else:
+            result = evaluate(statement, variables)
+    return variables if result is None else result
+
+
 @tool
 def python_math(code: str) -> str:
     """
-    Execute Python code for mathematical computation.
+    Evaluate arithmetic for a mathematical computation.
+    Accepts expressions and "name = expression" lines, e.g.
+    "v = 20; t = 4; v / t". Supports + - * / // % ** (or ^), sqrt, exp,
+    ln, log, log10, trig functions, factorial, pi and e.
     Only use for calculations.
     """
     try:
-        local_env = {}
-        exec(code, {}, local_env)
-        return str(local_env)
-    except Exception as e:
-        return f"Error: {e}"
\ No newline at end of file
+        return str(run_program(code))
+    except MathError as e:
+        return f"Error: {e}"
+
+
+# -------------------------------------------------
+# Numeric answer checking
+# -------------------------------------------------
+
+_NUMBER = (
+    r"[-+−]?(?:\d+(?:,\d{3})*(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?"
+    r"(?:\s*(?:[x×*]|\\times)\s*10\s*(?:\^|\*\*)\s*\{?\s*[-+−]?\d+\s*\}?)?"
+)
+_QUANTITY = re.compile(rf"^(?P<number>{_NUMBER})\s*(?P<unit>[^\s\d].*)?$")
+_UNIT_TEXT = re.compile(r"^[A-Za-zΩµμ°%Å][A-Za-zΩµμ°Å0-9\s/^*·.\-()]*$")
+_OPTION_LETTER = re.compile(r"^\(?\s*(?:option\s+)?([A-Da-d])\s*[).:]?(?:\s+(?P<rest>.*))?$", re.IGNORECASE)
+_LATEX = re.compile(r"\\(?:,|;|!|\s)|\$")
+
+
+def _number(text: str) -> float:
+    text = text.replace(",", "").replace("−", "-").replace("\\times", "*").replace("×", "x")
+    match = re.fullmatch(r"([-+]?[\d.]+(?:[eE][-+]?\d+)?)(?:\s*[x*]\s*10\s*(?:\^|\*\*)\s*\{?\s*([-+]?\d+)\s*\}?)?", text.strip())
+    if match is None:
+        raise MathError(f"not a number: {text!r}")
+    mantissa, exponent = match.groups()
+    try:
+        return float(mantissa) * (10.0 ** int(exponent) if exponent else 1.0)
+    except (OverflowError, ValueError):
+        raise MathError(f"not a number: {text!r}") from None
+
+
+def normalize_unit(unit: str) -> str:
+    unit = unit.strip().rstrip(".").replace("µ", "μ").replace("**", "^").replace("·", "*")
+    unit = re.sub(r"\s*([/*^])\s*", r"\1", unit)
+    return re.sub(r"\s+", "*", unit)
+
+
+def parse_quantity(text: Any) -> Optional[Tuple[float, str]]:
+    """
+    Parses "9.8 m/s^2", "3 × 10^8 m/s", "-12.5", "2*sqrt(3)" into
+    (value, normalized unit); None when text is not a single quantity.
+    """
+    if isinstance(text, bool):
+        return None
+    if isinstance(text, (int, float)):
+        return float(text), ""
+    if not isinstance(text, str):
+        return None
+    text = _LATEX.sub(" ", text).strip().rstrip(".")
+    if not text or len(text) > MAX_EXPRESSION_CHARS:
+        return None
+    match = _QUANTITY.match(text)
+    if match:
+        unit = (match.group("unit") or "").strip()
+        if not unit or (_UNIT_TEXT.match(unit) and len(unit.split()) <= 2):
+            try:
+                return _number(match.group("number")), normalize_unit(unit)
+            except MathError:
+                pass
+    try:
+        return float(evaluate(text)), ""
+    except MathError:
+        return None
+
+
+def resolve_option(answer: Any, options: List[Any]) -> Any:
+    """
+    Maps an MCQ answer given as a letter ("B", "(b)", "Option B") to the
+    option text; other answers are returned unchanged.
+    """
+    if not isinstance(answer, str) or not options:
+        return answer
+    match = _OPTION_LETTER.match(answer.strip())
+    if match is None:
+        return answer
+    index = ord(match.group(1).upper()) - ord("A")
+    if index < len(options):
+        return options[index]
+    return answer
+
+
+def compare_quantities(
+    expected: Tuple[float, str],
+    actual: Tuple[float, str],
+    rel_tol: float = ANSWER_REL_TOL,
+    abs_tol: float = ANSWER_ABS_TOL,
+) -> Dict[str, Any]:
+    """
+    Unit-aware comparison of two parsed quantities. When both carry units
+    they must have the same dimension, and the actual value is converted
+    into the expected unit first (so "36 km/h" matches "10 m/s"); a unit
+    on only one side is reported but not failed.
+    """
+    (expected_value, expected_unit), (actual_value, actual_unit) = expected, actual
+    result: Dict[str, Any] = {
+        "expected": expected_value,
+        "actual": actual_value,
+    }
+    if expected_unit and actual_unit and expected_unit != actual_unit:
+        result["units"] = [expected_unit, actual_unit]
+        try:
+            actual_value = convert(actual_value, actual_unit, expected_unit)
+        except UnitError:
+            result["status"] = "unit_mismatch"
+            dimensions = _dimensions(expected_unit, actual_unit)
+            if dimensions:
+                result["dimensions"] = dimensions
+            return result
+        result["converted"] = actual_value
+    if bool(expected_unit) != bool(actual_unit):
+        result["unit"] = "missing"
+    if expected_unit or actual_unit:
+        result["units"] = [expected_unit, actual_unit]
+    close = math.isclose(expected_value, actual_value, rel_tol=rel_tol, abs_tol=abs_tol)
+    result["status"] = "match" if close else "mismatch"
+    return result
+
+
+def _dimensions(expected_unit: str, actual_unit: str) -> Optional[List[str]]:
+    try:
+        return [format_dimension(parse_unit(unit)[1]) for unit in (expected_unit, actual_unit)]
+    except UnitError:
+        return None
+
+
+def _answer_key(question: Dict[str, Any]) -> Any:
+    return resolve_option(question.get("answer"), question.get("options") or [])
+
+
+def check_answer(question: Any, solution: Any) -> Optional[Dict[str, Any]]:
+    """
+    Compares a solution's final answer with the question's answer key when
+    both are numeric; None when there is nothing numeric to compare.
+    """
+    if not isinstance(question, dict) or not isinstance(solution, dict):
+        return None
+    expected = parse_quantity(_answer_key(question))
+    if expected is None:
+        return None
+    actual = parse_quantity(resolve_option(solution.get("final_answer"), question.get("options") or []))
+    if actual is None:
+        return None
+    return compare_quantities(expected, actual)
+
+
+def verify_solver_output(
+    question_bank: Dict[str, Any],
+    solver_output: Dict[str, Any],
+    sections: Tuple[str, ...] = ("mcq", "short_answer", "long_answer"),
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Checks every solution against its question's answer key (matched by
+    section and index). Returns (solver_output with an "answer_check" on
+    each compared solution, summary).
+    """
+    checked = dict(solver_output)
+    summary: Dict[str, Any] = {"compared": 0, "match": 0, "mismatch": 0, "unit_mismatch": 0, "mismatches": []}
+    for section in sections:
+        questions = question_bank.get(section) if isinstance(question_bank, dict) else None
+        solutions = solver_output.get(section)
+        if not isinstance(questions, list) or not isinstance(solutions, list):
+            continue
+        annotated = list(solutions)
+        for index, (question, solution) in enumerate(zip(questions, solutions)):
+            result = check_answer(question, solution)
+            if result is None:
+                continue
+            annotated[index] = {**solution, "answer_check": result}
+            summary["compared"] += 1
+            summary[result["status"]] += 1
+            if result["status"] != "match":
+                summary["mismatches"].append({"section": section, "index": index, **result})
+        checked[section] = annotated
+    return checked, summary
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Table-driven unit registry: SI conversion factors, dimension vectors and
+SI prefixes, all precomputed at import.
+
+A parsed unit is (factor, dimension, offset): value_in_si =
+(value + offset) * factor, and dimension is the exponent vector over the
+SI base dimensions (length, mass, time, current, temperature, amount,
+luminous intensity). Offsets only exist for °C/°F on their own.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+Dimension = Tuple[int, int, int, int, int, int, int]
+Unit = Tuple[float, Dimension, float]
+
+BASE_DIMENSIONS = ("L", "M", "T", "I", "Θ", "N", "J")
+
+
+class UnitError(ValueError):
+    """Raised for unknown units, malformed unit expressions or incompatible conversions."""
+
+
+def _dim(L=0, M=0, T=0, I=0, K=0, N=0, J=0) -> Dimension:
+    return (L, M, T, I, K, N, J)
+
+
+DIMENSIONLESS = _dim()
+
+# symbol: (factor to SI, dimension, takes SI prefixes)
+_UNITS: Dict[str, Tuple[float, Dimension, bool]] = {
+    # SI base units (the kilogram is the prefixed gram)
+    "m": (1.0, _dim(L=1), True),
+    "g": (1e-3, _dim(M=1), True),
+    "s": (1.0, _dim(T=1), True),
+    "A": (1.0, _dim(I=1), True),
+    "K": (1.0, _dim(K=1), True),
+    "mol": (1.0, _dim(N=1), True),
+    "cd": (1.0, _dim(J=1), True),
+    # Derived SI units
+    "Hz": (1.0, _dim(T=-1), True),
+    "N": (1.0, _dim(M=1, L=1, T=-2), True),
+    "Pa": (1.0, _dim(M=1, L=-1, T=-2), True),
+    "J": (1.0, _dim(M=1, L=2, T=-2), True),
+    "W": (1.0, _dim(M=1, L=2, T=-3), True),
+    "C": (1.0, _dim(T=1, I=1), True),
+    "V": (1.0, _dim(M=1, L=2, T=-3, I=-1), True),
+    "Ω": (1.0, _dim(M=1, L=2, T=-3, I=-2), True),
+    "S": (1.0, _dim(M=-1, L=-2, T=3, I=2), True),
+    "F": (1.0, _dim(M=-1, L=-2, T=4, I=2), True),
+    "H": (1.0, _dim(M=1, L=2, T=-2, I=-2), True),
+    "T": (1.0, _dim(M=1, T=-2, I=-1), True),
+    "Wb": (1.0, _dim(M=1, L=2, T=-2, I=-1), True),
+    "Bq": (1.0, _dim(T=-1), True),
+    # Accepted non-SI units common in NEET/JEE questions
+    "L": (1e-3, _dim(L=3), True),
+    "eV": (1.602176634e-19, _dim(M=1, L=2, T=-2), True),
+    "cal": (4.184, _dim(M=1, L=2, T=-2), True),
+    "bar": (1e5, _dim(M=1, L=-1, T=-2), True),
+    "M": (1e3, _dim(L=-3, N=1), True),
+    "min": (60.0, _dim(T=1), False),
+    "h": (3600.0, _dim(T=1), False),
+    "day": (86400.0, _dim(T=1), False),
+    "yr": (3.15576e7, _dim(T=1), False),
+    "atm": (101325.0, _dim(M=1, L=-1, T=-2), False),
+    "torr": (101325.0 / 760, _dim(M=1, L=-1, T=-2), False),
+    "mmHg": (133.322387415, _dim(M=1, L=-1, T=-2), False),
+    "Å": (1e-10, _dim(L=1), False),
+    "u": (1.66053906660e-27, _dim(M=1), False),
+    "rad": (1.0, DIMENSIONLESS, False),
+    "°": (math.pi / 180, DIMENSIONLESS, False),
+    "%": (0.01, DIMENSIONLESS, False),
+}
+
+# Affine temperature scales: value_in_K = (value + offset) * factor.
+_OFFSET_UNITS: Dict[str, Tuple[float, float]] = {
+    "°C": (1.0, 273.15),
+    "°F": (5 / 9, 459.67),
+}
+
+_ALIASES = {
+    "l": "L", "ohm": "Ω", "amu": "u", "Da": "u", "hr": "h", "sec": "s",
+    "deg": "°", "degC": "°C", "degF": "°F", "Torr": "torr", "angstrom": "Å",
+    "meter": "m", "metre": "m", "second": "s", "gram": "g", "kilogram": "kg",
+    "newton": "N", "joule": "J", "watt": "W", "pascal": "Pa", "litre": "L",
+    "liter": "L", "mole": "mol", "kelvin": "K", "ampere": "A", "amp": "A",
+    "volt": "V", "coulomb": "C", "hertz": "Hz", "hour": "h", "minute": "min",
+    "calorie": "cal", "cc": "cm^3",
+}
+
+PREFIXES = {
+    "Y": 1e24, "Z": 1e21, "E": 1e18, "P": 1e15, "T": 1e12, "G": 1e9,
+    "M": 1e6, "k": 1e3, "h": 1e2, "da": 1e1, "d": 1e-1, "c": 1e-2,
+    "m": 1e-3, "μ": 1e-6, "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15,
+    "a": 1e-18, "z": 1e-21, "y": 1e-24,
+}
+
+
+def _build_registry() -> Dict[str, Tuple[float, Dimension]]:
+    registry: Dict[str, Tuple[float, Dimension]] = {}
+    for symbol, (factor, dimension, prefixable) in _UNITS.items():
+        if not prefixable:
+            continue
+        for prefix, scale in PREFIXES.items():
+            registry[prefix + symbol] = (factor * scale, dimension)
+    # Plain symbols win over prefixed readings ("min" is not milli-inch).
+    for symbol, (factor, dimension, _prefixable) in _UNITS.items():
+        registry[symbol] = (factor, dimension)
+    return registry
+
+
+# Every unit symbol, prefixed or not, with its SI factor and dimension.
+REGISTRY = _build_registry()
+
+_SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⁻", "0123456789-")
+_TOKEN = re.compile(r"\s*(?:(?P<symbol>[A-Za-zΩμµÅ°%]+)(?:\s*\^\s*(?:\((?P<wrapped>[-+]?\d+)\)|(?P<power>[-+]?\d+))|(?P<bare>[-+]?\d+))?|(?P<op>[*/(])|(?P<close>\))(?:\s*\^\s*(?P<group_power>[-+]?\d+))?)")
+
+
+def _lookup(symbol: str) -> Tuple[float, Dimension]:
+    symbol = _ALIASES.get(symbol, symbol).replace("µ", "μ")
+    if symbol in REGISTRY:
+        return REGISTRY[symbol]
+    if symbol.endswith("s") and symbol[:-1] in _ALIASES:
+        return _lookup(symbol[:-1])
+    if "^" in symbol:
+        return parse_unit(symbol)[:2]
+    raise UnitError(f"unknown unit: {symbol!r}")
+
+
+def _multiply(unit: Tuple[float, Dimension], other: Tuple[float, Dimension], power: int) -> Tuple[float, Dimension]:
+    factor, dimension = unit
+    other_factor, other_dimension = other
+    return (
+        factor * other_factor ** power,
+        tuple(a + b * power for a, b in zip(dimension, other_dimension)),
+    )
+
+
+def _normalize(text: str) -> str:
+    text = text.strip().translate(_SUPERSCRIPTS).replace("**", "^").replace("·", "*").replace("⋅", "*")
+    return re.sub(r"(?<=\d)\s+(?=[A-Za-zΩμµÅ°%(])", "*", text).replace(" ", "*")
+
+
+@lru_cache(maxsize=4096)
+def parse_unit(text: str) -> Unit:
+    """
+    Parses a unit expression such as "km/h", "kg*m^2/s^2", "m s^-1",
+    "J/(mol K)", "mol L⁻¹" or "°C". Everything after a "/" up to the next
+    "/" is in the denominator ("J/mol*K" is J/(mol*K)).
+    """
+    text = _normalize(text)
+    if not text:
+        return 1.0, DIMENSIONLESS, 0.0
+    offset_unit = _OFFSET_UNITS.get(_ALIASES.get(text, text))
+    if offset_unit is not None:
+        factor, offset = offset_unit
+        return factor, _dim(K=1), offset
+
+    position = 0
+    # One accumulator per open parenthesis, with the sign it is applied with.
+    group: List[Tuple[float, Dimension]] = [(1.0, DIMENSIONLESS)]
+    signs: List[int] = []
+    sign = 1
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise UnitError(f"malformed unit: {text!r}")
+        position = match.end()
+        op = match.group("op")
+        if op == "*":
+            continue
+        if op == "/":
+            sign = -1
+            continue
+        if op == "(":
+            group.append((1.0, DIMENSIONLESS))
+            signs.append(sign)
+            sign = 1
+            continue
+        if match.group("close"):
+            if not signs:
+                raise UnitError(f"unbalanced parentheses: {text!r}")
+            inner = group.pop()
+            sign = signs.pop()
+            group[-1] = _multiply(group[-1], inner, sign * int(match.group("group_power") or 1))
+            continue
+        symbol = match.group("symbol")
+        if symbol in _OFFSET_UNITS or _ALIASES.get(symbol) in _OFFSET_UNITS:
+            raise UnitError(f"{symbol} cannot be combined with other units")
+        power = int(match.group("power") or match.group("wrapped") or match.group("bare") or 1)
+        group[-1] = _multiply(group[-1], _lookup(symbol), sign * power)
+    if signs:
+        raise UnitError(f"unbalanced parentheses: {text!r}")
+    factor, dimension = group[0]
+    return factor, dimension, 0.0
+
+
+def dimension_of(unit: str) -> Dimension:
+    return parse_unit(unit)[1]
+
+
+def format_dimension(dimension: Sequence[int]) -> str:
+    """
+    Readable dimension, e.g. "L T^-1"; "1" when dimensionless.
+    """
+    parts = [
+        name if power == 1 else f"{name}^{power}"
+        for name, power in zip(BASE_DIMENSIONS, dimension)
+        if power
+    ]
+    return " ".join(parts) or "1"
+
+
+def compatible(unit: str, other: str) -> bool:
+    try:
+        return parse_unit(unit)[1] == parse_unit(other)[1]
+    except UnitError:
+        return False
+
+
+def to_si(value: float, unit: str) -> Tuple[float, Dimension]:
+    factor, dimension, offset = parse_unit(unit)
+    return (value + offset) * factor, dimension
+
+
+def conversion_factor(from_unit: str, to_unit: str) -> float:
+    """
+    Multiplier taking values in from_unit to to_unit. Offset scales (°C,
+    °F) have no single factor; use convert().
+    """
+    from_factor, from_dimension, from_offset = parse_unit(from_unit)
+    to_factor, to_dimension, to_offset = parse_unit(to_unit)
+    if from_dimension != to_dimension:
+        raise UnitError(
+            f"cannot convert {from_unit} ({format_dimension(from_dimension)}) "
+            f"to {to_unit} ({format_dimension(to_dimension)})"
+        )
+    if from_offset or to_offset:
+        raise UnitError("offset temperature scales have no conversion factor")
+    return from_factor / to_factor
+
+
+def convert(value: float, from_unit: str, to_unit: str) -> float:
+    si_value, dimension = to_si(value, from_unit)
+    to_factor, to_dimension, to_offset = parse_unit(to_unit)
+    if dimension != to_dimension:
+        raise UnitError(
+            f"cannot convert {from_unit} ({format_dimension(dimension)}) "
+            f"to {to_unit} ({format_dimension(to_dimension)})"
+        )
+    return si_value / to_factor - to_offset
+
+
+def convert_many(
+    values: Iterable[float],
+    from_units: Union[str, Sequence[str]],
+    to_unit: str,
+) -> List[float]:
+    """
+    Batch conversion: each distinct source unit is parsed and checked once,
+    then applied to all of its values as a single scale-and-shift.
+    """
+    values = list(values)
+    units = [from_units] * len(values) if isinstance(from_units, str) else list(from_units)
+    if len(units) != len(values):
+        raise ValueError("values and from_units differ in length")
+    to_factor, to_dimension, to_offset = parse_unit(to_unit)
+
+    transforms: Dict[str, Tuple[float, float]] = {}
+    for unit in set(units):
+        factor, dimension, offset = parse_unit(unit)
+        if dimension != to_dimension:
+            raise UnitError(f"cannot convert {unit} to {to_unit}")
+        # (value + offset) * factor / to_factor - to_offset
+        scale = factor / to_factor
+        transforms[unit] = (scale, offset * scale - to_offset)
+    return [value * transforms[unit][0] + transforms[unit][1] for value, unit in zip(values, units)]